@@ -2,8 +2,15 @@ import os
 import base64
 import hmac
 
+from _timing import timed
+
 
 def is_authorized(headers):
+    with timed("auth"):
+        return _check_authorized(headers)
+
+
+def _check_authorized(headers):
     user = os.getenv("BASIC_AUTH_USER")
     password = os.getenv("BASIC_AUTH_PASS")
 
@@ -54,5 +61,7 @@ def send_unauthorized(handler):
     # ✅ Dit is de “label”: hiermee herkennen we “echte login fout”
     handler.send_header("X-Auth-Reason", "basic")
 
+    body = b'{"error":"unauthorized"}'
+    handler.send_header("Content-Length", str(len(body)))
     handler.end_headers()
-    handler.wfile.write(b'{"error":"unauthorized"}')
+    handler.wfile.write(body)
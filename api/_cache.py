@@ -0,0 +1,206 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# In-process response cache (bytes), gedeeld tussen warme invocations.
+# - TTL: binnen 'ttl' seconden is een entry vers (HIT).
+# - Stale-while-revalidate: tot 'ttl + stale_ttl' wordt de oude waarde
+#   direct teruggegeven en op de achtergrond ververst (STALE).
+# - LRU met een limiet op het totaal aantal bytes.
+# - Optioneel een disk-tier (bijv. onder /tmp) die een cold start overleeft
+#   zolang de container hergebruikt wordt.
+
+
+class TTLCache:
+    def __init__(self, name, ttl, stale_ttl=0, max_bytes=64 * 1024 * 1024, disk_dir=None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._stats = {"hits": 0, "stale": 0, "misses": 0, "bypass": 0, "evictions": 0, "invalidations": 0}
+
+    # ---- memory tier ----
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _set_memory(self, key, entry):
+        size = len(entry["body"])
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old["body"])
+            if size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted["body"])
+                self._stats["evictions"] += 1
+
+    # ---- disk tier ----
+
+    def _disk_path(self, key):
+        if not self.disk_dir:
+            return None
+        raw = "|".join(str(part) for part in key) if isinstance(key, tuple) else str(key)
+        digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{self.name}-{digest}.bin")
+
+    def _get_disk(self, key):
+        path = self._disk_path(key)
+        if not path:
+            return None
+        try:
+            stored_at = os.path.getmtime(path)
+            with open(path, "rb") as fh:
+                body = fh.read()
+        except OSError:
+            return None
+        return {"body": body, "stored_at": stored_at, "hash": hashlib.sha256(body).hexdigest()}
+
+    def _set_disk(self, key, entry):
+        path = self._disk_path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, prefix=f".{self.name}-")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(entry["body"])
+            os.utime(tmp_path, (entry["stored_at"], entry["stored_at"]))
+            os.replace(tmp_path, path)
+        except OSError:
+            # Disk-tier is best effort.
+            pass
+
+    def _delete_disk(self, key):
+        path = self._disk_path(key)
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # ---- public API ----
+
+    def get(self, key):
+        entry = self._get_memory(key)
+        if entry is None:
+            entry = self._get_disk(key)
+            if entry is not None:
+                self._set_memory(key, entry)
+        if entry is None:
+            return None
+        if time.time() - entry["stored_at"] > self.ttl + self.stale_ttl:
+            return None
+        return entry
+
+    def get_fresh(self, key):
+        """Entry die nog binnen de TTL valt, anders None (geen revalidatie)."""
+        entry = self.get(key)
+        if entry is None or time.time() - entry["stored_at"] > self.ttl:
+            return None
+        return entry
+
+    def set(self, key, body):
+        # hash één keer per versie (ETag), niet per request
+        entry = {"body": body, "stored_at": time.time(), "hash": hashlib.sha256(body).hexdigest()}
+        self._set_memory(key, entry)
+        self._set_disk(key, entry)
+        return entry
+
+    def _clear_disk(self):
+        if not self.disk_dir:
+            return
+        try:
+            names = os.listdir(self.disk_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(f"{self.name}-") and name.endswith(".bin"):
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except OSError:
+                    pass
+
+    def invalidate(self, *keys):
+        """Verwijdert de gegeven keys (zonder keys: alles), ook uit de disk-tier."""
+        with self._lock:
+            for k in keys or list(self._entries.keys()):
+                old = self._entries.pop(k, None)
+                if old is not None:
+                    self._bytes -= len(old["body"])
+            self._stats["invalidations"] += 1
+        if keys:
+            for k in keys:
+                self._delete_disk(k)
+        else:
+            self._clear_disk()
+
+    def _revalidate(self, key, fetch):
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                self.set(key, fetch())
+            except Exception:
+                # Stale waarde blijft staan; volgende request probeert opnieuw.
+                pass
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=run, name=f"{self.name}-revalidate", daemon=True).start()
+
+    def get_or_fetch(self, key, fetch, refresh=False):
+        """
+        Geeft (body, status) terug; status is HIT, STALE, MISS of BYPASS.
+        'fetch' levert de body als bytes en wordt alleen aangeroepen als het moet.
+        """
+        entry, status = self.get_or_fetch_entry(key, fetch, refresh=refresh)
+        return entry["body"], status
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_or_fetch_entry(self, key, fetch, refresh=False):
+        """Als get_or_fetch, maar met de hele entry (body, stored_at, hash)."""
+        if refresh:
+            self._count("bypass")
+            return self.set(key, fetch()), "BYPASS"
+
+        entry = self.get(key)
+        if entry is not None:
+            age = time.time() - entry["stored_at"]
+            if age <= self.ttl:
+                self._count("hits")
+                return entry, "HIT"
+            self._count("stale")
+            self._revalidate(key, fetch)
+            return entry, "STALE"
+
+        self._count("misses")
+        return self.set(key, fetch()), "MISS"
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes)
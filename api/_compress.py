@@ -0,0 +1,171 @@
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from _timing import timed
+
+# Response compressie op basis van Accept-Encoding (br > gzip > identity).
+# - brotli is optioneel: zonder het 'brotli' pakket alleen gzip
+# - onder COMPRESS_MIN_BYTES niet comprimeren (overhead > winst)
+# - gestreamde responses comprimeren onderweg (sync flush per ~64KB, dus de
+#   browser kan al verder parsen)
+# - gecomprimeerde varianten van gecachete bodies worden zelf ook bewaard
+#   (LRU op bytes, sleutel = ETag + encoding), dus een HIT comprimeert niet
+#   opnieuw; die varianten krijgen een hoger compressieniveau.
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_CACHE_MAX_BYTES = int(os.getenv("COMPRESS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+BROTLI_CACHED_QUALITY = int(os.getenv("COMPRESS_BROTLI_CACHED_QUALITY", "9"))
+
+ETAG_SUFFIX = {"br": "-br", "gzip": "-gz"}
+
+_brotli = None
+_brotli_checked = False
+
+_variants = OrderedDict()
+_variants_bytes = 0
+_variants_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bytesIn": 0, "bytesOut": 0}
+
+
+def _brotli_module():
+    global _brotli, _brotli_checked
+    if not _brotli_checked:
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+        _brotli = brotli
+        _brotli_checked = True
+    return _brotli
+
+
+def supported_encodings():
+    return ("br", "gzip") if _brotli_module() is not None else ("gzip",)
+
+
+def negotiate(headers):
+    """Beste encoding volgens Accept-Encoding (q-waarden), of None voor identity."""
+    header = headers.get("Accept-Encoding") if headers else None
+    if not header:
+        return None
+    weights = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def choose(headers, size):
+    """Encoding voor een body van 'size' bytes (None: niet comprimeren)."""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    return negotiate(headers)
+
+
+def compress(body, encoding, cached=False):
+    with timed("compress"):
+        if encoding == "br":
+            quality = BROTLI_CACHED_QUALITY if cached else BROTLI_QUALITY
+            out = _brotli_module().compress(body, quality=quality)
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            out = compressor.compress(body) + compressor.flush()
+    with _variants_lock:
+        _stats["bytesIn"] += len(body)
+        _stats["bytesOut"] += len(out)
+    return out
+
+
+def compress_cached(body, encoding, key):
+    """Als compress(), maar de uitkomst wordt bewaard onder (key, encoding)."""
+    global _variants_bytes
+    cache_key = (key, encoding)
+    with _variants_lock:
+        out = _variants.get(cache_key)
+        if out is not None:
+            _variants.move_to_end(cache_key)
+            _stats["hits"] += 1
+            return out
+        _stats["misses"] += 1
+    out = compress(body, encoding, cached=True)
+    with _variants_lock:
+        if len(out) <= COMPRESS_CACHE_MAX_BYTES and cache_key not in _variants:
+            _variants[cache_key] = out
+            _variants_bytes += len(out)
+            while _variants_bytes > COMPRESS_CACHE_MAX_BYTES and _variants:
+                _, evicted = _variants.popitem(last=False)
+                _variants_bytes -= len(evicted)
+    return out
+
+
+def variant_etag(etag, encoding):
+    if not encoding:
+        return etag
+    return etag[:-1] + ETAG_SUFFIX[encoding] + '"'
+
+
+def encode_body(handler, body):
+    """(body, extra headers) voor een niet-gecachete response."""
+    encoding = choose(handler.headers, len(body))
+    if encoding is None:
+        return body, {}
+    return compress(body, encoding), {"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+
+
+class StreamEncoder:
+    """
+    Comprimeert een gestreamde body chunk voor chunk. Na elke
+    STREAM_FLUSH_BYTES invoer wordt geflusht, zodat kleine upstream chunks
+    de compressie niet verpesten en de browser toch regelmatig data krijgt.
+    """
+
+    STREAM_FLUSH_BYTES = 64 * 1024
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self._pending = 0
+        if encoding == "br":
+            self._brotli = _brotli_module().Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def feed(self, chunk):
+        if not chunk:
+            return b""
+        self._pending += len(chunk)
+        flush = self._pending >= self.STREAM_FLUSH_BYTES
+        if flush:
+            self._pending = 0
+        if self.encoding == "br":
+            out = self._brotli.process(chunk)
+            return out + self._brotli.flush() if flush else out
+        out = self._zlib.compress(chunk)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def close(self):
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress_stats():
+    with _variants_lock:
+        return dict(_stats, variants=len(_variants), variantBytes=_variants_bytes)
@@ -0,0 +1,156 @@
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from _runtime import httpx
+
+# Deadline per request, gezet door @instrument bij binnenkomst van do_*.
+# - Budget = maxDuration van de function (vercel.json, of
+#   FUNCTION_MAX_DURATION) min DEADLINE_MARGIN om nog netjes te antwoorden.
+# - Token, upstream calls, retries en LLM calls krijgen als timeout wat er
+#   nog over is (clip_timeout); is de tijd op, dan DeadlineExceeded.
+# - De handler antwoordt daarop met een 504 (payload()) met de fasen tot
+#   dan toe, in plaats van door het platform afgebroken te worden.
+# Buiten een request (CLI, achtergrondthreads) is er geen deadline en is
+# alles hier een no-op.
+FUNCTION_MAX_DURATION = os.getenv("FUNCTION_MAX_DURATION")
+DEADLINE_MARGIN = float(os.getenv("DEADLINE_MARGIN", "1.5"))
+# Een timeout binnen deze marge van de deadline telt als "tijd op".
+DEADLINE_SLACK = 0.1
+
+VERCEL_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vercel.json")
+
+_current = contextvars.ContextVar("request_deadline", default=None)
+_budgets = None
+
+
+def _load_budgets():
+    try:
+        with open(VERCEL_JSON, "r", encoding="utf-8") as fh:
+            functions = json.load(fh).get("functions") or {}
+    except (OSError, ValueError):
+        return {}
+    return {
+        path: float(settings["maxDuration"])
+        for path, settings in functions.items()
+        if isinstance(settings, dict) and settings.get("maxDuration")
+    }
+
+
+def function_budget(endpoint):
+    """maxDuration (seconden) van api/<endpoint>.py, of None als onbekend."""
+    global _budgets
+    if FUNCTION_MAX_DURATION:
+        return float(FUNCTION_MAX_DURATION)
+    if _budgets is None:
+        _budgets = _load_budgets()
+    return _budgets.get(f"api/{endpoint}.py", _budgets.get("api/**/*.py"))
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, deadline, phase):
+        self.deadline = deadline
+        self.phase = phase
+        super().__init__(f"Geen tijd meer voor {phase} binnen het budget van {deadline.max_duration:g}s")
+
+    def payload(self):
+        """Body voor de 504: waar de tijd op ging en hoe ver het request kwam."""
+        deadline = self.deadline
+        payload = {
+            "error": "Gateway Timeout",
+            "message": str(self),
+            "phase": self.phase,
+            "budgetMs": round(deadline.budget * 1000),
+            "elapsedMs": round(deadline.elapsed() * 1000, 1),
+        }
+        timer = deadline.timer
+        if timer is not None:
+            timer.set(deadline=self.phase)
+            payload["phases"] = timer.phases_ms()
+        return payload
+
+
+class Deadline:
+    def __init__(self, max_duration, started=None, timer=None):
+        self.max_duration = max_duration
+        self.budget = max(max_duration - DEADLINE_MARGIN, 0.0)
+        self.started = started if started is not None else time.perf_counter()
+        self.timer = timer
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def remaining(self):
+        return self.budget - self.elapsed()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, phase):
+        if self.expired():
+            raise DeadlineExceeded(self, phase)
+
+
+def start_deadline(endpoint, timer=None):
+    """Deadline voor het huidige request; geeft het contextvar-token terug (of None)."""
+    max_duration = function_budget(endpoint)
+    if max_duration is None:
+        return None
+    started = timer.started if timer is not None else None
+    return _current.set(Deadline(max_duration, started, timer))
+
+
+def end_deadline(token):
+    if token is not None:
+        _current.reset(token)
+
+
+def current_deadline():
+    return _current.get()
+
+
+def remaining():
+    """Seconden tot de deadline, of None zonder deadline."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def check(phase):
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(phase)
+
+
+def clip_timeout(timeout, phase):
+    """
+    timeout (float of httpx.Timeout) ingekort tot de resterende tijd;
+    DeadlineExceeded als die al op is.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return timeout
+    deadline.check(phase)
+    left = deadline.remaining()
+    if isinstance(timeout, (int, float)):
+        return min(float(timeout), left)
+
+    def clip(value):
+        return left if value is None else min(value, left)
+
+    return httpx.Timeout(
+        connect=clip(timeout.connect), read=clip(timeout.read), write=clip(timeout.write), pool=clip(timeout.pool)
+    )
+
+
+@contextmanager
+def guard(phase):
+    """Een httpx timeout doordat de deadline bereikt is wordt DeadlineExceeded."""
+    try:
+        yield
+    except httpx.TimeoutException as exc:
+        deadline = _current.get()
+        if deadline is not None and deadline.remaining() <= DEADLINE_SLACK:
+            raise DeadlineExceeded(deadline, phase) from exc
+        raise
@@ -0,0 +1,162 @@
+import hashlib
+import json
+from collections import defaultdict, deque
+
+from _explaincache import normalize_expression
+from _ruletable import _fold, normalize_rule
+
+# Vergelijking van twee verzamelingen records (regels of producten) uit
+# verschillende omgevingen, in lineaire tijd:
+# 1. elk record krijgt een hash van de genormaliseerde inhoud;
+#    gelijke hashes aan beide kanten zijn ongewijzigd
+# 2. de rest wordt op identiteit (ExternNummer, anders Omschrijving) gekoppeld
+#    en geeft een veld-diff
+# 3. wat dan overblijft is toegevoegd (alleen in target) of verwijderd
+#    (alleen in base)
+
+# Ids verschillen per omgeving en tellen niet mee in de inhoud.
+VOLATILE_FIELDS = frozenset(
+    ("RegelId", "regelId", "ResourceId", "resourceId", "RekenregelId", "rekenregelId", "id", "Id")
+)
+EXPRESSION_FIELDS = frozenset(("Expressie", "expressie"))
+MAX_FIELD_DIFFS = 50
+
+
+def normalize_record(value, volatile=VOLATILE_FIELDS):
+    if isinstance(value, dict):
+        out = {}
+        for key, child in value.items():
+            if key in volatile:
+                continue
+            if key in EXPRESSION_FIELDS and isinstance(child, str):
+                out[key] = normalize_expression(child)
+            else:
+                out[key] = normalize_record(child, volatile)
+        return out
+    if isinstance(value, list):
+        return [normalize_record(child, volatile) for child in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def content_hash(normalized):
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def rule_identity(item):
+    row = normalize_rule(item)
+    if str(row["externNummer"]).strip():
+        return "extern:" + _fold(str(row["externNummer"]).strip())
+    return "omschrijving:" + _fold(" ".join(str(row["omschrijving"]).split()))
+
+
+def field_diff(base, target, path="", out=None):
+    """Lijst van {"path", "base", "target"} voor verschillende velden (max MAX_FIELD_DIFFS)."""
+    out = [] if out is None else out
+    if len(out) >= MAX_FIELD_DIFFS:
+        return out
+    if isinstance(base, dict) and isinstance(target, dict):
+        for key in sorted(set(base) | set(target), key=str):
+            child = f"{path}.{key}" if path else str(key)
+            if key not in base:
+                out.append({"path": child, "base": None, "target": target[key]})
+            elif key not in target:
+                out.append({"path": child, "base": base[key], "target": None})
+            else:
+                field_diff(base[key], target[key], child, out)
+            if len(out) >= MAX_FIELD_DIFFS:
+                break
+        return out
+    if isinstance(base, list) and isinstance(target, list):
+        for index in range(max(len(base), len(target))):
+            child = f"{path}[{index}]"
+            if index >= len(base):
+                out.append({"path": child, "base": None, "target": target[index]})
+            elif index >= len(target):
+                out.append({"path": child, "base": base[index], "target": None})
+            else:
+                field_diff(base[index], target[index], child, out)
+            if len(out) >= MAX_FIELD_DIFFS:
+                break
+        return out
+    if base != target:
+        out.append({"path": path, "base": base, "target": target})
+    return out
+
+
+def _prepare(records, identity, summary):
+    prepared = []
+    for record in records:
+        normalized = normalize_record(record)
+        prepared.append(
+            {
+                "hash": content_hash(normalized),
+                "key": identity(record),
+                "summary": summary(record),
+                "normalized": normalized,
+            }
+        )
+    return prepared
+
+
+def diff_records(base_records, target_records, identity=rule_identity, summary=normalize_rule):
+    """
+    {"added", "removed", "changed", "unchanged", "baseCount", "targetCount"}.
+    added/removed bevatten de samenvatting (summary) plus hash; changed ook
+    de veld-diff op de genormaliseerde inhoud.
+    """
+    base = _prepare(base_records, identity, summary)
+    target = _prepare(target_records, identity, summary)
+
+    # 1. Gelijke inhoud (multiset op hash)
+    by_hash = defaultdict(deque)
+    for entry in base:
+        by_hash[entry["hash"]].append(entry)
+    matched = set()
+    unchanged = 0
+    target_rest = []
+    for entry in target:
+        pool = by_hash.get(entry["hash"])
+        if pool:
+            matched.add(id(pool.popleft()))
+            unchanged += 1
+        else:
+            target_rest.append(entry)
+    base_rest = [entry for entry in base if id(entry) not in matched]
+
+    # 2. Zelfde identiteit, andere inhoud
+    by_key = defaultdict(deque)
+    for entry in base_rest:
+        by_key[entry["key"]].append(entry)
+    changed = []
+    added = []
+    for entry in target_rest:
+        pool = by_key.get(entry["key"])
+        if pool:
+            old = pool.popleft()
+            changed.append(
+                {
+                    "key": entry["key"],
+                    "base": dict(old["summary"], hash=old["hash"]),
+                    "target": dict(entry["summary"], hash=entry["hash"]),
+                    "fields": field_diff(old["normalized"], entry["normalized"]),
+                }
+            )
+        else:
+            added.append(dict(entry["summary"], hash=entry["hash"]))
+
+    # 3. Over in base: verwijderd
+    removed = [
+        dict(entry["summary"], hash=entry["hash"]) for pool in by_key.values() for entry in pool
+    ]
+
+    return {
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "unchanged": unchanged,
+        "baseCount": len(base),
+        "targetCount": len(target),
+    }
@@ -0,0 +1,81 @@
+import hashlib
+
+from _compress import choose, compress_cached, variant_etag
+
+# Conditional GET voor lees-endpoints (producten, regels).
+# - Sterke ETag: sha256 van de genormaliseerde body, met de omgeving als
+#   prefix zodat production en acceptance nooit dezelfde tag delen.
+# - If-None-Match die matcht -> 304 zonder body.
+# - "private, no-cache": de browser mag bewaren maar moet elke keer
+#   revalideren; private omdat de data achter Basic Auth zit.
+# - env zit in de URL (?env=) en is daarmee al deel van de cache key;
+#   Vary noemt de request headers waar de response van afhangt.
+# - Gecomprimeerde varianten hebben een eigen ETag (suffix -gz / -br) en
+#   worden per ETag bewaard (_compress).
+# Mutaties (PUT/DELETE/POST) blijven no-store.
+CACHEABLE_HEADERS = {
+    "Cache-Control": "private, no-cache",
+    "Vary": "Authorization, Accept-Encoding",
+}
+
+
+def content_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def make_etag(digest, env_key):
+    return f'"{(env_key or "production")[:1]}-{digest[:40]}"'
+
+
+def etag_for(body, env_key):
+    return make_etag(content_hash(body), env_key)
+
+
+def _opaque(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(headers, etag):
+    """If-None-Match vergelijking (zwak, zoals RFC 9110 voor GET voorschrijft)."""
+    header = headers.get("If-None-Match") if headers else None
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_opaque(candidate) == etag for candidate in header.split(","))
+
+
+def send_cacheable(handler, body, etag, headers=None):
+    """
+    200 met ETag, of 304 als de client deze versie al heeft. 'headers' zijn
+    extra headers (Content-Type, X-Cache, ...); bij 304 gaan alleen de
+    cache-relevante mee.
+    """
+    headers = headers or {}
+    encoding = choose(handler.headers, len(body))
+    etag = variant_etag(etag, encoding)
+    if etag_matches(handler.headers, etag):
+        handler.send_response(304)
+        handler.send_header("ETag", etag)
+        for name, value in CACHEABLE_HEADERS.items():
+            handler.send_header(name, value)
+        if "X-Cache" in headers:
+            handler.send_header("X-Cache", headers["X-Cache"])
+        handler.end_headers()
+        return
+
+    if encoding:
+        body = compress_cached(body, encoding, etag)
+    handler.send_response(200)
+    for name, value in headers.items():
+        handler.send_header(name, value)
+    for name, value in CACHEABLE_HEADERS.items():
+        handler.send_header(name, value)
+    if encoding:
+        handler.send_header("Content-Encoding", encoding)
+    handler.send_header("ETag", etag)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    if handler.command != "HEAD":
+        handler.wfile.write(body)
@@ -0,0 +1,198 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+
+from _cache import TTLCache
+from _runtime import lazy_import
+
+# sqlite3 pas laden als de persistente tier echt gebruikt wordt
+sqlite3 = lazy_import("sqlite3")
+
+# Cache voor LLM uitleg van XPath expressies (content-addressed).
+# Sleutel: sha256 van model + promptversie + genormaliseerde expressie.
+# - memory tier: TTLCache (LRU op bytes), gedeeld tussen warme invocations
+# - persistente tier: SQLite (standaard onder /tmp), overleeft een cold start
+#   zolang de container hergebruikt wordt; met EXPLAIN_CACHE_DB op een
+#   gedeeld volume ook tussen containers.
+EXPLAIN_CACHE_TTL = int(os.getenv("EXPLAIN_CACHE_TTL", str(30 * 24 * 3600)))
+EXPLAIN_CACHE_MAX_BYTES = int(os.getenv("EXPLAIN_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+EXPLAIN_CACHE_DB = os.getenv(
+    "EXPLAIN_CACHE_DB", os.path.join(tempfile.gettempdir(), "explain-cache.sqlite3")
+)
+EXPLAIN_CACHE_DB_MAX_ENTRIES = int(os.getenv("EXPLAIN_CACHE_DB_MAX_ENTRIES", "20000"))
+
+# String literals blijven letterlijk; daarbuiten telt witruimte niet mee.
+_LITERAL_OR_SPACE = re.compile(r"'[^']*'|\"[^\"]*\"|\s+")
+
+
+def normalize_expression(expression):
+    def replace(match):
+        text = match.group()
+        return text if text[0] in "'\"" else " "
+
+    return _LITERAL_OR_SPACE.sub(replace, str(expression)).strip()
+
+
+def cache_key(expression, model, prompt_version):
+    raw = "\x00".join((model, str(prompt_version), normalize_expression(expression)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ExplainCache:
+    def __init__(self, ttl, max_bytes, db_path=None, db_max_entries=20000):
+        self.ttl = ttl
+        self.db_path = db_path or None
+        self.db_max_entries = db_max_entries
+        self.memory = TTLCache("explain", ttl, max_bytes=max_bytes)
+
+        self._db_lock = threading.Lock()
+        self._db_ready = False
+        self._writes = 0
+        self._stats = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "db_pruned": 0,
+            "db_errors": 0,
+        }
+
+    # ---- SQLite tier ----
+
+    def _connect(self):
+        if not self._db_ready:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=2.0)
+        if not self._db_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS explanations ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " prompt_version TEXT NOT NULL,"
+                " explanation TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS explanations_last_used ON explanations (last_used)"
+            )
+            self._db_ready = True
+        return conn
+
+    def _db_get(self, key):
+        if not self.db_path:
+            return None
+        try:
+            with self._db_lock:
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        "SELECT explanation, created_at FROM explanations WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    if time.time() - row[1] > self.ttl:
+                        conn.execute("DELETE FROM explanations WHERE key = ?", (key,))
+                        conn.commit()
+                        return None
+                    conn.execute(
+                        "UPDATE explanations SET last_used = ? WHERE key = ?", (time.time(), key)
+                    )
+                    conn.commit()
+                    return row[0]
+                finally:
+                    conn.close()
+        except (sqlite3.Error, OSError):
+            # Persistente tier is best effort.
+            self._stats["db_errors"] += 1
+            return None
+
+    def _db_set(self, key, model, prompt_version, explanation):
+        if not self.db_path:
+            return
+        now = time.time()
+        try:
+            with self._db_lock:
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO explanations"
+                        " (key, model, prompt_version, explanation, created_at, last_used)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, model, str(prompt_version), explanation, now, now),
+                    )
+                    self._writes += 1
+                    if self._writes % 50 == 1:
+                        self._prune(conn, now)
+                    conn.commit()
+                finally:
+                    conn.close()
+        except (sqlite3.Error, OSError):
+            self._stats["db_errors"] += 1
+
+    def _prune(self, conn, now):
+        # Om de 50 writes: verlopen regels weg, daarna de minst recent gebruikte
+        # boven het maximum (de limiet is dus een zachte grens).
+        pruned = conn.execute(
+            "DELETE FROM explanations WHERE created_at < ?", (now - self.ttl,)
+        ).rowcount
+        pruned += conn.execute(
+            "DELETE FROM explanations WHERE key IN ("
+            " SELECT key FROM explanations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.db_max_entries,),
+        ).rowcount
+        self._stats["db_pruned"] += max(pruned, 0)
+
+    # ---- public API ----
+
+    def get(self, expression, model, prompt_version):
+        """Geeft (explanation, "HIT" | "MISS") terug; explanation is None bij een miss."""
+        key = cache_key(expression, model, prompt_version)
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._stats["memory_hits"] += 1
+            return entry["body"].decode("utf-8"), "HIT"
+
+        explanation = self._db_get(key)
+        if explanation is not None:
+            self._stats["db_hits"] += 1
+            self.memory.set(key, explanation.encode("utf-8"))
+            return explanation, "HIT"
+
+        self._stats["misses"] += 1
+        return None, "MISS"
+
+    def set(self, expression, model, prompt_version, explanation):
+        if not explanation:
+            # Lege uitleg (bijv. afgekapt antwoord) niet vastleggen.
+            return
+        key = cache_key(expression, model, prompt_version)
+        self.memory.set(key, explanation.encode("utf-8"))
+        self._db_set(key, model, prompt_version, explanation)
+        self._stats["stores"] += 1
+
+    def stats(self):
+        lookups = self._stats["memory_hits"] + self._stats["db_hits"] + self._stats["misses"]
+        hits = self._stats["memory_hits"] + self._stats["db_hits"]
+        memory = self.memory.stats()
+        return dict(
+            self._stats,
+            hit_ratio=round(hits / lookups, 3) if lookups else None,
+            memory_entries=memory["entries"],
+            memory_bytes=memory["bytes"],
+            memory_evictions=memory["evictions"],
+        )
+
+
+explain_cache = ExplainCache(
+    EXPLAIN_CACHE_TTL,
+    EXPLAIN_CACHE_MAX_BYTES,
+    db_path=EXPLAIN_CACHE_DB,
+    db_max_entries=EXPLAIN_CACHE_DB_MAX_ENTRIES,
+)
@@ -0,0 +1,237 @@
+from _xpath import XPathSyntaxError, local_name, parse
+
+# Lokale, deterministische uitleg van XPath expressies in het Nederlands.
+# Zelfde formaat als de LLM prompt (3-5 regels '- ' plus 'Samenvatting:').
+# Alleen de vormen die de expressie-builder in App.jsx maakt (en varianten
+# daarop) worden ondersteund; al het andere gaat naar de LLM.
+
+COMPARISON_PHRASES = {
+    "=": "is gelijk aan",
+    "!=": "is niet gelijk aan",
+    "<": "is kleiner dan",
+    "<=": "is kleiner dan of gelijk aan",
+    ">": "is groter dan",
+    ">=": "is groter dan of gelijk aan",
+}
+STRING_TESTS = {
+    "contains": ("bevat", "bevat niet"),
+    "starts-with": ("begint met", "begint niet met"),
+    "ends-with": ("eindigt op", "eindigt niet op"),
+}
+MAX_GROUP_BULLETS = 3
+
+
+class Unsupported(Exception):
+    """Constructie die de lokale uitleg niet kent; de LLM neemt het over."""
+
+
+class _Explainer:
+    def __init__(self):
+        self.fields = []
+        self.case_insensitive = False
+        self.numeric = False
+        self.uses_exists = False
+
+    # ---- waarden ----
+
+    def field(self, node):
+        if node.kind != "path" or not node.children:
+            raise Unsupported(node.kind)
+        parts = []
+        for step in node.children:
+            if step.kind != "step" or step.children or step.value["axis"] not in ("child", "attribute"):
+                raise Unsupported("step")
+            name = step.value["name"]
+            parts.append(f"@{name}" if step.value["axis"] == "attribute" else name)
+        name = "/".join(parts)
+        if name not in self.fields:
+            self.fields.append(name)
+        return name
+
+    def value(self, node):
+        if node.kind == "literal":
+            return f"'{node.value}'"
+        if node.kind == "number":
+            return str(node.value)
+        if node.kind == "path":
+            return self.field(node)
+        if node.kind == "neg" and node.children[0].kind == "number":
+            return f"-{node.children[0].value}"
+        if node.kind == "call":
+            name = local_name(node.value)
+            args = node.children
+            if name in ("lower-case", "upper-case") and len(args) == 1:
+                self.case_insensitive = True
+                return self.value(args[0])
+            if name == "number" and len(args) == 1:
+                self.numeric = True
+                return self.value(args[0])
+            if name in ("string", "normalize-space") and len(args) == 1:
+                return self.value(args[0])
+            if name == "concat" and args and all(arg.kind == "literal" for arg in args):
+                return "'" + "".join(arg.value for arg in args) + "'"
+        raise Unsupported(node.kind)
+
+    # ---- voorwaarden ----
+
+    def condition(self, node, negate=False):
+        if node.kind in ("and", "or"):
+            if negate:
+                return "niet (" + self.condition(node) + ")"
+            joiner = " en " if node.kind == "and" else " of "
+            parts = []
+            for child in node.children:
+                text = self.condition(child)
+                if child.kind in ("and", "or") and child.kind != node.kind:
+                    text = f"({text})"
+                parts.append(text)
+            return joiner.join(parts)
+
+        if node.kind == "cmp":
+            left, right = (self.value(child) for child in node.children)
+            phrase = COMPARISON_PHRASES[node.value]
+            if negate:
+                phrase = phrase.replace("is ", "is niet ", 1).replace("niet niet ", "")
+            return f"{left} {phrase} {right}"
+
+        if node.kind == "path":
+            name = self.field(node)
+            return f"{name} ontbreekt" if negate else f"{name} is aanwezig"
+
+        if node.kind == "call":
+            name = local_name(node.value)
+            args = node.children
+            if name == "not" and len(args) == 1:
+                return self.condition(args[0], negate=not negate)
+            if name in ("exists", "empty") and len(args) == 1:
+                field = self.field(args[0])
+                present = (name == "exists") != negate
+                return f"{field} is aanwezig" if present else f"{field} ontbreekt"
+            if name in STRING_TESTS and len(args) == 2:
+                left, right = self.value(args[0]), self.value(args[1])
+                return f"{left} {STRING_TESTS[name][1 if negate else 0]} {right}"
+            if name in ("true", "false") and not args:
+                return "altijd waar" if (name == "true") != negate else "nooit waar"
+            if name == "boolean" and len(args) == 1:
+                return self.condition(args[0], negate)
+        raise Unsupported(node.kind)
+
+    # ---- structuur ----
+
+    def groups(self, node):
+        # Bovenste 'of'-niveau: elke tak is een eigen combinatie van voorwaarden.
+        return node.children if node.kind == "or" else [node]
+
+    def _conjuncts(self, node):
+        if node.kind != "and":
+            return [node]
+        out = []
+        for child in node.children:
+            out.extend(self._conjuncts(child))
+        return out
+
+    def _referenced(self, node):
+        names = set()
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            if current.kind == "path":
+                try:
+                    names.add(self.field(current))
+                except Unsupported:
+                    pass
+            else:
+                pending.extend(current.children)
+        return names
+
+    def _is_exists(self, node):
+        return node.kind == "call" and local_name(node.value) == "exists" and len(node.children) == 1
+
+    def group_text(self, node):
+        # (fn:exists(//X) and (...X...)) -> de exists-check is impliciet bij de voorwaarde over X
+        conjuncts = self._conjuncts(node)
+        referenced = set()
+        for child in conjuncts:
+            if not self._is_exists(child):
+                referenced |= self._referenced(child)
+
+        parts = []
+        for child in conjuncts:
+            text = self.condition(child)
+            if self._is_exists(child) and self.field(child.children[0]) in referenced:
+                self.uses_exists = True
+                continue
+            parts.append(f"({text})" if child.kind == "or" else text)
+        return " en ".join(parts)
+
+
+def _outcome(node):
+    """(voorwaarde, uitkomst als de voorwaarde waar is) voor if-then-else met vaste uitkomsten."""
+    if node.kind != "if":
+        return node, "true"
+    condition, then, otherwise = node.children
+    branches = []
+    for branch in (then, otherwise):
+        if branch.kind != "call" or local_name(branch.value) not in ("true", "false") or branch.children:
+            raise Unsupported("if")
+        branches.append(local_name(branch.value))
+    if branches[0] == branches[1]:
+        raise Unsupported("if")
+    return condition, branches[0]
+
+
+def explain_expression(expression):
+    """
+    Uitleg als tekst ('- ...' regels plus 'Samenvatting: ...'), of None als
+    de expressie niet lokaal uit te leggen is.
+    """
+    try:
+        tree = parse(expression)
+        condition, outcome = _outcome(tree)
+        explainer = _Explainer()
+        groups = [explainer.group_text(group) for group in explainer.groups(condition)]
+    except (XPathSyntaxError, Unsupported, RecursionError):
+        return None
+
+    other = "false" if outcome == "true" else "true"
+    bullets = [
+        f"De regel geeft {outcome} als aan de voorwaarden hieronder is voldaan, anders {other}."
+    ]
+    if len(groups) == 1:
+        bullets.append(f"Voorwaarde: {groups[0]}.")
+    elif len(groups) <= MAX_GROUP_BULLETS:
+        for i, text in enumerate(groups, start=1):
+            bullets.append(f"Combinatie {i} (één combinatie is genoeg): {text}.")
+    else:
+        for i, text in enumerate(groups[:MAX_GROUP_BULLETS - 1], start=1):
+            bullets.append(f"Combinatie {i} (één combinatie is genoeg): {text}.")
+        rest = len(groups) - (MAX_GROUP_BULLETS - 1)
+        bullets.append(
+            f"Daarnaast nog {rest} andere combinaties, zoals: {groups[MAX_GROUP_BULLETS - 1]}."
+        )
+
+    notes = []
+    if explainer.fields:
+        notes.append("Gebruikte velden: " + ", ".join(explainer.fields) + ".")
+    if explainer.uses_exists:
+        notes.append("Een voorwaarde telt alleen als het betreffende veld aanwezig is.")
+    if explainer.case_insensitive:
+        notes.append("Tekst wordt zonder onderscheid tussen hoofd- en kleine letters vergeleken.")
+    if explainer.numeric:
+        notes.append("Getalvergelijkingen gebruiken de numerieke waarde van het veld.")
+    if len(bullets) + len(notes) < 3:
+        notes.append("Er zijn geen andere voorwaarden.")
+    for note in notes:
+        if len(bullets) >= 5:
+            break
+        bullets.append(note)
+
+    if len(groups) == 1:
+        summary = f"De uitkomst is {outcome} wanneer geldt: {groups[0]}."
+    else:
+        summary = (
+            f"De uitkomst is {outcome} wanneer aan minstens één van de "
+            f"{len(groups)} combinaties van voorwaarden is voldaan."
+        )
+
+    return "\n".join([f"- {bullet}" for bullet in bullets] + [f"Samenvatting: {summary}"])
@@ -0,0 +1,152 @@
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Rollende latency-histogrammen per (endpoint, env), in-process.
+# - log-schaal buckets (~10% resolutie, 0.1ms .. ~5min), dus samenvoegbaar
+# - tijdvakken van METRICS_SLOT_SECONDS; alleen de laatste METRICS_WINDOW
+#   seconden tellen mee
+# - elke Vercel function is een eigen proces: ieder proces schrijft zijn
+#   histogrammen (hooguit elke METRICS_DUMP_INTERVAL s) naar METRICS_DIR, en
+#   /api/metrics voegt alles samen wat op hetzelfde filesystem staat.
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "300"))
+METRICS_SLOT_SECONDS = int(os.getenv("METRICS_SLOT_SECONDS", "10"))
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "5"))
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "beheer-metrics"))
+
+BUCKET_BOUNDS = [round(0.1 * 1.1 ** i, 4) for i in range(150)]
+
+_lock = threading.Lock()
+# key "endpoint|env" -> {slot_start: {"counts": {bucket: n}, "count", "sum", "max", "errors"}}
+_series = {}
+_last_dump = 0.0
+
+
+def _slot(now):
+    return int(now // METRICS_SLOT_SECONDS) * METRICS_SLOT_SECONDS
+
+
+def _prune(slots, now):
+    oldest = _slot(now) - METRICS_WINDOW
+    for start in [start for start in slots if int(start) < oldest]:
+        del slots[start]
+
+
+def observe(endpoint, env, duration_ms, status=200):
+    now = time.time()
+    key = f"{endpoint}|{env or '-'}"
+    bucket = str(bisect.bisect_left(BUCKET_BOUNDS, duration_ms))
+    with _lock:
+        slots = _series.setdefault(key, {})
+        slot = slots.setdefault(
+            str(_slot(now)), {"counts": {}, "count": 0, "sum": 0.0, "max": 0.0, "errors": 0}
+        )
+        slot["counts"][bucket] = slot["counts"].get(bucket, 0) + 1
+        slot["count"] += 1
+        slot["sum"] += duration_ms
+        slot["max"] = max(slot["max"], duration_ms)
+        if status >= 500:
+            slot["errors"] += 1
+        _prune(slots, now)
+    _maybe_dump(now)
+
+
+def _dump_path():
+    return os.path.join(METRICS_DIR, f"metrics-{os.getpid()}.json")
+
+
+def _maybe_dump(now):
+    global _last_dump
+    if not METRICS_DIR or now - _last_dump < METRICS_DUMP_INTERVAL:
+        return
+    _last_dump = now
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        with _lock:
+            data = json.dumps({"updated": now, "series": _series})
+        tmp = _dump_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(data)
+        os.replace(tmp, _dump_path())
+    except OSError:
+        # Metrics zijn best effort.
+        pass
+
+
+def _collect():
+    # Eigen proces plus de dumps van andere processen (binnen het venster).
+    now = time.time()
+    sources = []
+    with _lock:
+        sources.append(json.loads(json.dumps(_series)))
+    if METRICS_DIR and os.path.isdir(METRICS_DIR):
+        own = os.path.basename(_dump_path())
+        for name in os.listdir(METRICS_DIR):
+            if name == own or not name.endswith(".json"):
+                continue
+            path = os.path.join(METRICS_DIR, name)
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            if now - float(data.get("updated") or 0) > METRICS_WINDOW:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            sources.append(data.get("series") or {})
+    return sources, now
+
+
+def _percentile(counts, total, fraction):
+    target = total * fraction
+    running = 0
+    for bucket in sorted(counts, key=int):
+        running += counts[bucket]
+        if running >= target:
+            index = int(bucket)
+            return BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else None
+    return None
+
+
+def snapshot():
+    """Per "endpoint|env": count, errors, mean/max en p50/p95/p99 (bovengrens van de bucket)."""
+    sources, now = _collect()
+    oldest = _slot(now) - METRICS_WINDOW
+    merged = {}
+    for series in sources:
+        for key, slots in series.items():
+            target = merged.setdefault(key, {"counts": {}, "count": 0, "sum": 0.0, "max": 0.0, "errors": 0})
+            for start, slot in slots.items():
+                if int(start) < oldest:
+                    continue
+                for bucket, count in slot["counts"].items():
+                    target["counts"][bucket] = target["counts"].get(bucket, 0) + count
+                target["count"] += slot["count"]
+                target["sum"] += slot["sum"]
+                target["max"] = max(target["max"], slot["max"])
+                target["errors"] += slot["errors"]
+
+    out = {}
+    for key in sorted(merged):
+        data = merged[key]
+        if not data["count"]:
+            continue
+        endpoint, env = key.split("|", 1)
+        out[key] = {
+            "endpoint": endpoint,
+            "env": env,
+            "count": data["count"],
+            "errors": data["errors"],
+            "meanMs": round(data["sum"] / data["count"], 2),
+            "maxMs": round(data["max"], 2),
+            "p50Ms": _percentile(data["counts"], data["count"], 0.50),
+            "p95Ms": _percentile(data["counts"], data["count"], 0.95),
+            "p99Ms": _percentile(data["counts"], data["count"], 0.99),
+        }
+    return {"windowSeconds": METRICS_WINDOW, "series": out}
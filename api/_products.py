@@ -0,0 +1,71 @@
+import json
+
+from _runtime import PRODUCT_CONFIG_FIELDS, PRODUCT_HEADER_FIELDS, httpx
+from _runtime import dias_headers as _dias_headers
+from _runtime import get_env_config as _get_env_config
+from _stream import normalize_list_body
+from _timing import timed
+from _upstream import coalesced_get
+
+# Gedeelde DIAS toegang voor productdefinities (lijst en detail).
+# products.py voegt daar cache en projecties aan toe; endpoints die
+# productdefinities van een hele omgeving nodig hebben gebruiken deze module.
+
+
+def get_env_config(env_key):
+    # Productdefinities hebben ook medewerker/kantoor nodig.
+    return _get_env_config(env_key, PRODUCT_CONFIG_FIELDS)
+
+
+def dias_headers(config, token):
+    return _dias_headers(config, token, PRODUCT_HEADER_FIELDS)
+
+
+def fetch_products_body(config, token):
+    response = coalesced_get(
+        config["env"],
+        f"{config['host'].rstrip('/')}/contract/api/v1/contracten/verzekeringen/productdefinities",
+        params={
+            "AlleenLopendProduct": "true",
+            "IsBeschikbaarVoorMedewerker": "true",
+        },
+        headers=dias_headers(config, token),
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    # Lijst normaliseren naar {"products": [...], "count": N} zonder decode/re-encode.
+    with timed("decode"):
+        return normalize_list_body(response.content, "products", ("data", "items"))
+
+
+def fetch_products(config, token):
+    body = fetch_products_body(config, token)
+    with timed("decode"):
+        return json.loads(body)
+
+
+def fetch_product_detail_body(config, token, product_id):
+    response = coalesced_get(
+        config["env"],
+        f"{config['host'].rstrip('/')}/contract/api/v1/contracten/verzekeringen/productdefinities/{product_id}",
+        headers=dias_headers(config, token),
+        timeout=httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0),
+        # Trage detail reads krijgen na de p95 een tweede request (_resilience).
+        hedge="product-detail",
+    )
+    response.raise_for_status()
+    return response.content
+
+
+def fetch_product_detail(config, token, product_id):
+    body = fetch_product_detail_body(config, token, product_id)
+    with timed("decode"):
+        return json.loads(body)
+
+
+def product_id_of(item):
+    # Zelfde velden als flatten in Products.jsx
+    for name in ("ProductId", "Productid", "productid", "productId", "productID"):
+        if item.get(name) is not None:
+            return item[name]
+    return None
@@ -0,0 +1,319 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from _deadline import DeadlineExceeded, clip_timeout, current_deadline, remaining
+from _runtime import httpx
+from _timing import bind, current_timer, timed
+
+# Veerkracht rond upstream GETs (alleen idempotente reads; PUT/DELETE/POST niet).
+# resilient_get voor gewone reads, resilient_stream voor gestreamde lijsten:
+# - retry bij verbindingsfouten, timeouts en 429/502/503/504, met
+#   exponentiële backoff met "full jitter", begrensd door RETRY_CAP
+# - circuit breaker per omgeving: na BREAKER_THRESHOLD fouten op rij wordt
+#   BREAKER_COOLDOWN seconden direct 503 gegeven; daarna mag één request
+#   proberen of DIAS terug is (half-open)
+# - hedging (optioneel per call): duurt een read langer dan de p95 van de
+#   recente reads, dan gaat er een tweede request uit; de eerste die
+#   slaagt wint
+# - alles binnen de deadline van het request (_deadline): timeouts worden
+#   ingekort en er wordt niet meer geretried of gehedged als de tijd op is.
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+UPSTREAM_RETRY_BASE = float(os.getenv("UPSTREAM_RETRY_BASE_MS", "100")) / 1000
+UPSTREAM_RETRY_CAP = float(os.getenv("UPSTREAM_RETRY_CAP_MS", "2000")) / 1000
+RETRY_STATUSES = (429, 502, 503, 504)
+
+BREAKER_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "15"))
+
+UPSTREAM_HEDGE = (os.getenv("UPSTREAM_HEDGE") or "1").lower() not in ("0", "false", "no")
+HEDGE_MIN_DELAY = float(os.getenv("UPSTREAM_HEDGE_MIN_MS", "250")) / 1000
+# Zolang er te weinig metingen zijn voor een p95.
+HEDGE_DEFAULT_DELAY = float(os.getenv("UPSTREAM_HEDGE_DEFAULT_MS", "2000")) / 1000
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+HEDGE_WORKERS = int(os.getenv("UPSTREAM_HEDGE_WORKERS", "16"))
+
+# Een retry heeft geen zin als er minder tijd over is dan dit.
+MIN_ATTEMPT_SECONDS = 1.0
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_latencies = {}
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+_stats = {"retries": 0, "hedged": 0, "hedgeWins": 0, "breakerRejects": 0, "deadlineExceeded": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+    timer = current_timer()
+    if timer is not None:
+        timer.count("upstream" + name[:1].upper() + name[1:])
+
+
+# ---- circuit breaker ----
+
+
+class CircuitBreaker:
+    def __init__(self, env_key):
+        self.env_key = env_key
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+                self.state = "half-open"
+            if self.state == "half-open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record(self, success):
+        with self._lock:
+            self.probing = False
+            if success:
+                self.state = "closed"
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= BREAKER_THRESHOLD:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        # Probe zonder uitkomst (geen upstream fout): volgende mag proberen.
+        with self._lock:
+            self.probing = False
+
+    def retry_after(self):
+        return max(0, int(BREAKER_COOLDOWN - (time.monotonic() - self.opened_at)) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
+
+
+def breaker(env_key):
+    cb = _breakers.get(env_key)
+    if cb is None:
+        with _breakers_lock:
+            cb = _breakers.setdefault(env_key, CircuitBreaker(env_key))
+    return cb
+
+
+def _circuit_open(cb, url):
+    # Als 503 van upstream, zodat de handlers het net zo afhandelen.
+    _count("breakerRejects")
+    request = httpx.Request("GET", url)
+    message = f"DIAS ({cb.env_key}) is tijdelijk niet bereikbaar; opnieuw proberen over {cb.retry_after()}s"
+    response = httpx.Response(
+        503, request=request, headers={"Retry-After": str(cb.retry_after())}, text=message
+    )
+    return httpx.HTTPStatusError(message, request=request, response=response)
+
+
+# ---- hedging ----
+
+
+class LatencyWindow:
+    def __init__(self, size=HEDGE_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self):
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def _window(name):
+    window = _latencies.get(name)
+    if window is None:
+        with _breakers_lock:
+            window = _latencies.setdefault(name, LatencyWindow())
+    return window
+
+
+def hedge_delay(name):
+    p95 = _window(name).p95()
+    return max(HEDGE_MIN_DELAY, p95 if p95 is not None else HEDGE_DEFAULT_DELAY)
+
+
+def _pool():
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _hedge_pool_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="upstream-hedge")
+    return _hedge_pool
+
+
+def _hedged_get(client, url, params, headers, timeout, hedge, left):
+    delay = hedge_delay(hedge)
+    if left is not None and left < delay + MIN_ATTEMPT_SECONDS:
+        return client.get(url, params=params, headers=headers, timeout=timeout)
+
+    def send():
+        return client.get(url, params=params, headers=headers, timeout=timeout)
+
+    primary = _pool().submit(bind(send))
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    _count("hedged")
+    backup = _pool().submit(bind(send))
+    pending = {primary, backup}
+    fallback = None
+    error = None
+    # Eerste bruikbare response wint; een 5xx of fout alleen als de ander ook faalt.
+    # De verliezer loopt nog af in de pool (sync httpx is niet te annuleren).
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+                continue
+            response = future.result()
+            if response.status_code < 500:
+                if future is backup:
+                    _count("hedgeWins")
+                return response
+            fallback = response
+    if fallback is not None:
+        return fallback
+    raise error
+
+
+# ---- retries ----
+
+
+def _backoff(attempt, response=None):
+    delay = random.uniform(0, min(UPSTREAM_RETRY_CAP, UPSTREAM_RETRY_BASE * (2 ** attempt)))
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
+
+
+def _with_retries(env_key, url, timeout, send):
+    # send(attempt_timeout, left) doet één poging en geeft een response terug.
+    cb = breaker(env_key)
+    attempt = 0
+    while True:
+        deadline = current_deadline()
+        if deadline is not None and deadline.expired():
+            _count("deadlineExceeded")
+            raise DeadlineExceeded(deadline, "upstream")
+        left = remaining()
+        if not cb.allow():
+            raise _circuit_open(cb, url)
+
+        response = None
+        try:
+            response = send(clip_timeout(timeout, "upstream"), left)
+        except httpx.TransportError as exc:
+            cb.record(False)
+            error = exc
+        except Exception:
+            cb.release()
+            raise
+        else:
+            cb.record(response.status_code < 500)
+            error = None
+            if response.status_code not in RETRY_STATUSES:
+                return response
+
+        delay = _backoff(attempt, response)
+        left = remaining()
+        can_retry = attempt < UPSTREAM_RETRIES and delay <= UPSTREAM_RETRY_CAP
+        if left is not None and left - delay < MIN_ATTEMPT_SECONDS:
+            can_retry = False
+        if not can_retry:
+            if error is not None:
+                raise error
+            return response
+        if response is not None:
+            # Gestreamde response: (kleine) foutbody lezen en sluiten, zodat de
+            # verbinding terug kan in de pool.
+            try:
+                response.read()
+            except httpx.HTTPError:
+                pass
+            response.close()
+
+        attempt += 1
+        _count("retries")
+        with timed("retry") as phase:
+            phase.desc = f"attempt {attempt + 1}"
+            time.sleep(delay)
+
+
+def resilient_get(client, env_key, url, headers=None, params=None, timeout=30.0, hedge=None):
+    """
+    GET met retries, circuit breaker en (als 'hedge' een naam is) hedging,
+    binnen de deadline van het huidige request. Geeft de laatste response
+    terug (ook een 5xx, de caller doet raise_for_status) of gooit de
+    laatste httpx fout.
+    """
+
+    def send(attempt_timeout, left):
+        started = time.perf_counter()
+        if hedge and UPSTREAM_HEDGE:
+            response = _hedged_get(client, url, params, headers, attempt_timeout, hedge, left)
+        else:
+            response = client.get(url, params=params, headers=headers, timeout=attempt_timeout)
+        if hedge and response.status_code < 400:
+            _window(hedge).add(time.perf_counter() - started)
+        return response
+
+    return _with_retries(env_key, url, timeout, send)
+
+
+@contextmanager
+def resilient_stream(client, env_key, url, headers=None, timeout=30.0):
+    """
+    Gestreamde GET (context manager, geeft de open response). Retries en de
+    circuit breaker gelden tot de response headers binnen zijn; een fout
+    tijdens het lezen van de body wordt niet opnieuw geprobeerd, want dan
+    kan er al iets naar de browser gestuurd zijn. Geen hedging.
+    """
+
+    def send(attempt_timeout, left):
+        request = client.build_request("GET", url, headers=headers, timeout=attempt_timeout)
+        return client.send(request, stream=True)
+
+    response = _with_retries(env_key, url, timeout, send)
+    try:
+        yield response
+    finally:
+        response.close()
+
+
+def resilience_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["breakers"] = {env_key: cb.snapshot() for env_key, cb in list(_breakers.items())}
+    return stats
@@ -0,0 +1,401 @@
+import bisect
+import os
+import re
+import threading
+import time
+
+from _rules import RULE_KINDS, fetch_rule_details, fetch_rules
+from _ruletable import _fold, flatten_rules, natural_key, normalize_rule
+from _token import get_bearer_token
+
+# In-memory inverted index over Omschrijving en (getokeniseerde) Expressie van
+# alle acceptatie- en dynamiekregels, per omgeving.
+# - term  -> set van (soort, regelId), per veld
+# - prefix-zoeken via een gesorteerde termlijst (bisect)
+# - na invoeren/wijzigen/verwijderen wordt de index bijgewerkt i.p.v. opnieuw opgebouwd
+RULE_INDEX_TTL = int(os.getenv("RULE_INDEX_TTL", "300"))
+RULE_INDEX_WORKERS = int(os.getenv("RULE_INDEX_WORKERS", "8"))
+FIELDS = ("omschrijving", "expressie")
+
+# Namen (met namespace-prefix, koppeltekens en punten) en getallen
+_TERM = re.compile(r"[^\W_][\w\-.:]*")
+_TERM_PARTS = re.compile(r"[\-.:]+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+_indexes = {}
+_build_locks = {}
+_rebuilding = set()
+_registry_lock = threading.Lock()
+
+
+def tokenize(text):
+    """
+    Termen uit een omschrijving of XPath expressie, lowercase en zonder accenten.
+    Samengestelde namen leveren ook hun delen op: 'fn:lower-case' ->
+    'fn:lower-case', 'fn', 'lower', 'case'.
+    """
+    terms = []
+    for match in _TERM.finditer(_fold(text or "")):
+        term = match.group().rstrip("-.:")
+        if not term:
+            continue
+        terms.append(term)
+        parts = [part for part in _TERM_PARTS.split(term) if part]
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+def extract_expressie(data):
+    # Zelfde vormen als extractExpressie in App.jsx
+    if not isinstance(data, dict):
+        return None
+    for source in (data, data.get("Data"), data.get("data")):
+        if isinstance(source, dict):
+            for name in ("Expressie", "expressie"):
+                if source.get(name) is not None:
+                    return str(source[name])
+    return None
+
+
+def _unwrap(data):
+    if isinstance(data, dict):
+        for name in ("Data", "data"):
+            if isinstance(data.get(name), dict):
+                return data[name]
+    return data
+
+
+def _entiteit_text(entiteit):
+    if not isinstance(entiteit, dict):
+        return ""
+    return " ".join(
+        str(entiteit.get(name) or "")
+        for name in ("EntiteitcodeId", "AfdDekkingcode", "AttribuutcodeId")
+    )
+
+
+def dynamiek_text(data):
+    """Doorzoekbare tekst van een dynamiekregel: Bron plus Rekenregels (Waarde/Doel)."""
+    data = _unwrap(data)
+    if not isinstance(data, dict) or not isinstance(data.get("Rekenregels"), list):
+        return None
+    parts = [_entiteit_text(data.get("Bron"))]
+    for rekenregel in data["Rekenregels"]:
+        if not isinstance(rekenregel, dict) or rekenregel.get("Actie") == "Verwijderen":
+            continue
+        parts.append(str(rekenregel.get("Waarde") or ""))
+        parts.append(_entiteit_text(rekenregel.get("Doel")))
+    return " ".join(part for part in parts if part.strip())
+
+
+def rule_text(kind, data):
+    return dynamiek_text(data) if kind == "dynamiek" else extract_expressie(data)
+
+
+def parse_query(q):
+    """
+    Splitst een zoekopdracht in clauses (alle clauses moeten matchen):
+    - woord        -> term
+    - woord*       -> prefix
+    - "a b" of een XPath fragment (//Polis/Merk) -> alle termen + letterlijke match
+    """
+    clauses = []
+    for match in _QUERY.finditer(q or ""):
+        quoted, raw = match.group(1), match.group(2)
+        text = quoted if quoted is not None else raw
+        prefix = quoted is None and text.endswith("*")
+        if prefix:
+            text = text.rstrip("*")
+        # Samengestelde namen op hun delen zoeken: die staan altijd in de index,
+        # 'lower-case' als geheel niet (alleen 'fn:lower-case'). De letterlijke
+        # match houdt de delen bij elkaar.
+        words = [m.group().rstrip("-.:") for m in _TERM.finditer(_fold(text))]
+        terms = [part for word in words for part in _TERM_PARTS.split(word) if part]
+        if not terms:
+            continue
+        phrase = None
+        if not prefix and (quoted is not None or terms != [_fold(text)]):
+            phrase = _fold(text)
+        clauses.append({"terms": terms, "prefix": prefix, "phrase": phrase})
+    return clauses
+
+
+class RuleIndex:
+    def __init__(self):
+        self.docs = {}
+        self.postings = {field: {} for field in FIELDS}
+        self.errors = []
+        self._sorted_terms = {field: None for field in FIELDS}
+        self._lock = threading.Lock()
+
+    def _unlink(self, key):
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return None
+        for field in FIELDS:
+            postings = self.postings[field]
+            for term in doc["terms"][field]:
+                keys = postings.get(term)
+                if keys is None:
+                    continue
+                keys.discard(key)
+                if not keys:
+                    del postings[term]
+                    self._sorted_terms[field] = None
+        return doc
+
+    def upsert(self, kind, item, detail=None):
+        """Voegt een regel toe of vervangt hem; ontbrekende velden blijven van de oude versie."""
+        row = normalize_rule(_unwrap(item))
+        if row["regelId"] in ("", None) and detail is not None:
+            row = normalize_rule(_unwrap(detail))
+        if row["regelId"] in ("", None):
+            return
+        key = (kind, str(row["regelId"]))
+
+        expressie = rule_text(kind, detail) if detail is not None else None
+        if expressie is None:
+            expressie = rule_text(kind, item)
+
+        with self._lock:
+            old = self._unlink(key)
+            if old is not None:
+                row["externNummer"] = row["externNummer"] or old["externNummer"]
+                row["omschrijving"] = row["omschrijving"] or old["omschrijving"]
+                if expressie is None:
+                    expressie = old["expressie"]
+
+            doc = {
+                "kind": kind,
+                "regelId": row["regelId"],
+                "externNummer": row["externNummer"],
+                "omschrijving": str(row["omschrijving"] or ""),
+                "expressie": expressie or "",
+            }
+            doc["folded"] = {field: _fold(doc[field]) for field in FIELDS}
+            doc["terms"] = {field: set(tokenize(doc[field])) for field in FIELDS}
+            self.docs[key] = doc
+
+            for field in FIELDS:
+                postings = self.postings[field]
+                for term in doc["terms"][field]:
+                    keys = postings.get(term)
+                    if keys is None:
+                        keys = postings[term] = set()
+                        self._sorted_terms[field] = None
+                    keys.add(key)
+
+    def remove(self, kind, regel_id):
+        with self._lock:
+            self._unlink((kind, str(regel_id)))
+
+    def _lookup(self, field, term, prefix):
+        postings = self.postings[field]
+        if not prefix:
+            return postings.get(term, set())
+
+        terms = self._sorted_terms[field]
+        if terms is None:
+            terms = self._sorted_terms[field] = sorted(postings)
+        found = set()
+        for i in range(bisect.bisect_left(terms, term), len(terms)):
+            if not terms[i].startswith(term):
+                break
+            found |= postings[terms[i]]
+        return found
+
+    def _match_clause(self, clause, fields):
+        hits = {}
+        for field in fields:
+            keys = None
+            last = len(clause["terms"]) - 1
+            for i, term in enumerate(clause["terms"]):
+                found = self._lookup(field, term, clause["prefix"] and i == last)
+                keys = set(found) if keys is None else keys & found
+                if not keys:
+                    break
+            for key in keys or ():
+                if clause["phrase"] and clause["phrase"] not in self.docs[key]["folded"][field]:
+                    continue
+                hits.setdefault(key, set()).add(field)
+        return hits
+
+    def search(self, q, kind=None, field=None, limit=100):
+        clauses = parse_query(q)
+        fields = (field,) if field in FIELDS else FIELDS
+
+        with self._lock:
+            matched = None
+            for clause in clauses:
+                hits = self._match_clause(clause, fields)
+                if matched is None:
+                    matched = hits
+                else:
+                    matched = {
+                        key: matched[key] | hits[key] for key in matched.keys() & hits.keys()
+                    }
+                if not matched:
+                    break
+
+            keys = [key for key in (matched or {}) if kind in (None, key[0])]
+            keys.sort(key=lambda key: (key[0], natural_key(key[1])))
+
+            results = []
+            for key in keys[:limit]:
+                doc = self.docs[key]
+                results.append(
+                    {
+                        "kind": doc["kind"],
+                        "regelId": doc["regelId"],
+                        "externNummer": doc["externNummer"],
+                        "omschrijving": doc["omschrijving"],
+                        "matchedFields": sorted(matched[key]),
+                        "snippet": _snippet(doc, clauses),
+                    }
+                )
+
+        return {"results": results, "count": len(results), "total": len(keys)}
+
+
+def _snippet(doc, clauses, width=60):
+    # Stukje expressie rond de eerste treffer, zodat de impact direct zichtbaar is.
+    folded = doc["folded"]["expressie"]
+    for clause in clauses:
+        needle = clause["phrase"] or clause["terms"][0]
+        pos = folded.find(needle)
+        if pos >= 0:
+            start = max(0, pos - width)
+            end = min(len(folded), pos + len(needle) + width)
+            text = doc["expressie"][start:end]
+            return ("…" if start else "") + text + ("…" if end < len(folded) else "")
+    return None
+
+
+def fetch_rule_records(config, token, kind, concurrency=RULE_INDEX_WORKERS):
+    """
+    Alle regels van één soort met inhoud: de lijst, en alleen voor regels
+    zonder expressie/rekenregels in de lijst de detail-call.
+    Geeft (records, errors); een record is (item, detail of None).
+    """
+    records = []
+    pending = []
+    for item in flatten_rules(fetch_rules(config, token, kind)["rules"]):
+        if rule_text(kind, item) is not None:
+            records.append((item, None))
+        else:
+            pending.append(item)
+
+    errors = []
+    ids = [normalize_rule(item)["regelId"] for item in pending]
+    results = fetch_rule_details(config, token, kind, ids, concurrency=concurrency)
+    for item, result in zip(pending, results):
+        if result["ok"]:
+            records.append((item, result["data"]))
+        else:
+            records.append((item, None))
+            errors.append({"kind": kind, "regelId": result["regelId"], "error": result["error"]})
+    return records, errors
+
+
+def merge_rule_record(item, detail):
+    # Lijst-item aangevuld met de (uitgepakte) detail-response.
+    if not isinstance(detail, dict):
+        return dict(item)
+    merged = dict(item)
+    merged.update(_unwrap(detail))
+    return merged
+
+
+def build_index(config):
+    index = RuleIndex()
+    token = get_bearer_token(config)
+
+    for kind in RULE_KINDS:
+        try:
+            records, errors = fetch_rule_records(config, token, kind)
+        except Exception as exc:
+            index.errors.append({"kind": kind, "error": str(exc)})
+            continue
+        # Regels waarvan de detail mislukte blijven vindbaar op omschrijving.
+        for item, detail in records:
+            index.upsert(kind, item, detail)
+        index.errors.extend(errors)
+
+    return index
+
+
+def _rebuild_in_background(config):
+    env_key = config["env"]
+    with _registry_lock:
+        if env_key in _rebuilding:
+            return
+        _rebuilding.add(env_key)
+
+    def run():
+        try:
+            get_rule_index(config, refresh=True)
+        except Exception:
+            # Oude index blijft staan; volgende request probeert opnieuw.
+            pass
+        finally:
+            with _registry_lock:
+                _rebuilding.discard(env_key)
+
+    threading.Thread(target=run, name=f"rule-index-{env_key}", daemon=True).start()
+
+
+def get_rule_index(config, refresh=False):
+    """
+    Index voor deze omgeving. Een verlopen index wordt direct teruggegeven en
+    op de achtergrond opnieuw opgebouwd; zonder index wordt er gewacht.
+    """
+    env_key = config["env"]
+    requested_at = time.time()
+    entry = _indexes.get(env_key)
+    if entry and not refresh:
+        if requested_at - entry["built_at"] >= RULE_INDEX_TTL:
+            _rebuild_in_background(config)
+        return entry
+
+    with _registry_lock:
+        lock = _build_locks.setdefault(env_key, threading.Lock())
+
+    # Eén opbouw tegelijk per omgeving; wie wacht gebruikt het resultaat.
+    with lock:
+        entry = _indexes.get(env_key)
+        if entry and (not refresh or entry["built_at"] >= requested_at):
+            return entry
+        entry = {"index": build_index(config), "built_at": time.time()}
+        _indexes[env_key] = entry
+        return entry
+
+
+def _response_regel_id(data):
+    data = _unwrap(data)
+    if isinstance(data, dict):
+        for name in ("RegelId", "regelId", "id"):
+            if data.get(name) not in (None, "", 0):
+                return data[name]
+    return None
+
+
+def index_rule_saved(kind, env_key, payload, response=None):
+    """Na een geslaagde invoer/wijziging; zonder bekend RegelId wordt de index opnieuw opgebouwd."""
+    entry = _indexes.get(env_key)
+    if entry is None:
+        return
+    try:
+        regel_id = payload.get("RegelId") or _response_regel_id(response)
+        if not regel_id:
+            _indexes.pop(env_key, None)
+            return
+        entry["index"].upsert(kind, dict(payload, RegelId=regel_id))
+    except Exception:
+        _indexes.pop(env_key, None)
+
+
+def index_rule_deleted(kind, env_key, regel_id):
+    entry = _indexes.get(env_key)
+    if entry is not None:
+        entry["index"].remove(kind, regel_id)
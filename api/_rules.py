@@ -0,0 +1,266 @@
+import os
+import uuid
+
+from _deadline import clip_timeout, guard, remaining
+from _rulevalidate import RuleValidationError, validate_rule_payload
+from _runtime import RULE_CONFIG_FIELDS, RULE_HEADER_FIELDS, asyncio, httpx
+from _runtime import dias_headers as _dias_headers
+from _runtime import get_env_config as _get_env_config
+from _timing import timed
+from _upstream import coalesced_get, get_client, new_async_client
+
+# Gedeelde DIAS toegang voor acceptatieregels en dynamiekregels.
+# Beide soorten hebben dezelfde vorm (lijst / detail / invoeren / wijzigen),
+# alleen het pad verschilt. Endpoints die beide soorten nodig hebben (zoeken,
+# bulk, vergelijken) gebruiken deze module; de regel-handlers ook.
+
+# ====== UPSTREAM PATHS (pas dit aan als jouw backend andere routes heeft) ======
+RULE_PATHS = {
+    "acceptance": "/beheer/api/v1/administratie/assurantie/regels/acceptatieregels",
+    "dynamiek": "/beheer/api/v1/administratie/assurantie/regels/dynamiekregels",
+}
+# ============================================================================
+
+RULE_KINDS = tuple(RULE_PATHS)
+
+# Bulk detail ophalen: max aantal gelijktijdige requests en timeout per regel
+RULE_DETAILS_CONCURRENCY = int(os.getenv("RULE_DETAILS_CONCURRENCY", "10"))
+RULE_DETAILS_ITEM_TIMEOUT = float(os.getenv("RULE_DETAILS_ITEM_TIMEOUT", "15"))
+
+
+def _acceptance_payload(body: dict):
+    afd_code = body.get("AfdBrancheCodeId")
+    omschrijving = body.get("Omschrijving")
+    expressie = body.get("Expressie")
+    regel_id = body.get("RegelId")
+    resource_id = body.get("ResourceId") or str(uuid.uuid4())
+
+    if regel_id is not None:
+        if expressie is None or omschrijving is None:
+            raise ValueError("RegelId, Omschrijving, and Expressie are required")
+        return "update", {
+            "RegelId": regel_id,
+            "Omschrijving": omschrijving,
+            "Expressie": expressie,
+            "ResourceId": resource_id,
+        }
+
+    if afd_code is None or omschrijving is None or expressie is None:
+        raise ValueError("AfdBrancheCodeId, Omschrijving, and Expressie are required")
+    return "create", {
+        "AfdBrancheCodeId": afd_code,
+        "Omschrijving": omschrijving,
+        "Expressie": expressie,
+        "ResourceId": resource_id,
+    }
+
+
+def _dynamiek_payload(body: dict):
+    # Payload contract (DIAS):
+    # - Invoeren (create): NO RegelId in payload
+    # - Wijzigen (update): RegelId aanwezig en > 0
+    # Bron/Doel velden mogen leeg zijn.
+    payload = dict(body)
+    payload["ResourceId"] = payload.get("ResourceId") or str(uuid.uuid4())
+
+    regel_id_raw = payload.get("RegelId")
+    is_update = False
+    try:
+        if regel_id_raw is not None and str(regel_id_raw).strip() != "":
+            is_update = int(regel_id_raw) > 0
+    except Exception:
+        # If it's not numeric, treat as update intent when provided
+        is_update = True
+
+    if is_update:
+        return "update", payload
+
+    # Ensure RegelId is not sent on create
+    payload.pop("RegelId", None)
+    return "create", payload
+
+
+def build_rule_payload(kind: str, body: dict):
+    """
+    Valideert een PUT body en bepaalt of het een invoer of wijziging is.
+    Geeft ("create" | "update", payload) terug; ongeldige input geeft een ValueError,
+    fouten in de expressie/rekenregels een RuleValidationError (met .errors).
+    """
+    if not isinstance(body, dict):
+        raise ValueError("Body must be a JSON object")
+    if kind == "dynamiek":
+        action, payload = _dynamiek_payload(body)
+    else:
+        action, payload = _acceptance_payload(body)
+
+    # Pre-flight: geen DIAS round-trip voor een expressie die zeker fout is.
+    errors = validate_rule_payload(kind, payload)
+    if errors:
+        raise RuleValidationError(errors)
+    return action, payload
+
+
+def get_env_config(env_key: str):
+    # Config wordt één keer per proces opgebouwd in _runtime.
+    return _get_env_config(env_key, RULE_CONFIG_FIELDS)
+
+
+def dias_headers(config: dict, token: str) -> dict:
+    if not config.get("tenant_customer_id") or not config.get("bedrijf_id"):
+        raise RuntimeError(
+            "DIAS_TENANT_CUSTOMER_ID / DIAS_BEDRIJF_ID ontbreekt (zet env vars in Vercel)"
+        )
+    return _dias_headers(config, token, RULE_HEADER_FIELDS)
+
+
+def rules_url(config: dict, kind: str) -> str:
+    return f"{config['host'].rstrip('/')}{RULE_PATHS[kind]}"
+
+
+def rule_detail_url(config: dict, kind: str, regel_id) -> str:
+    return f"{rules_url(config, kind)}/{regel_id}"
+
+
+def fetch_rules(config: dict, token: str, kind: str):
+    resp = coalesced_get(
+        config["env"],
+        rules_url(config, kind),
+        headers=dias_headers(config, token),
+        timeout=30.0,
+    )
+    resp.raise_for_status()
+
+    with timed("decode"):
+        data = resp.json()
+    if isinstance(data, list):
+        rules = data
+    elif isinstance(data, dict) and "data" in data:
+        rules = data["data"]
+    elif isinstance(data, dict) and "rules" in data:
+        rules = data["rules"]
+    else:
+        rules = [data] if data else []
+
+    return {"rules": rules, "count": len(rules)}
+
+
+def fetch_rule_detail(config: dict, token: str, kind: str, regel_id):
+    resp = coalesced_get(
+        config["env"],
+        rule_detail_url(config, kind, regel_id),
+        headers=dias_headers(config, token),
+        timeout=30.0,
+    )
+    resp.raise_for_status()
+    with timed("decode"):
+        return resp.json()
+
+
+async def _fetch_rule_details_async(config, token, kind, regel_ids, concurrency, item_timeout):
+    headers = dias_headers(config, token)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with new_async_client(concurrency) as client:
+
+        async def fetch_one(regel_id):
+            async with semaphore:
+                # Regels die pas na de deadline aan de beurt zijn: direct 504.
+                left = remaining()
+                timeout = item_timeout if left is None else min(item_timeout, left)
+                if timeout <= 0:
+                    return {"regelId": regel_id, "ok": False, "status_code": 504, "error": "Geen tijd meer"}
+                try:
+                    resp = await asyncio.wait_for(
+                        client.get(
+                            rule_detail_url(config, kind, regel_id),
+                            headers=headers,
+                            timeout=timeout,
+                        ),
+                        timeout,
+                    )
+                    resp.raise_for_status()
+                    return {"regelId": regel_id, "ok": True, "data": resp.json()}
+                except httpx.HTTPStatusError as exc:
+                    return {
+                        "regelId": regel_id,
+                        "ok": False,
+                        "status_code": exc.response.status_code,
+                        "error": exc.response.text or "Upstream request failed",
+                    }
+                except asyncio.TimeoutError:
+                    return {
+                        "regelId": regel_id,
+                        "ok": False,
+                        "status_code": 504,
+                        "error": f"Timeout na {timeout:g}s",
+                    }
+                except Exception as exc:
+                    return {"regelId": regel_id, "ok": False, "status_code": 502, "error": str(exc)}
+
+        return await asyncio.gather(*(fetch_one(regel_id) for regel_id in regel_ids))
+
+
+def fetch_rule_details(
+    config: dict,
+    token: str,
+    kind: str,
+    regel_ids,
+    concurrency: int = RULE_DETAILS_CONCURRENCY,
+    item_timeout: float = RULE_DETAILS_ITEM_TIMEOUT,
+):
+    """
+    Details van meerdere regels tegelijk (max 'concurrency' in flight).
+    Geeft per regelId {"regelId", "ok", "data"} of {"regelId", "ok": False,
+    "status_code", "error"} terug, in dezelfde volgorde als regel_ids.
+    """
+    if not regel_ids:
+        return []
+    return asyncio.run(
+        _fetch_rule_details_async(
+            config, token, kind, list(regel_ids), max(1, concurrency), item_timeout
+        )
+    )
+
+
+def delete_rule(config: dict, token: str, kind: str, regel_id):
+    client = get_client(config["env"])
+    with guard("upstream"):
+        resp = client.delete(
+            rule_detail_url(config, kind, regel_id),
+            headers=dias_headers(config, token),
+            timeout=clip_timeout(30.0, "upstream"),
+        )
+    resp.raise_for_status()
+    return resp.json() if resp.content else {"status": "deleted"}
+
+
+def create_rule(config: dict, token: str, kind: str, payload: dict):
+    client = get_client(config["env"])
+    with guard("upstream"):
+        resp = client.put(
+            f"{rules_url(config, kind)}/invoeren",
+            headers=dias_headers(config, token),
+            json=payload,
+            timeout=clip_timeout(30.0, "upstream"),
+        )
+    resp.raise_for_status()
+    return resp.json() if resp.content else {"status": "created"}
+
+
+def update_rule(config: dict, token: str, kind: str, payload: dict):
+    client = get_client(config["env"])
+    with guard("upstream"):
+        resp = client.put(
+            f"{rules_url(config, kind)}/wijzigen",
+            headers=dias_headers(config, token),
+            json=payload,
+            timeout=clip_timeout(30.0, "upstream"),
+        )
+    resp.raise_for_status()
+    return resp.json() if resp.content else {"status": "updated"}
+
+
+def save_rule(config: dict, token: str, kind: str, action: str, payload: dict):
+    if action == "update":
+        return update_rule(config, token, kind, payload)
+    return create_rule(config, token, kind, payload)
@@ -0,0 +1,165 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+
+# Voorbewerkte regeltabel voor zoeken/sorteren/pagineren op de server.
+# De tabel wordt per (soort, omgeving) gecachet; zoeksleutels (lowercase) en
+# sorteervolgordes worden één keer berekend bij het opbouwen.
+RULE_TABLE_TTL = int(os.getenv("RULE_TABLE_TTL", "60"))
+MAX_PAGE_SIZE = 500
+
+_DIGITS = re.compile(r"(\d+)")
+
+_tables = {}
+_build_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _first(item, *names):
+    for name in names:
+        value = item.get(name)
+        if value is not None:
+            return value
+    return ""
+
+
+def normalize_rule(item):
+    # Zelfde velden als normalizeRules in App.jsx / Dynamiekregels.jsx
+    return {
+        "regelId": _first(item, "regelId", "RegelId", "id"),
+        "externNummer": _first(item, "externNummer", "ExternNummer"),
+        "omschrijving": _first(item, "omschrijving", "Omschrijving"),
+    }
+
+
+def flatten_rules(items):
+    # Iteratief en in documentvolgorde; arrays en Data-arrays worden platgeslagen.
+    out = []
+    pending = list(reversed(items)) if isinstance(items, list) else [items]
+    while pending:
+        item = pending.pop()
+        if not item:
+            continue
+        if isinstance(item, list):
+            pending.extend(reversed(item))
+        elif isinstance(item, dict) and isinstance(item.get("Data"), list):
+            pending.extend(reversed(item["Data"]))
+        elif isinstance(item, dict):
+            out.append(item)
+    return out
+
+
+def _fold(value):
+    # Benadert localeCompare(..., { sensitivity: 'base' }): geen hoofdletters/accenten.
+    text = unicodedata.normalize("NFKD", str(value))
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+
+
+def natural_key(value):
+    # Benadert localeCompare(..., { numeric: true }): "R2" < "R10".
+    parts = _DIGITS.split(_fold(value))
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in parts if part)
+
+
+class RuleTable:
+    def __init__(self, items, search_fields, sort_fields):
+        self.items = flatten_rules(items)
+        self.rows = [normalize_rule(item) for item in self.items]
+        self.search_keys = [
+            "\x00".join(_fold(row[field]) for field in search_fields) for row in self.rows
+        ]
+        self.sort_fields = sort_fields
+        # Stabiel gesorteerd in beide richtingen (net als sort() met -cmp in de UI).
+        self.order = {}
+        for field in sort_fields:
+            keys = [natural_key(row[field]) for row in self.rows]
+            for direction in ("asc", "desc"):
+                self.order[(field, direction)] = sorted(
+                    range(len(keys)), key=keys.__getitem__, reverse=direction == "desc"
+                )
+
+    def query(self, q="", sort=None, direction="asc", page=1, page_size=10):
+        sort = sort if sort in self.sort_fields else self.sort_fields[0]
+        order = self.order[(sort, direction)]
+
+        needle = _fold(q.strip()) if q else ""
+        if needle:
+            matches = [i for i in order if needle in self.search_keys[i]]
+        else:
+            matches = list(order)
+
+        total = len(matches)
+        pages = max(1, -(-total // page_size))
+        page = min(max(page, 1), pages)
+        start = (page - 1) * page_size
+        page_items = [self.items[i] for i in matches[start:start + page_size]]
+
+        return {
+            "rules": page_items,
+            "count": len(page_items),
+            "total": total,
+            "page": page,
+            "pageSize": page_size,
+            "pages": pages,
+        }
+
+
+def parse_list_query(query_params):
+    """
+    Leest q/sort/dir/page/pageSize uit de querystring.
+    Geeft None terug als geen van deze parameters is meegegeven (dan blijft
+    de volledige lijst het antwoord). Ongeldige waarden geven een ValueError.
+    """
+    names = ("q", "sort", "dir", "page", "pageSize")
+    if not any(name in query_params for name in names):
+        return None
+
+    direction = query_params.get("dir", ["asc"])[0]
+    if direction not in ("asc", "desc"):
+        raise ValueError("dir must be 'asc' or 'desc'")
+
+    try:
+        page = int(query_params.get("page", ["1"])[0])
+        page_size = int(query_params.get("pageSize", ["10"])[0])
+    except ValueError:
+        raise ValueError("page and pageSize must be integers")
+    if page < 1 or page_size < 1 or page_size > MAX_PAGE_SIZE:
+        raise ValueError(f"page must be >= 1 and pageSize between 1 and {MAX_PAGE_SIZE}")
+
+    return {
+        "q": query_params.get("q", [""])[0],
+        "sort": query_params.get("sort", [None])[0],
+        "direction": direction,
+        "page": page,
+        "page_size": page_size,
+    }
+
+
+def get_rule_table(kind, env_key, load, search_fields, sort_fields, refresh=False):
+    key = (kind, env_key)
+    requested_at = time.time()
+    entry = _tables.get(key)
+    if entry and not refresh and requested_at - entry["built_at"] < RULE_TABLE_TTL:
+        return entry["table"]
+
+    with _registry_lock:
+        lock = _build_locks.setdefault(key, threading.Lock())
+
+    # Eén opbouw tegelijk per (soort, omgeving); wie wacht gebruikt het resultaat.
+    with lock:
+        entry = _tables.get(key)
+        if entry:
+            fresh = time.time() - entry["built_at"] < RULE_TABLE_TTL
+            if fresh and (not refresh or entry["built_at"] >= requested_at):
+                return entry["table"]
+        table = RuleTable(load(), search_fields, sort_fields)
+        _tables[key] = {"table": table, "built_at": time.time()}
+        return table
+
+
+def invalidate_rule_table(kind, env_key=None):
+    for key in list(_tables):
+        if key[0] == kind and (env_key is None or key[1] == env_key):
+            _tables.pop(key, None)
@@ -0,0 +1,125 @@
+import functools
+import os
+
+from _xpath import XPathSyntaxError, check_lexical, parse
+from _xpatheval import XPathEvalError, compile_expression
+
+# Pre-flight validatie van regels vóór een upstream PUT. Syntaxfouten in
+# XPath expressies komen anders pas na een volledige DIAS round-trip terug.
+# - errors:   alleen zekere fouten (blokkeren opslaan), met positie/regel/
+#             kolom: niet afgesloten string of commentaar, haakjes die niet
+#             kloppen, expressie die halverwege ophoudt
+# - warnings: alles wat de lokale parser/evaluator niet kent (for/some,
+#             instance of, 'to', andere assen, onbekende functies, ...).
+#             De parser dekt maar een deel van XPath 2.0 en DIAS kan ze
+#             wel kennen, dus die blokkeren niet. Een lege expressie is ook
+#             een waarschuwing: of die mag, beslist DIAS (zoals voorheen).
+XPATH_VALIDATE_CACHE_SIZE = int(os.getenv("XPATH_VALIDATE_CACHE_SIZE", "4096"))
+
+
+class RuleValidationError(ValueError):
+    def __init__(self, errors):
+        first = errors[0]
+        where = f" (regel {first['line']}, kolom {first['column']})" if "line" in first else ""
+        super().__init__(f"{first['field']}: {first['message']}{where}")
+        self.errors = errors
+
+
+def _line_column(text, pos):
+    line = text.count("\n", 0, pos) + 1
+    column = pos - (text.rfind("\n", 0, pos) + 1) + 1
+    return line, column
+
+
+def _issue(text, message, pos, severity):
+    issue = {"severity": severity, "message": message}
+    if pos is not None:
+        line, column = _line_column(text, pos)
+        issue.update({"position": pos, "line": line, "column": column})
+    return issue
+
+
+@functools.lru_cache(maxsize=XPATH_VALIDATE_CACHE_SIZE)
+def _check(expression):
+    # Gecachet per tekst: de editor stuurt bij elke toetsaanslag (debounced)
+    # grotendeels dezelfde expressies. Tuples, zodat de cache niet muteerbaar is.
+    try:
+        check_lexical(expression)
+    except XPathSyntaxError as exc:
+        return ("error", exc.message, exc.pos)
+    try:
+        parse(expression)
+    except XPathSyntaxError as exc:
+        if exc.pos >= len(expression.rstrip()):
+            # Onverwacht einde: "a and", "if (x) then y" zonder else, ...
+            return ("error", exc.message, exc.pos)
+        return ("warning", f"Niet lokaal te controleren: {exc.message}", exc.pos)
+    except RecursionError:
+        return ("warning", "Expressie is te diep genest om lokaal te controleren", None)
+    try:
+        compile_expression(expression)
+    except XPathEvalError as exc:
+        return ("warning", exc.message, exc.pos)
+    except XPathSyntaxError as exc:
+        return ("warning", exc.message, None)
+    return None
+
+
+def validate_expression(expression):
+    """Geeft {"valid", "errors", "warnings"} voor één XPath expressie."""
+    text = "" if expression is None else str(expression)
+    result = {"valid": True, "errors": [], "warnings": []}
+    if not text.strip():
+        result["warnings"].append(_issue(text, "Lege expressie", None, "warning"))
+        return result
+    found = _check(text)
+    if found is not None:
+        severity, message, pos = found
+        result["errors" if severity == "error" else "warnings"].append(
+            _issue(text, message, pos, severity)
+        )
+        result["valid"] = severity != "error"
+    return result
+
+
+def _dynamiek_errors(payload):
+    # Dynamiekregels hebben geen XPath; wel de Rekenregels-structuur controleren
+    # die DIAS anders pas na de round-trip afkeurt.
+    errors = []
+    rekenregels = payload.get("Rekenregels")
+    if rekenregels is None:
+        return errors
+    if not isinstance(rekenregels, list):
+        return [{"field": "Rekenregels", "severity": "error", "message": "Rekenregels moet een lijst zijn"}]
+    for index, rekenregel in enumerate(rekenregels):
+        field = f"Rekenregels[{index}]"
+        if not isinstance(rekenregel, dict):
+            errors.append({"field": field, "severity": "error", "message": "Rekenregel moet een object zijn"})
+            continue
+        if rekenregel.get("Actie") == "Verwijderen":
+            continue
+        operator = str(rekenregel.get("Operator") or "").strip()
+        if not operator or operator == "NotSet":
+            errors.append(
+                {"field": f"{field}.Operator", "severity": "error", "message": "Operator is verplicht."}
+            )
+    return errors
+
+
+def validate_rule_payload(kind, payload):
+    """
+    Alle fouten in een (door build_rule_payload opgebouwde) payload, als lijst
+    van {"field", "severity", "message", "position"?, "line"?, "column"?}.
+    """
+    errors = []
+    if "Expressie" in payload:
+        for issue in validate_expression(payload["Expressie"])["errors"]:
+            errors.append(dict(issue, field="Expressie"))
+    if kind == "dynamiek":
+        errors.extend(_dynamiek_errors(payload))
+    return errors
+
+
+def cache_info():
+    info = _check.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
@@ -0,0 +1,137 @@
+import importlib
+import os
+import sys
+import threading
+from functools import lru_cache
+
+# Gedeelde runtime voor alle handlers, één keer per proces geladen.
+# - Zware modules (httpx ~200ms, asyncio) pas importeren bij eerste gebruik:
+#   health, login, metrics, rule-validate en lokale uitleg komen er nooit aan.
+# - DIAS/Kinetic configuratie per omgeving wordt bij het laden één keer uit
+#   de env vars gelezen; get_env_config() geeft daarna steeds dezelfde dict
+#   terug (niet wijzigen).
+# - Vaste DIAS headers per configuratie worden één keer opgebouwd; per
+#   request komt alleen de Authorization header erbij.
+
+
+class LazyModule:
+    """Module-proxy: de echte import gebeurt bij de eerste attribuut-toegang."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+                module = self._module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def is_loaded(name):
+    return name in sys.modules
+
+
+httpx = lazy_import("httpx")
+asyncio = lazy_import("asyncio")
+
+
+# ---- omgevingen ----
+
+DEFAULT_KINETIC_HOST = "https://dcb.sleutelstadassuradeuren.nl"
+
+# veld -> (production env var, acceptance env var, production default)
+# Acceptance env vars: GEEN fallback naar production (veiligheid)
+ENV_VARS = {
+    "host": ("KINETIC_HOST", "KINETIC_HOST_ACCEPTANCE", DEFAULT_KINETIC_HOST),
+    "client_id": ("KINETIC_CLIENT_ID", "KINETIC_CLIENT_ID_ACCEPTANCE", None),
+    "client_secret": ("KINETIC_CLIENT_SECRET", "KINETIC_CLIENT_SECRET_ACCEPTANCE", None),
+    "tenant_customer_id": ("DIAS_TENANT_CUSTOMER_ID", "DIAS_TENANT_CUSTOMER_ID_ACCEPTANCE", ""),
+    "bedrijf_id": ("DIAS_BEDRIJF_ID", "DIAS_BEDRIJF_ID_ACCEPTANCE", ""),
+    "medewerker_id": ("DIAS_MEDEWERKER_ID", "DIAS_MEDEWERKER_ID_ACCEPTANCE", ""),
+    "kantoor_id": ("DIAS_KANTOOR_ID", "DIAS_KANTOOR_ID_ACCEPTANCE", ""),
+}
+
+RULE_CONFIG_FIELDS = ("host", "client_id", "client_secret", "tenant_customer_id", "bedrijf_id")
+PRODUCT_CONFIG_FIELDS = RULE_CONFIG_FIELDS + ("medewerker_id", "kantoor_id")
+
+
+def _load_env_configs():
+    configs = {}
+    for env_key, index in (("production", 0), ("acceptance", 1)):
+        config = {"env": env_key}
+        for field, names in ENV_VARS.items():
+            default = names[2] if env_key == "production" else None
+            config[field] = os.getenv(names[index], default)
+        configs[env_key] = config
+    return configs
+
+
+ENV_CONFIGS = _load_env_configs()
+
+
+@lru_cache(maxsize=None)
+def _missing(env_key, fields):
+    if env_key != "acceptance":
+        return ()
+    config = ENV_CONFIGS[env_key]
+    return tuple(ENV_VARS[field][1] for field in fields if not config[field])
+
+
+def get_env_config(env_key, fields=RULE_CONFIG_FIELDS):
+    """Vooraf opgebouwde config; acceptance faalt als een van 'fields' ontbreekt."""
+    env_key = "acceptance" if env_key == "acceptance" else "production"
+    missing = _missing(env_key, tuple(fields))
+    if missing:
+        raise RuntimeError("Acceptance env vars ontbreken: " + ", ".join(missing))
+    return ENV_CONFIGS[env_key]
+
+
+HEADER_NAMES = {
+    "tenant_customer_id": "Tenant-CustomerId",
+    "bedrijf_id": "BedrijfId",
+    "medewerker_id": "MedewerkerId",
+    "kantoor_id": "KantoorId",
+}
+RULE_HEADER_FIELDS = ("tenant_customer_id", "bedrijf_id")
+PRODUCT_HEADER_FIELDS = RULE_HEADER_FIELDS + ("medewerker_id", "kantoor_id")
+
+
+def _build_headers(config, fields):
+    headers = {"Accept": "application/json"}
+    for field in fields:
+        headers[HEADER_NAMES[field]] = str(config[field] or "")
+    return headers
+
+
+HEADER_TEMPLATES = {
+    (env_key, fields): _build_headers(config, fields)
+    for env_key, config in ENV_CONFIGS.items()
+    for fields in (RULE_HEADER_FIELDS, PRODUCT_HEADER_FIELDS)
+}
+
+
+def dias_headers(config, token, fields=RULE_HEADER_FIELDS):
+    """Authorization + vaste DIAS headers ('fields' bepaalt welke ids meegaan)."""
+    template = None
+    if config is ENV_CONFIGS.get(config["env"]):
+        template = HEADER_TEMPLATES.get((config["env"], fields))
+    headers = {"Authorization": f"Bearer {token}"}
+    headers.update(template if template is not None else _build_headers(config, fields))
+    return headers
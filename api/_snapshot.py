@@ -0,0 +1,346 @@
+import argparse
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _products import fetch_product_detail, fetch_products, product_id_of
+from _products import get_env_config as get_product_env_config
+from _ruleindex import merge_rule_record, rule_text
+from _rules import RULE_KINDS, fetch_rule_details, fetch_rules, get_env_config
+from _ruletable import flatten_rules, normalize_rule
+from _token import get_bearer_token
+
+# Offline snapshot van alle regels en productdefinities van één omgeving.
+#
+# <dir>/records.jsonl.gz  één gzip member per record (samen een geldige
+#                         .jsonl.gz, dus zcat werkt); elke regel is
+#                         {"key", "kind", "id", "hash", "data"}
+# <dir>/manifest.json     per record: hash van de inhoud, offset en lengte
+#                         van het gzip member
+#
+# Een sync haalt de lijsten en de details op (regels met expressie in de
+# lijst hebben geen detail-call nodig) en vergelijkt de hash van de inhoud
+# met het manifest. Ongewijzigde members worden byte-voor-byte gekopieerd;
+# alleen gewijzigde records worden opnieuw gecomprimeerd en geschreven.
+# Met het manifest is elk record los te lezen via mmap.
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_PRODUCT_WORKERS = int(os.getenv("SNAPSHOT_PRODUCT_WORKERS", "4"))
+RECORDS_FILE = "records.jsonl.gz"
+MANIFEST_FILE = "manifest.json"
+
+
+def _hash(value):
+    raw = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _member(record):
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    # mtime=0: zelfde inhoud geeft dezelfde bytes
+    return gzip.compress(line.encode("utf-8"), compresslevel=6, mtime=0)
+
+
+def _write_atomic(path, data):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """Leest een snapshot; records worden per stuk uit het gemapte bestand gehaald."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as fh:
+            self.manifest = json.load(fh)
+        if self.manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError("Onbekend snapshot formaat")
+        size = os.path.getsize(os.path.join(directory, RECORDS_FILE))
+        if size != self.manifest["bytes"]:
+            raise ValueError("Manifest hoort niet bij het recordbestand")
+        self.entries = {entry["key"]: entry for entry in self.manifest["records"]}
+        self._file = None
+        self._map = None
+
+    def _data(self):
+        if self._map is None:
+            self._file = open(os.path.join(self.directory, RECORDS_FILE), "rb")
+            if os.fstat(self._file.fileno()).st_size:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._map = b""
+        return self._map
+
+    def raw_member(self, key):
+        entry = self.entries[key]
+        return self._data()[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def get(self, key):
+        """Record (met "data") of None."""
+        if key not in self.entries:
+            return None
+        return json.loads(gzip.decompress(self.raw_member(key)))
+
+    def records(self, kind=None):
+        for entry in self.manifest["records"]:
+            if kind is None or entry["kind"] == kind:
+                yield self.get(entry["key"])
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_snapshot(directory):
+    try:
+        return Snapshot(directory)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# ---- ophalen ----
+
+
+def _rule_items(config, token, kind):
+    items = []
+    for item in flatten_rules(fetch_rules(config, token, kind)["rules"]):
+        regel_id = normalize_rule(item)["regelId"]
+        if regel_id not in ("", None):
+            items.append((f"{kind}:{regel_id}", regel_id, item))
+    return items
+
+
+def _fetch_rule_records(config, token, kind, items):
+    # Lijst-items met inhoud zijn het record; de rest via de bulk detail-call.
+    records = {}
+    errors = []
+    pending = []
+    for key, regel_id, item in items:
+        if rule_text(kind, item) is not None:
+            records[key] = item
+        else:
+            pending.append((key, regel_id, item))
+    if not pending:
+        return records, errors
+    results = fetch_rule_details(config, token, kind, [regel_id for _, regel_id, _ in pending])
+    for (key, _, item), result in zip(pending, results):
+        if result["ok"]:
+            records[key] = merge_rule_record(item, result["data"])
+        else:
+            errors.append({"key": key, "status_code": result["status_code"], "error": result["error"]})
+    return records, errors
+
+
+def _product_items(config, token):
+    items = []
+    for item in flatten_rules(fetch_products(config, token)["products"]):
+        product_id = product_id_of(item)
+        if product_id is not None:
+            items.append((f"product:{product_id}", product_id, item))
+    return items
+
+
+def _fetch_product_records(config, token, items):
+    def fetch(entry):
+        key, product_id, _ = entry
+        try:
+            return key, fetch_product_detail(config, token, product_id), None
+        except Exception as exc:
+            return key, None, {"key": key, "error": str(exc)}
+
+    records = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, SNAPSHOT_PRODUCT_WORKERS)) as pool:
+        for key, data, error in pool.map(fetch, items):
+            if error:
+                errors.append(error)
+            else:
+                records[key] = data
+    return records, errors
+
+
+def sync_snapshot(env_key, directory, kinds=RULE_KINDS, include_products=True, full=False):
+    """
+    Maakt of werkt de snapshot in 'directory' bij. Geeft statistieken terug:
+    per soort listed/fetched/unchanged/changed/removed, plus fouten. Een
+    soort waarvan de lijst niet op te halen is, of die niet gesynct wordt
+    (--kinds, --no-products), blijft ongewijzigd in de snapshot.
+    """
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    previous = load_snapshot(directory)
+    old_entries = previous.entries if previous else {}
+
+    sources = [(kind, get_env_config(env_key)) for kind in kinds]
+    if include_products:
+        sources.append(("product", get_product_env_config(env_key)))
+    synced = {kind for kind, _ in sources}
+
+    stats = {"env": env_key, "errors": [], "kinds": {}}
+    # Soorten die deze keer niet gesynct worden gaan ongewijzigd mee.
+    new_entries = [entry for entry in old_entries.values() if entry["kind"] not in synced]
+    payloads = {}
+    for kind, config in sources:
+        kind_stats = {"listed": 0, "fetched": 0, "unchanged": 0, "changed": 0, "removed": 0}
+        stats["kinds"][kind] = kind_stats
+        try:
+            token = get_bearer_token(config)
+            items = _rule_items(config, token, kind) if kind != "product" else _product_items(config, token)
+        except Exception as exc:
+            # Lijst niet beschikbaar: bestaande records van deze soort houden.
+            stats["errors"].append({"kind": kind, "error": str(exc)})
+            new_entries.extend(entry for entry in old_entries.values() if entry["kind"] == kind)
+            continue
+        kind_stats["listed"] = len(items)
+
+        # Het lijst-item zegt niet of de inhoud veranderd is (een product
+        # houdt dezelfde ProductId/Omschrijving). Daarom het volledige record
+        # ophalen en de hash van de inhoud vergelijken.
+        if kind == "product":
+            records, errors = _fetch_product_records(config, token, items)
+            kind_stats["fetched"] = len(items)
+        else:
+            records, errors = _fetch_rule_records(config, token, kind, items)
+            kind_stats["fetched"] = sum(1 for _, _, item in items if rule_text(kind, item) is None)
+        stats["errors"].extend(dict(error, kind=kind) for error in errors)
+
+        for key, record_id, _ in items:
+            old = old_entries.get(key)
+            if key not in records:
+                # Detail mislukt: oude versie (indien aanwezig) blijft staan.
+                if old is not None:
+                    new_entries.append(old)
+                continue
+            content_hash = _hash(records[key])
+            if old is not None and not full and old["hash"] == content_hash:
+                new_entries.append(old)
+                kind_stats["unchanged"] += 1
+                continue
+            record = {"key": key, "kind": kind, "id": record_id, "hash": content_hash, "data": records[key]}
+            payloads[key] = _member(record)
+            new_entries.append({"key": key, "kind": kind, "id": record_id, "hash": content_hash})
+            kind_stats["changed"] += 1
+
+        listed = {key for key, _, _ in items}
+        kind_stats["removed"] = sum(
+            1 for entry in old_entries.values() if entry["kind"] == kind and entry["key"] not in listed
+        )
+
+    # Nieuw recordbestand: ongewijzigde members kopiëren, gewijzigde nieuw.
+    chunks = []
+    offset = 0
+    manifest_records = []
+    for entry in new_entries:
+        data = payloads[entry["key"]] if entry["key"] in payloads else previous.raw_member(entry["key"])
+        data = bytes(data)
+        chunks.append(data)
+        manifest_records.append(dict(entry, offset=offset, length=len(data)))
+        offset += len(data)
+    if previous is not None:
+        previous.close()
+
+    now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    created = previous.manifest.get("createdAt", now) if previous is not None else now
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "env": env_key,
+        "createdAt": created,
+        "updatedAt": now,
+        "recordsFile": RECORDS_FILE,
+        "count": len(manifest_records),
+        "bytes": offset,
+        "records": manifest_records,
+    }
+    # Records eerst, dan het manifest (beide via tmp + replace). Breekt de sync
+    # daartussen af, dan klopt "bytes" niet meer en begint de volgende sync opnieuw.
+    _write_atomic(os.path.join(directory, RECORDS_FILE), b"".join(chunks))
+    _write_atomic(
+        os.path.join(directory, MANIFEST_FILE),
+        json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"),
+    )
+
+    stats.update(
+        {
+            "count": len(manifest_records),
+            "bytes": offset,
+            "tookMs": round((time.perf_counter() - started) * 1000, 1),
+        }
+    )
+    return stats
+
+
+# ---- CLI ----
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot van regels en productdefinities")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sync = sub.add_parser("sync", help="snapshot maken of incrementeel bijwerken")
+    sync.add_argument("--env", choices=("production", "acceptance"), default="production")
+    sync.add_argument("--dir", required=True)
+    sync.add_argument("--kinds", default=",".join(RULE_KINDS))
+    sync.add_argument("--no-products", action="store_true")
+    sync.add_argument("--full", action="store_true", help="alle records opnieuw schrijven")
+
+    show = sub.add_parser("show", help="manifest samenvatten of één record tonen")
+    show.add_argument("--dir", required=True)
+    show.add_argument("key", nargs="?")
+
+    export = sub.add_parser("export", help="alle records als JSONL naar stdout")
+    export.add_argument("--dir", required=True)
+    export.add_argument("--kind")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "sync":
+        kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+        unknown = [kind for kind in kinds if kind not in RULE_KINDS]
+        if unknown:
+            parser.error(f"onbekende soort: {', '.join(unknown)}")
+        stats = sync_snapshot(args.env, args.dir, kinds, not args.no_products, args.full)
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 1 if stats["errors"] else 0
+
+    snapshot = load_snapshot(args.dir)
+    if snapshot is None:
+        print(f"Geen snapshot in {args.dir}", file=sys.stderr)
+        return 1
+    with snapshot:
+        if args.command == "show":
+            if args.key:
+                record = snapshot.get(args.key)
+                if record is None:
+                    print(f"Onbekende key {args.key}", file=sys.stderr)
+                    return 1
+                print(json.dumps(record, ensure_ascii=False, indent=2))
+            else:
+                counts = {}
+                for entry in snapshot.manifest["records"]:
+                    counts[entry["kind"]] = counts.get(entry["kind"], 0) + 1
+                summary = {k: v for k, v in snapshot.manifest.items() if k != "records"}
+                print(json.dumps(dict(summary, kinds=counts), ensure_ascii=False, indent=2))
+        else:
+            for record in snapshot.records(args.kind):
+                sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+import json
+import re
+
+from _compress import StreamEncoder, negotiate
+from _deadline import guard
+from _resilience import resilient_stream
+from _upstream import get_client
+
+# Streaming helpers voor grote upstream payloads.
+# - start_chunked/write_chunk: bytes direct doorzetten (chunked transfer encoding)
+# - ListEnvelope: de lijst-normalisatie (list / {"data": [...]}) incrementeel
+#   uitvoeren, zonder de hele body te decoderen en opnieuw te encoderen.
+
+# Strings in één keer (incl. escapes), structurele tekens los, of een losse '"'
+# als de string nog niet compleet is (dan wachten we op de volgende chunk).
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[\[\]{},:]|"', re.DOTALL)
+_WHITESPACE = b" \t\r\n"
+
+
+class ListEnvelope:
+    """
+    Zet een upstream body om naar {"<name>": [...], "count": N}, met dezelfde
+    regels als de oude normalisatie:
+    - top-level array            -> die array
+    - object met keys[0] (data)  -> die waarde
+    - object met keys[1:]        -> die waarde
+    - anders                     -> [body] (of [] als leeg)
+
+    De veelvoorkomende vormen (array, of object waarin "data" een array is)
+    worden gestreamd; alle andere vormen vallen terug op een volledige decode.
+    """
+
+    def __init__(self, name, keys):
+        self.name = name
+        self.keys = keys
+        self.count = 0
+
+        self._buf = b""
+        self._raw = []  # alles vóór commit, voor de fallback
+        self._mode = "start"  # start | object | array | done | fallback
+        self._depth = 0
+        self._base = 0  # diepte binnen de gestreamde array
+        self._has_value = False
+        self._key = None
+        self._expect = "key"  # object mode op diepte 1: key | colon | value | next
+
+    def _commit(self, out, start):
+        # Vanaf hier streamen we; de fallback-buffer is niet meer nodig.
+        self._raw = []
+        self._mode = "array"
+        self._base = self._depth
+        out.append(b'{"' + self.name.encode("utf-8") + b'": ')
+        return start
+
+    def _scan(self, buf, out):
+        pos = 0
+        emit_from = None if self._mode != "array" else 0
+
+        while pos < len(buf):
+            if self._mode == "start":
+                stripped = buf[pos:].lstrip(_WHITESPACE)
+                if not stripped:
+                    return len(buf), emit_from
+                pos = len(buf) - len(stripped)
+                first = buf[pos:pos + 1]
+                if first == b"[":
+                    self._depth = 1
+                    emit_from = self._commit(out, pos)
+                    pos += 1
+                    continue
+                if first == b"{":
+                    self._depth = 1
+                    self._mode = "object"
+                    pos += 1
+                    continue
+                # Scalar op top-level: fallback.
+                self._mode = "fallback"
+                return len(buf), emit_from
+
+            m = _TOKEN.search(buf, pos)
+            if m is None:
+                if self._mode == "array" and self._depth == self._base and buf[pos:].strip(_WHITESPACE):
+                    self._has_value = True
+                return len(buf), emit_from
+
+            token = m.group()
+            if token == b'"':
+                # Onvolledige string; bewaar vanaf hier voor de volgende chunk.
+                return m.start(), emit_from
+
+            gap_has_content = bool(buf[pos:m.start()].strip(_WHITESPACE))
+            pos = m.end()
+
+            if self._mode == "array":
+                if self._depth == self._base:
+                    if gap_has_content:
+                        self._has_value = True
+                    if token in (b",", b"]"):
+                        if self._has_value:
+                            self.count += 1
+                        self._has_value = False
+                    else:
+                        self._has_value = True
+                if token in (b"[", b"{"):
+                    self._depth += 1
+                elif token in (b"]", b"}"):
+                    self._depth -= 1
+                    if self._depth < self._base:
+                        out.append(buf[emit_from:pos])
+                        self._mode = "done"
+                        return len(buf), None
+                continue
+
+            # object mode: alleen diepte 1 is interessant
+            if self._depth == 1:
+                if self._expect == "key" and token.startswith(b'"'):
+                    self._key = json.loads(token)
+                    self._expect = "colon"
+                    continue
+                if self._expect == "colon" and token == b":":
+                    self._expect = "value"
+                    continue
+                if self._expect == "value":
+                    self._expect = "next"
+                    if token == b"[" and not gap_has_content and self._key == self.keys[0]:
+                        self._depth += 1
+                        emit_from = self._commit(out, m.start())
+                        continue
+                if token == b",":
+                    self._expect = "key"
+                    continue
+
+            if token in (b"[", b"{"):
+                self._depth += 1
+            elif token in (b"]", b"}"):
+                self._depth -= 1
+
+        return pos, emit_from
+
+    def feed(self, chunk):
+        if self._mode in ("done", "fallback"):
+            if self._mode == "fallback":
+                self._raw.append(chunk)
+            return b""
+
+        buf = self._buf + chunk
+        out = []
+        consumed, emit_from = self._scan(buf, out)
+
+        if self._mode == "array" and emit_from is not None:
+            out.append(buf[emit_from:consumed])
+        elif self._mode in ("start", "object", "fallback"):
+            self._raw.append(buf[:consumed])
+            if self._mode == "fallback":
+                self._raw.append(buf[consumed:])
+                consumed = len(buf)
+
+        self._buf = buf[consumed:]
+        return b"".join(out)
+
+    def close(self):
+        if self._mode == "done":
+            return b', "count": ' + str(self.count).encode("ascii") + b"}"
+        if self._mode == "array":
+            raise ValueError("Upstream body eindigde midden in de lijst")
+
+        self._raw.append(self._buf)
+        raw = b"".join(self._raw)
+        data = json.loads(raw) if raw.strip() else None
+
+        items = None
+        if isinstance(data, list):
+            items = data
+        elif isinstance(data, dict):
+            for key in self.keys:
+                if key in data:
+                    items = data[key]
+                    break
+        if items is None:
+            items = [data] if data else []
+
+        return json.dumps({self.name: items, "count": len(items)}, ensure_ascii=False).encode(
+            "utf-8"
+        )
+
+
+def normalize_list_body(raw, name, keys):
+    envelope = ListEnvelope(name, keys)
+    return envelope.feed(raw) + envelope.close()
+
+
+def start_chunked(handler, status_code=200, headers=None):
+    """
+    Start een gestreamde response. Met chunked transfer encoding als zowel de
+    handler (protocol_version) als de client HTTP/1.1 spreken; anders zonder
+    lengte en wordt de verbinding na afloop gesloten.
+    """
+    handler._chunked = (
+        handler.protocol_version == "HTTP/1.1" and handler.request_version == "HTTP/1.1"
+    )
+    handler.send_response(status_code)
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    if handler._chunked:
+        handler.send_header("Transfer-Encoding", "chunked")
+    else:
+        handler.send_header("Connection", "close")
+        handler.close_connection = True
+    handler.end_headers()
+
+
+def write_chunk(handler, data):
+    if not data:
+        return
+    if handler._chunked:
+        handler.wfile.write(b"%x\r\n" % len(data) + data + b"\r\n")
+    else:
+        handler.wfile.write(data)
+
+
+def end_chunked(handler):
+    if handler._chunked:
+        handler.wfile.write(b"0\r\n\r\n")
+    handler.wfile.flush()
+
+
+SSE_HEADERS = {
+    "Content-Type": "text/event-stream; charset=utf-8",
+    "Cache-Control": "no-store, max-age=0",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event, data):
+    """Eén server-sent event; data wordt als JSON op één regel verstuurd."""
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+def iter_sse(response):
+    """Leest server-sent events van een httpx stream; geeft (event, data) terug per event."""
+    event, data = None, []
+    for line in response.iter_lines():
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = None, []
+        elif line.startswith(":"):
+            continue
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip(" "))
+    if data:
+        yield event, "\n".join(data)
+
+
+NO_STORE_JSON_HEADERS = {
+    "Content-Type": "application/json; charset=utf-8",
+    "Cache-Control": "no-store, max-age=0",
+    "Pragma": "no-cache",
+}
+
+
+def stream_get(handler, env_key, url, headers, timeout=30.0, envelope=None):
+    """
+    GET naar upstream en de body chunk voor chunk doorsturen naar de browser.
+    Met 'envelope' (ListEnvelope) wordt de lijst onderweg genormaliseerd.
+    Upstream fouten (4xx/5xx) worden vóór het starten van de response als
+    httpx.HTTPStatusError opgegooid, zodat de handler ze als JSON kan melden.
+
+    Retries en de circuit breaker gelden tot de eerste byte (resilient_stream).
+    Niet gecoalesced zoals coalesced_get: dat zou de hele body moeten
+    bufferen om hem te delen, en juist dat voorkomt het streamen.
+    """
+    client = get_client(env_key)
+    with guard("upstream"), resilient_stream(client, env_key, url, headers=headers, timeout=timeout) as resp:
+        if resp.is_error:
+            resp.read()
+            resp.raise_for_status()
+
+        # Lengte is vooraf onbekend: comprimeren zodra de browser het aankan.
+        encoding = negotiate(handler.headers)
+        encoder = StreamEncoder(encoding) if encoding else None
+        response_headers = dict(NO_STORE_JSON_HEADERS)
+        if encoder:
+            response_headers.update({"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+
+        start_chunked(handler, 200, response_headers)
+        try:
+            for chunk in resp.iter_bytes():
+                data = envelope.feed(chunk) if envelope else chunk
+                write_chunk(handler, encoder.feed(data) if encoder else data)
+            if envelope:
+                data = envelope.close()
+                write_chunk(handler, encoder.feed(data) if encoder else data)
+            if encoder:
+                write_chunk(handler, encoder.close())
+            end_chunked(handler)
+        except Exception as exc:
+            # Headers zijn al verstuurd: afbreken i.p.v. een tweede response te schrijven.
+            handler.log_error("Upstream stream afgebroken: %s", exc)
+            handler.close_connection = True
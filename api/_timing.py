@@ -0,0 +1,257 @@
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlparse
+
+from _deadline import end_deadline, start_deadline
+from _metrics import observe
+
+# Instrumentatie per request, voor alle handlers via @instrument("naam"):
+# - fasen (auth, token, upstream, decode, send) worden gemeten en als
+#   Server-Timing header meegestuurd (plus "app" = de rest, en "total")
+# - per request één JSON logregel met status, bytes, upstream status en
+#   cache vlaggen (TIMING_LOG=0 zet dat uit)
+# - de totale duur gaat naar de rollende histogrammen in _metrics
+# Gedeelde code (auth, token, upstream client) meet via timed(); buiten een
+# request (CLI, achtergrondthreads) is dat een no-op.
+# Per request wordt ook de deadline gezet (_deadline).
+TIMING_LOG = (os.getenv("TIMING_LOG") or "1").lower() not in ("0", "false", "no")
+
+_current = contextvars.ContextVar("request_timer", default=None)
+# Fasen die in deze context lopen (per thread verschillend, zie bind()).
+_active = contextvars.ContextVar("timing_active", default=())
+
+
+class _Phase:
+    __slots__ = ("desc",)
+
+    def __init__(self):
+        self.desc = None
+
+
+class RequestTimer:
+    def __init__(self, endpoint, method, env):
+        self.endpoint = endpoint
+        self.method = method
+        self.env = env
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.descs = {}
+        self.fields = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, duration_ms, desc=None):
+        # Fasen uit parallelle workers tellen op (kan samen meer zijn dan total).
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + duration_ms
+            if desc:
+                self.descs[name] = desc
+
+    def set(self, **fields):
+        with self._lock:
+            self.fields.update(fields)
+
+    def count(self, name):
+        with self._lock:
+            self.fields[name] = self.fields.get(name, 0) + 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def phases_ms(self):
+        with self._lock:
+            return {name: round(value, 1) for name, value in self.phases.items()}
+
+    def server_timing(self):
+        total = self.elapsed_ms()
+        parts = []
+        for name, duration in self.phases.items():
+            part = f"{name};dur={duration:.1f}"
+            if name in self.descs:
+                part += f';desc="{self.descs[name]}"'
+            parts.append(part)
+        parts.append(f"app;dur={max(total - sum(self.phases.values()), 0.0):.1f}")
+        parts.append(f"total;dur={total:.1f}")
+        return ", ".join(parts)
+
+    def finish(self, status):
+        total = self.elapsed_ms()
+        observe(self.endpoint, self.env, total, status)
+        if TIMING_LOG:
+            line = {
+                "type": "request",
+                "endpoint": self.endpoint,
+                "method": self.method,
+                "env": self.env,
+                "status": status,
+                "durationMs": round(total, 1),
+                "phases": {name: round(value, 1) for name, value in self.phases.items()},
+            }
+            fields = dict(self.fields)
+            cache = dict(self.descs)
+            if "cache" in fields:
+                cache["response"] = fields.pop("cache")
+            line.update(fields)
+            if cache:
+                line["cache"] = cache
+            sys.stdout.write(json.dumps(line, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+
+
+def current_timer():
+    return _current.get()
+
+
+def bind(fn):
+    """
+    fn met de huidige request-context, voor ThreadPoolExecutor workers.
+    Niet gebruiken voor achtergrondthreads die langer leven dan het request.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+@contextmanager
+def timed(name):
+    """Meet een fase van het huidige request; phase.desc wordt de Server-Timing desc."""
+    timer = _current.get()
+    phase = _Phase()
+    if timer is None:
+        yield phase
+        return
+    token = _active.set(_active.get() + (name,))
+    started = time.perf_counter()
+    try:
+        yield phase
+    finally:
+        _active.reset(token)
+        timer.add(name, (time.perf_counter() - started) * 1000, phase.desc)
+
+
+def _env_of(path):
+    env = parse_qs(urlparse(path).query or "").get("env", ["production"])[0]
+    return "acceptance" if env == "acceptance" else "production"
+
+
+def _wrap_method(method, endpoint):
+    @functools.wraps(method)
+    def wrapper(self):
+        timer = RequestTimer(endpoint, self.command, _env_of(self.path))
+        self._timer = timer
+        self._timing_status = 200
+        token = _current.set(timer)
+        deadline_token = start_deadline(endpoint, timer)
+        try:
+            return method(self)
+        finally:
+            end_deadline(deadline_token)
+            _current.reset(token)
+            timer.finish(self._timing_status)
+
+    return wrapper
+
+
+def _wrap_send(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        timer = _current.get()
+        if timer is not None and "send" in _active.get():
+            # _send_json -> _send_body: één keer meten
+            return method(self, *args, **kwargs)
+        with timed("send"):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def instrument(endpoint):
+    """
+    Class decorator voor een handler: meet alle do_* methodes en voegt vlak
+    voor end_headers() de Server-Timing header toe.
+    """
+
+    def decorate(cls):
+        for name in ("do_GET", "do_POST", "do_PUT", "do_DELETE", "do_PATCH"):
+            if name in cls.__dict__:
+                setattr(cls, name, _wrap_method(cls.__dict__[name], endpoint))
+        for name in ("_send_json", "_send_body", "_send_cacheable"):
+            if name in cls.__dict__:
+                setattr(cls, name, _wrap_send(cls.__dict__[name]))
+
+        send_response = cls.send_response
+        send_header = cls.send_header
+        end_headers = cls.end_headers
+
+        def timed_send_response(self, code, message=None):
+            self._timing_status = code
+            send_response(self, code, message)
+
+        def timed_send_header(self, keyword, value):
+            timer = getattr(self, "_timer", None)
+            if timer is not None:
+                lowered = keyword.lower()
+                if lowered == "content-length":
+                    timer.set(bytesOut=int(value))
+                elif lowered == "x-cache":
+                    timer.set(cache=str(value))
+            send_header(self, keyword, value)
+
+        def timed_end_headers(self):
+            timer = getattr(self, "_timer", None)
+            if timer is not None:
+                send_header(self, "Server-Timing", timer.server_timing())
+            end_headers(self)
+
+        cls.send_response = timed_send_response
+        cls.send_header = timed_send_header
+        cls.end_headers = timed_end_headers
+        return cls
+
+    return decorate
+
+
+# ---- httpx hooks voor de gedeelde upstream clients ----
+# De starttijd staat op het request zelf (extensions, de transport negeert
+# onbekende keys), zodat een request dat nooit een response krijgt
+# (verbindingsfout, timeout, verliezer van een hedge) niets achterlaat.
+
+
+def _on_request(request):
+    if _current.get() is not None:
+        request.extensions["upstream_started"] = time.perf_counter()
+
+
+def _on_response(response):
+    started = response.request.extensions.get("upstream_started")
+    timer = _current.get()
+    if started is None or timer is None:
+        return
+    # Token-requests tellen al in de "token" fase. De hook komt na de
+    # response headers; het lezen van de body (ook bij streaming) valt in "app".
+    if "token" not in _active.get():
+        timer.add("upstream", (time.perf_counter() - started) * 1000, "ttfb")
+        timer.set(upstreamStatus=response.status_code)
+        timer.count("upstreamCalls")
+
+
+UPSTREAM_EVENT_HOOKS = {"request": [_on_request], "response": [_on_response]}
+
+
+async def _on_request_async(request):
+    _on_request(request)
+
+
+async def _on_response_async(response):
+    _on_response(response)
+
+
+ASYNC_UPSTREAM_EVENT_HOOKS = {"request": [_on_request_async], "response": [_on_response_async]}
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from _deadline import DeadlineExceeded, clip_timeout, current_deadline, guard, remaining
+from _timing import timed
+from _upstream import get_client
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - niet beschikbaar op Windows
+    fcntl = None
+
+# Eén token manager voor alle endpoints.
+# - Token wordt gedeeld tussen requests (per omgeving).
+# - Vóór expires_at wordt het token op de achtergrond ververst.
+# - Per omgeving draait maximaal één refresh tegelijk (single-flight).
+# - Optioneel: token delen met andere handlers in dezelfde container via
+#   een bestand (bijv. KINETIC_TOKEN_STORE_DIR=/tmp/kinetic-tokens).
+TOKEN_EXPIRY_MARGIN = 300
+TOKEN_REFRESH_AHEAD = float(os.getenv("KINETIC_TOKEN_REFRESH_AHEAD", "300"))
+TOKEN_STORE_DIR = os.getenv("KINETIC_TOKEN_STORE_DIR")
+
+_entries = {}
+_locks = {}
+_stats = {}
+_registry_lock = threading.Lock()
+
+
+def _entry(env_key):
+    entry = _entries.get(env_key)
+    if entry is None:
+        with _registry_lock:
+            entry = _entries.setdefault(
+                env_key, {"token": None, "expires_at": 0.0, "refresh_at": 0.0}
+            )
+            _locks.setdefault(env_key, threading.Lock())
+            _stats.setdefault(
+                env_key,
+                {
+                    "hits": 0,
+                    "misses": 0,
+                    "store_hits": 0,
+                    "refreshes": 0,
+                    "background_refreshes": 0,
+                    "errors": 0,
+                },
+            )
+    return entry
+
+
+def _count(env_key, name):
+    _stats[env_key][name] += 1
+
+
+def _is_valid(entry, now):
+    return bool(entry["token"]) and now < entry["expires_at"]
+
+
+def _store_path(config):
+    if not TOKEN_STORE_DIR:
+        return None
+    digest = hashlib.sha256(
+        f"{config['host']}|{config['client_id']}".encode("utf-8")
+    ).hexdigest()[:16]
+    return os.path.join(TOKEN_STORE_DIR, f"kinetic-token-{config['env']}-{digest}.json")
+
+
+def _load_store(config):
+    path = _store_path(config)
+    if not path:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not data.get("token") or time.time() >= float(data.get("expires_at") or 0):
+        return None
+    return {
+        "token": data["token"],
+        "expires_at": float(data["expires_at"]),
+        "refresh_at": float(data.get("refresh_at") or data["expires_at"]),
+    }
+
+
+def _save_store(config, entry):
+    path = _store_path(config)
+    if not path:
+        return
+    try:
+        os.makedirs(TOKEN_STORE_DIR, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=TOKEN_STORE_DIR, prefix=".token-")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "token": entry["token"],
+                    "expires_at": entry["expires_at"],
+                    "refresh_at": entry["refresh_at"],
+                },
+                fh,
+            )
+        os.replace(tmp_path, path)
+    except OSError:
+        # Store is een optimalisatie; een schrijffout mag een request niet breken.
+        pass
+
+
+@contextmanager
+def _store_lock(config):
+    """Bestandslock zodat handlers in dezelfde container niet tegelijk verversen."""
+    path = _store_path(config)
+    if not path or fcntl is None:
+        yield
+        return
+
+    try:
+        os.makedirs(TOKEN_STORE_DIR, mode=0o700, exist_ok=True)
+        fh = open(path + ".lock", "a")
+    except OSError:
+        yield
+        return
+
+    with fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _request_token(config):
+    if not config.get("client_id") or not config.get("client_secret"):
+        raise RuntimeError(f"KINETIC_CLIENT_ID/SECRET ontbreekt voor env={config['env']}")
+
+    client = get_client(config["env"])
+    # In een request: niet langer dan de deadline (background refresh: 30s).
+    with guard("token"):
+        resp = client.post(
+            f"{config['host'].rstrip('/')}/token",
+            params={
+                "client_id": config["client_id"],
+                "client_secret": config["client_secret"],
+            },
+            timeout=clip_timeout(30.0, "token"),
+        )
+    resp.raise_for_status()
+
+    data = resp.json()
+    token = data.get("access_token")
+    expires_in = int(data.get("expires_in", 3600))
+
+    if not token:
+        raise RuntimeError("Bearer token ontbreekt in token response")
+
+    now = time.time()
+    lifetime = max(expires_in - TOKEN_EXPIRY_MARGIN, 60)
+    return {
+        "token": token,
+        "expires_at": now + lifetime,
+        "refresh_at": now + max(lifetime - TOKEN_REFRESH_AHEAD, lifetime / 2),
+    }
+
+
+def _refresh_locked(config):
+    """Ververs het token; aanroeper houdt de lock van deze omgeving vast."""
+    env_key = config["env"]
+    entry = _entry(env_key)
+
+    # Een andere thread kan al ververst hebben terwijl we op de lock wachtten.
+    if entry["token"] and time.time() < entry["refresh_at"]:
+        return entry["token"]
+
+    with _store_lock(config):
+        stored = _load_store(config)
+        if stored and time.time() < stored["refresh_at"]:
+            entry.update(stored)
+            _count(env_key, "store_hits")
+            return entry["token"]
+
+        try:
+            fresh = _request_token(config)
+        except Exception:
+            _count(env_key, "errors")
+            raise
+        entry.update(fresh)
+        _count(env_key, "refreshes")
+        _save_store(config, entry)
+        return entry["token"]
+
+
+def _refresh_in_background(config):
+    env_key = config["env"]
+    lock = _locks[env_key]
+    if not lock.acquire(blocking=False):
+        # Er loopt al een refresh voor deze omgeving.
+        return
+
+    def run():
+        try:
+            _count(env_key, "background_refreshes")
+            _refresh_locked(config)
+        except Exception:
+            # Het huidige token is nog geldig; volgende request probeert opnieuw.
+            pass
+        finally:
+            lock.release()
+
+    threading.Thread(target=run, name=f"token-refresh-{env_key}", daemon=True).start()
+
+
+def get_bearer_token(config):
+    with timed("token") as phase:
+        return _get_bearer_token(config, phase)
+
+
+def _get_bearer_token(config, phase):
+    env_key = config["env"]
+    entry = _entry(env_key)
+    now = time.time()
+
+    if _is_valid(entry, now):
+        _count(env_key, "hits")
+        phase.desc = "hit"
+        if now >= entry["refresh_at"]:
+            _refresh_in_background(config)
+        return entry["token"]
+
+    stored = _load_store(config)
+    if stored:
+        entry.update(stored)
+        _count(env_key, "store_hits")
+        phase.desc = "store"
+        return entry["token"]
+
+    _count(env_key, "misses")
+    phase.desc = "refresh"
+    # Wachten op een lopende refresh telt ook mee voor de deadline.
+    lock = _locks[env_key]
+    left = remaining()
+    if not lock.acquire(timeout=-1 if left is None else max(left, 0.0)):
+        raise DeadlineExceeded(current_deadline(), "token")
+    try:
+        if _is_valid(entry, time.time()):
+            return entry["token"]
+        return _refresh_locked(config)
+    finally:
+        lock.release()
+
+
+def token_stats():
+    return {env_key: dict(stats) for env_key, stats in _stats.items()}
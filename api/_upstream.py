@@ -0,0 +1,173 @@
+import os
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from _deadline import DeadlineExceeded, current_deadline, guard, remaining
+from _resilience import resilience_stats, resilient_get
+from _runtime import httpx
+from _timing import ASYNC_UPSTREAM_EVENT_HOOKS, UPSTREAM_EVENT_HOOKS, timed
+
+# Gedeelde upstream client per omgeving (production / acceptance).
+# Module-level state blijft bewaard tussen warme invocations, dus de
+# TCP/TLS verbinding naar DIAS/Kinetic wordt hergebruikt (keep-alive).
+UPSTREAM_HTTP2 = (os.getenv("UPSTREAM_HTTP2") or "").lower() in ("1", "true", "yes")
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "20"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "10"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "60"))
+# Gelijktijdige identieke GETs delen één upstream request (zie coalesced_get).
+# De gestreamde volledige regellijst (_stream.stream_get) doet hier niet aan mee.
+UPSTREAM_COALESCE = (os.getenv("UPSTREAM_COALESCE") or "1").lower() not in ("0", "false", "no")
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+_coalesce_stats = {"requests": 0, "coalesced": 0}
+
+
+def _http2_enabled():
+    # HTTP/2 is optioneel: httpx heeft daarvoor het 'h2' pakket nodig.
+    if not UPSTREAM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _limits(max_connections=None):
+    max_connections = max_connections or UPSTREAM_MAX_CONNECTIONS
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(UPSTREAM_MAX_KEEPALIVE, max_connections),
+        keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+    )
+
+
+def _new_client():
+    return httpx.Client(
+        http2=_http2_enabled(), limits=_limits(), timeout=30.0, event_hooks=UPSTREAM_EVENT_HOOKS
+    )
+
+
+def new_async_client(max_connections=None):
+    # Een AsyncClient hoort bij één event loop; daarom per batch een nieuwe
+    # i.p.v. gedeeld zoals get_client().
+    return httpx.AsyncClient(
+        http2=_http2_enabled(),
+        limits=_limits(max_connections),
+        timeout=30.0,
+        event_hooks=ASYNC_UPSTREAM_EVENT_HOOKS,
+    )
+
+
+def get_client(env_key="production"):
+    client = _clients.get(env_key)
+    if client is not None and not client.is_closed:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(env_key)
+        if client is None or client.is_closed:
+            client = _new_client()
+            _clients[env_key] = client
+        return client
+
+
+def close_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def _coalesce_key(env_key, url, params, headers):
+    # Authorization hoort bij de omgeving (client credentials), niet bij de vraag.
+    return (
+        env_key,
+        url,
+        tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())),
+        tuple(
+            sorted((k.lower(), str(v)) for k, v in (headers or {}).items() if k.lower() != "authorization")
+        ),
+    )
+
+
+def _wait_seconds(timeout):
+    if isinstance(timeout, (int, float)):
+        return float(timeout)
+    parts = [timeout.connect, timeout.read, timeout.write, timeout.pool]
+    return sum(part for part in parts if part is not None) or None
+
+
+def coalesced_get(env_key, url, headers=None, params=None, timeout=30.0, hedge=None):
+    """
+    GET via de gedeelde client, met retries/circuit breaker (_resilience).
+    Gelijktijdige identieke GETs (omgeving, url, params en headers behalve
+    Authorization) wachten op één upstream request en krijgen allemaal
+    dezelfde (volledig gelezen) response, of dezelfde exceptie. Een
+    wachtende geeft het op na zijn eigen timeout of als het budget op is.
+    """
+    client = get_client(env_key)
+
+    def fetch():
+        with guard("upstream"):
+            return resilient_get(
+                client, env_key, url, headers=headers, params=params, timeout=timeout, hedge=hedge
+            )
+
+    if not UPSTREAM_COALESCE:
+        return fetch()
+
+    key = _coalesce_key(env_key, url, params, headers)
+    with _inflight_lock:
+        _coalesce_stats["requests"] += 1
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+        else:
+            _coalesce_stats["coalesced"] += 1
+
+    if not leader:
+        with timed("upstream") as phase:
+            phase.desc = "coalesced"
+            try:
+                wait_seconds = _wait_seconds(timeout)
+                left = remaining()
+                if left is not None:
+                    wait_seconds = max(0.0, min(wait_seconds or left, left))
+                return future.result(timeout=wait_seconds)
+            except DeadlineExceeded as exc:
+                # Vóór FutureTimeout: beide zijn een TimeoutError.
+                if exc.deadline is current_deadline():
+                    raise
+            except FutureTimeout:
+                deadline = current_deadline()
+                if deadline is not None and deadline.expired():
+                    raise DeadlineExceeded(deadline, "upstream")
+                raise httpx.TimeoutException(f"Timeout bij wachten op gedeeld upstream request: {url}")
+        # De leider liep tegen zijn eigen (kortere) deadline aan: zelf opnieuw.
+        return coalesced_get(env_key, url, headers=headers, params=params, timeout=timeout, hedge=hedge)
+
+    try:
+        response = fetch()
+    except BaseException as exc:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        future.set_exception(exc)
+        raise
+    with _inflight_lock:
+        _inflight.pop(key, None)
+    future.set_result(response)
+    return response
+
+
+def upstream_stats():
+    with _inflight_lock:
+        stats = dict(_coalesce_stats, inflight=len(_inflight))
+    stats.update(resilience_stats())
+    return stats
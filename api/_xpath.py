@@ -0,0 +1,434 @@
+import re
+
+# Parser voor het XPath (2.0) subset dat in acceptatieregels voorkomt.
+# Levert een AST (Node) met posities, zodat uitleg, simulatie en validatie
+# dezelfde boom gebruiken. Ondersteund:
+# - if (...) then ... else ...
+# - or / and, vergelijkingen (= != < <= > >= en eq ne lt le gt ge)
+# - + - * div idiv mod, unaire min, union (|)
+# - paden (/, //, @, ., .., *, predicaten [..]) en functie-aanroepen
+# - string literals ('..' en ".." met verdubbelde quotes) en getallen
+
+_TOKEN = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][\w.\-]*(?::[A-Za-z_][\w.\-]*)?)
+  | (?P<op>//|::|\.\.|!=|<=|>=|[/()\[\],=<>|+\-*@.$])
+    """,
+    re.VERBOSE,
+)
+
+COMPARISONS = {
+    "=": "=",
+    "!=": "!=",
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">=",
+    "eq": "=",
+    "ne": "!=",
+    "lt": "<",
+    "le": "<=",
+    "gt": ">",
+    "ge": ">=",
+}
+MULTIPLICATIVE = ("*", "div", "idiv", "mod")
+AXES = ("child", "descendant", "descendant-or-self", "self", "parent", "attribute", "ancestor")
+
+
+class XPathSyntaxError(ValueError):
+    def __init__(self, message, pos):
+        super().__init__(f"{message} (positie {pos + 1})")
+        self.message = message
+        self.pos = pos
+
+
+class Token:
+    __slots__ = ("kind", "value", "pos")
+
+    def __init__(self, kind, value, pos):
+        self.kind = kind
+        self.value = value
+        self.pos = pos
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.value!r}, {self.pos})"
+
+
+class Node:
+    """
+    AST knoop. kind is een van:
+    if, or, and, cmp, arith, neg, union, path, step, filter,
+    call, literal, number, var, seq
+    """
+
+    __slots__ = ("kind", "value", "children", "pos", "end")
+
+    def __init__(self, kind, value=None, children=(), pos=0, end=0):
+        self.kind = kind
+        self.value = value
+        self.children = list(children)
+        self.pos = pos
+        self.end = end
+
+    def __repr__(self):
+        if self.children:
+            return f"{self.kind}({self.value!r}, {self.children!r})"
+        return f"{self.kind}({self.value!r})"
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise XPathSyntaxError(f"Onverwacht teken {text[pos]!r}", pos)
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "string":
+            quote = value[0]
+            value = value[1:-1].replace(quote * 2, quote)
+        if kind != "ws":
+            tokens.append(Token(kind, value, pos))
+        pos = match.end()
+    tokens.append(Token("end", None, len(text)))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.i = 0
+
+    # ---- helpers ----
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.i + offset, len(self.tokens) - 1)]
+
+    def next(self):
+        token = self.tokens[self.i]
+        self.i += 1
+        return token
+
+    def at(self, value, kind=None):
+        token = self.peek()
+        return token.value == value and token.kind in ((kind,) if kind else ("op", "name"))
+
+    def expect(self, value):
+        token = self.peek()
+        if token.value != value or token.kind not in ("op", "name"):
+            found = "einde van de expressie" if token.kind == "end" else repr(token.value)
+            raise XPathSyntaxError(f"Verwacht {value!r} maar vond {found}", token.pos)
+        return self.next()
+
+    def _end(self):
+        # Positie direct na het laatst gelezen token
+        token = self.tokens[self.i - 1]
+        if token.kind == "string":
+            return _token_end(self.text, token)
+        return token.pos + len(str(token.value))
+
+    # ---- grammar ----
+
+    def parse(self):
+        node = self.expr()
+        token = self.peek()
+        if token.kind != "end":
+            raise XPathSyntaxError(f"Onverwacht {token.value!r}", token.pos)
+        return node
+
+    def expr(self):
+        start = self.peek().pos
+        items = [self.expr_single()]
+        while self.at(",", "op"):
+            self.next()
+            items.append(self.expr_single())
+        if len(items) == 1:
+            return items[0]
+        return Node("seq", None, items, start, self._end())
+
+    def expr_single(self):
+        token = self.peek()
+        if token.kind == "name" and token.value == "if" and self.peek(1).value == "(":
+            return self.if_expr()
+        return self.or_expr()
+
+    def if_expr(self):
+        start = self.next().pos
+        self.expect("(")
+        condition = self.expr()
+        self.expect(")")
+        self.expect("then")
+        then = self.expr_single()
+        self.expect("else")
+        otherwise = self.expr_single()
+        return Node("if", None, [condition, then, otherwise], start, self._end())
+
+    def _binary(self, kind, operators, operand):
+        start = self.peek().pos
+        left = operand()
+        while self.peek().kind == "name" and self.peek().value in operators:
+            self.next()
+            right = operand()
+            if left.kind == kind:
+                left.children.append(right)
+                left.end = right.end
+            else:
+                left = Node(kind, None, [left, right], start, right.end)
+        return left
+
+    def or_expr(self):
+        return self._binary("or", ("or",), self.and_expr)
+
+    def and_expr(self):
+        return self._binary("and", ("and",), self.comparison)
+
+    def comparison(self):
+        start = self.peek().pos
+        left = self.additive()
+        token = self.peek()
+        if token.value in COMPARISONS and token.kind in ("op", "name"):
+            self.next()
+            right = self.additive()
+            return Node("cmp", COMPARISONS[token.value], [left, right], start, right.end)
+        return left
+
+    def additive(self):
+        start = self.peek().pos
+        left = self.multiplicative()
+        while self.peek().kind == "op" and self.peek().value in ("+", "-"):
+            op = self.next().value
+            right = self.multiplicative()
+            left = Node("arith", op, [left, right], start, right.end)
+        return left
+
+    def multiplicative(self):
+        start = self.peek().pos
+        left = self.unary()
+        while self.peek().value in MULTIPLICATIVE and (
+            self.peek().kind == "name" or self.peek().value == "*"
+        ):
+            op = self.next().value
+            right = self.unary()
+            left = Node("arith", op, [left, right], start, right.end)
+        return left
+
+    def unary(self):
+        token = self.peek()
+        if token.kind == "op" and token.value in ("-", "+"):
+            self.next()
+            operand = self.unary()
+            if token.value == "+":
+                return operand
+            return Node("neg", None, [operand], token.pos, operand.end)
+        return self.union()
+
+    def union(self):
+        start = self.peek().pos
+        left = self.path()
+        while self.at("|", "op") or (self.peek().kind == "name" and self.peek().value == "union"):
+            self.next()
+            right = self.path()
+            if left.kind == "union":
+                left.children.append(right)
+                left.end = right.end
+            else:
+                left = Node("union", None, [left, right], start, right.end)
+        return left
+
+    def path(self):
+        token = self.peek()
+        start = token.pos
+        if token.kind == "op" and token.value in ("/", "//"):
+            self.next()
+            if token.value == "/" and not self._starts_step():
+                return Node("path", "/", [], start, self._end())
+            steps = self.relative_path(descendant_first=token.value == "//")
+            return Node("path", "/", steps, start, self._end())
+
+        steps = self.relative_path()
+        if len(steps) == 1 and steps[0].kind == "filter" and len(steps[0].children) == 1:
+            # Gewone primary expressie (literal, functie, haakjes) zonder pad
+            return steps[0].children[0]
+        return Node("path", None, steps, start, self._end())
+
+    def _starts_step(self):
+        token = self.peek()
+        if token.kind in ("name", "string", "number"):
+            return True
+        return token.kind == "op" and token.value in ("@", ".", "..", "*", "(", "$")
+
+    def relative_path(self, descendant_first=False):
+        steps = [self.step(descendant_first)]
+        while self.peek().kind == "op" and self.peek().value in ("/", "//"):
+            descendant = self.next().value == "//"
+            steps.append(self.step(descendant))
+        return steps
+
+    def step(self, descendant=False):
+        token = self.peek()
+        start = token.pos
+
+        if token.kind == "op" and token.value == ".":
+            self.next()
+            node = Node("step", {"axis": "self", "name": "*", "descendant": descendant}, [], start, self._end())
+        elif token.kind == "op" and token.value == "..":
+            self.next()
+            node = Node("step", {"axis": "parent", "name": "*", "descendant": descendant}, [], start, self._end())
+        elif (token.kind == "op" and token.value in ("@", "*")) or (
+            token.kind == "name" and self.peek(1).value != "("
+        ):
+            axis = "child"
+            if token.value == "@":
+                self.next()
+                axis = "attribute"
+            elif token.kind == "name" and self.peek(1).value == "::":
+                if token.value not in AXES:
+                    raise XPathSyntaxError(f"Onbekende as {token.value!r}", token.pos)
+                axis = self.next().value
+                self.next()
+            name_token = self.next()
+            if name_token.kind != "name" and name_token.value != "*":
+                raise XPathSyntaxError("Verwacht een elementnaam", name_token.pos)
+            node = Node(
+                "step",
+                {"axis": axis, "name": name_token.value, "descendant": descendant},
+                [],
+                start,
+                self._end(),
+            )
+        else:
+            primary = self.primary()
+            node = Node("filter", {"descendant": descendant}, [primary], start, primary.end)
+
+        while self.at("[", "op"):
+            self.next()
+            predicate = self.expr()
+            self.expect("]")
+            node.children.append(predicate)
+            node.end = self._end()
+        return node
+
+    def primary(self):
+        token = self.peek()
+        if token.kind == "string":
+            self.next()
+            return Node("literal", token.value, [], token.pos, self._end())
+        if token.kind == "number":
+            self.next()
+            raw = token.value
+            value = float(raw) if any(c in raw for c in ".eE") else int(raw)
+            return Node("number", value, [], token.pos, self._end())
+        if token.kind == "op" and token.value == "$":
+            self.next()
+            name = self.next()
+            if name.kind != "name":
+                raise XPathSyntaxError("Verwacht een variabelenaam", name.pos)
+            return Node("var", name.value, [], token.pos, self._end())
+        if token.kind == "op" and token.value == "(":
+            self.next()
+            if self.at(")", "op"):
+                self.next()
+                return Node("seq", None, [], token.pos, self._end())
+            inner = self.expr()
+            self.expect(")")
+            return inner
+        if token.kind == "name" and self.peek(1).value == "(":
+            self.next()
+            self.next()
+            args = []
+            if not self.at(")", "op"):
+                args.append(self.expr_single())
+                while self.at(",", "op"):
+                    self.next()
+                    args.append(self.expr_single())
+            self.expect(")")
+            return Node("call", token.value, args, token.pos, self._end())
+
+        found = "einde van de expressie" if token.kind == "end" else repr(token.value)
+        raise XPathSyntaxError(f"Onverwacht {found}", token.pos)
+
+
+def _token_end(text, token):
+    # Strings zijn ontdaan van quotes/escapes; zoek het sluitende quote-teken.
+    quote = text[token.pos]
+    pos = token.pos + 1
+    while pos < len(text):
+        if text[pos] == quote:
+            if text[pos + 1:pos + 2] == quote:
+                pos += 2
+                continue
+            return pos + 1
+        pos += 1
+    return len(text)
+
+
+_OPENING = {")": "(", "]": "[", "}": "{"}
+
+
+def check_lexical(text):
+    """
+    Alleen zekere lexicale fouten, los van welke constructies de parser kent:
+    niet afgesloten strings of commentaar (: ... :) en haakjes die niet
+    kloppen. Gooit een XPathSyntaxError.
+    """
+    stack = []
+    pos = 0
+    while pos < len(text):
+        char = text[pos]
+        if char in ("'", '"'):
+            end = pos + 1
+            while True:
+                end = text.find(char, end)
+                if end < 0:
+                    raise XPathSyntaxError("String wordt niet afgesloten", pos)
+                if text[end + 1:end + 2] != char:
+                    break
+                end += 2
+            pos = end + 1
+            continue
+        if text.startswith("(:", pos):
+            # Commentaar mag genest zijn; strings tellen daarin niet.
+            depth = 0
+            end = pos
+            while True:
+                if text.startswith("(:", end):
+                    depth += 1
+                    end += 2
+                elif text.startswith(":)", end):
+                    depth -= 1
+                    end += 2
+                    if not depth:
+                        break
+                elif end >= len(text):
+                    raise XPathSyntaxError("Commentaar wordt niet afgesloten", pos)
+                else:
+                    end += 1
+            pos = end
+            continue
+        if char in "([{":
+            stack.append((char, pos))
+        elif char in _OPENING:
+            if not stack or stack[-1][0] != _OPENING[char]:
+                raise XPathSyntaxError(f"{char!r} zonder bijbehorend {_OPENING[char]!r}", pos)
+            stack.pop()
+        pos += 1
+    if stack:
+        char, pos = stack[-1]
+        raise XPathSyntaxError(f"{char!r} wordt niet gesloten", pos)
+
+
+def parse(text):
+    """Parse een XPath expressie; geeft een Node of een XPathSyntaxError."""
+    if not isinstance(text, str) or not text.strip():
+        raise XPathSyntaxError("Lege expressie", 0)
+    return _Parser(text).parse()
+
+
+def local_name(name):
+    # 'fn:exists' -> 'exists'
+    return name.split(":", 1)[1] if ":" in name else name
@@ -0,0 +1,847 @@
+import functools
+import math
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from _xpath import XPathSyntaxError, local_name, parse
+
+# Evaluator voor het XPath subset uit _xpath.py, op xml.etree.ElementTree.
+# Een expressie wordt één keer gecompileerd naar geneste Python closures
+# (compile_expression, LRU cache per expressie-tekst); daarna kost een
+# evaluatie alleen nog het lopen over het document.
+#
+# Semantiek volgt XPath 2.0 waar dat voor acceptatieregels uitmaakt:
+# - algemene vergelijkingen (=, < ...) zijn existentieel over reeksen
+# - waarden uit het document zijn "untyped": tegen een getal numeriek,
+#   tegen tekst als tekst vergeleken
+# - effective boolean value voor and/or/not/if/predicaten
+XPATH_COMPILE_CACHE_SIZE = int(os.getenv("XPATH_COMPILE_CACHE_SIZE", "2048"))
+# fn:matches draait op Python's re (backtracking, niet te onderbreken): lange
+# patronen en geneste herhalingen zoals (a+)+ worden vooraf geweigerd.
+XPATH_REGEX_MAX_LENGTH = int(os.getenv("XPATH_REGEX_MAX_LENGTH", "256"))
+
+
+class XPathEvalError(ValueError):
+    def __init__(self, message, pos=None):
+        super().__init__(message if pos is None else f"{message} (positie {pos + 1})")
+        self.message = message
+        self.pos = pos
+
+
+class Untyped(str):
+    """Tekstwaarde van een element/attribuut (xs:untypedAtomic)."""
+
+    __slots__ = ()
+
+
+class Attr:
+    __slots__ = ("name", "value", "parent")
+
+    def __init__(self, name, value, parent):
+        self.name = name
+        self.value = value
+        self.parent = parent
+
+
+class _DocumentNode:
+    __slots__ = ()
+
+
+DOCUMENT = _DocumentNode()
+_NODE_TYPES = (ET.Element, Attr, _DocumentNode)
+
+
+class Document:
+    def __init__(self, root):
+        self.root = root
+        self._parents = None
+
+    def parent(self, element):
+        if self._parents is None:
+            self._parents = {child: parent for parent in self.root.iter() for child in parent}
+        return self._parents.get(element, DOCUMENT if element is self.root else None)
+
+
+class _Env:
+    __slots__ = ("document", "variables")
+
+    def __init__(self, document, variables):
+        self.document = document
+        self.variables = variables
+
+
+# ---- documenten ----
+
+
+def _scalar(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _fill(element, value):
+    if isinstance(value, dict):
+        for key, child in value.items():
+            key = str(key)
+            if key.startswith("@"):
+                element.set(key[1:], _scalar(child))
+            elif key == "#text":
+                element.text = _scalar(child)
+            else:
+                _append(element, key, child)
+    elif value is not None:
+        element.text = _scalar(value)
+
+
+def _append(parent, tag, value):
+    # Lijsten worden herhaalde elementen met dezelfde naam.
+    if isinstance(value, list):
+        for item in value:
+            _append(parent, tag, item)
+        return
+    _fill(ET.SubElement(parent, tag), value)
+
+
+def json_to_xml(data, root_tag="Document"):
+    """
+    JSON naar ElementTree: {"Polis": {"Merk": "BMW", "@versie": 2}} wordt
+    <Polis versie="2"><Merk>BMW</Merk></Polis>. Een object met meer dan één
+    sleutel (of een lijst) komt onder een <Document> root.
+    """
+    if isinstance(data, dict) and len(data) == 1:
+        tag, value = next(iter(data.items()))
+        if not isinstance(value, list) and not str(tag).startswith(("@", "#")):
+            root = ET.Element(str(tag))
+            _fill(root, value)
+            return root
+    root = ET.Element(root_tag)
+    if isinstance(data, list):
+        for item in data:
+            _append(root, "Item", item)
+    else:
+        _fill(root, data)
+    return root
+
+
+def load_document(value):
+    """XML-tekst of JSON (dict/list) naar een Document; ValueError bij ongeldige XML."""
+    if isinstance(value, str):
+        try:
+            return Document(ET.fromstring(value))
+        except ET.ParseError as exc:
+            raise ValueError(f"Ongeldige XML: {exc}") from None
+    if isinstance(value, (dict, list)):
+        return Document(json_to_xml(value))
+    raise ValueError("Document moet XML-tekst of een JSON object zijn")
+
+
+# ---- waarden ----
+
+
+def _is_node(item):
+    return isinstance(item, _NODE_TYPES)
+
+
+def _atomize_item(item, env):
+    if isinstance(item, ET.Element):
+        return Untyped("".join(item.itertext()))
+    if isinstance(item, Attr):
+        return Untyped(item.value)
+    if isinstance(item, _DocumentNode):
+        return Untyped("".join(env.document.root.itertext()))
+    return item
+
+
+def _atomize(seq, env):
+    return [_atomize_item(item, env) for item in seq]
+
+
+def _string(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "INF" if value > 0 else "-INF"
+        if value.is_integer():
+            return str(int(value))
+        return repr(value)
+    return str(value)
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return math.nan
+
+
+def _is_numeric(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def ebv(seq):
+    """Effective boolean value van een reeks."""
+    if not seq:
+        return False
+    first = seq[0]
+    if _is_node(first):
+        return True
+    if len(seq) > 1:
+        raise XPathEvalError("Geen effective boolean value voor een reeks van meerdere waarden")
+    if isinstance(first, bool):
+        return first
+    if _is_numeric(first):
+        return not (first == 0 or math.isnan(first))
+    return first != ""
+
+
+def _single(seq, env, what):
+    if len(seq) > 1:
+        raise XPathEvalError(f"{what} verwacht één waarde maar kreeg er {len(seq)}")
+    return _atomize_item(seq[0], env) if seq else None
+
+
+def _string_arg(seq, env, what):
+    value = _single(seq, env, what)
+    return "" if value is None else _string(value)
+
+
+_OPERATORS = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+def _boolean(value):
+    # Cast naar xs:boolean ('true'/'1' en 'false'/'0' bij tekst).
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip() in ("true", "1")
+    return ebv([value])
+
+
+def _compare_atoms(op, a, b):
+    if isinstance(a, bool) or isinstance(b, bool):
+        a, b = _boolean(a), _boolean(b)
+    elif _is_numeric(a) or _is_numeric(b):
+        a, b = _number(a), _number(b)
+        if math.isnan(a) or math.isnan(b):
+            return op == "!="
+    else:
+        a, b = str(a), str(b)
+    return _OPERATORS[op](a, b)
+
+
+def _dedupe(seq):
+    # Nodes uit meerdere contexten één keer (attributen op naam + element).
+    seen = set()
+    out = []
+    for item in seq:
+        key = (id(item.parent), item.name) if isinstance(item, Attr) else id(item)
+        if key not in seen:
+            seen.add(key)
+            out.append(item)
+    return out
+
+
+# ---- functies ----
+
+
+def _fn_substring(env, s, start, length=None):
+    text = _string_arg(s, env, "substring")
+    begin = _number(_single(start, env, "substring"))
+    size = math.inf if length is None else _number(_single(length, env, "substring"))
+    if math.isnan(begin) or math.isnan(size):
+        return [""]
+    first = max(math.floor(begin + 0.5), 1)
+    last = math.floor(begin + 0.5) + (math.floor(size + 0.5) if size != math.inf else len(text) + 1)
+    return [text[first - 1:max(last - 1, first - 1)]]
+
+
+def _fn_matches(env, s, pattern, flags=None):
+    options = 0
+    for flag in _string_arg(flags or [], env, "matches"):
+        options |= {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}.get(flag, 0)
+    regex = _regex(_string_arg(pattern, env, "matches"), options)
+    return [regex.search(_string_arg(s, env, "matches")) is not None]
+
+
+def _has_nested_quantifier(pattern):
+    # Een groep met een herhaling erin die zelf herhaald wordt: (a+)+, (\d*x)*, ((a)+){2,}
+    stack = [False]
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "(":
+            stack.append(False)
+        elif ch == ")" and len(stack) > 1:
+            repeated = stack.pop()
+            if repeated and pattern[i + 1:i + 2] in ("*", "+", "{"):
+                return True
+            stack[-1] = stack[-1] or repeated
+        elif ch in "*+{":
+            stack[-1] = True
+        i += 1
+    return False
+
+
+@functools.lru_cache(maxsize=256)
+def _regex(pattern, options):
+    if len(pattern) > XPATH_REGEX_MAX_LENGTH:
+        raise XPathEvalError(f"Reguliere expressie is te lang (max {XPATH_REGEX_MAX_LENGTH} tekens)")
+    if _has_nested_quantifier(pattern):
+        raise XPathEvalError("Geneste herhaling in een reguliere expressie wordt niet ondersteund")
+    try:
+        return re.compile(pattern, options)
+    except re.error as exc:
+        raise XPathEvalError(f"Ongeldige reguliere expressie: {exc}") from None
+
+
+def _aggregate(name, reducer):
+    def fn(env, seq):
+        values = [_number(value) for value in _atomize(seq, env)]
+        return [reducer(values)] if values else []
+
+    fn.__name__ = name
+    return fn
+
+
+def _fn_sum(env, seq):
+    return [float(sum(_number(value) for value in _atomize(seq, env)))]
+
+
+def _fn_substring_before(env, s, sep):
+    text, sep = _string_arg(s, env, "substring-before"), _string_arg(sep, env, "substring-before")
+    return [text.partition(sep)[0] if sep in text else ""]
+
+
+def _fn_substring_after(env, s, sep):
+    text, sep = _string_arg(s, env, "substring-after"), _string_arg(sep, env, "substring-after")
+    return [text.partition(sep)[2]]
+
+
+def _fn_round(env, seq):
+    value = _single(seq, env, "round")
+    if value is None:
+        return []
+    value = _number(value)
+    return [value if math.isnan(value) or math.isinf(value) else float(math.floor(value + 0.5))]
+
+
+def _numeric_fn(name, operation):
+    def fn(env, seq):
+        value = _single(seq, env, name)
+        if value is None:
+            return []
+        value = _number(value)
+        return [value if math.isnan(value) or math.isinf(value) else float(operation(value))]
+
+    return fn
+
+
+def _fn_distinct(env, seq):
+    out = []
+    for value in _atomize(seq, env):
+        if value not in out:
+            out.append(value)
+    return out
+
+
+def _fn_translate(env, s, source, target):
+    text = _string_arg(s, env, "translate")
+    source = _string_arg(source, env, "translate")
+    target = _string_arg(target, env, "translate")
+    table = {}
+    for i, char in enumerate(source):
+        table.setdefault(ord(char), target[i] if i < len(target) else None)
+    return [text.translate(table)]
+
+
+def _fn_name(env, seq):
+    if not seq:
+        return [""]
+    item = seq[0]
+    if isinstance(item, ET.Element):
+        return [item.tag.rsplit("}", 1)[-1]]
+    if isinstance(item, Attr):
+        return [item.name.rsplit("}", 1)[-1]]
+    return [""]
+
+
+# naam -> (min args, max args, functie(env, *arg_reeksen)); None = onbeperkt
+FUNCTIONS = {
+    "true": (0, 0, lambda env: [True]),
+    "false": (0, 0, lambda env: [False]),
+    "not": (1, 1, lambda env, seq: [not ebv(seq)]),
+    "boolean": (1, 1, lambda env, seq: [ebv(seq)]),
+    "exists": (1, 1, lambda env, seq: [bool(seq)]),
+    "empty": (1, 1, lambda env, seq: [not seq]),
+    "count": (1, 1, lambda env, seq: [len(seq)]),
+    "sum": (1, 1, _fn_sum),
+    "avg": (1, 1, _aggregate("avg", lambda values: sum(values) / len(values))),
+    "min": (1, 1, _aggregate("min", min)),
+    "max": (1, 1, _aggregate("max", max)),
+    "data": (1, 1, lambda env, seq: _atomize(seq, env)),
+    "string": (1, 1, lambda env, seq: [_string_arg(seq, env, "string")]),
+    "number": (1, 1, lambda env, seq: [_number(_single(seq, env, "number")) if seq else math.nan]),
+    "string-length": (1, 1, lambda env, seq: [len(_string_arg(seq, env, "string-length"))]),
+    "normalize-space": (
+        1,
+        1,
+        lambda env, seq: [" ".join(_string_arg(seq, env, "normalize-space").split())],
+    ),
+    "lower-case": (1, 1, lambda env, seq: [_string_arg(seq, env, "lower-case").lower()]),
+    "upper-case": (1, 1, lambda env, seq: [_string_arg(seq, env, "upper-case").upper()]),
+    "contains": (
+        2,
+        2,
+        lambda env, a, b: [_string_arg(b, env, "contains") in _string_arg(a, env, "contains")],
+    ),
+    "starts-with": (
+        2,
+        2,
+        lambda env, a, b: [
+            _string_arg(a, env, "starts-with").startswith(_string_arg(b, env, "starts-with"))
+        ],
+    ),
+    "ends-with": (
+        2,
+        2,
+        lambda env, a, b: [
+            _string_arg(a, env, "ends-with").endswith(_string_arg(b, env, "ends-with"))
+        ],
+    ),
+    "concat": (2, None, lambda env, *args: ["".join(_string_arg(a, env, "concat") for a in args)]),
+    "string-join": (
+        2,
+        2,
+        lambda env, seq, sep: [
+            _string_arg(sep, env, "string-join").join(_string(v) for v in _atomize(seq, env))
+        ],
+    ),
+    "substring": (2, 3, _fn_substring),
+    "substring-before": (2, 2, _fn_substring_before),
+    "substring-after": (2, 2, _fn_substring_after),
+    "translate": (3, 3, _fn_translate),
+    "matches": (2, 3, _fn_matches),
+    "round": (1, 1, _fn_round),
+    "floor": (1, 1, _numeric_fn("floor", math.floor)),
+    "ceiling": (1, 1, _numeric_fn("ceiling", math.ceil)),
+    "abs": (1, 1, _numeric_fn("abs", abs)),
+    "distinct-values": (1, 1, _fn_distinct),
+    "name": (1, 1, _fn_name),
+    "local-name": (1, 1, _fn_name),
+}
+# Zonder argument werken deze functies op het context-item: string() == string(.)
+CONTEXT_ITEM_FUNCTIONS = ("string", "number", "string-length", "normalize-space", "name", "local-name")
+
+
+# ---- compiler ----
+
+
+def _compile(node):
+    compiler = getattr(_Compiler, "_" + node.kind, None)
+    if compiler is None:
+        raise XPathEvalError(f"Niet ondersteund: {node.kind}", node.pos)
+    return compiler(node)
+
+
+def _matcher(name):
+    if name == "*":
+        return lambda tag: True
+    name = local_name(name)
+    suffix = "}" + name
+    return lambda tag: tag == name or tag.endswith(suffix)
+
+
+def _children(item):
+    if isinstance(item, ET.Element):
+        return list(item)
+    return []
+
+
+def _predicate_filter(predicates):
+    if not predicates:
+        return None
+
+    def apply(candidates, env):
+        for predicate in predicates:
+            size = len(candidates)
+            kept = []
+            for position, candidate in enumerate(candidates, start=1):
+                result = predicate(candidate, position, size, env)
+                if len(result) == 1 and _is_numeric(result[0]):
+                    if result[0] == position:
+                        kept.append(candidate)
+                elif ebv(result):
+                    kept.append(candidate)
+            candidates = kept
+        return candidates
+
+    return apply
+
+
+class _Compiler:
+    @staticmethod
+    def _literal(node):
+        value = [node.value]
+        return lambda item, pos, size, env: value
+
+    @staticmethod
+    def _number(node):
+        value = [node.value]
+        return lambda item, pos, size, env: value
+
+    @staticmethod
+    def _var(node):
+        name = node.value
+
+        def var(item, pos, size, env):
+            if name not in env.variables:
+                raise XPathEvalError(f"Onbekende variabele ${name}", node.pos)
+            value = env.variables[name]
+            return list(value) if isinstance(value, (list, tuple)) else [value]
+
+        return var
+
+    @staticmethod
+    def _seq(node):
+        parts = [_compile(child) for child in node.children]
+
+        def seq(item, pos, size, env):
+            out = []
+            for part in parts:
+                out.extend(part(item, pos, size, env))
+            return out
+
+        return seq
+
+    @staticmethod
+    def _union(node):
+        parts = [_compile(child) for child in node.children]
+
+        def union(item, pos, size, env):
+            out = []
+            for part in parts:
+                values = part(item, pos, size, env)
+                if any(not _is_node(value) for value in values):
+                    raise XPathEvalError("Union werkt alleen op nodes", node.pos)
+                out.extend(values)
+            return _dedupe(out)
+
+        return union
+
+    @staticmethod
+    def _if(node):
+        condition, then, otherwise = (_compile(child) for child in node.children)
+        return lambda item, pos, size, env: (
+            then if ebv(condition(item, pos, size, env)) else otherwise
+        )(item, pos, size, env)
+
+    @staticmethod
+    def _and(node):
+        parts = [_compile(child) for child in node.children]
+        true, false = [True], [False]
+
+        def and_(item, pos, size, env):
+            for part in parts:
+                if not ebv(part(item, pos, size, env)):
+                    return false
+            return true
+
+        return and_
+
+    @staticmethod
+    def _or(node):
+        parts = [_compile(child) for child in node.children]
+        true, false = [True], [False]
+
+        def or_(item, pos, size, env):
+            for part in parts:
+                if ebv(part(item, pos, size, env)):
+                    return true
+            return false
+
+        return or_
+
+    @staticmethod
+    def _cmp(node):
+        op = node.value
+        left, right = (_compile(child) for child in node.children)
+
+        def cmp(item, pos, size, env):
+            a = _atomize(left(item, pos, size, env), env)
+            if not a:
+                return [False]
+            b = _atomize(right(item, pos, size, env), env)
+            return [any(_compare_atoms(op, x, y) for x in a for y in b)]
+
+        return cmp
+
+    @staticmethod
+    def _neg(node):
+        operand = _compile(node.children[0])
+
+        def neg(item, pos, size, env):
+            value = _single(operand(item, pos, size, env), env, "-")
+            return [] if value is None else [-_number(value)]
+
+        return neg
+
+    @staticmethod
+    def _arith(node):
+        op = node.value
+        left, right = (_compile(child) for child in node.children)
+
+        def arith(item, pos, size, env):
+            a = _single(left(item, pos, size, env), env, op)
+            b = _single(right(item, pos, size, env), env, op)
+            if a is None or b is None:
+                return []
+            both_int = all(isinstance(v, int) and not isinstance(v, bool) for v in (a, b))
+            a, b = (a, b) if both_int else (_number(a), _number(b))
+            if op == "+":
+                return [a + b]
+            if op == "-":
+                return [a - b]
+            if op == "*":
+                return [a * b]
+            if op == "idiv":
+                if b == 0:
+                    raise XPathEvalError("Deling door nul", node.pos)
+                return [int(a / b)]
+            if op == "mod":
+                if b == 0:
+                    if both_int:
+                        raise XPathEvalError("Deling door nul", node.pos)
+                    return [math.nan]
+                return [math.fmod(a, b) if not both_int else int(math.fmod(a, b))]
+            # div
+            if b == 0:
+                return [math.nan if a == 0 or math.isnan(a) else math.copysign(math.inf, a)]
+            return [a / b]
+
+        return arith
+
+    @staticmethod
+    def _call(node):
+        name = local_name(node.value)
+        args = [_compile(child) for child in node.children]
+
+        # Context-functies
+        if name == "position" and not args:
+            return lambda item, pos, size, env: [pos]
+        if name == "last" and not args:
+            return lambda item, pos, size, env: [size]
+        if name == "text" and not args:
+            return lambda item, pos, size, env: (
+                [Untyped(item.text)] if isinstance(item, ET.Element) and item.text else []
+            )
+        if name == "node" and not args:
+            return lambda item, pos, size, env: _children(item)
+        if name in CONTEXT_ITEM_FUNCTIONS and not args:
+            args = [lambda item, pos, size, env: [item]]
+
+        if name not in FUNCTIONS:
+            raise XPathEvalError(f"Onbekende functie {node.value}()", node.pos)
+        minimum, maximum, function = FUNCTIONS[name]
+        if len(args) < minimum or (maximum is not None and len(args) > maximum):
+            raise XPathEvalError(f"Verkeerd aantal argumenten voor {node.value}()", node.pos)
+
+        def call(item, pos, size, env):
+            try:
+                return function(env, *(arg(item, pos, size, env) for arg in args))
+            except XPathEvalError as exc:
+                if exc.pos is None:
+                    raise XPathEvalError(exc.message, node.pos) from None
+                raise
+
+        return call
+
+    @staticmethod
+    def _filter(node):
+        primary = _compile(node.children[0])
+        predicates = _predicate_filter([_compile(child) for child in node.children[1:]])
+
+        def filter_(item, pos, size, env):
+            values = primary(item, pos, size, env)
+            return predicates(values, env) if predicates else values
+
+        return filter_
+
+    @staticmethod
+    def _path(node):
+        absolute = node.value == "/"
+        steps = [_compile_step(step) for step in node.children]
+
+        def path(item, pos, size, env):
+            if absolute:
+                current = [DOCUMENT]
+            else:
+                current = [item]
+            for index, step in enumerate(steps):
+                if index and any(not _is_node(value) for value in current):
+                    raise XPathEvalError("Pad-stap op een waarde in plaats van een node", node.pos)
+                current = step(current, pos, size, env)
+            return current
+
+        return path
+
+
+def _descendants_or_self(item, env):
+    if isinstance(item, _DocumentNode):
+        return [DOCUMENT] + list(env.document.root.iter())
+    if isinstance(item, ET.Element):
+        return list(item.iter())
+    return [item]
+
+
+def _compile_step(node):
+    if node.kind == "filter":
+        inner = _Compiler._filter(node)
+        descendant = node.value["descendant"]
+
+        def filter_step(current, pos, size, env):
+            contexts = current
+            if descendant:
+                contexts = _dedupe([d for item in current for d in _descendants_or_self(item, env)])
+            out = []
+            count = len(contexts)
+            for position, item in enumerate(contexts, start=1):
+                out.extend(inner(item, position, count, env))
+            return _dedupe(out) if all(_is_node(value) for value in out) else out
+
+        return filter_step
+
+    axis = node.value["axis"]
+    match = _matcher(node.value["name"])
+    descendant = node.value["descendant"]
+    predicates = _predicate_filter([_compile(child) for child in node.children])
+
+    def candidates(item, env):
+        if axis == "child":
+            if isinstance(item, _DocumentNode):
+                root = env.document.root
+                return [root] if match(root.tag) else []
+            return [child for child in _children(item) if match(child.tag)]
+        if axis == "attribute":
+            if not isinstance(item, ET.Element):
+                return []
+            return [Attr(name, value, item) for name, value in item.attrib.items() if match(name)]
+        if axis == "self":
+            if isinstance(item, ET.Element):
+                return [item] if match(item.tag) else []
+            return [item] if node.value["name"] == "*" else []
+        if axis in ("descendant", "descendant-or-self"):
+            nodes = _descendants_or_self(item, env)
+            if axis == "descendant":
+                nodes = nodes[1:]
+            return [n for n in nodes if isinstance(n, ET.Element) and match(n.tag)]
+        if axis == "parent":
+            parent = item.parent if isinstance(item, Attr) else (
+                env.document.parent(item) if isinstance(item, ET.Element) else None
+            )
+            if parent is None or (isinstance(parent, ET.Element) and not match(parent.tag)):
+                return []
+            return [parent]
+        if axis == "ancestor":
+            out = []
+            parent = item.parent if isinstance(item, Attr) else env.document.parent(item)
+            while isinstance(parent, ET.Element):
+                if match(parent.tag):
+                    out.append(parent)
+                parent = env.document.parent(parent)
+            return out
+        raise XPathEvalError(f"As {axis} wordt niet ondersteund", node.pos)
+
+    if descendant and axis == "child" and predicates is None:
+        # '//X' zonder predicaat: één keer door de boom (iter is in C).
+        def descendant_step(current, pos, size, env):
+            out = []
+            for item in current:
+                if isinstance(item, _DocumentNode):
+                    out.extend(e for e in env.document.root.iter() if match(e.tag))
+                elif isinstance(item, ET.Element):
+                    out.extend(e for e in item.iter() if e is not item and match(e.tag))
+            return _dedupe(out) if len(current) > 1 else out
+
+        return descendant_step
+
+    def step(current, pos, size, env):
+        contexts = current
+        if descendant:
+            contexts = _dedupe([d for item in current for d in _descendants_or_self(item, env)])
+        out = []
+        for item in contexts:
+            found = candidates(item, env)
+            out.extend(predicates(found, env) if predicates else found)
+        return _dedupe(out) if len(contexts) > 1 else out
+
+    return step
+
+
+class CompiledExpression:
+    __slots__ = ("expression", "_run")
+
+    def __init__(self, expression, run):
+        self.expression = expression
+        self._run = run
+
+    def evaluate(self, document, variables=None):
+        """Resultaatreeks van de expressie met het document als context."""
+        return self._run(DOCUMENT, 1, 1, _Env(document, variables or {}))
+
+    def test(self, document, variables=None):
+        """Effective boolean value: True = regel is voldaan."""
+        return ebv(self.evaluate(document, variables))
+
+
+@functools.lru_cache(maxsize=XPATH_COMPILE_CACHE_SIZE)
+def compile_expression(expression):
+    """
+    Gecompileerde expressie (gecachet per tekst). Geeft XPathSyntaxError
+    bij een parse-fout en XPathEvalError bij onbekende functies e.d.
+    """
+    try:
+        return CompiledExpression(expression, _compile(parse(expression)))
+    except RecursionError:
+        raise XPathSyntaxError("Expressie is te diep genest", 0) from None
+
+
+def compile_cache_info():
+    info = compile_expression.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+
+def to_json(seq, document):
+    # Resultaatreeks naar JSON-waarden (nodes als hun tekst).
+    env = _Env(document, {})
+    out = []
+    for item in seq:
+        item = _atomize_item(item, env)
+        if isinstance(item, Untyped):
+            item = str(item)
+        elif isinstance(item, float) and (math.isnan(item) or math.isinf(item)):
+            item = _string(item)
+        out.append(item)
+    return out
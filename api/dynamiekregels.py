@@ -1,207 +1,69 @@
 from http.server import BaseHTTPRequestHandler
-from datetime import datetime, timedelta
 from urllib.parse import parse_qs, urlparse
-import httpx
 import json
 import os
 import sys
-import uuid
 
 current_dir = os.path.dirname(__file__)
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 from _auth import is_authorized, send_unauthorized
-
-# Cache bearer token between requests to reduce token calls
-token_cache = {
-    "production": {"token": None, "expires_at": None},
-    "acceptance": {"token": None, "expires_at": None},
-}
-
-DEFAULT_KINETIC_HOST = os.getenv("KINETIC_HOST", "https://dcb.sleutelstadassuradeuren.nl")
-DEFAULT_CLIENT_ID = os.getenv("KINETIC_CLIENT_ID")
-DEFAULT_CLIENT_SECRET = os.getenv("KINETIC_CLIENT_SECRET")
-
-# Acceptance env vars: GEEN fallback naar production (veiligheid)
-ACCEPTANCE_KINETIC_HOST = os.getenv("KINETIC_HOST_ACCEPTANCE")
-ACCEPTANCE_CLIENT_ID = os.getenv("KINETIC_CLIENT_ID_ACCEPTANCE")
-ACCEPTANCE_CLIENT_SECRET = os.getenv("KINETIC_CLIENT_SECRET_ACCEPTANCE")
-
-# DIAS tenant/company headers (maak deze in Vercel aan!)
-DEFAULT_TENANT_CUSTOMER_ID = os.getenv("DIAS_TENANT_CUSTOMER_ID", "")
-DEFAULT_BEDRIJF_ID = os.getenv("DIAS_BEDRIJF_ID", "")
-
-# Acceptance env vars: GEEN fallback naar production (veiligheid)
-ACCEPTANCE_TENANT_CUSTOMER_ID = os.getenv("DIAS_TENANT_CUSTOMER_ID_ACCEPTANCE")
-ACCEPTANCE_BEDRIJF_ID = os.getenv("DIAS_BEDRIJF_ID_ACCEPTANCE")
-
-
-def get_env_config(env_key: str):
-    if env_key == "acceptance":
-        missing = []
-        if not ACCEPTANCE_KINETIC_HOST:
-            missing.append("KINETIC_HOST_ACCEPTANCE")
-        if not ACCEPTANCE_CLIENT_ID:
-            missing.append("KINETIC_CLIENT_ID_ACCEPTANCE")
-        if not ACCEPTANCE_CLIENT_SECRET:
-            missing.append("KINETIC_CLIENT_SECRET_ACCEPTANCE")
-        if not ACCEPTANCE_TENANT_CUSTOMER_ID:
-            missing.append("DIAS_TENANT_CUSTOMER_ID_ACCEPTANCE")
-        if not ACCEPTANCE_BEDRIJF_ID:
-            missing.append("DIAS_BEDRIJF_ID_ACCEPTANCE")
-        if missing:
-            raise RuntimeError("Acceptance env vars ontbreken: " + ", ".join(missing))
-
-        return {
-            "host": ACCEPTANCE_KINETIC_HOST,
-            "client_id": ACCEPTANCE_CLIENT_ID,
-            "client_secret": ACCEPTANCE_CLIENT_SECRET,
-            "tenant_customer_id": ACCEPTANCE_TENANT_CUSTOMER_ID,
-            "bedrijf_id": ACCEPTANCE_BEDRIJF_ID,
-        }
-    return {
-        "host": DEFAULT_KINETIC_HOST,
-        "client_id": DEFAULT_CLIENT_ID,
-        "client_secret": DEFAULT_CLIENT_SECRET,
-        "tenant_customer_id": DEFAULT_TENANT_CUSTOMER_ID,
-        "bedrijf_id": DEFAULT_BEDRIJF_ID,
-    }
-
-
-def get_bearer_token(env_key: str = "production") -> str:
-    cache = token_cache.get(env_key, token_cache["production"])
-    if cache["token"] and cache["expires_at"] and datetime.now() < cache["expires_at"]:
-        return cache["token"]
-
-    config = get_env_config(env_key)
-    if not config["client_id"] or not config["client_secret"]:
-        raise RuntimeError(f"KINETIC_CLIENT_ID/SECRET ontbreekt voor env={env_key}")
-
-    with httpx.Client() as client:
-        resp = client.post(
-            f"{config['host'].rstrip('/')}/token",
-            params={
-                "client_id": config["client_id"],
-                "client_secret": config["client_secret"],
-            },
-            timeout=30.0,
-        )
-        resp.raise_for_status()
-
-        data = resp.json()
-        token = data.get("access_token")
-        expires_in = int(data.get("expires_in", 3600))
-
-        if not token:
-            raise RuntimeError("Bearer token ontbreekt in token response")
-
-        cache["token"] = token
-        cache["expires_at"] = datetime.now() + timedelta(seconds=max(expires_in - 300, 60))
-        return token
-
-
-def _dias_headers(config: dict, token: str) -> dict:
-    if not config.get("tenant_customer_id") or not config.get("bedrijf_id"):
-        raise RuntimeError(
-            "DIAS_TENANT_CUSTOMER_ID / DIAS_BEDRIJF_ID ontbreekt (zet env vars in Vercel)"
-        )
-    return {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-        "Tenant-CustomerId": str(config["tenant_customer_id"]),
-        "BedrijfId": str(config["bedrijf_id"]),
-    }
-
-
-# ====== UPSTREAM PATHS (pas dit aan als jouw backend andere routes heeft) ======
-UPSTREAM_LIST_PATH = "/beheer/api/v1/administratie/assurantie/regels/dynamiekregels"
-UPSTREAM_CREATE_PATH = "/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/invoeren"
-UPSTREAM_UPDATE_PATH = "/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/wijzigen"
-# ============================================================================
-
-
-def fetch_rules(config: dict, token: str):
-    with httpx.Client() as client:
-        resp = client.get(
-            f"{config['host'].rstrip('/')}{UPSTREAM_LIST_PATH}",
-            headers=_dias_headers(config, token),
-            timeout=30.0,
-        )
-        resp.raise_for_status()
-
-        data = resp.json()
-        if isinstance(data, list):
-            rules = data
-        elif isinstance(data, dict) and "data" in data:
-            rules = data["data"]
-        elif isinstance(data, dict) and "rules" in data:
-            rules = data["rules"]
-        else:
-            rules = [data] if data else []
-
-        return {"rules": rules, "count": len(rules)}
-
-
-def fetch_rule_detail(config: dict, token: str, regel_id: str):
-    with httpx.Client() as client:
-        resp = client.get(
-            f"{config['host'].rstrip('/')}{UPSTREAM_LIST_PATH}/{regel_id}",
-            headers=_dias_headers(config, token),
-            timeout=30.0,
-        )
-        resp.raise_for_status()
-        return resp.json()
-
-
-def delete_rule(config: dict, token: str, regel_id: str):
-    with httpx.Client() as client:
-        resp = client.delete(
-            f"{config['host'].rstrip('/')}{UPSTREAM_LIST_PATH}/{regel_id}",
-            headers=_dias_headers(config, token),
-            timeout=30.0,
-        )
-        resp.raise_for_status()
-        return resp.json() if resp.content else {"status": "deleted"}
-
-
-def create_rule(config: dict, token: str, payload: dict):
-    with httpx.Client() as client:
-        resp = client.put(
-            f"{config['host'].rstrip('/')}{UPSTREAM_CREATE_PATH}",
-            headers=_dias_headers(config, token),
-            json=payload,
-            timeout=30.0,
-        )
-        resp.raise_for_status()
-        return resp.json() if resp.content else {"status": "created"}
-
-
-def update_rule(config: dict, token: str, payload: dict):
-    with httpx.Client() as client:
-        resp = client.put(
-            f"{config['host'].rstrip('/')}{UPSTREAM_UPDATE_PATH}",
-            headers=_dias_headers(config, token),
-            json=payload,
-            timeout=30.0,
-        )
-        resp.raise_for_status()
-        return resp.json() if resp.content else {"status": "updated"}
-
-
+from _compress import encode_body
+from _deadline import DeadlineExceeded
+from _etag import etag_for, send_cacheable
+from _ruleindex import index_rule_deleted, index_rule_saved
+from _rules import (
+    build_rule_payload,
+    delete_rule,
+    dias_headers,
+    fetch_rules,
+    get_env_config,
+    rule_detail_url,
+    rules_url,
+    save_rule,
+)
+from _ruletable import get_rule_table, invalidate_rule_table, parse_list_query
+from _rulevalidate import RuleValidationError
+from _runtime import httpx
+from _stream import ListEnvelope, stream_get
+from _timing import instrument
+from _token import get_bearer_token
+from _upstream import coalesced_get
+
+RULE_KIND = "dynamiek"
+
+# Server-side zoeken/sorteren/pagineren (zelfde velden als de tabel in de UI)
+RULE_SEARCH_FIELDS = ("regelId", "omschrijving")
+RULE_SORT_FIELDS = ("regelId", "externNummer", "omschrijving")
+
+
+@instrument("dynamiekregels")
 class handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 nodig voor chunked streaming van grote lijsten
+    protocol_version = "HTTP/1.1"
+
     def _send_json(self, payload, status_code: int = 200):
         body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        body, encoding_headers = encode_body(self, body)
         self.send_response(status_code)
 
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Cache-Control", "no-store, max-age=0")
         self.send_header("Pragma", "no-cache")
+        for name, value in encoding_headers.items():
+            self.send_header(name, value)
 
         self.send_header("Content-Length", str(len(body)))
         self.end_headers()
         self.wfile.write(body)
 
+    def _send_cacheable(self, body, env_key):
+        # Leesresultaat: ETag + 304 als de browser deze versie al heeft
+        send_cacheable(
+            self, body, etag_for(body, env_key), {"Content-Type": "application/json; charset=utf-8"}
+        )
+
     def do_OPTIONS(self):
         self.send_response(204)
         self.send_header("Cache-Control", "no-store, max-age=0")
@@ -231,13 +93,52 @@ class handler(BaseHTTPRequestHandler):
 
             env_key = self._env_key()
             config = get_env_config(env_key)
-            token = get_bearer_token(env_key)
+            token = get_bearer_token(config)
+
+            query_params = parse_qs(urlparse(self.path).query or "")
+            try:
+                list_query = parse_list_query(query_params)
+            except ValueError as exc:
+                self._send_json({"error": str(exc)}, status_code=400)
+                return
 
             regel_id = self._regel_id()
-            data = fetch_rule_detail(config, token, regel_id) if regel_id else fetch_rules(config, token)
+            if list_query is not None and not regel_id:
+                table = get_rule_table(
+                    RULE_KIND,
+                    env_key,
+                    lambda: fetch_rules(config, token, RULE_KIND)["rules"],
+                    RULE_SEARCH_FIELDS,
+                    RULE_SORT_FIELDS,
+                    refresh=query_params.get("refresh", ["0"])[0] in ("1", "true"),
+                )
+                body = json.dumps(table.query(**list_query), ensure_ascii=False).encode("utf-8")
+                self._send_cacheable(body, env_key)
+                return
 
-            self._send_json(data, status_code=200)
+            if regel_id:
+                # Detail is klein: bufferen zodat er een ETag op kan.
+                resp = coalesced_get(
+                    config["env"],
+                    rule_detail_url(config, RULE_KIND, regel_id),
+                    headers=dias_headers(config, token),
+                    timeout=30.0,
+                )
+                resp.raise_for_status()
+                self._send_cacheable(resp.content, env_key)
+                return
 
+            # Volledige lijst doorstromen (geen ETag: de body is pas aan het eind bekend).
+            stream_get(
+                self,
+                config["env"],
+                rules_url(config, RULE_KIND),
+                headers=dias_headers(config, token),
+                envelope=ListEnvelope("rules", ("data", "rules")),
+            )
+
+        except DeadlineExceeded as exc:
+            self._send_json(exc.payload(), status_code=504)
         except httpx.HTTPStatusError as exc:
             self._send_json(
                 {
@@ -258,16 +159,20 @@ class handler(BaseHTTPRequestHandler):
 
             env_key = self._env_key()
             config = get_env_config(env_key)
-            token = get_bearer_token(env_key)
+            token = get_bearer_token(config)
 
             regel_id = self._regel_id()
             if not regel_id:
                 self._send_json({"error": "regelId is required"}, status_code=400)
                 return
 
-            data = delete_rule(config, token, regel_id)
+            data = delete_rule(config, token, RULE_KIND, regel_id)
+            invalidate_rule_table(RULE_KIND, env_key)
+            index_rule_deleted(RULE_KIND, env_key, regel_id)
             self._send_json(data, status_code=200)
 
+        except DeadlineExceeded as exc:
+            self._send_json(exc.payload(), status_code=504)
         except httpx.HTTPStatusError as exc:
             self._send_json(
                 {
@@ -287,42 +192,31 @@ class handler(BaseHTTPRequestHandler):
                 return
 
             env_key = self._env_key()
-            config = get_env_config(env_key)
-            token = get_bearer_token(env_key)
 
             content_length = int(self.headers.get("Content-Length", 0))
             raw_body = self.rfile.read(content_length).decode("utf-8") if content_length else ""
             body = json.loads(raw_body) if raw_body else {}
 
-            # Payload contract (DIAS):
-            # - Invoeren (create): NO RegelId in payload
-            # - Wijzigen (update): RegelId aanwezig en > 0
-            # Bron/Doel velden mogen leeg zijn.
-            resource_id = body.get("ResourceId") or str(uuid.uuid4())
-            body["ResourceId"] = resource_id
-
-            regel_id_raw = body.get("RegelId")
-            is_update = False
             try:
-                if regel_id_raw is not None and str(regel_id_raw).strip() != "":
-                    is_update = int(regel_id_raw) > 0
-            except Exception:
-                # If it's not numeric, treat as update intent when provided
-                is_update = True
-
-            if is_update:
-                if body.get("RegelId") is None:
-                    self._send_json({"error": "RegelId is required for update"}, status_code=400)
-                    return
-                data = update_rule(config, token, body)
-            else:
-                # Ensure RegelId is not sent on create
-                if "RegelId" in body:
-                    body.pop("RegelId", None)
-                data = create_rule(config, token, body)
+                action, payload = build_rule_payload(RULE_KIND, body)
+            except RuleValidationError as exc:
+                self._send_json({"error": str(exc), "errors": exc.errors}, status_code=400)
+                return
+            except ValueError as exc:
+                self._send_json({"error": str(exc)}, status_code=400)
+                return
+
+            config = get_env_config(env_key)
+            token = get_bearer_token(config)
+
+            data = save_rule(config, token, RULE_KIND, action, payload)
 
+            invalidate_rule_table(RULE_KIND, env_key)
+            index_rule_saved(RULE_KIND, env_key, payload, data)
             self._send_json(data, status_code=200)
 
+        except DeadlineExceeded as exc:
+            self._send_json(exc.payload(), status_code=504)
         except httpx.HTTPStatusError as exc:
             self._send_json(
                 {
@@ -0,0 +1,236 @@
+from http.server import BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+import json
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from _auth import is_authorized, send_unauthorized
+from _deadline import DeadlineExceeded, remaining
+from _envdiff import diff_records
+from _products import fetch_product_detail, fetch_products, product_id_of
+from _products import get_env_config as get_product_env_config
+from _ruleindex import fetch_rule_records, merge_rule_record
+from _rules import RULE_KINDS, get_env_config
+from _ruletable import flatten_rules
+from _runtime import httpx
+from _timing import bind, instrument
+from _token import get_bearer_token
+
+ENVS = ("production", "acceptance")
+# Productdefinities (detail) van producten die in beide omgevingen staan:
+# max aantal gelijktijdige requests (over beide omgevingen samen), max aantal
+# producten per request, en de minimale resterende tijd om nog een detail op
+# te halen. Wat daarbuiten valt wordt op het lijst-item vergeleken en als
+# overgeslagen gemeld.
+ENV_DIFF_PRODUCT_WORKERS = int(os.getenv("ENV_DIFF_PRODUCT_WORKERS", "6"))
+ENV_DIFF_MAX_PRODUCT_DETAILS = int(os.getenv("ENV_DIFF_MAX_PRODUCT_DETAILS", "100"))
+ENV_DIFF_DETAIL_MIN_SECONDS = float(os.getenv("ENV_DIFF_DETAIL_MIN_SECONDS", "2"))
+
+_SKIPPED = object()
+
+
+def _upstream_error(exc):
+    if isinstance(exc, DeadlineExceeded):
+        return {"status_code": 504, "error": str(exc)}
+    if isinstance(exc, httpx.HTTPStatusError):
+        return {"status_code": exc.response.status_code, "error": exc.response.text or "Upstream request failed"}
+    return {"status_code": 502, "error": str(exc)}
+
+
+def load_rules(env_key, kind):
+    config = get_env_config(env_key)
+    token = get_bearer_token(config)
+    records, errors = fetch_rule_records(config, token, kind)
+    return [merge_rule_record(item, detail) for item, detail in records], errors
+
+
+def load_products(env_key):
+    config = get_product_env_config(env_key)
+    token = get_bearer_token(config)
+    return flatten_rules(fetch_products(config, token)["products"]), []
+
+
+def _product_identity(item):
+    product_id = product_id_of(item)
+    return f"product:{product_id}" if product_id is not None else "omschrijving:" + str(item.get("Omschrijving") or "")
+
+
+def _product_summary(item):
+    return {"productId": product_id_of(item), "omschrijving": item.get("Omschrijving") or item.get("omschrijving") or ""}
+
+
+def _time_short():
+    left = remaining()
+    return left is not None and left < ENV_DIFF_DETAIL_MIN_SECONDS
+
+
+def load_product_details(loaded, base_env, target_env):
+    """
+    Vervangt voor producten die in beide omgevingen staan het lijst-item door
+    de volledige productdefinitie, zodat ook wijzigingen binnen een definitie
+    als changed gemeld worden. Lukt het detail aan één kant niet, dan blijft
+    voor dat product aan beide kanten het lijst-item staan en komt er een
+    fout bij. Producten boven ENV_DIFF_MAX_PRODUCT_DETAILS, of waarvoor de
+    tijd te kort wordt, houden ook het lijst-item en worden als overgeslagen
+    gemeld. Geeft (loaded, errors, skipped).
+    """
+    envs = (base_env, target_env)
+    by_env = {env_key: {_product_identity(item): item for item in loaded[env_key]} for env_key in envs}
+    common = [key for key in by_env[base_env] if key.startswith("product:") and key in by_env[target_env]]
+    if not common:
+        return loaded, [], []
+    skipped = common[ENV_DIFF_MAX_PRODUCT_DETAILS:]
+    common = common[:ENV_DIFF_MAX_PRODUCT_DETAILS]
+    if _time_short():
+        return loaded, [], [_product_summary(by_env[base_env][key]) for key in common + skipped]
+
+    configs = {env_key: get_product_env_config(env_key) for env_key in envs}
+    tokens = {env_key: get_bearer_token(configs[env_key]) for env_key in envs}
+
+    def fetch(job):
+        env_key, key = job
+        product_id = product_id_of(by_env[env_key][key])
+        if _time_short():
+            return _SKIPPED, None
+        try:
+            return fetch_product_detail(configs[env_key], tokens[env_key], product_id), None
+        except Exception as exc:
+            return None, dict(_upstream_error(exc), kind="products", env=env_key, productId=product_id)
+
+    jobs = [(env_key, key) for key in common for env_key in envs]
+    with ThreadPoolExecutor(max_workers=max(1, ENV_DIFF_PRODUCT_WORKERS)) as pool:
+        results = dict(zip(jobs, pool.map(bind(fetch), jobs)))
+
+    errors = []
+    details = {env_key: {} for env_key in envs}
+    for key in common:
+        pair = [results[(env_key, key)] for env_key in envs]
+        failed = [error for _, error in pair if error is not None]
+        if failed:
+            errors.extend(failed)
+            continue
+        if any(detail is _SKIPPED for detail, _ in pair):
+            skipped.append(key)
+            continue
+        for env_key, (detail, _) in zip(envs, pair):
+            # Lijst-velden blijven staan: ProductId bepaalt de identiteit.
+            item = by_env[env_key][key]
+            details[env_key][key] = dict(item, **detail) if isinstance(detail, dict) else item
+
+    merged = {
+        env_key: [details[env_key].get(_product_identity(item), item) for item in loaded[env_key]]
+        for env_key in envs
+    }
+    return merged, errors, [_product_summary(by_env[base_env][key]) for key in skipped]
+
+
+def compare_environments(base_env, target_env, kinds, include_products):
+    """
+    Haalt alle gevraagde sets van beide omgevingen tegelijk op en vergelijkt
+    ze per soort. Een mislukte set geeft een fout voor die soort; de andere
+    soorten worden gewoon vergeleken.
+    """
+    sets = [(kind, load_rules, (kind,)) for kind in kinds]
+    if include_products:
+        sets.append(("products", load_products, ()))
+
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=len(sets) * 2) as pool:
+        for name, loader, args in sets:
+            for env_key in (base_env, target_env):
+                jobs[(name, env_key)] = pool.submit(bind(loader), env_key, *args)
+
+    result = {"errors": []}
+    for name, _, _ in sets:
+        loaded = {}
+        for env_key in (base_env, target_env):
+            try:
+                records, errors = jobs[(name, env_key)].result()
+                loaded[env_key] = records
+                result["errors"].extend(dict(error, env=env_key) for error in errors)
+            except Exception as exc:
+                result["errors"].append(dict(_upstream_error(exc), kind=name, env=env_key))
+        if len(loaded) != 2:
+            result[name] = None
+            continue
+        if name == "products":
+            loaded, errors, skipped = load_product_details(loaded, base_env, target_env)
+            result["errors"].extend(errors)
+            result["productDetailsSkipped"] = skipped
+            result[name] = diff_records(
+                loaded[base_env], loaded[target_env], _product_identity, _product_summary
+            )
+        else:
+            result[name] = diff_records(loaded[base_env], loaded[target_env])
+    return result
+
+
+@instrument("env-diff")
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status_code: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.send_header("Pragma", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.end_headers()
+
+    def do_GET(self):
+        """
+        Verschil tussen production en acceptance (bijv. vóór een promotie).
+
+        base:     production | acceptance (default production)
+        kinds:    acceptance,dynamiek (default beide)
+        products: 1 om ook de productdefinities te vergelijken (lijst, en de
+                  volledige definitie van producten die in beide staan)
+
+        Per soort: added (alleen in de andere omgeving), removed (alleen in
+        base), changed (zelfde ExternNummer/Omschrijving, andere inhoud, met
+        veld-diff) en het aantal ongewijzigde regels. productDetailsSkipped:
+        producten die alleen op het lijst-item vergeleken zijn (limiet of tijd).
+        """
+        try:
+            if not is_authorized(self.headers):
+                send_unauthorized(self)
+                return
+
+            query_params = parse_qs(urlparse(self.path).query or "")
+            base_env = "acceptance" if query_params.get("base", ["production"])[0] == "acceptance" else "production"
+            target_env = ENVS[1] if base_env == ENVS[0] else ENVS[0]
+
+            kinds_param = query_params.get("kinds", [",".join(RULE_KINDS)])[0]
+            kinds = [kind.strip() for kind in kinds_param.split(",") if kind.strip()]
+            unknown = [kind for kind in kinds if kind not in RULE_KINDS]
+            if unknown or not kinds:
+                self._send_json({"error": f"kinds must be one of {', '.join(RULE_KINDS)}"}, status_code=400)
+                return
+            include_products = query_params.get("products", ["0"])[0] in ("1", "true")
+
+            started = time.perf_counter()
+            result = compare_environments(base_env, target_env, kinds, include_products)
+            result.update(
+                {
+                    "base": base_env,
+                    "target": target_env,
+                    "tookMs": round((time.perf_counter() - started) * 1000, 1),
+                }
+            )
+            self._send_json(result, status_code=200)
+
+        except DeadlineExceeded as exc:
+            self._send_json(exc.payload(), status_code=504)
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
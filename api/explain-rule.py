@@ -1,14 +1,21 @@
 from http.server import BaseHTTPRequestHandler
-import httpx
 import json
 import os
 import sys
+import threading
+import time
 
 current_dir = os.path.dirname(__file__)
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 from _auth import is_authorized, send_unauthorized
+from _deadline import DeadlineExceeded, clip_timeout, guard, remaining
+from _explaincache import explain_cache
+from _explainer import explain_expression
+from _runtime import httpx
+from _stream import SSE_HEADERS, end_chunked, iter_sse, sse_event, start_chunked, write_chunk
+from _timing import instrument, timed
 
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -16,6 +23,21 @@ OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5.2")
 OPENAI_MAX_OUTPUT_TOKENS = int(os.getenv("OPENAI_MAX_OUTPUT_TOKENS", "350"))
 
+# Lokale uitleg (zonder LLM) voor expressies die de parser begrijpt; EXPLAIN_LOCAL=0 zet dit uit
+EXPLAIN_LOCAL = (os.getenv("EXPLAIN_LOCAL") or "1").lower() not in ("0", "false", "no")
+
+# Streaming: max stilte tussen twee events, en een totale grens onder maxDuration (30s)
+OPENAI_STREAM_READ_TIMEOUT = float(os.getenv("OPENAI_STREAM_READ_TIMEOUT", "8"))
+OPENAI_STREAM_MAX_SECONDS = float(os.getenv("OPENAI_STREAM_MAX_SECONDS", "25"))
+
+# Gedeelde client naar OpenAI (keep-alive tussen warme invocations), los van
+# de DIAS clients in _upstream: geen upstream-hooks, retries of breaker.
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+# Verhoog bij elke wijziging van build_prompt; oude uitleg in de cache telt dan niet meer.
+PROMPT_VERSION = "1"
+
 
 def build_prompt(expression):
     return (
@@ -29,34 +51,198 @@ def build_prompt(expression):
     )
 
 
+def get_llm_client():
+    global _llm_client
+    client = _llm_client
+    if client is not None and not client.is_closed:
+        return client
+    with _llm_client_lock:
+        if _llm_client is None or _llm_client.is_closed:
+            _llm_client = httpx.Client(timeout=30.0)
+        return _llm_client
+
+
+def extract_output_text(data):
+    for item in data.get("output", []):
+        if item.get("type") == "message":
+            for part in item.get("content", []):
+                if part.get("type") == "output_text" and part.get("text"):
+                    return part.get("text")
+    return data.get("output_text")
+
+
+@instrument("explain-rule")
 class handler(BaseHTTPRequestHandler):
-    def _send_json(self, payload, status_code=200):
+    # HTTP/1.1 nodig voor chunked server-sent events
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, payload, status_code=200, cache_status=None):
         body = json.dumps(payload).encode()
         self.send_response(status_code)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(body)))
         self.send_header("Cache-Control", "no-store")
+        if cache_status:
+            self.send_header("X-Cache", cache_status)
         self.end_headers()
         self.wfile.write(body)
 
+    def _send_explanation(self, text, stream, source, cache_status=None):
+        # Antwoord zonder LLM call (cache of lokale uitleg), als JSON of als SSE
+        cached = source == "cache"
+        if not stream:
+            self._send_json(
+                {"explanation": text, "cached": cached, "source": source},
+                status_code=200,
+                cache_status=cache_status,
+            )
+            return
+        headers = dict(SSE_HEADERS)
+        if cache_status:
+            headers["X-Cache"] = cache_status
+        start_chunked(self, 200, headers)
+        write_chunk(self, sse_event("delta", {"text": text}))
+        write_chunk(
+            self,
+            sse_event(
+                "done",
+                {"explanation": text, "cached": cached, "complete": True, "source": source},
+            ),
+        )
+        end_chunked(self)
+
+    def _stream_explanation(self, expression, payload, headers, cache_status):
+        """
+        Tokens als server-sent events doorzetten zodra ze binnenkomen:
+          event: delta  data: {"text": "..."}
+          event: done   data: {"explanation": "<volledige tekst>", "cached": false, "complete": true}
+          event: error  data: {"error": "..."}
+        De volledige tekst wordt hier opgebouwd zodat hij gecachet kan worden.
+        """
+        # Totale grens: de vaste max, maar nooit voorbij de deadline van het request.
+        max_seconds = OPENAI_STREAM_MAX_SECONDS
+        left = remaining()
+        if left is not None:
+            max_seconds = min(max_seconds, left)
+        deadline = time.monotonic() + max_seconds
+        client = get_llm_client()
+        request = client.build_request(
+            "POST",
+            f"{OPENAI_BASE_URL}/responses",
+            headers=headers,
+            json=dict(payload, stream=True),
+            timeout=clip_timeout(httpx.Timeout(OPENAI_STREAM_READ_TIMEOUT), "llm"),
+        )
+        # Tot de eerste byte als aparte "llm" fase: die staat nog in de
+        # Server-Timing header; het streamen zelf telt daarna mee in de metrics.
+        with timed("llm") as phase, guard("llm"):
+            phase.desc = "ttfb"
+            response = client.send(request, stream=True)
+        try:
+            if response.is_error:
+                # Nog geen headers verstuurd: als gewone JSON fout melden.
+                response.read()
+                response.raise_for_status()
+
+            sse_headers = dict(SSE_HEADERS)
+            if cache_status:
+                sse_headers["X-Cache"] = cache_status
+            start_chunked(self, 200, sse_headers)
+            try:
+                with timed("llm"):
+                    parts = []
+                    completed = False
+                    final = None
+                    for event, data in iter_sse(response):
+                        if data == "[DONE]":
+                            break
+                        message = json.loads(data)
+                        kind = message.get("type") or event
+                        if kind == "response.output_text.delta":
+                            delta = message.get("delta") or ""
+                            parts.append(delta)
+                            write_chunk(self, sse_event("delta", {"text": delta}))
+                        elif kind == "response.completed":
+                            completed = True
+                            final = message.get("response") or {}
+                        elif kind == "response.incomplete":
+                            final = message.get("response") or {}
+                        elif kind in ("response.failed", "error"):
+                            error = message.get("error") or (message.get("response") or {}).get("error")
+                            raise RuntimeError((error or {}).get("message") or "Uitleg genereren mislukt")
+                        if time.monotonic() > deadline:
+                            raise TimeoutError(f"Uitleg duurde langer dan {max_seconds:g}s")
+
+                text = "".join(parts)
+                if not text and final:
+                    text = extract_output_text(final) or ""
+                    write_chunk(self, sse_event("delta", {"text": text}))
+                if completed and text:
+                    explain_cache.set(expression, OPENAI_MODEL, PROMPT_VERSION, text)
+                write_chunk(
+                    self,
+                    sse_event(
+                        "done",
+                        {"explanation": text, "cached": False, "complete": completed, "source": "llm"},
+                    ),
+                )
+                end_chunked(self)
+            except Exception as exc:
+                # Headers zijn al verstuurd: fout als event, de browser houdt wat er al stond.
+                self.log_error("Uitleg stream afgebroken: %s", exc)
+                try:
+                    write_chunk(self, sse_event("error", {"error": str(exc)}))
+                    end_chunked(self)
+                except Exception:
+                    # Browser is weg: geen tweede response, verbinding sluiten.
+                    self.close_connection = True
+        finally:
+            response.close()
+
+    def do_GET(self):
+        # Hit/miss metrics van de uitleg-cache
+        if not is_authorized(self.headers):
+            send_unauthorized(self)
+            return
+        self._send_json({"cache": explain_cache.stats()}, status_code=200)
+
     def do_POST(self):
         try:
             if not is_authorized(self.headers):
                 send_unauthorized(self)
                 return
-            if not OPENAI_API_KEY:
-                self._send_json({"error": "OPENAI_API_KEY is not set"}, status_code=500)
-                return
-
             content_length = int(self.headers.get("Content-Length", 0))
             raw_body = self.rfile.read(content_length).decode() if content_length else ""
             body = json.loads(raw_body) if raw_body else {}
             expression = body.get("expression")
+            # Streaming via {"stream": true} of Accept: text/event-stream
+            stream = bool(body.get("stream")) or "text/event-stream" in (
+                self.headers.get("Accept") or ""
+            )
 
             if not expression:
                 self._send_json({"error": "expression is required"}, status_code=400)
                 return
 
+            # Eerst lokaal (microseconden, geen kosten); {"engine": "llm"} forceert de LLM.
+            if EXPLAIN_LOCAL and body.get("engine") != "llm":
+                local = explain_expression(expression)
+                if local:
+                    self._send_explanation(local, stream, "local")
+                    return
+
+            if not OPENAI_API_KEY:
+                self._send_json({"error": "OPENAI_API_KEY is not set"}, status_code=500)
+                return
+
+            if not body.get("refresh"):
+                cached, cache_status = explain_cache.get(expression, OPENAI_MODEL, PROMPT_VERSION)
+                if cached is not None:
+                    self._send_explanation(cached, stream, "cache", cache_status)
+                    return
+            else:
+                cache_status = "BYPASS"
+
             prompt = build_prompt(expression)
             payload = {
                 "model": OPENAI_MODEL,
@@ -67,27 +253,31 @@ class handler(BaseHTTPRequestHandler):
                 "Authorization": f"Bearer {OPENAI_API_KEY}",
                 "Content-Type": "application/json",
             }
-            with httpx.Client() as client:
-                response = client.post(
+            if stream:
+                self._stream_explanation(expression, payload, headers, cache_status)
+                return
+
+            with timed("llm"), guard("llm"):
+                response = get_llm_client().post(
                     f"{OPENAI_BASE_URL}/responses",
                     headers=headers,
                     json=payload,
-                    timeout=8.0,
+                    timeout=clip_timeout(8.0, "llm"),
                 )
                 response.raise_for_status()
                 data = response.json()
-                text = None
-                for item in data.get("output", []):
-                    if item.get("type") == "message":
-                        for part in item.get("content", []):
-                            if part.get("type") == "output_text":
-                                text = part.get("text")
-                                break
-                    if text:
-                        break
-                if not text:
-                    text = data.get("output_text")
-                self._send_json({"explanation": text or ""}, status_code=200)
+                text = extract_output_text(data)
+
+            # Alleen complete antwoorden bewaren (niet afgekapt op max_output_tokens).
+            if text and data.get("status") in (None, "completed"):
+                explain_cache.set(expression, OPENAI_MODEL, PROMPT_VERSION, text)
+            self._send_json(
+                {"explanation": text or "", "cached": False, "source": "llm"},
+                status_code=200,
+                cache_status=cache_status,
+            )
+        except DeadlineExceeded as exc:
+            self._send_json(exc.payload(), status_code=504)
         except httpx.HTTPStatusError as exc:
             detail = {
                 "error": "Upstream request failed",
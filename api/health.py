@@ -1,8 +1,17 @@
 from http.server import BaseHTTPRequestHandler
 from datetime import datetime
 import json
+import os
+import sys
 
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
 
+from _timing import instrument
+
+
+@instrument("health")
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         self.send_response(200)
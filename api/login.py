@@ -8,8 +8,10 @@ if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 from _auth import is_authorized, send_unauthorized
+from _timing import instrument
 
 
+@instrument("login")
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         # Preflight is niet nodig bij same-origin, maar dit kan geen kwaad
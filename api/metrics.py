@@ -0,0 +1,59 @@
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+import json
+import os
+import sys
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from _auth import is_authorized, send_unauthorized
+from _compress import compress_stats
+from _metrics import snapshot
+from _timing import instrument
+from _token import token_stats
+from _upstream import upstream_stats
+
+
+@instrument("metrics")
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status_code: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.send_header("Pragma", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        """
+        Latency per endpoint en omgeving over het laatste venster
+        (count, errors, mean/max, p50/p95/p99 in ms), plus de tellers van
+        de token manager, de upstream client (coalescing, retries, breakers)
+        en de response compressie.
+
+        ?endpoint= alleen dit endpoint (bijv. products)
+        """
+        try:
+            if not is_authorized(self.headers):
+                send_unauthorized(self)
+                return
+
+            query_params = parse_qs(urlparse(self.path).query or "")
+            endpoint = query_params.get("endpoint", [None])[0]
+
+            result = snapshot()
+            if endpoint:
+                result["series"] = {
+                    key: value for key, value in result["series"].items() if value["endpoint"] == endpoint
+                }
+            result["tokens"] = token_stats()
+            result["upstream"] = upstream_stats()
+            result["compression"] = compress_stats()
+            self._send_json(result, status_code=200)
+
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
@@ -1,7 +1,5 @@
 from http.server import BaseHTTPRequestHandler
-from datetime import datetime, timedelta
 from urllib.parse import parse_qs, urlparse
-import httpx
 import json
 import os
 import sys
@@ -11,173 +9,173 @@ if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 from _auth import is_authorized, send_unauthorized
-
-# Cache bearer token between requests to reduce token calls
-token_cache = {
-    "production": {"token": None, "expires_at": None},
-    "acceptance": {"token": None, "expires_at": None},
-}
-
-DEFAULT_KINETIC_HOST = os.getenv("KINETIC_HOST", "https://dcb.sleutelstadassuradeuren.nl")
-DEFAULT_CLIENT_ID = os.getenv("KINETIC_CLIENT_ID")
-DEFAULT_CLIENT_SECRET = os.getenv("KINETIC_CLIENT_SECRET")
-
-# Acceptance env vars: GEEN fallback naar production (veiligheid)
-ACCEPTANCE_KINETIC_HOST = os.getenv("KINETIC_HOST_ACCEPTANCE")
-ACCEPTANCE_CLIENT_ID = os.getenv("KINETIC_CLIENT_ID_ACCEPTANCE")
-ACCEPTANCE_CLIENT_SECRET = os.getenv("KINETIC_CLIENT_SECRET_ACCEPTANCE")
-
-# DIAS headers
-DEFAULT_TENANT_CUSTOMER_ID = os.getenv("DIAS_TENANT_CUSTOMER_ID", "")
-DEFAULT_BEDRIJF_ID = os.getenv("DIAS_BEDRIJF_ID", "")
-DEFAULT_MEDEWERKER_ID = os.getenv("DIAS_MEDEWERKER_ID", "")
-DEFAULT_KANTOOR_ID = os.getenv("DIAS_KANTOOR_ID", "")
-
-# Acceptance env vars: GEEN fallback naar production (veiligheid)
-ACCEPTANCE_TENANT_CUSTOMER_ID = os.getenv("DIAS_TENANT_CUSTOMER_ID_ACCEPTANCE")
-ACCEPTANCE_BEDRIJF_ID = os.getenv("DIAS_BEDRIJF_ID_ACCEPTANCE")
-ACCEPTANCE_MEDEWERKER_ID = os.getenv("DIAS_MEDEWERKER_ID_ACCEPTANCE")
-ACCEPTANCE_KANTOOR_ID = os.getenv("DIAS_KANTOOR_ID_ACCEPTANCE")
-
-
-def get_env_config(env_key):
-    if env_key == "acceptance":
-        missing = []
-        if not ACCEPTANCE_KINETIC_HOST:
-            missing.append("KINETIC_HOST_ACCEPTANCE")
-        if not ACCEPTANCE_CLIENT_ID:
-            missing.append("KINETIC_CLIENT_ID_ACCEPTANCE")
-        if not ACCEPTANCE_CLIENT_SECRET:
-            missing.append("KINETIC_CLIENT_SECRET_ACCEPTANCE")
-        if not ACCEPTANCE_TENANT_CUSTOMER_ID:
-            missing.append("DIAS_TENANT_CUSTOMER_ID_ACCEPTANCE")
-        if not ACCEPTANCE_BEDRIJF_ID:
-            missing.append("DIAS_BEDRIJF_ID_ACCEPTANCE")
-        if not ACCEPTANCE_MEDEWERKER_ID:
-            missing.append("DIAS_MEDEWERKER_ID_ACCEPTANCE")
-        if not ACCEPTANCE_KANTOOR_ID:
-            missing.append("DIAS_KANTOOR_ID_ACCEPTANCE")
-        if missing:
-            raise RuntimeError("Acceptance env vars ontbreken: " + ", ".join(missing))
-
-        return {
-            "host": ACCEPTANCE_KINETIC_HOST,
-            "client_id": ACCEPTANCE_CLIENT_ID,
-            "client_secret": ACCEPTANCE_CLIENT_SECRET,
-            "tenant_customer_id": ACCEPTANCE_TENANT_CUSTOMER_ID,
-            "bedrijf_id": ACCEPTANCE_BEDRIJF_ID,
-            "medewerker_id": ACCEPTANCE_MEDEWERKER_ID,
-            "kantoor_id": ACCEPTANCE_KANTOOR_ID,
-        }
+from _cache import TTLCache
+from _compress import encode_body
+from _deadline import DeadlineExceeded
+from _etag import make_etag, send_cacheable
+from _products import fetch_product_detail_body, fetch_products_body, get_env_config
+from _runtime import httpx
+from _timing import instrument
+from _token import get_bearer_token
+
+# Productdefinities veranderen zelden: cache list + detail per (env, productId).
+# ?refresh=1 slaat de cache over en ververst de entry; DELETE invalideert
+# (zie do_DELETE).
+PRODUCT_CACHE_TTL = int(os.getenv("PRODUCT_CACHE_TTL", "300"))
+PRODUCT_CACHE_STALE_TTL = int(os.getenv("PRODUCT_CACHE_STALE_TTL", "3600"))
+PRODUCT_CACHE_MAX_BYTES = int(os.getenv("PRODUCT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PRODUCT_CACHE_DIR = os.getenv("PRODUCT_CACHE_DIR")
+
+product_cache = TTLCache(
+    "products",
+    ttl=PRODUCT_CACHE_TTL,
+    stale_ttl=PRODUCT_CACHE_STALE_TTL,
+    max_bytes=PRODUCT_CACHE_MAX_BYTES,
+    disk_dir=PRODUCT_CACHE_DIR,
+)
+
+
+# Projecties: de frontend gebruikt maar een klein deel van de productdefinitie.
+# ?view=validatieregels -> alleen de Validatieregels
+# ?view=dynamiek        -> alle IsVanToepassingAls-blokken (incl. pad)
+
+
+def project_validatieregels(data):
+    rules = []
+    if isinstance(data, dict):
+        nested = data.get("Data") if isinstance(data.get("Data"), dict) else {}
+        for candidate in (
+            data.get("Validatieregels"),
+            data.get("validatieregels"),
+            nested.get("Validatieregels"),
+        ):
+            if isinstance(candidate, list):
+                rules = candidate
+                break
+    return {"Validatieregels": rules, "count": len(rules)}
+
+
+def _count_list(value):
+    return len(value) if isinstance(value, list) else 0
+
+
+def _condition_item(path, idx, cond):
+    cond = cond if isinstance(cond, dict) else {}
+    rekenregels = cond.get("Rekenregels")
+    if not isinstance(rekenregels, list):
+        rekenregels = cond.get("rekenregels")
+    waardes = cond.get("Waardes") if isinstance(cond.get("Waardes"), list) else cond.get("waardes")
     return {
-        "host": DEFAULT_KINETIC_HOST,
-        "client_id": DEFAULT_CLIENT_ID,
-        "client_secret": DEFAULT_CLIENT_SECRET,
-        "tenant_customer_id": DEFAULT_TENANT_CUSTOMER_ID,
-        "bedrijf_id": DEFAULT_BEDRIJF_ID,
-        "medewerker_id": DEFAULT_MEDEWERKER_ID,
-        "kantoor_id": DEFAULT_KANTOOR_ID,
+        "id": f"{path}[{idx}]",
+        "path": path,
+        "objectcodeId": next(
+            (v for v in (cond.get("ObjectcodeId"), cond.get("objectcodeId")) if v is not None), ""
+        ),
+        "waardesCount": _count_list(waardes),
+        "rekenregels": rekenregels if isinstance(rekenregels, list) else [],
     }
 
 
-def get_bearer_token(env_key="production"):
-    cache = token_cache.get(env_key, token_cache["production"])
-    if cache["token"] and cache["expires_at"] and datetime.now() < cache["expires_at"]:
-        return cache["token"]
-
-    config = get_env_config(env_key)
-    if not config["client_id"] or not config["client_secret"]:
-        raise RuntimeError(
-            f"KINETIC_CLIENT_ID or KINETIC_CLIENT_SECRET is not set for {env_key}"
-        )
-
-    with httpx.Client() as client:
-        response = client.post(
-            f"{config['host'].rstrip('/')}/token",
-            params={
-                "client_id": config["client_id"],
-                "client_secret": config["client_secret"],
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        token = data.get("access_token")
-        expires_in = int(data.get("expires_in", 3600))
-
-        if not token:
-            raise RuntimeError("Bearer token missing from token response")
-
-        cache["token"] = token
-        cache["expires_at"] = datetime.now() + timedelta(
-            seconds=max(expires_in - 300, 60)
-        )
-        return token
-
+def project_dynamiek(data):
+    """
+    Zelfde uitkomst (en volgorde) als de vroegere recursieve walk in
+    ProductDynamiekregels.jsx, maar iteratief met een expliciete stack.
+    """
+    items = []
+    # Stack entries: (pad, node, is_conditions)
+    stack = [("data", data, False)]
+    while stack:
+        path, node, is_conditions = stack.pop()
+        if is_conditions:
+            items.extend(_condition_item(path, idx, cond) for idx, cond in enumerate(node))
+            continue
+
+        if isinstance(node, list):
+            children = [(f"{path}[{idx}]", value, False) for idx, value in enumerate(node)]
+        elif isinstance(node, dict):
+            children = []
+            for key, value in node.items():
+                next_path = f"{path}.{key}"
+                # IsVanToepassingAls-blokken opnemen, niet verder in afdalen.
+                is_block = key == "IsVanToepassingAls" and isinstance(value, list)
+                children.append((next_path, value, is_block))
+        else:
+            continue
 
-def _dias_headers(config, token):
-    return {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-        "Tenant-CustomerId": config["tenant_customer_id"],
-        "BedrijfId": config["bedrijf_id"],
-        "MedewerkerId": config["medewerker_id"],
-        "KantoorId": config["kantoor_id"],
-    }
+        stack.extend(reversed(children))
 
+    return {"items": items, "count": len(items)}
 
-def fetch_products(config, token):
-    with httpx.Client() as client:
-        response = client.get(
-            f"{config['host'].rstrip('/')}/contract/api/v1/contracten/verzekeringen/productdefinities",
-            params={
-                "AlleenLopendProduct": "true",
-                "IsBeschikbaarVoorMedewerker": "true",
-            },
-            headers=_dias_headers(config, token),
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        if isinstance(data, list):
-            items = data
-        elif isinstance(data, dict) and "data" in data:
-            items = data["data"]
-        elif isinstance(data, dict) and "items" in data:
-            items = data["items"]
-        else:
-            items = [data] if data else []
 
-        return {"products": items, "count": len(items)}
+PRODUCT_VIEWS = {
+    "validatieregels": project_validatieregels,
+    "dynamiek": project_dynamiek,
+}
 
 
-def fetch_product_detail(config, token, product_id):
-    with httpx.Client() as client:
-        response = client.get(
-            f"{config['host'].rstrip('/')}/contract/api/v1/contracten/verzekeringen/productdefinities/{product_id}",
-            headers=_dias_headers(config, token),
-            timeout=httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0),
-        )
-        response.raise_for_status()
-        return response.json()
+def _encode(payload):
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
 
 
+@instrument("products")
 class handler(BaseHTTPRequestHandler):
-    def _send_json(self, payload, status_code=200):
-        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    def _send_body(self, body, status_code=200, cache_status=None):
+        body, encoding_headers = encode_body(self, body)
         self.send_response(status_code)
 
-        # ✅ Backend fix: always JSON + prevent 304/ETag caching weirdness
+        # Fouten e.d.: altijd JSON en nooit cachen (leesresultaten via _send_cacheable)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Cache-Control", "no-store, max-age=0")
         self.send_header("Pragma", "no-cache")
+        if cache_status:
+            self.send_header("X-Cache", cache_status)
+        for name, value in encoding_headers.items():
+            self.send_header(name, value)
 
         self.send_header("Content-Length", str(len(body)))
         self.end_headers()
         self.wfile.write(body)
 
+    def _send_json(self, payload, status_code=200):
+        self._send_body(_encode(payload), status_code=status_code)
+
+    def _send_cacheable(self, body, etag, cache_status=None):
+        # ETag + 304 als de browser deze versie al heeft
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        if cache_status:
+            headers["X-Cache"] = cache_status
+        send_cacheable(self, body, etag, headers)
+
+    def do_DELETE(self):
+        # Expliciet invalideren, bijv. na een wijziging in DIAS:
+        #   ?productId=<id>  -> die productdefinitie (ook de views)
+        #   zonder productId -> de productlijst
+        #   ?all=1           -> alles, beide omgevingen
+        # Geldt voor deze instance; andere warme instances verlopen via de TTL.
+        try:
+            if not is_authorized(self.headers):
+                send_unauthorized(self)
+                return
+
+            query_params = parse_qs(urlparse(self.path).query or "")
+            if query_params.get("all", ["0"])[0] in ("1", "true"):
+                product_cache.invalidate()
+                self._send_json({"invalidated": "all"}, status_code=200)
+                return
+
+            env_param = query_params.get("env", ["production"])[0]
+            env_key = "acceptance" if env_param == "acceptance" else "production"
+            product_id = query_params.get("productId", [None])[0]
+            key = (env_key, str(product_id) if product_id else "__list__")
+            keys = [key] + ([key + (view,) for view in PRODUCT_VIEWS] if product_id else [])
+            product_cache.invalidate(*keys)
+            self._send_json(
+                {"invalidated": {"env": env_key, "productId": product_id}, "stats": product_cache.stats()},
+                status_code=200,
+            )
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
+
     def do_GET(self):
         try:
             if not is_authorized(self.headers):
@@ -192,20 +190,52 @@ class handler(BaseHTTPRequestHandler):
             env_key = "acceptance" if env_param == "acceptance" else "production"
 
             config = get_env_config(env_key)
-            token = get_bearer_token(env_key)
+            refresh = query_params.get("refresh", ["0"])[0] in ("1", "true")
 
             # Prefer /api/products?productId=<id>, but keep /api/products/<id> as fallback.
             product_id = query_params.get("productId", [None])[0]
             if not product_id and len(parts) >= 3 and parts[0] == "api" and parts[1] == "products":
                 product_id = parts[2] if parts[2] else None
 
-            if product_id:
-                data = fetch_product_detail(config, token, product_id)
-                self._send_json(data, status_code=200)
+            view = query_params.get("view", [None])[0]
+            if view and (view not in PRODUCT_VIEWS or not product_id):
+                self._send_json(
+                    {"error": "view must be one of: " + ", ".join(PRODUCT_VIEWS) + " (with productId)"},
+                    status_code=400,
+                )
+                return
+
+            # Token pas ophalen als de cache echt naar DIAS moet.
+            def fetch():
+                token = get_bearer_token(config)
+                if product_id:
+                    return fetch_product_detail_body(config, token, product_id)
+                return fetch_products_body(config, token)
+
+            key = (env_key, str(product_id) if product_id else "__list__")
+
+            if view:
+                # Projectie wordt apart gecachet; de volledige definitie wordt
+                # alleen gedecodeerd als de projectie opnieuw berekend moet worden.
+                # Alleen een verse definitie gebruiken: bij het verversen van de
+                # view is de gecachete definitie meestal ook stale (zelfde TTL),
+                # en een projectie daarvan zou met een nieuwe stored_at tot 2x
+                # de TTL achter kunnen lopen.
+                def fetch_view():
+                    full = None if refresh else product_cache.get_fresh(key)
+                    if full is None:
+                        full = product_cache.set(key, fetch())
+                    return _encode(PRODUCT_VIEWS[view](json.loads(full["body"])))
+
+                entry, cache_status = product_cache.get_or_fetch_entry(
+                    key + (view,), fetch_view, refresh=refresh
+                )
             else:
-                data = fetch_products(config, token)
-                self._send_json(data, status_code=200)
+                entry, cache_status = product_cache.get_or_fetch_entry(key, fetch, refresh=refresh)
+            self._send_cacheable(entry["body"], make_etag(entry["hash"], env_key), cache_status)
 
+        except DeadlineExceeded as exc:
+            self._send_json(exc.payload(), status_code=504)
         except httpx.HTTPStatusError as exc:
             self._send_json(
                 {
@@ -0,0 +1,134 @@
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, urlencode, urlparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+# Optionele gebundelde entry point: alle /api/* routes in één function.
+# De losse handlers (products.py, acceptance-rules.py, ...) worden als route
+# geladen bij de eerste hit, dus token cache, upstream connection pools en
+# response caches worden gedeeld en één warme instance bedient de hele UI.
+#
+# Aanzetten in vercel.json (de losse functions blijven werken zonder dit):
+#   "rewrites": [
+#     { "source": "/api/:path*", "destination": "/api/router?__route=:path*" },
+#     ...
+#   ]
+# Zonder __route wordt de route uit het pad gehaald (/api/<route>/...), dus
+# lokaal of achter een proxy werkt ook /api/products?env=acceptance direct.
+ROUTE_PARAM = "__route"
+# Komma-gescheiden routes die al bij het laden geïmporteerd worden (of "*").
+ROUTER_PRELOAD = os.getenv("ROUTER_PRELOAD", "")
+
+ROUTES = {
+    name[:-3]: os.path.join(current_dir, name)
+    for name in sorted(os.listdir(current_dir))
+    if name.endswith(".py") and not name.startswith("_") and name != "router.py"
+}
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+def route_handler(route):
+    """De handler class van een route (module wordt één keer geladen)."""
+    cls = _handlers.get(route)
+    if cls is not None:
+        return cls
+    with _handlers_lock:
+        cls = _handlers.get(route)
+        if cls is None:
+            module_name = "route_" + route.replace("-", "_")
+            spec = importlib.util.spec_from_file_location(module_name, ROUTES[route])
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[module_name] = module
+            cls = module.handler
+            _handlers[route] = cls
+        return cls
+
+
+def _resolve(path):
+    """(route, pad zoals de losse handler het zou zien) of (None, None)."""
+    parsed = urlparse(path)
+    query = parse_qsl(parsed.query or "", keep_blank_values=True)
+    forwarded = [value for key, value in query if key == ROUTE_PARAM]
+    if forwarded:
+        parts = [part for part in forwarded[0].split("/") if part]
+        query = [(key, value) for key, value in query if key != ROUTE_PARAM]
+    else:
+        parts = [part for part in parsed.path.split("/") if part]
+        if parts and parts[0] == "api":
+            parts = parts[1:]
+    if not parts or parts[0] not in ROUTES:
+        return None, None
+    route_path = "/api/" + "/".join(parts)
+    if query:
+        route_path += "?" + urlencode(query)
+    return parts[0], route_path
+
+
+class handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 zodat streaming routes (chunked) werken; routes die zelf
+    # HTTP/1.0 spreken sluiten de verbinding na hun antwoord.
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, payload, status_code: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self):
+        route, route_path = _resolve(self.path)
+        if route is None:
+            self._send_json({"error": "Unknown route", "routes": sorted(ROUTES)}, status_code=404)
+            return
+        try:
+            target = route_handler(route)
+        except Exception as exc:
+            self._send_json({"error": f"Route {route} kon niet geladen worden: {exc}"}, status_code=500)
+            return
+
+        method = getattr(target, "do_" + self.command, None)
+        if method is None:
+            self.send_error(501, f"Unsupported method ({self.command!r})")
+            return
+
+        # Het request wordt tijdelijk een instance van de route-handler, zodat
+        # diens methodes en class-attributen (protocol_version) gelden.
+        self.path = route_path
+        if target.protocol_version != "HTTP/1.1":
+            self.close_connection = True
+        self.__class__ = target
+        try:
+            method(self)
+        finally:
+            self.__class__ = handler
+
+    do_GET = _dispatch
+    do_POST = _dispatch
+    do_PUT = _dispatch
+    do_DELETE = _dispatch
+    do_PATCH = _dispatch
+    do_OPTIONS = _dispatch
+    do_HEAD = _dispatch
+
+
+def _preload():
+    names = list(ROUTES) if ROUTER_PRELOAD.strip() == "*" else ROUTER_PRELOAD.split(",")
+    for name in (name.strip() for name in names):
+        if name in ROUTES:
+            route_handler(name)
+
+
+_preload()
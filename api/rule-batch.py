@@ -0,0 +1,256 @@
+from http.server import BaseHTTPRequestHandler
+from collections import deque
+from urllib.parse import parse_qs, urlparse
+import json
+import os
+import sys
+import threading
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from _auth import is_authorized, send_unauthorized
+from _deadline import DeadlineExceeded, remaining
+from _ruleindex import index_rule_deleted, index_rule_saved
+from _rules import RULE_KINDS, build_rule_payload, delete_rule, get_env_config, save_rule
+from _ruletable import invalidate_rule_table
+from _rulevalidate import RuleValidationError
+from _runtime import httpx
+from _timing import bind, instrument
+from _token import get_bearer_token
+
+RULE_BATCH_MAX_OPERATIONS = int(os.getenv("RULE_BATCH_MAX_OPERATIONS", "500"))
+RULE_BATCH_CONCURRENCY = int(os.getenv("RULE_BATCH_CONCURRENCY", "4"))
+RULE_BATCH_MAX_CONCURRENCY = 16
+ACTIONS = ("create", "update", "delete")
+
+
+def validate_operation(operation):
+    """
+    Controleert één operatie met dezelfde regels als de PUT/DELETE handlers.
+    Geeft {"kind", "action", "payload" | "regelId"} terug of een ValueError.
+    """
+    if not isinstance(operation, dict):
+        raise ValueError("Operation must be an object")
+
+    kind = operation.get("kind")
+    if kind not in RULE_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(RULE_KINDS)}")
+    action = operation.get("action")
+    if action not in ACTIONS:
+        raise ValueError(f"action must be one of {', '.join(ACTIONS)}")
+
+    if action == "delete":
+        regel_id = operation.get("regelId")
+        if regel_id is None and isinstance(operation.get("payload"), dict):
+            regel_id = operation["payload"].get("RegelId")
+        if regel_id is None or str(regel_id).strip() == "":
+            raise ValueError("regelId is required")
+        return {"kind": kind, "action": action, "regelId": str(regel_id).strip()}
+
+    detected, payload = build_rule_payload(kind, operation.get("payload"))
+    if detected != action:
+        # Zelfde RegelId-logica als de PUT handler bepaalt wat DIAS gaat doen.
+        if action == "create":
+            raise ValueError("RegelId is not allowed for create")
+        raise ValueError("RegelId is required for update")
+    return {"kind": kind, "action": action, "payload": payload}
+
+
+def run_operations(config, token, operations, concurrency, stop_on_error):
+    """
+    Voert de (gevalideerde) operaties uit met max 'concurrency' tegelijk.
+    Met stop_on_error start er na de eerste fout geen nieuwe operatie meer;
+    lopende operaties worden afgemaakt en de rest krijgt status "skipped".
+    """
+    results = [None] * len(operations)
+    pending = deque(range(len(operations)))
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def run(index):
+        operation = operations[index]
+        result = {"index": index, "kind": operation["kind"], "action": operation["action"]}
+        try:
+            if operation["action"] == "delete":
+                result["regelId"] = operation["regelId"]
+                data = delete_rule(config, token, operation["kind"], operation["regelId"])
+            else:
+                result["regelId"] = operation["payload"].get("RegelId")
+                data = save_rule(
+                    config, token, operation["kind"], operation["action"], operation["payload"]
+                )
+            result.update({"status": "ok", "data": data})
+        except DeadlineExceeded as exc:
+            result.update({"status": "error", "status_code": 504, "error": str(exc)})
+        except httpx.HTTPStatusError as exc:
+            result.update(
+                {
+                    "status": "error",
+                    "status_code": exc.response.status_code,
+                    "error": exc.response.text or "Upstream request failed",
+                }
+            )
+        except Exception as exc:
+            result.update({"status": "error", "status_code": 502, "error": str(exc)})
+        return result
+
+    def worker():
+        while True:
+            with lock:
+                # Na de deadline geen nieuwe operaties meer (de rest wordt "skipped").
+                left = remaining()
+                if stop.is_set() or not pending or (left is not None and left <= 0):
+                    return
+                index = pending.popleft()
+            results[index] = run(index)
+            if stop_on_error and results[index]["status"] == "error":
+                stop.set()
+
+    threads = [
+        threading.Thread(target=bind(worker), name=f"rule-batch-{i}", daemon=True)
+        for i in range(min(concurrency, len(operations)))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for index, operation in enumerate(operations):
+        if results[index] is None:
+            results[index] = {
+                "index": index,
+                "kind": operation["kind"],
+                "action": operation["action"],
+                "regelId": operation.get("regelId") or operation.get("payload", {}).get("RegelId"),
+                "status": "skipped",
+            }
+    return results
+
+
+@instrument("rule-batch")
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status_code: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.send_header("Pragma", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.end_headers()
+
+    def do_POST(self):
+        """
+        Batch van invoer/wijzig/verwijder operaties.
+
+        {
+          "operations": [
+            {"kind": "acceptance", "action": "create", "payload": {...}},
+            {"kind": "dynamiek", "action": "update", "payload": {"RegelId": 12, ...}},
+            {"kind": "acceptance", "action": "delete", "regelId": "34"}
+          ],
+          "stopOnError": false,
+          "concurrency": 4
+        }
+
+        Alle operaties worden eerst gevalideerd; bij een ongeldige operatie wordt
+        niets uitgevoerd (400 met fouten per index).
+        """
+        try:
+            if not is_authorized(self.headers):
+                send_unauthorized(self)
+                return
+
+            query_params = parse_qs(urlparse(self.path).query or "")
+            env_param = query_params.get("env", ["production"])[0]
+            env_key = "acceptance" if env_param == "acceptance" else "production"
+
+            content_length = int(self.headers.get("Content-Length", 0))
+            raw_body = self.rfile.read(content_length).decode("utf-8") if content_length else ""
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                self._send_json({"error": "Invalid JSON body"}, status_code=400)
+                return
+
+            raw_operations = body.get("operations")
+            if not isinstance(raw_operations, list) or not raw_operations:
+                self._send_json({"error": "operations is required"}, status_code=400)
+                return
+            if len(raw_operations) > RULE_BATCH_MAX_OPERATIONS:
+                self._send_json(
+                    {"error": f"Maximaal {RULE_BATCH_MAX_OPERATIONS} operaties per request"},
+                    status_code=400,
+                )
+                return
+            try:
+                concurrency = int(body.get("concurrency") or RULE_BATCH_CONCURRENCY)
+            except (TypeError, ValueError):
+                self._send_json({"error": "concurrency must be an integer"}, status_code=400)
+                return
+            concurrency = min(max(concurrency, 1), RULE_BATCH_MAX_CONCURRENCY)
+
+            operations = []
+            invalid = []
+            for index, operation in enumerate(raw_operations):
+                try:
+                    operations.append(validate_operation(operation))
+                except RuleValidationError as exc:
+                    invalid.append({"index": index, "error": str(exc), "errors": exc.errors})
+                except ValueError as exc:
+                    invalid.append({"index": index, "error": str(exc)})
+            if invalid:
+                self._send_json(
+                    {"error": "Ongeldige operaties; er is niets uitgevoerd", "invalid": invalid},
+                    status_code=400,
+                )
+                return
+
+            config = get_env_config(env_key)
+            token = get_bearer_token(config)
+            results = run_operations(
+                config, token, operations, concurrency, bool(body.get("stopOnError"))
+            )
+
+            for operation, result in zip(operations, results):
+                if result["status"] != "ok":
+                    continue
+                if operation["action"] == "delete":
+                    index_rule_deleted(operation["kind"], env_key, operation["regelId"])
+                else:
+                    index_rule_saved(operation["kind"], env_key, operation["payload"], result["data"])
+            for kind in {operation["kind"] for operation in operations}:
+                invalidate_rule_table(kind, env_key)
+
+            self._send_json(
+                {
+                    "results": results,
+                    "count": len(results),
+                    "succeeded": sum(1 for result in results if result["status"] == "ok"),
+                    "failed": sum(1 for result in results if result["status"] == "error"),
+                    "skipped": sum(1 for result in results if result["status"] == "skipped"),
+                },
+                status_code=200,
+            )
+
+        except DeadlineExceeded as exc:
+            self._send_json(exc.payload(), status_code=504)
+        except httpx.HTTPStatusError as exc:
+            self._send_json(
+                {
+                    "error": "Upstream request failed",
+                    "status_code": exc.response.status_code,
+                    "message": exc.response.text,
+                },
+                status_code=exc.response.status_code,
+            )
+        except json.JSONDecodeError:
+            self._send_json({"error": "Invalid JSON body"}, status_code=400)
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
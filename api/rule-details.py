@@ -0,0 +1,146 @@
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+import json
+import os
+import sys
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from _auth import is_authorized, send_unauthorized
+from _deadline import DeadlineExceeded
+from _rules import RULE_DETAILS_CONCURRENCY, RULE_KINDS, fetch_rule_details, get_env_config
+from _runtime import httpx
+from _timing import instrument
+from _token import get_bearer_token
+
+RULE_DETAILS_MAX_IDS = int(os.getenv("RULE_DETAILS_MAX_IDS", "500"))
+RULE_DETAILS_MAX_CONCURRENCY = 32
+
+
+def parse_regel_ids(value):
+    # Lijst of komma-gescheiden string; dubbele ids één keer ophalen.
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        raise ValueError("regelIds must be a list")
+    seen = []
+    for regel_id in value:
+        regel_id = str(regel_id).strip()
+        if regel_id and regel_id not in seen:
+            seen.append(regel_id)
+    return seen
+
+
+@instrument("rule-details")
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status_code: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.send_header("Pragma", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.end_headers()
+
+    def _handle(self, params):
+        """
+        Details van meerdere regels in één response.
+
+        kind:        acceptance | dynamiek
+        regelIds:    lijst (of komma-gescheiden string) met regelIds
+        concurrency: optioneel, max gelijktijdige DIAS requests
+
+        Fouten per regel staan in het resultaat ({"ok": false, "status_code", "error"});
+        de response zelf is 200 zolang de batch kon worden uitgevoerd.
+        """
+        try:
+            query_params = parse_qs(urlparse(self.path).query or "")
+            env_param = query_params.get("env", ["production"])[0]
+            env_key = "acceptance" if env_param == "acceptance" else "production"
+
+            kind = params.get("kind")
+            if kind not in RULE_KINDS:
+                self._send_json({"error": f"kind must be one of {', '.join(RULE_KINDS)}"}, status_code=400)
+                return
+
+            try:
+                regel_ids = parse_regel_ids(params.get("regelIds") or [])
+            except ValueError as exc:
+                self._send_json({"error": str(exc)}, status_code=400)
+                return
+            try:
+                concurrency = int(params.get("concurrency") or RULE_DETAILS_CONCURRENCY)
+            except (TypeError, ValueError):
+                self._send_json({"error": "concurrency must be an integer"}, status_code=400)
+                return
+            if not regel_ids:
+                self._send_json({"error": "regelIds is required"}, status_code=400)
+                return
+            if len(regel_ids) > RULE_DETAILS_MAX_IDS:
+                self._send_json(
+                    {"error": f"Maximaal {RULE_DETAILS_MAX_IDS} regelIds per request"},
+                    status_code=400,
+                )
+                return
+            concurrency = min(max(concurrency, 1), RULE_DETAILS_MAX_CONCURRENCY)
+
+            config = get_env_config(env_key)
+            token = get_bearer_token(config)
+            results = fetch_rule_details(config, token, kind, regel_ids, concurrency=concurrency)
+
+            self._send_json(
+                {
+                    "kind": kind,
+                    "results": results,
+                    "count": len(results),
+                    "failed": sum(1 for result in results if not result["ok"]),
+                },
+                status_code=200,
+            )
+
+        except DeadlineExceeded as exc:
+            self._send_json(exc.payload(), status_code=504)
+        except httpx.HTTPStatusError as exc:
+            self._send_json(
+                {
+                    "error": "Upstream request failed",
+                    "status_code": exc.response.status_code,
+                    "message": exc.response.text,
+                },
+                status_code=exc.response.status_code,
+            )
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
+
+    def do_GET(self):
+        # ?kind=acceptance&regelIds=1,2,3
+        if not is_authorized(self.headers):
+            send_unauthorized(self)
+            return
+        query_params = parse_qs(urlparse(self.path).query or "")
+        self._handle({name: values[0] for name, values in query_params.items()})
+
+    def do_POST(self):
+        # {"kind": "acceptance", "regelIds": [1, 2, 3], "concurrency": 10}
+        if not is_authorized(self.headers):
+            send_unauthorized(self)
+            return
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+            raw_body = self.rfile.read(content_length).decode("utf-8") if content_length else ""
+            body = json.loads(raw_body) if raw_body else {}
+        except json.JSONDecodeError:
+            self._send_json({"error": "Invalid JSON body"}, status_code=400)
+            return
+        if not isinstance(body, dict):
+            self._send_json({"error": "Invalid JSON body"}, status_code=400)
+            return
+        self._handle(body)
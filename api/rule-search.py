@@ -0,0 +1,109 @@
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+import json
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from _auth import is_authorized, send_unauthorized
+from _deadline import DeadlineExceeded
+from _ruleindex import FIELDS, get_rule_index
+from _rules import RULE_KINDS, get_env_config
+from _runtime import httpx
+from _timing import instrument
+
+MAX_LIMIT = 500
+
+
+@instrument("rule-search")
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status_code: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.send_header("Pragma", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.end_headers()
+
+    def do_GET(self):
+        """
+        Zoeken in alle regels (beide soorten) op omschrijving en expressie.
+
+        ?q=        termen (AND), 'woord*' voor prefix, '"a b"' of '//Polis/Merk' letterlijk
+        ?kind=     acceptance | dynamiek (standaard beide)
+        ?field=    omschrijving | expressie (standaard beide)
+        ?limit=    max aantal resultaten (standaard 100)
+        ?refresh=1 index opnieuw opbouwen
+        """
+        try:
+            if not is_authorized(self.headers):
+                send_unauthorized(self)
+                return
+
+            query_params = parse_qs(urlparse(self.path).query or "")
+            env_param = query_params.get("env", ["production"])[0]
+            env_key = "acceptance" if env_param == "acceptance" else "production"
+
+            q = query_params.get("q", [""])[0].strip()
+            kind = query_params.get("kind", [None])[0] or None
+            field = query_params.get("field", [None])[0] or None
+            try:
+                limit = int(query_params.get("limit", ["100"])[0])
+            except ValueError:
+                limit = 0
+
+            if not q:
+                self._send_json({"error": "q is required"}, status_code=400)
+                return
+            if kind is not None and kind not in RULE_KINDS:
+                self._send_json({"error": f"kind must be one of {', '.join(RULE_KINDS)}"}, status_code=400)
+                return
+            if field is not None and field not in FIELDS:
+                self._send_json({"error": f"field must be one of {', '.join(FIELDS)}"}, status_code=400)
+                return
+            if limit < 1 or limit > MAX_LIMIT:
+                self._send_json({"error": f"limit must be between 1 and {MAX_LIMIT}"}, status_code=400)
+                return
+
+            config = get_env_config(env_key)
+            entry = get_rule_index(
+                config, refresh=query_params.get("refresh", ["0"])[0] in ("1", "true")
+            )
+
+            started = time.perf_counter()
+            result = entry["index"].search(q, kind=kind, field=field, limit=limit)
+            result.update(
+                {
+                    "query": q,
+                    "indexedRules": len(entry["index"].docs),
+                    "indexedAt": int(entry["built_at"]),
+                    "errors": entry["index"].errors,
+                    "tookMs": round((time.perf_counter() - started) * 1000, 2),
+                }
+            )
+            self._send_json(result, status_code=200)
+
+        except DeadlineExceeded as exc:
+            self._send_json(exc.payload(), status_code=504)
+        except httpx.HTTPStatusError as exc:
+            self._send_json(
+                {
+                    "error": "Upstream request failed",
+                    "status_code": exc.response.status_code,
+                    "message": exc.response.text,
+                },
+                status_code=exc.response.status_code,
+            )
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
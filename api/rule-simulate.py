@@ -0,0 +1,275 @@
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+import json
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from _auth import is_authorized, send_unauthorized
+from _deadline import DeadlineExceeded
+from _ruleindex import extract_expressie
+from _rules import fetch_rule_details, get_env_config
+from _runtime import httpx
+from _timing import instrument
+from _token import get_bearer_token
+from _xpath import XPathSyntaxError
+from _xpatheval import (
+    XPathEvalError,
+    compile_cache_info,
+    compile_expression,
+    ebv,
+    load_document,
+    to_json,
+)
+
+RULE_SIMULATE_MAX_RULES = int(os.getenv("RULE_SIMULATE_MAX_RULES", "1000"))
+RULE_SIMULATE_MAX_DOCUMENTS = int(os.getenv("RULE_SIMULATE_MAX_DOCUMENTS", "1000"))
+RULE_SIMULATE_MAX_EVALUATIONS = int(os.getenv("RULE_SIMULATE_MAX_EVALUATIONS", "200000"))
+
+
+def _first(item, names):
+    for name in names:
+        if item.get(name) is not None:
+            return item[name]
+    return None
+
+
+def parse_rules(value):
+    """
+    Regels als {"regelId", "omschrijving", "expressie"}; de DIAS vormen
+    (RegelId/ValidatieregelId, Omschrijving, Expressie) worden ook herkend,
+    zodat Validatieregels van een product direct door kunnen.
+    """
+    if not isinstance(value, list):
+        raise ValueError("rules must be a list")
+    if len(value) > RULE_SIMULATE_MAX_RULES:
+        raise ValueError(f"Maximaal {RULE_SIMULATE_MAX_RULES} regels per request")
+    rules = []
+    for index, item in enumerate(value):
+        if isinstance(item, str):
+            item = {"expressie": item}
+        if not isinstance(item, dict):
+            raise ValueError(f"rules[{index}] must be an object")
+        expressie = _first(item, ("expressie", "expression")) or extract_expressie(item)
+        if not expressie:
+            raise ValueError(f"rules[{index}] heeft geen expressie")
+        regel_id = _first(item, ("regelId", "RegelId", "ValidatieregelId", "validatieregelId"))
+        rules.append(
+            {
+                "regelId": regel_id,
+                "omschrijving": _first(item, ("omschrijving", "Omschrijving")),
+                "expressie": str(expressie),
+            }
+        )
+    return rules
+
+
+def parse_documents(value):
+    # XML-tekst, JSON object of {"id", "xml" | "json"}; ongeldige documenten per index.
+    if not isinstance(value, list) or not value:
+        raise ValueError("documents is required")
+    if len(value) > RULE_SIMULATE_MAX_DOCUMENTS:
+        raise ValueError(f"Maximaal {RULE_SIMULATE_MAX_DOCUMENTS} documenten per request")
+    documents = []
+    invalid = []
+    for index, item in enumerate(value):
+        doc_id = index
+        if isinstance(item, dict) and ("xml" in item or "json" in item):
+            doc_id = item.get("id", index)
+            item = item["xml"] if "xml" in item else item["json"]
+        try:
+            documents.append({"id": doc_id, "document": load_document(item)})
+        except ValueError as exc:
+            invalid.append({"index": index, "error": str(exc)})
+    return documents, invalid
+
+
+def simulate(rules, documents, include_values=False):
+    """
+    Elke regel tegen elk document. Per regel: compileer-tijd (0 bij een
+    cache-hit), totale evaluatietijd en per document true/false of de fout.
+    """
+    results = []
+    for rule in rules:
+        entry = {
+            "regelId": rule["regelId"],
+            "omschrijving": rule["omschrijving"],
+            "passed": 0,
+            "failed": 0,
+            "errors": 0,
+        }
+        started = time.perf_counter()
+        try:
+            compiled = compile_expression(rule["expressie"])
+        except (XPathSyntaxError, XPathEvalError) as exc:
+            entry.update(
+                {
+                    "ok": False,
+                    "error": str(exc),
+                    "position": exc.pos,
+                    "errors": len(documents),
+                    "compileMs": round((time.perf_counter() - started) * 1000, 3),
+                }
+            )
+            results.append(entry)
+            continue
+        entry["ok"] = True
+        entry["compileMs"] = round((time.perf_counter() - started) * 1000, 3)
+
+        outcomes = []
+        started = time.perf_counter()
+        for doc in documents:
+            outcome = {"document": doc["id"]}
+            try:
+                value = compiled.evaluate(doc["document"])
+                outcome["result"] = ebv(value)
+                entry["passed" if outcome["result"] else "failed"] += 1
+                if include_values:
+                    outcome["value"] = to_json(value, doc["document"])
+            except XPathEvalError as exc:
+                outcome["error"] = str(exc)
+                entry["errors"] += 1
+            outcomes.append(outcome)
+        entry["evalMs"] = round((time.perf_counter() - started) * 1000, 3)
+        entry["results"] = outcomes
+        results.append(entry)
+    return results
+
+
+@instrument("rule-simulate")
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status_code: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.send_header("Pragma", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.end_headers()
+
+    def do_POST(self):
+        """
+        Lokale simulatie van acceptatieregels tegen voorbeelddocumenten.
+
+        {
+          "rules": [{"regelId": "1", "expressie": "//Merk = 'BMW'"}, ...],
+          "regelIds": ["12", "34"],          // of: expressies uit DIAS ophalen
+          "documents": ["<Polis>...</Polis>", {"Polis": {...}}, {"id": "case-1", "xml": "..."}],
+          "includeValues": false
+        }
+
+        Een regel is "passed" als de expressie (effective boolean value) true geeft.
+        """
+        try:
+            if not is_authorized(self.headers):
+                send_unauthorized(self)
+                return
+
+            query_params = parse_qs(urlparse(self.path).query or "")
+            env_param = query_params.get("env", ["production"])[0]
+            env_key = "acceptance" if env_param == "acceptance" else "production"
+
+            content_length = int(self.headers.get("Content-Length", 0))
+            raw_body = self.rfile.read(content_length).decode("utf-8") if content_length else ""
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                self._send_json({"error": "Invalid JSON body"}, status_code=400)
+                return
+
+            started = time.perf_counter()
+            try:
+                rules = parse_rules(body.get("rules") or [])
+                documents, invalid = parse_documents(body.get("documents"))
+            except ValueError as exc:
+                self._send_json({"error": str(exc)}, status_code=400)
+                return
+            if invalid:
+                self._send_json(
+                    {"error": "Ongeldige documenten", "invalid": invalid}, status_code=400
+                )
+                return
+
+            fetch_failed = []
+            regel_ids = body.get("regelIds") or []
+            if isinstance(regel_ids, str):
+                regel_ids = regel_ids.split(",")
+            regel_ids = [str(regel_id).strip() for regel_id in regel_ids if str(regel_id).strip()]
+            if regel_ids:
+                if len(rules) + len(regel_ids) > RULE_SIMULATE_MAX_RULES:
+                    self._send_json(
+                        {"error": f"Maximaal {RULE_SIMULATE_MAX_RULES} regels per request"},
+                        status_code=400,
+                    )
+                    return
+                config = get_env_config(env_key)
+                token = get_bearer_token(config)
+                for item in fetch_rule_details(config, token, "acceptance", regel_ids):
+                    expressie = extract_expressie(item["data"]) if item["ok"] else None
+                    if not expressie:
+                        fetch_failed.append(
+                            {
+                                "regelId": item["regelId"],
+                                "status_code": item.get("status_code", 404),
+                                "error": item.get("error") or "Regel heeft geen Expressie",
+                            }
+                        )
+                        continue
+                    data = item["data"]
+                    if isinstance(data.get("Data"), dict):
+                        data = data["Data"]
+                    rules.append(
+                        {
+                            "regelId": item["regelId"],
+                            "omschrijving": data.get("Omschrijving"),
+                            "expressie": expressie,
+                        }
+                    )
+
+            if not rules and not fetch_failed:
+                self._send_json({"error": "rules or regelIds is required"}, status_code=400)
+                return
+            if len(rules) * len(documents) > RULE_SIMULATE_MAX_EVALUATIONS:
+                self._send_json(
+                    {"error": f"Maximaal {RULE_SIMULATE_MAX_EVALUATIONS} evaluaties (regels x documenten)"},
+                    status_code=400,
+                )
+                return
+
+            results = simulate(rules, documents, include_values=bool(body.get("includeValues")))
+            self._send_json(
+                {
+                    "results": results,
+                    "count": len(results),
+                    "documents": len(documents),
+                    "fetchFailed": fetch_failed,
+                    "compileCache": compile_cache_info(),
+                    "tookMs": round((time.perf_counter() - started) * 1000, 1),
+                },
+                status_code=200,
+            )
+
+        except DeadlineExceeded as exc:
+            self._send_json(exc.payload(), status_code=504)
+        except httpx.HTTPStatusError as exc:
+            self._send_json(
+                {
+                    "error": "Upstream request failed",
+                    "status_code": exc.response.status_code,
+                    "message": exc.response.text,
+                },
+                status_code=exc.response.status_code,
+            )
+        except json.JSONDecodeError:
+            self._send_json({"error": "Invalid JSON body"}, status_code=400)
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
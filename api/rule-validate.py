@@ -0,0 +1,106 @@
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+import json
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from _auth import is_authorized, send_unauthorized
+from _rules import RULE_KINDS, build_rule_payload
+from _rulevalidate import RuleValidationError, cache_info, validate_expression
+from _timing import instrument
+
+RULE_VALIDATE_MAX_LENGTH = int(os.getenv("RULE_VALIDATE_MAX_LENGTH", "20000"))
+
+
+@instrument("rule-validate")
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status_code: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.send_header("Pragma", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Cache-Control", "no-store, max-age=0")
+        self.end_headers()
+
+    def _validate(self, params):
+        """
+        Zelfde validatie als de PUT handlers, zonder iets naar DIAS te sturen.
+
+        {"expression": "..."}                      -> alleen de XPath expressie
+        {"kind": "acceptance", "payload": {...}}   -> volledige PUT body
+
+        Altijd 200 met {"valid", "errors", "warnings"}; fouten hebben
+        position (0-based), line en column zodat de editor kan markeren.
+        """
+        started = time.perf_counter()
+        if "payload" in params:
+            kind = params.get("kind")
+            if kind not in RULE_KINDS:
+                self._send_json({"error": f"kind must be one of {', '.join(RULE_KINDS)}"}, status_code=400)
+                return
+            result = {"valid": True, "errors": [], "warnings": []}
+            try:
+                action, _ = build_rule_payload(kind, params.get("payload"))
+                result["action"] = action
+            except RuleValidationError as exc:
+                result.update({"valid": False, "errors": exc.errors})
+            except ValueError as exc:
+                result.update({"valid": False, "errors": [{"severity": "error", "message": str(exc)}]})
+        else:
+            expression = params.get("expression")
+            if expression is None:
+                self._send_json({"error": "expression or payload is required"}, status_code=400)
+                return
+            if len(str(expression)) > RULE_VALIDATE_MAX_LENGTH:
+                self._send_json(
+                    {"error": f"Expressie is langer dan {RULE_VALIDATE_MAX_LENGTH} tekens"},
+                    status_code=400,
+                )
+                return
+            result = validate_expression(expression)
+
+        result["tookMs"] = round((time.perf_counter() - started) * 1000, 3)
+        self._send_json(result, status_code=200)
+
+    def do_GET(self):
+        # ?expression=...  (zonder expression: cache statistieken)
+        if not is_authorized(self.headers):
+            send_unauthorized(self)
+            return
+        query_params = parse_qs(urlparse(self.path).query or "", keep_blank_values=True)
+        if "expression" not in query_params:
+            self._send_json({"cache": cache_info()}, status_code=200)
+            return
+        try:
+            self._validate({"expression": query_params["expression"][0]})
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
+
+    def do_POST(self):
+        if not is_authorized(self.headers):
+            send_unauthorized(self)
+            return
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+            raw_body = self.rfile.read(content_length).decode("utf-8") if content_length else ""
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                self._send_json({"error": "Invalid JSON body"}, status_code=400)
+                return
+            self._validate(body)
+        except json.JSONDecodeError:
+            self._send_json({"error": "Invalid JSON body"}, status_code=400)
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
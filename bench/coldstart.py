@@ -0,0 +1,132 @@
+"""
+Cold-start kosten per endpoint: importtijd van api/<endpoint>.py in een vers
+Python proces (zoals een koude Vercel function), min de basis (http.server,
+die laadt de runtime toch al).
+
+    python bench/coldstart.py                 # alle endpoints
+    python bench/coldstart.py products health --runs 15 --top 8
+    python bench/coldstart.py --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, "api")
+
+HEAVY_MODULES = ("httpx", "asyncio", "sqlite3", "xml.etree.ElementTree")
+
+_PROBE = """
+import importlib.util, json, sys, time
+started = time.perf_counter()
+import http.server
+base = time.perf_counter()
+path = sys.argv[1]
+if path:
+    spec = importlib.util.spec_from_file_location("handler_module", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+done = time.perf_counter()
+print(json.dumps({
+    "baseMs": (base - started) * 1000,
+    "importMs": (done - base) * 1000,
+    "modules": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def endpoints():
+    return sorted(
+        name[:-3] for name in os.listdir(API_DIR) if name.endswith(".py") and not name.startswith("_")
+    )
+
+
+def _run(path, importtime=False):
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", _PROBE, path]
+    proc = subprocess.run(
+        cmd, capture_output=True, text=True, cwd=ROOT, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "probe failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def _top_imports(stderr, limit):
+    # -X importtime: "import time: self | cumulative | <inspringing>naam" (microseconden).
+    # Alleen wat na http.server geladen wordt, en alleen het bovenste niveau.
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        if depth == 0 and name == "http.server":
+            rows = []
+            continue
+        if depth == 0:
+            rows.append((int(cumulative_us), name))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulativeMs": round(cumulative / 1000, 1)} for cumulative, name in rows[:limit]]
+
+
+def measure(endpoint, runs, top):
+    path = os.path.join(API_DIR, f"{endpoint}.py")
+    samples = []
+    modules = []
+    for _ in range(runs):
+        result, _ = _run(path)
+        samples.append(result["importMs"])
+        modules = result["modules"]
+    _, stderr = _run(path, importtime=True)
+    samples.sort()
+    return {
+        "endpoint": endpoint,
+        "medianMs": round(statistics.median(samples), 1),
+        "p90Ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.9))], 1),
+        "minMs": round(samples[0], 1),
+        "heavyModules": modules,
+        "topImports": _top_imports(stderr, top),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start importtijd per endpoint")
+    parser.add_argument("endpoints", nargs="*")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=5, help="grootste imports per endpoint")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    names = args.endpoints or endpoints()
+    unknown = [name for name in names if name not in endpoints()]
+    if unknown:
+        parser.error(f"onbekend endpoint: {', '.join(unknown)}")
+
+    base = statistics.median(_run("")[0]["baseMs"] for _ in range(args.runs))
+    results = [measure(name, args.runs, args.top) for name in names]
+
+    if args.json:
+        print(json.dumps({"baseMs": round(base, 1), "endpoints": results}, indent=2))
+        return 0
+
+    print(f"basis (python + http.server): {base:.1f} ms, {args.runs} runs per endpoint\n")
+    print(f"{'endpoint':<18} {'median':>8} {'p90':>8} {'min':>8}  zware modules")
+    for result in results:
+        print(
+            f"{result['endpoint']:<18} {result['medianMs']:>6.1f}ms {result['p90Ms']:>6.1f}ms "
+            f"{result['minMs']:>6.1f}ms  {', '.join(result['heavyModules']) or '-'}"
+        )
+        for row in result["topImports"]:
+            print(f"{'':<20}{row['cumulativeMs']:>6.1f}ms  {row['module']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
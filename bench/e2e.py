@@ -0,0 +1,475 @@
+"""
+End-to-end benchmark van de handlers tegen de stand-in (bench/standin.py).
+De handler classes uit api/ draaien in dit proces (elk op een eigen poort,
+ThreadingHTTPServer zoals lokaal); de stand-in draait in een eigen proces
+zodat die de meting niet beïnvloedt.
+
+Per scenario: doorvoer, latency percentielen, statuscodes, piekgeheugen
+(RSS high-water mark, met --tracemalloc ook de Python allocaties van het
+scenario zelf) en het aantal upstream calls per route.
+
+    python bench/e2e.py                                  # alle scenario's behalve env-diff
+    python bench/e2e.py products-detail acceptance-list -c 16 -n 500
+    python bench/e2e.py --latency 40 --error-rate product-detail=0.05
+    python bench/e2e.py --save bench/baseline.json
+    python bench/e2e.py --baseline bench/baseline.json --tolerance 0.2   # exit 1 bij regressie
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import standin as standin_module
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, "api")
+STANDIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "standin.py")
+
+SEARCH_TERMS = ("dekking", "merk", "postcode", "schade", "premie", "bestuurder", "regio")
+
+
+def _expression(i):
+    return f"if((fn:exists(//Merk) and (//Bouwjaar > {1990 + i % 30}))) then false() else true()"
+
+
+def _explain_body(i, stream):
+    return {
+        "expression": _expression(i),
+        "engine": "llm",
+        "refresh": True,
+        "stream": stream,
+    }
+
+
+# naam -> (endpoint, request(i, data) -> (method, path, json body of None))
+SCENARIOS = {
+    "health": ("health", lambda i, d: ("GET", "/api/health", None)),
+    "products-list": ("products", lambda i, d: ("GET", "/api/products", None)),
+    "products-detail": ("products", lambda i, d: ("GET", f"/api/products?productId={d.product(i)}", None)),
+    "products-detail-refresh": (
+        "products",
+        lambda i, d: ("GET", f"/api/products?productId={d.product(i)}&refresh=1", None),
+    ),
+    "products-view": (
+        "products",
+        lambda i, d: ("GET", f"/api/products?productId={d.product(i)}&view=dynamiek", None),
+    ),
+    "acceptance-list": ("acceptance-rules", lambda i, d: ("GET", "/api/acceptance-rules", None)),
+    "acceptance-page": (
+        "acceptance-rules",
+        lambda i, d: ("GET", f"/api/acceptance-rules?page={i % 10 + 1}&pageSize=50&sort=omschrijving", None),
+    ),
+    "acceptance-detail": (
+        "acceptance-rules",
+        lambda i, d: ("GET", f"/api/acceptance-rules?regelId={d.rule(i)}", None),
+    ),
+    "acceptance-update": (
+        "acceptance-rules",
+        lambda i, d: (
+            "PUT",
+            "/api/acceptance-rules",
+            {"RegelId": d.rule(i), "Omschrijving": f"Bench {i}", "Expressie": _expression(i)},
+        ),
+    ),
+    "dynamiek-list": ("dynamiekregels", lambda i, d: ("GET", "/api/dynamiekregels", None)),
+    "rule-search": (
+        "rule-search",
+        lambda i, d: ("GET", f"/api/rule-search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}", None),
+    ),
+    "rule-details": (
+        "rule-details",
+        lambda i, d: ("POST", "/api/rule-details", {"kind": "acceptance", "regelIds": d.rule_ids(i, 20)}),
+    ),
+    "env-diff": ("env-diff", lambda i, d: ("GET", "/api/env-diff", None)),
+    "explain": ("explain-rule", lambda i, d: ("POST", "/api/explain-rule", _explain_body(i, False))),
+    "explain-stream": ("explain-rule", lambda i, d: ("POST", "/api/explain-rule", _explain_body(i, True))),
+}
+
+
+# Niet standaard mee (alleen als ze genoemd worden): env-diff haalt per
+# request alle regeldetails van beide omgevingen op.
+HEAVY_SCENARIOS = ("env-diff",)
+
+
+class Data:
+    """Welke ids er in de stand-in bestaan (zelfde --rules / --products)."""
+
+    def __init__(self, rules, products):
+        self.rules = max(rules, 1)
+        self.products = max(products, 1)
+
+    def rule(self, i):
+        return i % self.rules + 1
+
+    def rule_ids(self, i, count):
+        return [(i * count + n) % self.rules + 1 for n in range(count)]
+
+    def product(self, i):
+        return i % self.products + 1
+
+
+# ---- stand-in ----
+
+
+def _standin_argv(args):
+    argv = [
+        "--port", "0",
+        "--rules", str(args.rules),
+        "--products", str(args.products),
+        "--product-kb", str(args.product_kb),
+        "--jitter-ms", str(args.jitter_ms),
+        "--error-status", str(args.error_status),
+        "--llm-token-ms", str(args.llm_token_ms),
+        "--seed", str(args.seed),
+    ]
+    for value in args.latency or ():
+        argv += ["--latency", value]
+    for value in args.error_rate or ():
+        argv += ["--error-rate", value]
+    return argv
+
+
+def start_standin(args):
+    proc = subprocess.Popen(
+        [sys.executable, STANDIN] + _standin_argv(args), stdout=subprocess.PIPE, text=True
+    )
+    line = proc.stdout.readline().strip()
+    if not line:
+        proc.kill()
+        raise RuntimeError("stand-in kon niet starten")
+    return proc, line.rsplit(" ", 1)[-1]
+
+
+def _standin_call(url, method, path):
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=10)
+    try:
+        conn.request(method, path)
+        return json.loads(conn.getresponse().read() or b"{}")
+    finally:
+        conn.close()
+
+
+def upstream_calls(url):
+    return _standin_call(url, "GET", "/_calls")
+
+
+# ---- handlers ----
+
+
+def configure_environment(standin_url, workdir):
+    # Vóór het laden van de handlers: _runtime leest de env vars bij import.
+    env = {
+        "KINETIC_HOST": standin_url,
+        "KINETIC_HOST_ACCEPTANCE": standin_url,
+        "OPENAI_BASE_URL": standin_url + "/v1",
+        "OPENAI_API_KEY": "standin",
+        "TIMING_LOG": "0",
+        "METRICS_DIR": os.path.join(workdir, "metrics"),
+        "EXPLAIN_CACHE_DB": os.path.join(workdir, "explain-cache.sqlite3"),
+    }
+    for env_suffix in ("", "_ACCEPTANCE"):
+        env.update(
+            {
+                "KINETIC_CLIENT_ID" + env_suffix: "bench",
+                "KINETIC_CLIENT_SECRET" + env_suffix: "bench",
+                "DIAS_TENANT_CUSTOMER_ID" + env_suffix: "1",
+                "DIAS_BEDRIJF_ID" + env_suffix: "1",
+                "DIAS_MEDEWERKER_ID" + env_suffix: "1",
+                "DIAS_KANTOOR_ID" + env_suffix: "1",
+            }
+        )
+    os.environ.update(env)
+    # Lokaal zonder Basic Auth (is_authorized laat dan alles door).
+    for name in ("BASIC_AUTH_USER", "BASIC_AUTH_PASS", "VERCEL_ENV"):
+        os.environ.pop(name, None)
+
+
+class BenchServer(ThreadingHTTPServer):
+    # Standaard backlog (5) laat bij veel gelijktijdige verbindingen SYNs
+    # vallen; dat geeft uitschieters van 1s die niets met de handler te maken hebben.
+    request_queue_size = 128
+    daemon_threads = True
+
+
+_servers = {}
+
+
+def handler_server(endpoint):
+    """ThreadingHTTPServer met de handler class van api/<endpoint>.py (één per endpoint)."""
+    server = _servers.get(endpoint)
+    if server is None:
+        module_name = "bench_" + endpoint.replace("-", "_")
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(API_DIR, f"{endpoint}.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[module_name] = module
+        module.handler.log_message = lambda self, format, *args: None
+        server = BenchServer(("127.0.0.1", 0), module.handler)
+        threading.Thread(target=server.serve_forever, name=f"bench-{endpoint}", daemon=True).start()
+        _servers[endpoint] = server
+    return server
+
+
+# ---- load ----
+
+
+class Client:
+    """Eén keep-alive verbinding per worker; opnieuw verbinden als de handler sluit."""
+
+    def __init__(self, port, headers):
+        self.port = port
+        self.headers = headers
+        self.conn = None
+
+    def request(self, method, path, body):
+        headers = dict(self.headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # Server sloot een hergebruikte verbinding: één keer opnieuw.
+                self.close()
+                if attempt:
+                    raise
+                continue
+            if response.will_close:
+                self.close()
+            return response.status, len(data)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _peak_rss_mb():
+    # Linux: KB, macOS: bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def run_scenario(name, args, data, standin_url):
+    endpoint, make_request = SCENARIOS[name]
+    port = handler_server(endpoint).server_port
+    headers = {"Accept": "application/json"}
+    if not args.identity:
+        headers["Accept-Encoding"] = "gzip, br"
+
+    warmup = Client(port, headers)
+    for i in range(args.warmup):
+        warmup.request(*make_request(i, data))
+    warmup.close()
+
+    before = upstream_calls(standin_url)
+    if args.tracemalloc:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    counter = iter(range(args.requests))
+    counter_lock = threading.Lock()
+    latencies = []
+    statuses = Counter()
+    bytes_in = [0]
+    results_lock = threading.Lock()
+
+    def worker():
+        client = Client(port, headers)
+        local = []
+        local_statuses = Counter()
+        local_bytes = 0
+        while True:
+            with counter_lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            try:
+                status, size = client.request(*make_request(args.warmup + i, data))
+            except Exception:
+                status, size = "error", 0
+            local.append((time.perf_counter() - started) * 1000)
+            local_statuses[status] += 1
+            local_bytes += size
+        client.close()
+        with results_lock:
+            latencies.extend(local)
+            statuses.update(local_statuses)
+            bytes_in[0] += local_bytes
+
+    threads = [threading.Thread(target=worker, name=f"load-{n}") for n in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    peak_alloc = None
+    if args.tracemalloc:
+        peak_alloc = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+    after = upstream_calls(standin_url)
+    upstream = {route: after.get(route, 0) - before.get(route, 0) for route in after}
+    upstream = {route: count for route, count in upstream.items() if count}
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if isinstance(status, int) and status < 400)
+    total_upstream = sum(upstream.values())
+    return {
+        "scenario": name,
+        "endpoint": endpoint,
+        "requests": len(latencies),
+        "concurrency": args.concurrency,
+        "seconds": round(wall, 2),
+        "throughput": round(len(latencies) / wall, 1) if wall else 0.0,
+        "ok": ok,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "p50Ms": round(_percentile(latencies, 0.50), 1),
+        "p90Ms": round(_percentile(latencies, 0.90), 1),
+        "p95Ms": round(_percentile(latencies, 0.95), 1),
+        "p99Ms": round(_percentile(latencies, 0.99), 1),
+        "maxMs": round(latencies[-1], 1) if latencies else 0.0,
+        "bytesPerRequest": round(bytes_in[0] / len(latencies)) if latencies else 0,
+        "peakRssMb": _peak_rss_mb(),
+        "peakAllocMb": peak_alloc,
+        "upstream": upstream,
+        "upstreamPerRequest": round(total_upstream / len(latencies), 2) if latencies else 0.0,
+    }
+
+
+# ---- rapport ----
+
+
+def compare(results, baseline, tolerance):
+    """Regressies t.o.v. een eerder opgeslagen run (p95 hoger of doorvoer lager dan de marge)."""
+    previous = {result["scenario"]: result for result in baseline.get("scenarios", [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result["scenario"])
+        if not old:
+            continue
+        if old["p95Ms"] and result["p95Ms"] > old["p95Ms"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p95 {old['p95Ms']}ms -> {result['p95Ms']}ms")
+        if old["throughput"] and result["throughput"] < old["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{result['scenario']}: doorvoer {old['throughput']}/s -> {result['throughput']}/s"
+            )
+        if result["ok"] < result["requests"] and old["ok"] == old["requests"]:
+            regressions.append(f"{result['scenario']}: fouten {result['statuses']}")
+    return regressions
+
+
+def print_table(results):
+    print(
+        f"{'scenario':<24} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} "
+        f"{'fout':>5} {'rss':>7}  upstream per request"
+    )
+    for result in results:
+        failed = result["requests"] - result["ok"]
+        upstream = ", ".join(f"{route} {count}" for route, count in sorted(result["upstream"].items()))
+        print(
+            f"{result['scenario']:<24} {result['throughput']:>8.1f} {result['p50Ms']:>6.1f}ms "
+            f"{result['p95Ms']:>6.1f}ms {result['p99Ms']:>6.1f}ms {result['maxMs']:>6.1f}ms "
+            f"{failed:>5} {result['peakRssMb']:>5.0f}MB  {result['upstreamPerRequest']:.2f} ({upstream or '-'})"
+        )
+        if result["peakAllocMb"] is not None:
+            print(f"{'':<26}piek allocaties {result['peakAllocMb']} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end benchmark van de handlers tegen de stand-in")
+    parser.add_argument("scenarios", nargs="*", help=", ".join(SCENARIOS))
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-n", "--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="requests vooraf (niet gemeten)")
+    parser.add_argument("--identity", action="store_true", help="geen Accept-Encoding (geen compressie)")
+    parser.add_argument("--tracemalloc", action="store_true", help="ook Python allocaties meten (trager)")
+    parser.add_argument("--standin", help="URL van een al draaiende stand-in (zelfde --rules/--products)")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--save", help="resultaten als JSON opslaan (baseline)")
+    parser.add_argument("--baseline", help="vergelijk met een opgeslagen run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="toegestane verslechtering (fractie)")
+    standin_module.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or [name for name in SCENARIOS if name not in HEAVY_SCENARIOS]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"onbekend scenario: {', '.join(unknown)}")
+
+    proc = None
+    if args.standin:
+        standin_url = args.standin.rstrip("/")
+    else:
+        proc, standin_url = start_standin(args)
+    try:
+        with tempfile.TemporaryDirectory(prefix="beheer-bench-") as workdir:
+            configure_environment(standin_url, workdir)
+            sys.path.insert(0, API_DIR)
+            data = Data(args.rules, args.products)
+            results = [run_scenario(name, args, data, standin_url) for name in names]
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    report = {
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "standin": {
+            "rules": args.rules,
+            "products": args.products,
+            "productKb": args.product_kb,
+            "latency": args.latency,
+            "jitterMs": args.jitter_ms,
+            "errorRate": args.error_rate,
+        },
+        "scenarios": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(results)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        if regressions:
+            print("\nregressies:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
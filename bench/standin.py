@@ -0,0 +1,432 @@
+"""
+Lokale stand-in voor DIAS/Kinetic en OpenAI, voor benchmarks zonder de echte
+hosts. Synthetische data met instelbare omvang, plus kunstmatige latency en
+fouten per route.
+
+    python bench/standin.py --port 18080
+    python bench/standin.py --rules 2000 --product-kb 256 --latency 40 --jitter-ms 20
+    python bench/standin.py --latency token=300 --error-rate product-detail=0.05
+
+Routes (namen voor --latency / --error-rate en de tellers in /_calls):
+    token            POST /token
+    rules-list       GET  <regels>                  (acceptatieregels / dynamiekregels)
+    rule-detail      GET  <regels>/<id>
+    rule-write       PUT  <regels>/invoeren | /wijzigen
+    rule-delete      DELETE <regels>/<id>
+    products-list    GET  .../productdefinities
+    product-detail   GET  .../productdefinities/<id>
+    llm              POST /v1/responses             (ook "stream": true)
+
+GET /_calls geeft de tellers per route, POST /_reset zet ze op nul.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+RULE_PATHS = {
+    "acceptance": "/beheer/api/v1/administratie/assurantie/regels/acceptatieregels",
+    "dynamiek": "/beheer/api/v1/administratie/assurantie/regels/dynamiekregels",
+}
+PRODUCTS_PATH = "/contract/api/v1/contracten/verzekeringen/productdefinities"
+ROUTES = (
+    "token", "rules-list", "rule-detail", "rule-write", "rule-delete", "products-list", "product-detail", "llm"
+)
+
+WORDS = (
+    "dekking", "merk", "bouwjaar", "postcode", "schade", "premie", "eigen", "risico", "bestuurder",
+    "leeftijd", "woonhuis", "inboedel", "kenteken", "cataloguswaarde", "regio", "korting", "claim",
+    "verzekerde", "object", "acceptatie", "vervaldatum", "betaaltermijn", "aanhanger", "motor",
+)
+FIELDS = ("Merk", "Bouwjaar", "Postcode", "Leeftijd", "Cataloguswaarde", "SchadevrijeJaren", "Regio")
+LLM_TEXT = (
+    "- De regel controleert het merk van het voertuig.\n"
+    "- Bij een bekend merk wordt de aanvraag afgewezen.\n"
+    "- Zonder polisnummer is de regel niet van toepassing.\n"
+    "Samenvatting: aanvragen voor dit merk worden niet geaccepteerd."
+)
+
+
+def _expression(rng, i):
+    field = rng.choice(FIELDS)
+    other = rng.choice(FIELDS)
+    return (
+        f"if(( (fn:exists(//{field}) and (lower-case(//{other}) = lower-case('{rng.choice(WORDS)}{i}'))) "
+        f"or (number(//{field}) > {rng.randint(1, 5000)}) )) then false() else true()"
+    )
+
+
+def make_rules(kind, count, seed):
+    rng = random.Random(f"{seed}-{kind}")
+    prefix = "A" if kind == "acceptance" else "D"
+    return {
+        i: {
+            "RegelId": i,
+            "ExternNummer": f"{prefix}{i:05d}",
+            "Omschrijving": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))).capitalize(),
+            "Expressie": _expression(rng, i),
+            "ResultaatAcceptatie": rng.choice(("Afwijzen", "Accepteren", "Beoordelen")),
+        }
+        for i in range(1, count + 1)
+    }
+
+
+def make_product(product_id, size_kb, seed):
+    """Productdefinitie van ongeveer size_kb KB met Validatieregels en IsVanToepassingAls-blokken."""
+    rng = random.Random(f"{seed}-product-{product_id}")
+    product = {
+        "ProductId": product_id,
+        "Omschrijving": f"Product {product_id} {rng.choice(WORDS)}",
+        "Validatieregels": [],
+        "Onderdelen": [],
+    }
+    size = 200
+    target = size_kb * 1024
+    n = 0
+    while size < target:
+        n += 1
+        regel = {
+            "ValidatieregelId": n,
+            "Omschrijving": " ".join(rng.choice(WORDS) for _ in range(6)),
+            "Expressie": _expression(rng, n),
+            "AandResultaatAcceptatie": rng.choice(("A", "B", "W")),
+        }
+        onderdeel = {
+            "Naam": f"{rng.choice(WORDS)}-{n}",
+            "Volgorde": n,
+            "IsVanToepassingAls": [
+                {
+                    "ObjectcodeId": rng.randint(1, 400),
+                    "Waardes": [rng.randint(1, 99) for _ in range(rng.randint(1, 6))],
+                    "Rekenregels": [{"Operator": rng.choice(("Gelijk", "Groter", "Kleiner")), "Waardes": [n]}],
+                }
+                for _ in range(rng.randint(1, 3))
+            ],
+        }
+        product["Validatieregels"].append(regel)
+        product["Onderdelen"].append(onderdeel)
+        size += len(json.dumps(regel)) + len(json.dumps(onderdeel))
+    return product
+
+
+class StandIn:
+    """
+    Data en gedrag van de stand-in. latency/jitter in seconden; 'latency' en
+    'error_rate' mogen per route overschreven worden (dict route -> waarde).
+    """
+
+    def __init__(
+        self,
+        rules=500,
+        products=40,
+        product_kb=64,
+        latency=0.02,
+        jitter=0.01,
+        error_rate=0.0,
+        error_status=503,
+        route_latency=None,
+        route_error_rate=None,
+        llm_token_delay=0.02,
+        seed=1,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.route_latency = dict(route_latency or {})
+        self.route_error_rate = dict(route_error_rate or {})
+        self.llm_token_delay = llm_token_delay
+        self.product_kb = product_kb
+        self.seed = seed
+        self.rules = {kind: make_rules(kind, rules, seed) for kind in RULE_PATHS}
+        self.next_rule_id = {kind: rules + 1 for kind in RULE_PATHS}
+        self.product_ids = list(range(1, products + 1))
+        self._product_bodies = {}
+        self._calls = {route: 0 for route in ROUTES}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def count(self, route):
+        with self._lock:
+            self._calls[route] = self._calls.get(route, 0) + 1
+
+    def calls(self):
+        with self._lock:
+            return dict(self._calls)
+
+    def reset(self):
+        with self._lock:
+            self._calls = {route: 0 for route in ROUTES}
+
+    def delay(self, route):
+        base = self.route_latency.get(route, self.latency)
+        with self._lock:
+            extra = self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+        if base + extra > 0:
+            time.sleep(base + extra)
+
+    def should_fail(self, route):
+        rate = self.route_error_rate.get(route, self.error_rate)
+        if not rate:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def product_body(self, product_id):
+        body = self._product_bodies.get(product_id)
+        if body is None:
+            body = json.dumps(make_product(product_id, self.product_kb, self.seed)).encode("utf-8")
+            with self._lock:
+                self._product_bodies[product_id] = body
+        return body
+
+
+def _route_of(method, path):
+    """(route, kind, id) voor een request pad, of (None, None, None)."""
+    if method == "POST" and path == "/token":
+        return "token", None, None
+    if method == "POST" and path.endswith("/responses"):
+        return "llm", None, None
+    for kind, base in RULE_PATHS.items():
+        if path == base and method == "GET":
+            return "rules-list", kind, None
+        if path.startswith(base + "/"):
+            rest = path[len(base) + 1:]
+            if method == "PUT" and rest in ("invoeren", "wijzigen"):
+                return "rule-write", kind, rest
+            if method == "GET":
+                return "rule-detail", kind, rest
+            if method == "DELETE":
+                return "rule-delete", kind, rest
+    if path == PRODUCTS_PATH and method == "GET":
+        return "products-list", None, None
+    if path.startswith(PRODUCTS_PATH + "/") and method == "GET":
+        return "product-detail", None, path[len(PRODUCTS_PATH) + 1:]
+    return None, None, None
+
+
+def make_handler(standin):
+    class handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, payload, status=200):
+            self._send(status, json.dumps(payload).encode("utf-8"))
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length", 0) or 0)
+            raw = self.rfile.read(length) if length else b""
+            try:
+                return json.loads(raw) if raw else {}
+            except ValueError:
+                return {}
+
+        def _dispatch(self):
+            path = urlparse(self.path).path
+            if path == "/_calls":
+                self._send_json(standin.calls())
+                return
+            if path == "/_reset" and self.command == "POST":
+                standin.reset()
+                self._send_json({"ok": True})
+                return
+
+            route, kind, ident = _route_of(self.command, path)
+            if route is None:
+                self._send_json({"error": "Not found"}, status=404)
+                return
+            body = self._read_json() if self.command in ("POST", "PUT") else None
+            standin.count(route)
+            if route != "llm" or not body.get("stream"):
+                standin.delay(route)
+            if standin.should_fail(route):
+                self._send_json({"error": "Injected failure", "route": route}, status=standin.error_status)
+                return
+            getattr(self, "_" + route.replace("-", "_"))(kind, ident, body)
+
+        do_GET = _dispatch
+        do_POST = _dispatch
+        do_PUT = _dispatch
+        do_DELETE = _dispatch
+
+        def _token(self, kind, ident, body):
+            self._send_json({"access_token": f"standin-{time.time():.0f}", "expires_in": 3600})
+
+        def _rules_list(self, kind, ident, body):
+            self._send_json({"data": list(standin.rules[kind].values())})
+
+        def _rule_detail(self, kind, ident, body):
+            rule = standin.rules[kind].get(int(ident)) if ident.isdigit() else None
+            if rule is None:
+                self._send_json({"error": "Regel niet gevonden"}, status=404)
+                return
+            self._send_json(rule)
+
+        def _rule_write(self, kind, action, body):
+            rules = standin.rules[kind]
+            with standin._lock:
+                if action == "invoeren":
+                    regel_id = standin.next_rule_id[kind]
+                    standin.next_rule_id[kind] += 1
+                else:
+                    regel_id = int(body.get("RegelId") or 0)
+                    if regel_id not in rules:
+                        regel_id = None
+                if regel_id is not None:
+                    rules[regel_id] = dict(body, RegelId=regel_id)
+            if regel_id is None:
+                self._send_json({"error": "Regel niet gevonden"}, status=404)
+                return
+            self._send_json({"RegelId": regel_id})
+
+        def _rule_delete(self, kind, ident, body):
+            with standin._lock:
+                removed = standin.rules[kind].pop(int(ident), None) if ident.isdigit() else None
+            if removed is None:
+                self._send_json({"error": "Regel niet gevonden"}, status=404)
+                return
+            self._send(200, b"")
+
+        def _products_list(self, kind, ident, body):
+            self._send_json(
+                [
+                    {"ProductId": product_id, "Omschrijving": f"Product {product_id}"}
+                    for product_id in standin.product_ids
+                ]
+            )
+
+        def _product_detail(self, kind, ident, body):
+            if not ident.isdigit() or int(ident) not in standin.product_ids:
+                self._send_json({"error": "Product niet gevonden"}, status=404)
+                return
+            self._send(200, standin.product_body(int(ident)))
+
+        def _llm(self, kind, ident, body):
+            if not body.get("stream"):
+                self._send_json(
+                    {
+                        "status": "completed",
+                        "output": [{"type": "message", "content": [{"type": "output_text", "text": LLM_TEXT}]}],
+                    }
+                )
+                return
+            # Server-sent events zoals de Responses API, token voor token.
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            standin.delay("llm")
+
+            def event(name, payload):
+                data = f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            for piece in LLM_TEXT.split(" "):
+                event("response.output_text.delta", {"type": "response.output_text.delta", "delta": piece + " "})
+                if standin.llm_token_delay:
+                    time.sleep(standin.llm_token_delay)
+            event("response.completed", {"type": "response.completed", "response": {"status": "completed"}})
+            self.wfile.write(b"0\r\n\r\n")
+
+    return handler
+
+
+class StandInServer(ThreadingHTTPServer):
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def serve(standin, host="127.0.0.1", port=0):
+    """Start de stand-in in een achtergrondthread; geeft de server terug (server.server_port)."""
+    server = StandInServer((host, port), make_handler(standin))
+    threading.Thread(target=server.serve_forever, name="standin", daemon=True).start()
+    return server
+
+
+def _per_route(values, cast):
+    """['token=300', '50'] -> (default of None, {"token": 300})."""
+    default = None
+    overrides = {}
+    for value in values or ():
+        if "=" in value:
+            route, _, raw = value.partition("=")
+            if route not in ROUTES:
+                raise ValueError(f"onbekende route: {route} (kies uit {', '.join(ROUTES)})")
+            overrides[route] = cast(raw)
+        else:
+            default = cast(value)
+    return default, overrides
+
+
+def add_arguments(parser):
+    parser.add_argument("--rules", type=int, default=500, help="regels per soort")
+    parser.add_argument("--products", type=int, default=40)
+    parser.add_argument("--product-kb", type=int, default=64, help="omvang van een productdefinitie")
+    parser.add_argument(
+        "--latency", action="append", metavar="[ROUTE=]MS", help="vaste latency, ook per route (herhaalbaar)"
+    )
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="extra willekeurige latency (0..N ms)")
+    parser.add_argument(
+        "--error-rate", action="append", metavar="[ROUTE=]FRACTIE", help="kans op een fout (herhaalbaar)"
+    )
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--llm-token-ms", type=float, default=20.0, help="pauze tussen gestreamde tokens")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def from_arguments(args):
+    latency, route_latency = _per_route(args.latency, lambda raw: float(raw) / 1000)
+    error_rate, route_error_rate = _per_route(args.error_rate, float)
+    return StandIn(
+        rules=args.rules,
+        products=args.products,
+        product_kb=args.product_kb,
+        latency=0.02 if latency is None else latency,
+        jitter=args.jitter_ms / 1000,
+        error_rate=error_rate or 0.0,
+        error_status=args.error_status,
+        route_latency=route_latency,
+        route_error_rate=route_error_rate,
+        llm_token_delay=args.llm_token_ms / 1000,
+        seed=args.seed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in voor DIAS/Kinetic en OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080, help="0 = vrije poort")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        standin = from_arguments(args)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    server = serve(standin, args.host, args.port)
+    print(f"stand-in luistert op http://{args.host}:{server.server_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
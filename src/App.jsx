@@ -11,12 +11,70 @@ const baseBtn =
 const inactiveBtn = 'brand-outline hover:bg-red-50';
 const activeBtn = 'brand-primary text-white border-transparent shadow-sm';
 
+// Live Xpath-controle tijdens het typen (debounced); zelfde validatie als bij opslaan.
+const useExpressionValidation = (expression, enabled) => {
+  const [result, setResult] = useState(null);
+
+  useEffect(() => {
+    const text = (expression ?? '').trim();
+    if (!enabled || !text) {
+      setResult(null);
+      return undefined;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const response = await authFetch(withApiEnv('/api/rule-validate'), {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+            'Cache-Control': 'no-store',
+          },
+          body: JSON.stringify({ expression }),
+          signal: controller.signal,
+        });
+        if (!response.ok) return;
+        setResult(await response.json());
+      } catch (_) {
+        // Afgebroken of netwerkfout: opslaan valideert alsnog.
+      }
+    }, 400);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [expression, enabled]);
+
+  return result;
+};
+
+const ExpressionValidationMessage = ({ result }) => {
+  if (!result) return null;
+  const issue = result.errors?.[0] || result.warnings?.[0];
+  if (!issue) {
+    return <p className="text-xs text-green-700 mt-1 dark:text-green-400">Xpath expressie is syntactisch geldig.</p>;
+  }
+  const where = issue.line ? `Regel ${issue.line}, kolom ${issue.column}: ` : '';
+  const color = result.valid ? 'text-yellow-700 dark:text-yellow-300' : 'text-red-600 dark:text-red-300';
+  return (
+    <p className={`text-xs mt-1 ${color}`}>
+      {where}
+      {issue.message}
+    </p>
+  );
+};
+
 const App = () => {
   const [rules, setRules] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [currentPage, setCurrentPage] = useState(1);
   const [searchTerm, setSearchTerm] = useState('');
+  const [debouncedSearchTerm, setDebouncedSearchTerm] = useState('');
+  const [totalRules, setTotalRules] = useState(0);
+  const [reloadKey, setReloadKey] = useState(0);
   const [sortKey, setSortKey] = useState('regelId'); // regelId | externNummer | omschrijving
   const [sortDir, setSortDir] = useState('asc'); // asc | desc
   const [deletingId, setDeletingId] = useState(null);
@@ -46,11 +104,16 @@ const App = () => {
   // NIEUW: expressie ophalen bij openen edit modal
   const [editLoadingExpressie, setEditLoadingExpressie] = useState(false);
 
+  const createValidation = useExpressionValidation(createForm.expressie, showCreateModal);
+  const editValidation = useExpressionValidation(editExpressie, showEditModal && !editLoadingExpressie);
+
   const rulesPerPage = 10;
 
   const navigate = useNavigate();
   const location = useLocation();
   const restoredListRef = useRef(false);
+  const forceRefreshRef = useRef(false);
+  const requestSeqRef = useRef(0);
 
   const makeId = () =>
     crypto?.randomUUID ? crypto.randomUUID() : Math.random().toString(36).slice(2, 10);
@@ -117,37 +180,71 @@ const App = () => {
     return flatten(Array.isArray(incoming) ? incoming : [incoming]);
   };
 
+  // Zoeken, sorteren en pagineren gebeurt op de server; we halen alleen de huidige pagina op.
   const fetchRules = async () => {
+    const requestSeq = ++requestSeqRef.current;
     setLoading(true);
     setError(null);
 
     try {
-      const response = await authFetch(withApiEnv('/api/acceptance-rules'));
+      const params = new URLSearchParams({
+        q: debouncedSearchTerm.trim(),
+        sort: sortKey,
+        dir: sortDir,
+        page: String(currentPage),
+        pageSize: String(rulesPerPage),
+      });
+      if (forceRefreshRef.current) {
+        params.set('refresh', '1');
+        forceRefreshRef.current = false;
+      }
+
+      const response = await authFetch(withApiEnv(`/api/acceptance-rules?${params.toString()}`));
 
       if (!response.ok) {
         throw new Error('De acceptatieregels konden niet worden opgehaald');
       }
 
       const data = await response.json();
+      if (requestSeq !== requestSeqRef.current) return;
+
       const normalized = normalizeRules(data.rules || data.data || data);
       setRules(normalized);
+      setTotalRules(Number.isFinite(data.total) ? data.total : normalized.length);
+      if (Number.isFinite(data.page) && data.page !== currentPage) setCurrentPage(data.page);
     } catch (err) {
+      if (requestSeq !== requestSeqRef.current) return;
       setError(err.message);
       setRules([]);
+      setTotalRules(0);
     } finally {
-      setLoading(false);
+      if (requestSeq === requestSeqRef.current) setLoading(false);
     }
   };
 
+  // Opnieuw ophalen; force = server-side cache overslaan (na wijzigingen / Refresh)
+  const reloadRules = (force = false) => {
+    if (force) forceRefreshRef.current = true;
+    setReloadKey((key) => key + 1);
+  };
+
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearchTerm(searchTerm), 250);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
   useEffect(() => {
     fetchRules();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [debouncedSearchTerm, sortKey, sortDir, currentPage, reloadKey]);
+
+  useEffect(() => {
     const handleEnvChange = () => {
       setCurrentPage(1);
-      fetchRules();
+      reloadRules();
     };
     window.addEventListener('apiEnvChange', handleEnvChange);
     return () => window.removeEventListener('apiEnvChange', handleEnvChange);
-    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
   useEffect(() => {
@@ -170,55 +267,15 @@ const App = () => {
     }
   };
 
-  const filteredRules = useMemo(() => {
-    const q = searchTerm.trim().toLowerCase();
-
-    const filtered = !q
-      ? rules
-      : rules.filter((rule) => {
-          const regelId = (rule.regelId ?? '').toString().toLowerCase();
-          const extern = (rule.externNummer ?? '').toString().toLowerCase();
-          const oms = (rule.omschrijving ?? '').toString().toLowerCase();
-          return regelId.includes(q) || extern.includes(q) || oms.includes(q);
-        });
-
-    const sorted = [...filtered].sort((a, b) => {
-      const av =
-        sortKey === 'regelId'
-          ? (a.regelId ?? '')
-          : sortKey === 'externNummer'
-            ? (a.externNummer ?? '')
-            : (a.omschrijving ?? '');
-
-      const bv =
-        sortKey === 'regelId'
-          ? (b.regelId ?? '')
-          : sortKey === 'externNummer'
-            ? (b.externNummer ?? '')
-            : (b.omschrijving ?? '');
-
-      const cmp = av.toString().localeCompare(bv.toString(), 'nl', {
-        numeric: true,
-        sensitivity: 'base',
-      });
-
-      return sortDir === 'asc' ? cmp : -cmp;
-    });
-
-    return sorted;
-  }, [rules, searchTerm, sortKey, sortDir]);
-
-  const totalPages = Math.max(1, Math.ceil(filteredRules.length / rulesPerPage));
+  const totalPages = Math.max(1, Math.ceil(totalRules / rulesPerPage));
   const safePage = Math.min(currentPage, totalPages);
-  const indexOfLastRule = safePage * rulesPerPage;
-  const indexOfFirstRule = indexOfLastRule - rulesPerPage;
-  const currentRules = filteredRules.slice(indexOfFirstRule, indexOfLastRule);
+  const currentRules = rules;
 
   const handlePageChange = (pageNumber) => setCurrentPage(pageNumber);
 
   const handleRefresh = () => {
     setCurrentPage(1);
-    fetchRules();
+    reloadRules(true);
   };
 
   const handleDelete = async (regelId) => {
@@ -244,7 +301,7 @@ const App = () => {
         throw new Error(message);
       }
 
-      setRules((prev) => prev.filter((rule) => rule.regelId !== regelId));
+      reloadRules(true);
       setShowDeleteSuccess(true);
     } catch (err) {
       setError(err.message);
@@ -459,8 +516,8 @@ const App = () => {
       const res = await authFetch(
         withApiEnv(`/api/acceptance-rules?regelId=${encodeURIComponent(regelId)}`),
         {
-          cache: 'no-store',
-          headers: { 'Cache-Control': 'no-store' },
+          // Revalideren met ETag: ongewijzigd = 304 zonder body
+          cache: 'no-cache',
         }
       );
 
@@ -550,7 +607,7 @@ const App = () => {
       }
 
       closeEditModal();
-      fetchRules();
+      reloadRules(true);
     } catch (err) {
       setEditError(err.message);
     } finally {
@@ -617,7 +674,7 @@ const App = () => {
       setXpathBuilder({ records: [createEmptyRecord()] });
       setBuilderError(null);
       setCurrentPage(1);
-      fetchRules();
+      reloadRules(true);
     } catch (err) {
       setCreateError(err.message);
     } finally {
@@ -838,7 +895,7 @@ const App = () => {
 
           {rules.length > 0 && (
             <div className="px-6 py-4 border-t border-gray-200 flex items-center justify-between dark:border-slate-700">
-              <div className="text-sm text-gray-700 dark:text-slate-200">Totaal {filteredRules.length} regels</div>
+              <div className="text-sm text-gray-700 dark:text-slate-200">Totaal {totalRules} regels</div>
 
               <div className="flex gap-2">
                 <button
@@ -1007,6 +1064,7 @@ const App = () => {
                   onChange={handleCreateInputChange('expressie')}
                   className="mt-1 w-full px-3 py-2 border border-gray-300 rounded-lg text-sm focus:outline-none focus:ring-2 focus:ring-red-200 focus:border-red-300 dark:bg-slate-800 dark:border-slate-700 dark:text-slate-100"
                 />
+                <ExpressionValidationMessage result={createValidation} />
               </div>
 
               <div className="flex items-center gap-3 text-xs font-medium text-gray-400 uppercase tracking-widest">
@@ -1270,6 +1328,7 @@ const App = () => {
                 {editLoadingExpressie && (
                   <p className="text-xs text-gray-500 mt-1 dark:text-slate-400">Huidige expressie wordt geladen…</p>
                 )}
+                <ExpressionValidationMessage result={editValidation} />
               </div>
 
               {editError && (
@@ -79,8 +79,9 @@ const DynamiekregelDetail = () => {
 
     try {
       const res = await fetch(withApiEnv(`/api/dynamiekregels?regelId=${encodeURIComponent(regelId)}`), {
-        cache: 'no-store',
-        headers: { 'Cache-Control': 'no-store', ...getAuthHeader() },
+        // Revalideren met ETag: ongewijzigd = 304 zonder body
+        cache: 'no-cache',
+        headers: { ...getAuthHeader() },
       });
 
       if (!res.ok) {
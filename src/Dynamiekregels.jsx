@@ -1,4 +1,4 @@
-import React, { useEffect, useMemo, useRef, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import {
   AlertCircle,
   ChevronLeft,
@@ -52,6 +52,9 @@ const Dynamiekregels = () => {
   const [error, setError] = useState(null);
   const [currentPage, setCurrentPage] = useState(1);
   const [searchTerm, setSearchTerm] = useState('');
+  const [debouncedSearchTerm, setDebouncedSearchTerm] = useState('');
+  const [totalRules, setTotalRules] = useState(0);
+  const [reloadKey, setReloadKey] = useState(0);
   const [sortKey, setSortKey] = useState('regelId'); // regelId | omschrijving
   const [sortDir, setSortDir] = useState('asc'); // asc | desc
 
@@ -95,6 +98,8 @@ const Dynamiekregels = () => {
   const navigate = useNavigate();
   const location = useLocation();
   const restoredListRef = useRef(false);
+  const forceRefreshRef = useRef(false);
+  const requestSeqRef = useRef(0);
 
   // Normalize varying API shapes into the fields the table expects
   const normalizeRules = (incoming) => {
@@ -118,37 +123,71 @@ const Dynamiekregels = () => {
     return flatten(Array.isArray(incoming) ? incoming : [incoming]);
   };
 
+  // Zoeken, sorteren en pagineren gebeurt op de server; we halen alleen de huidige pagina op.
   const fetchRules = async () => {
+    const requestSeq = ++requestSeqRef.current;
     setLoading(true);
     setError(null);
 
     try {
-      const response = await authFetch(withApiEnv('/api/dynamiekregels'));
+      const params = new URLSearchParams({
+        q: debouncedSearchTerm.trim(),
+        sort: sortKey,
+        dir: sortDir,
+        page: String(currentPage),
+        pageSize: String(rulesPerPage),
+      });
+      if (forceRefreshRef.current) {
+        params.set('refresh', '1');
+        forceRefreshRef.current = false;
+      }
+
+      const response = await authFetch(withApiEnv(`/api/dynamiekregels?${params.toString()}`));
 
       if (!response.ok) {
         throw new Error('De dynamiekregels konden niet worden opgehaald');
       }
 
       const data = await response.json();
+      if (requestSeq !== requestSeqRef.current) return;
+
       const normalized = normalizeRules(data.rules || data.data || data);
       setRules(normalized);
+      setTotalRules(Number.isFinite(data.total) ? data.total : normalized.length);
+      if (Number.isFinite(data.page) && data.page !== currentPage) setCurrentPage(data.page);
     } catch (err) {
+      if (requestSeq !== requestSeqRef.current) return;
       setError(err.message);
       setRules([]);
+      setTotalRules(0);
     } finally {
-      setLoading(false);
+      if (requestSeq === requestSeqRef.current) setLoading(false);
     }
   };
 
+  // Opnieuw ophalen; force = server-side cache overslaan (na wijzigingen / Refresh)
+  const reloadRules = (force = false) => {
+    if (force) forceRefreshRef.current = true;
+    setReloadKey((key) => key + 1);
+  };
+
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearchTerm(searchTerm), 250);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
   useEffect(() => {
     fetchRules();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [debouncedSearchTerm, sortKey, sortDir, currentPage, reloadKey]);
+
+  useEffect(() => {
     const handleEnvChange = () => {
       setCurrentPage(1);
-      fetchRules();
+      reloadRules();
     };
     window.addEventListener('apiEnvChange', handleEnvChange);
     return () => window.removeEventListener('apiEnvChange', handleEnvChange);
-    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
   useEffect(() => {
@@ -171,43 +210,15 @@ const Dynamiekregels = () => {
     }
   };
 
-  const filteredRules = useMemo(() => {
-    const q = searchTerm.trim().toLowerCase();
-
-    const filtered = !q
-      ? rules
-      : rules.filter((rule) => {
-          const regelId = (rule.regelId ?? '').toString().toLowerCase();
-          const oms = (rule.omschrijving ?? '').toString().toLowerCase();
-          return regelId.includes(q) || oms.includes(q);
-        });
-
-    const sorted = [...filtered].sort((a, b) => {
-      const av = sortKey === 'regelId' ? (a.regelId ?? '') : (a.omschrijving ?? '');
-      const bv = sortKey === 'regelId' ? (b.regelId ?? '') : (b.omschrijving ?? '');
-
-      const cmp = av.toString().localeCompare(bv.toString(), 'nl', {
-        numeric: true,
-        sensitivity: 'base',
-      });
-
-      return sortDir === 'asc' ? cmp : -cmp;
-    });
-
-    return sorted;
-  }, [rules, searchTerm, sortKey, sortDir]);
-
-  const totalPages = Math.max(1, Math.ceil(filteredRules.length / rulesPerPage));
+  const totalPages = Math.max(1, Math.ceil(totalRules / rulesPerPage));
   const safePage = Math.min(currentPage, totalPages);
-  const indexOfLastRule = safePage * rulesPerPage;
-  const indexOfFirstRule = indexOfLastRule - rulesPerPage;
-  const currentRules = filteredRules.slice(indexOfFirstRule, indexOfLastRule);
+  const currentRules = rules;
 
   const handlePageChange = (pageNumber) => setCurrentPage(pageNumber);
 
   const handleRefresh = () => {
     setCurrentPage(1);
-    fetchRules();
+    reloadRules(true);
   };
 
   const handleSearchChange = (e) => {
@@ -235,7 +246,7 @@ const Dynamiekregels = () => {
         throw new Error(message);
       }
 
-      setRules((prev) => prev.filter((rule) => rule.regelId !== regelId));
+      reloadRules(true);
       setShowDeleteSuccess(true);
     } catch (err) {
       setError(err.message);
@@ -462,7 +473,7 @@ return errors;
 
       setShowCreateModal(false);
       setCurrentPage(1);
-      fetchRules();
+      reloadRules(true);
     } catch (err) {
       setCreateError(err.message);
     } finally {
@@ -652,7 +663,7 @@ return errors;
       setShowEditModal(false);
       setEditRuleId(null);
       setOriginalEditSnapshot(null);
-      fetchRules();
+      reloadRules(true);
     } catch (err) {
       setEditError(err.message);
     } finally {
@@ -1153,7 +1164,7 @@ return errors;
 
           {rules.length > 0 && (
             <div className="px-6 py-4 border-t border-gray-200 flex items-center justify-between dark:border-slate-700">
-              <div className="text-sm text-gray-700 dark:text-slate-200">Totaal {filteredRules.length} regels</div>
+              <div className="text-sm text-gray-700 dark:text-slate-200">Totaal {totalRules} regels</div>
 
               <div className="flex gap-2">
                 <button
@@ -11,42 +11,6 @@ const baseBtn =
 const inactiveBtn = 'brand-outline hover:bg-red-50';
 const activeBtn = 'brand-primary text-white border-transparent shadow-sm';
 
-// Recursief zoeken naar alle IsVanToepassingAls-blokken in een JSON object
-const findIsVanToepassingAls = (node, path = 'root', out = []) => {
-  if (node === null || node === undefined) return out;
-
-  if (Array.isArray(node)) {
-    node.forEach((item, idx) => findIsVanToepassingAls(item, `${path}[${idx}]`, out));
-    return out;
-  }
-
-  if (typeof node !== 'object') return out;
-
-  Object.entries(node).forEach(([key, value]) => {
-    const nextPath = path ? `${path}.${key}` : key;
-
-    if (key === 'IsVanToepassingAls' && Array.isArray(value)) {
-      value.forEach((cond, idx) => {
-        out.push({
-          id: `${nextPath}[${idx}]`,
-          path: nextPath,
-          objectcodeId: cond?.ObjectcodeId ?? cond?.objectcodeId ?? '',
-          waardesCount: Array.isArray(cond?.Waardes) ? cond.Waardes.length : Array.isArray(cond?.waardes) ? cond.waardes.length : 0,
-          rekenregels: Array.isArray(cond?.Rekenregels)
-            ? cond.Rekenregels
-            : Array.isArray(cond?.rekenregels)
-              ? cond.rekenregels
-              : [],
-        });
-      });
-    } else {
-      findIsVanToepassingAls(value, nextPath, out);
-    }
-  });
-
-  return out;
-};
-
 const formatRekenregels = (regels) => {
   if (!Array.isArray(regels) || regels.length === 0) return '-';
   // Compacte weergave: Operator + aantallen waardes
@@ -69,15 +33,16 @@ const ProductDynamiekregels = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
-  const fetchDynamiek = async () => {
+  const fetchDynamiek = async (forceRefresh = false) => {
     if (!productId) return;
     setLoading(true);
     setError(null);
 
     try {
-      const res = await authFetch(withApiEnv(`/api/products?productId=${encodeURIComponent(productId)}`), {
-        cache: 'no-store',
-        headers: { 'Cache-Control': 'no-store' },
+      const refreshParam = forceRefresh ? '&refresh=1' : '';
+      const res = await authFetch(withApiEnv(`/api/products?productId=${encodeURIComponent(productId)}&view=dynamiek${refreshParam}`), {
+        // Revalideren met ETag: ongewijzigd = 304 zonder body
+        cache: 'no-cache',
       });
 
       if (!res.ok) {
@@ -87,9 +52,8 @@ const ProductDynamiekregels = () => {
       const data = await res.json();
       setRawData(data);
 
-      // Zoek alle ingebedde IsVanToepassingAls blokken
-      const found = findIsVanToepassingAls(data, 'data', []);
-      setItems(found);
+      // De server levert alle ingebedde IsVanToepassingAls blokken al (view=dynamiek)
+      setItems(Array.isArray(data.items) ? data.items : []);
     } catch (err) {
       setError(err.message);
       setItems([]);
@@ -138,7 +102,7 @@ const ProductDynamiekregels = () => {
             </p>
 
             <button
-              onClick={fetchDynamiek}
+              onClick={() => fetchDynamiek(true)}
               disabled={loading}
               className={[
                 baseBtn,
@@ -22,16 +22,18 @@ const ProductRules = () => {
   const [sortKey, setSortKey] = useState('validatieregelId'); // validatieregelId | aandResultaatAcceptatie | omschrijving
   const [sortDir, setSortDir] = useState('asc'); // asc | desc
 
-  const fetchRules = async () => {
+  const fetchRules = async (forceRefresh = false) => {
     if (!productId) return;
     setLoading(true);
     setError(null);
     try {
       const res = await authFetch(
-        withApiEnv(`/api/products?productId=${encodeURIComponent(productId)}`),
+        withApiEnv(
+          `/api/products?productId=${encodeURIComponent(productId)}&view=validatieregels${forceRefresh ? '&refresh=1' : ''}`
+        ),
         {
-          cache: 'no-store',
-          headers: { 'Cache-Control': 'no-store' },
+          // Revalideren met ETag: ongewijzigd = 304 zonder body
+          cache: 'no-cache',
         }
       );
       if (!res.ok) {
@@ -122,7 +124,7 @@ const ProductRules = () => {
             </p>
 
             <button
-              onClick={fetchRules}
+              onClick={() => fetchRules(true)}
               disabled={loading}
               className={[
                 baseBtn,
@@ -51,14 +51,14 @@ const Products = () => {
     return flatten(Array.isArray(incoming) ? incoming : [incoming]);
   };
 
-  const fetchProducts = async () => {
+  const fetchProducts = async (forceRefresh = false) => {
     setLoading(true);
     setError(null);
 
     try {
-      const res = await authFetch(withApiEnv('/api/products'), {
-        cache: 'no-store',
-        headers: { 'Cache-Control': 'no-store' },
+      const res = await authFetch(withApiEnv(forceRefresh ? '/api/products?refresh=1' : '/api/products'), {
+        // Revalideren met ETag: ongewijzigd = 304 zonder body
+        cache: 'no-cache',
       });
       if (!res.ok) {
         throw new Error(`Failed to fetch productdefinitions (status ${res.status})`);
@@ -151,7 +151,7 @@ const Products = () => {
                 />
 
                 <button
-                  onClick={fetchProducts}
+                  onClick={() => fetchProducts(true)}
                   disabled={loading}
                   className={[
                     baseBtn,
@@ -24,8 +24,9 @@ const RuleDetail = () => {
         const res = await fetch(
           withApiEnv(`/api/acceptance-rules?regelId=${encodeURIComponent(regelId)}`),
           {
-            cache: 'no-store',
-            headers: { 'Cache-Control': 'no-store', ...getAuthHeader() },
+            // Revalideren met ETag: ongewijzigd = 304 zonder body
+            cache: 'no-cache',
+            headers: { ...getAuthHeader() },
           }
         );
         if (!res.ok) {
@@ -53,6 +54,65 @@ const RuleDetail = () => {
     return () => window.removeEventListener('apiEnvChange', handleEnvChange);
   }, [regelId]);
 
+  // Bullets ('- ') en 'Samenvatting:' uit de (eventueel nog onvolledige) uitleg
+  const parseExplanation = (raw) => {
+    const lines = (raw || '')
+      .trim()
+      .split(/\r?\n/)
+      .map((line) => line.trim())
+      .filter(Boolean);
+    const bullets = lines
+      .filter((line) => line.startsWith('- '))
+      .map((line) => line.slice(2));
+    const summaryLine = lines.find((line) =>
+      line.toLowerCase().startsWith('samenvatting:')
+    );
+    const summary = summaryLine
+      ? summaryLine.replace(/^samenvatting:\s*/i, '')
+      : '';
+    return { bullets, summary };
+  };
+
+  // Server-sent events lezen; bij elke delta de uitleg opnieuw renderen
+  const readExplanationStream = async (response) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let raw = '';
+
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        let event = 'message';
+        let data = '';
+        frame.split('\n').forEach((line) => {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        if (!data) continue;
+        const payload = JSON.parse(data);
+
+        if (event === 'delta') {
+          raw += payload.text || '';
+          setExplanation(parseExplanation(raw));
+        } else if (event === 'done') {
+          raw = payload.explanation ?? raw;
+          setExplanation(parseExplanation(raw));
+        } else if (event === 'error') {
+          throw new Error(payload.error || 'Uitleg ophalen mislukt');
+        }
+      }
+    }
+  };
+
   const handleExplain = async () => {
     const expression = detail?.Expressie || detail?.expressie;
     if (!expression) return;
@@ -64,9 +124,10 @@ const RuleDetail = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          Accept: 'text/event-stream',
           ...getAuthHeader(),
         },
-        body: JSON.stringify({ expression }),
+        body: JSON.stringify({ expression, stream: true }),
       });
       if (!response.ok) {
         let message = `Failed to explain rule (status ${response.status})`;
@@ -76,22 +137,13 @@ const RuleDetail = () => {
         } catch (err) {}
         throw new Error(message);
       }
-      const data = await response.json();
-      const raw = (data.explanation || '').trim();
-      const lines = raw
-        .split(/\r?\n/)
-        .map((line) => line.trim())
-        .filter(Boolean);
-      const bullets = lines
-        .filter((line) => line.startsWith('- '))
-        .map((line) => line.slice(2));
-      const summaryLine = lines.find((line) =>
-        line.toLowerCase().startsWith('samenvatting:')
-      );
-      const summary = summaryLine
-        ? summaryLine.replace(/^samenvatting:\s*/i, '')
-        : '';
-      setExplanation({ bullets, summary });
+      const contentType = response.headers.get('Content-Type') || '';
+      if (contentType.includes('text/event-stream') && response.body) {
+        await readExplanationStream(response);
+      } else {
+        const data = await response.json();
+        setExplanation(parseExplanation(data.explanation));
+      }
     } catch (err) {
       setExplainError(err.message);
     } finally {
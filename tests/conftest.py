@@ -0,0 +1,68 @@
+import email
+import importlib.util
+import io
+import os
+import sys
+
+import pytest
+
+# De api/ modules importeren elkaar zonder package (zoals op Vercel).
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+
+@pytest.fixture(scope="session")
+def load_handler():
+    """Laadt een handler bestand (met koppelteken in de naam) zoals Vercel dat doet."""
+    modules = {}
+
+    def load(name):
+        if name not in modules:
+            spec = importlib.util.spec_from_file_location(
+                name.replace("-", "_"), os.path.join(API_DIR, f"{name}.py")
+            )
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            modules[name] = module
+        return modules[name]
+
+    return load
+
+
+@pytest.fixture
+def call_handler(monkeypatch):
+    """
+    Roept een do_* methode aan zonder socket en geeft (status, headers, body)
+    terug; header namen in kleine letters.
+    """
+    import _metrics
+
+    monkeypatch.setattr(_metrics, "METRICS_DIR", "")
+
+    def call(module, method, path, headers=None, body=b""):
+        handler = module.handler.__new__(module.handler)
+        handler.command = method
+        handler.path = path
+        handler.request_version = "HTTP/1.1"
+        handler.requestline = f"{method} {path} HTTP/1.1"
+        handler.client_address = ("127.0.0.1", 0)
+        handler.close_connection = True
+        raw = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        if body:
+            raw += f"Content-Length: {len(body)}\r\n"
+        handler.headers = email.message_from_string(raw)
+        handler.rfile = io.BytesIO(body)
+        handler.wfile = io.BytesIO()
+        getattr(handler, f"do_{method}")()
+
+        head, _, payload = handler.wfile.getvalue().partition(b"\r\n\r\n")
+        lines = head.decode("iso-8859-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        response_headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        return status, response_headers, payload
+
+    return call
@@ -0,0 +1,209 @@
+import base64
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from _cache import TTLCache
+
+
+def _age(cache, key, seconds):
+    cache._entries[key]["stored_at"] -= seconds
+
+
+def _wait_for(condition, seconds=5.0):
+    stop = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > stop:
+            raise AssertionError("conditie niet bereikt")
+        time.sleep(0.01)
+
+
+def test_lru_eviction_by_bytes():
+    cache = TTLCache("lru", ttl=60, max_bytes=10)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    assert cache.get("a") is not None  # a is nu het meest recent gebruikt
+    cache.set("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a")["body"] == b"aaaa"
+    assert cache.get("c")["body"] == b"cccc"
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 8, 1)
+
+
+def test_entry_larger_than_limit_is_not_kept():
+    cache = TTLCache("big", ttl=60, max_bytes=4)
+    cache.set("a", b"aaa")
+    cache.set("a", b"too large")
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_hit_miss_bypass_and_expiry():
+    cache = TTLCache("status", ttl=10, stale_ttl=10)
+    assert cache.get_or_fetch("k", lambda: b"1") == (b"1", "MISS")
+    assert cache.get_or_fetch("k", lambda: b"2") == (b"1", "HIT")
+    assert cache.get_or_fetch("k", lambda: b"3", refresh=True) == (b"3", "BYPASS")
+    _age(cache, "k", 25)
+    assert cache.get_or_fetch("k", lambda: b"4") == (b"4", "MISS")
+
+
+def test_stale_while_revalidate_runs_one_background_fetch():
+    cache = TTLCache("swr", ttl=5, stale_ttl=60)
+    cache.set("k", b"old")
+    _age(cache, "k", 10)
+
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return b"new"
+
+    assert cache.get_or_fetch("k", fetch) == (b"old", "STALE")
+    assert cache.get_or_fetch("k", fetch) == (b"old", "STALE")
+    release.set()
+
+    _wait_for(lambda: cache.get("k")["body"] == b"new")
+    _wait_for(lambda: not cache._revalidating)
+    assert len(calls) == 1
+    assert cache.get_or_fetch("k", fetch) == (b"new", "HIT")
+    assert cache.stats()["stale"] == 2
+
+
+def test_failed_revalidation_keeps_stale_value():
+    cache = TTLCache("swr-fail", ttl=5, stale_ttl=60)
+    cache.set("k", b"old")
+    _age(cache, "k", 10)
+
+    def fetch():
+        raise RuntimeError("DIAS down")
+
+    assert cache.get_or_fetch("k", fetch) == (b"old", "STALE")
+    _wait_for(lambda: not cache._revalidating)
+    assert cache.get("k")["body"] == b"old"
+
+
+def test_get_fresh_ignores_stale_entries():
+    cache = TTLCache("fresh", ttl=5, stale_ttl=60)
+    cache.set("k", b"v")
+    assert cache.get_fresh("k")["body"] == b"v"
+    _age(cache, "k", 10)
+    assert cache.get("k") is not None
+    assert cache.get_fresh("k") is None
+    assert cache.get_fresh("missing") is None
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    disk_dir = str(tmp_path)
+    first = TTLCache("products", ttl=60, disk_dir=disk_dir)
+    entry = first.set(("production", "42"), b"body")
+
+    # Cold start in dezelfde container: leeg geheugen, zelfde /tmp.
+    second = TTLCache("products", ttl=60, disk_dir=disk_dir)
+    loaded = second.get(("production", "42"))
+    assert loaded["body"] == b"body"
+    assert loaded["hash"] == entry["hash"]
+    assert abs(loaded["stored_at"] - entry["stored_at"]) < 1
+    assert second.stats()["entries"] == 1
+
+
+def test_invalidate_removes_memory_and_disk(tmp_path):
+    disk_dir = str(tmp_path)
+    cache = TTLCache("products", ttl=60, disk_dir=disk_dir)
+    cache.set("a", b"a")
+    cache.set("b", b"b")
+    (tmp_path / "other-cache.bin").write_bytes(b"x")
+
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert not os.path.exists(cache._disk_path("a"))
+
+    cache.invalidate()
+    assert cache.get("b") is None
+    assert TTLCache("products", ttl=60, disk_dir=disk_dir).get("b") is None
+    # _clear_disk raakt alleen bestanden van deze cache.
+    assert os.listdir(disk_dir) == ["other-cache.bin"]
+    stats = cache.stats()
+    assert (stats["invalidations"], stats["entries"], stats["bytes"]) == (2, 0, 0)
+
+
+# ---- DELETE /api/products ----
+
+
+@pytest.fixture
+def products(load_handler, monkeypatch):
+    module = load_handler("products")
+    cache = TTLCache("products-test", ttl=60)
+    for key in (
+        ("production", "__list__"),
+        ("production", "42"),
+        ("production", "42", "validatieregels"),
+        ("production", "42", "dynamiek"),
+        ("production", "43"),
+        ("acceptance", "__list__"),
+        ("acceptance", "42"),
+    ):
+        cache.set(key, b"{}")
+    monkeypatch.setattr(module, "product_cache", cache)
+    monkeypatch.delenv("BASIC_AUTH_USER", raising=False)
+    monkeypatch.delenv("BASIC_AUTH_PASS", raising=False)
+    return module, cache
+
+
+def _keys(cache):
+    return set(cache._entries)
+
+
+def test_delete_product_invalidates_detail_and_views(products, call_handler):
+    module, cache = products
+    status, _, body = call_handler(module, "DELETE", "/api/products?productId=42")
+
+    assert status == 200
+    assert json.loads(body)["invalidated"] == {"env": "production", "productId": "42"}
+    assert _keys(cache) == {
+        ("production", "__list__"),
+        ("production", "43"),
+        ("acceptance", "__list__"),
+        ("acceptance", "42"),
+    }
+
+
+def test_delete_without_product_invalidates_list(products, call_handler):
+    module, cache = products
+    status, _, _ = call_handler(module, "DELETE", "/api/products?env=acceptance")
+
+    assert status == 200
+    assert ("acceptance", "__list__") not in _keys(cache)
+    assert ("production", "__list__") in _keys(cache)
+    assert len(_keys(cache)) == 6
+
+
+def test_delete_all(products, call_handler):
+    module, cache = products
+    status, _, body = call_handler(module, "DELETE", "/api/products?all=1")
+
+    assert status == 200
+    assert json.loads(body) == {"invalidated": "all"}
+    assert _keys(cache) == set()
+
+
+def test_delete_requires_auth(products, call_handler, monkeypatch):
+    module, cache = products
+    monkeypatch.setenv("BASIC_AUTH_USER", "beheer")
+    monkeypatch.setenv("BASIC_AUTH_PASS", "geheim")
+
+    status, headers, _ = call_handler(module, "DELETE", "/api/products?all=1")
+    assert status == 401 and headers["x-auth-reason"] == "basic"
+    assert len(_keys(cache)) == 7
+
+    auth = "Basic " + base64.b64encode(b"beheer:geheim").decode("ascii")
+    status, _, _ = call_handler(module, "DELETE", "/api/products?all=1", headers={"Authorization": auth})
+    assert status == 200
+    assert _keys(cache) == set()
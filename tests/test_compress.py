@@ -0,0 +1,134 @@
+import gzip
+import os
+import threading
+import zlib
+
+import pytest
+
+import _compress
+from _compress import COMPRESS_MIN_BYTES, StreamEncoder, choose, compress_cached, encode_body, negotiate
+
+
+class FakeBrotli:
+    @staticmethod
+    def compress(body, quality):
+        return b"br:" + body
+
+
+@pytest.fixture(autouse=True)
+def gzip_only(monkeypatch):
+    # Zonder brotli, ook als het pakket toevallig geïnstalleerd is.
+    monkeypatch.setattr(_compress, "_brotli", None)
+    monkeypatch.setattr(_compress, "_brotli_checked", True)
+    monkeypatch.setattr(_compress, "_variants", _compress.OrderedDict())
+    monkeypatch.setattr(_compress, "_variants_bytes", 0)
+    monkeypatch.setattr(_compress, "_stats", {"hits": 0, "misses": 0, "bytesIn": 0, "bytesOut": 0})
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("", None),
+        ("gzip", "gzip"),
+        ("deflate, gzip", "gzip"),
+        ("GZIP ; q=0.8", "gzip"),
+        ("gzip;q=0", None),
+        ("gzip;q=abc", None),
+        ("*", "gzip"),
+        ("*;q=0.5, gzip;q=0", None),
+        ("identity", None),
+        ("br", None),
+    ],
+)
+def test_negotiate_gzip_only(header, expected):
+    assert negotiate({"Accept-Encoding": header} if header is not None else {}) == expected
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br;q=0.5, gzip;q=0.5", "br"),
+        ("*", "br"),
+        ("gzip, br;q=0", "gzip"),
+    ],
+)
+def test_negotiate_prefers_brotli_by_q_value(monkeypatch, header, expected):
+    monkeypatch.setattr(_compress, "_brotli", FakeBrotli)
+    assert negotiate({"Accept-Encoding": header}) == expected
+
+
+def test_choose_respects_min_bytes():
+    headers = {"Accept-Encoding": "gzip"}
+    assert choose(headers, COMPRESS_MIN_BYTES - 1) is None
+    assert choose(headers, COMPRESS_MIN_BYTES) == "gzip"
+    assert choose({}, COMPRESS_MIN_BYTES * 10) is None
+
+
+def test_encode_body():
+    class Handler:
+        headers = {"Accept-Encoding": "gzip"}
+
+    body = b"x" * COMPRESS_MIN_BYTES
+    out, headers = encode_body(Handler, body)
+    assert headers == {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+    assert gzip.decompress(out) == body
+
+    assert encode_body(Handler, b"klein") == (b"klein", {})
+
+
+def test_stream_encoder_output_decompresses():
+    chunks = [os.urandom(1000).hex().encode() for _ in range(50)]
+    encoder = StreamEncoder("gzip")
+    decoder = zlib.decompressobj(31)
+
+    received = b""
+    seen = 0
+    flushed_at_least_once = False
+    for chunk in chunks:
+        received += decoder.decompress(encoder.feed(chunk))
+        seen += len(chunk)
+        if seen >= StreamEncoder.STREAM_FLUSH_BYTES and not flushed_at_least_once:
+            # Na een sync flush kan de browser alles tot nu toe al lezen.
+            assert received == b"".join(chunks)[: len(received)]
+            assert len(received) >= StreamEncoder.STREAM_FLUSH_BYTES
+            flushed_at_least_once = True
+    received += decoder.decompress(encoder.close()) + decoder.flush()
+
+    assert flushed_at_least_once
+    assert received == b"".join(chunks)
+    assert encoder.feed(b"") == b""
+
+
+def test_compress_cached_reuses_variants():
+    body = b"y" * 5000
+    first = compress_cached(body, "gzip", '"p-1-gz"')
+    assert compress_cached(body, "gzip", '"p-1-gz"') is first
+    assert gzip.decompress(first) == body
+
+    stats = _compress.compress_stats()
+    assert (stats["hits"], stats["misses"], stats["variants"]) == (1, 1, 1)
+    assert (stats["bytesIn"], stats["bytesOut"]) == (5000, len(first))
+
+
+def test_stats_are_consistent_under_concurrency():
+    body = b"z" * 2000
+    barrier = threading.Barrier(8)
+
+    def work(n):
+        barrier.wait()
+        for i in range(25):
+            compress_cached(body, "gzip", f'"p-{i % 5}"')
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    stats = _compress.compress_stats()
+    assert stats["hits"] + stats["misses"] == 200
+    assert stats["bytesIn"] == stats["misses"] * len(body)
+    assert stats["variants"] == 5
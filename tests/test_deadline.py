@@ -0,0 +1,177 @@
+import json
+import time
+
+import httpx
+import pytest
+
+import _deadline
+import _timing
+from _deadline import (
+    DEADLINE_MARGIN,
+    Deadline,
+    DeadlineExceeded,
+    check,
+    clip_timeout,
+    current_deadline,
+    end_deadline,
+    function_budget,
+    guard,
+    remaining,
+    start_deadline,
+)
+from _timing import RequestTimer, timed
+
+
+@pytest.fixture
+def vercel_json(monkeypatch, tmp_path):
+    path = tmp_path / "vercel.json"
+    path.write_text(
+        json.dumps(
+            {
+                "functions": {
+                    "api/products.py": {"maxDuration": 60, "memory": 1024},
+                    "api/explain-rule.py": {"maxDuration": 30},
+                    "api/**/*.py": {"maxDuration": 10},
+                    "api/health.py": {"memory": 128},
+                }
+            }
+        )
+    )
+    monkeypatch.setattr(_deadline, "VERCEL_JSON", str(path))
+    monkeypatch.setattr(_deadline, "FUNCTION_MAX_DURATION", None)
+    monkeypatch.setattr(_deadline, "_budgets", None)
+    return path
+
+
+@pytest.fixture
+def deadline():
+    tokens = []
+
+    def start(seconds_left, timer=None):
+        value = Deadline(DEADLINE_MARGIN + seconds_left, timer=timer)
+        tokens.append(_deadline._current.set(value))
+        return value
+
+    yield start
+    for token in reversed(tokens):
+        _deadline._current.reset(token)
+
+
+def test_function_budget_from_vercel_json(vercel_json):
+    assert function_budget("products") == 60
+    assert function_budget("explain-rule") == 30
+    # Zonder eigen maxDuration: de glob, als die er is.
+    assert function_budget("health") == 10
+    assert function_budget("metrics") == 10
+
+
+def test_function_budget_env_override_and_missing_file(vercel_json, monkeypatch, tmp_path):
+    monkeypatch.setattr(_deadline, "FUNCTION_MAX_DURATION", "12")
+    assert function_budget("products") == 12
+
+    monkeypatch.setattr(_deadline, "FUNCTION_MAX_DURATION", None)
+    monkeypatch.setattr(_deadline, "VERCEL_JSON", str(tmp_path / "bestaat-niet.json"))
+    monkeypatch.setattr(_deadline, "_budgets", None)
+    assert function_budget("products") is None
+    assert start_deadline("products") is None
+    assert current_deadline() is None and remaining() is None
+
+
+def test_repo_vercel_json_gives_a_budget_per_function(monkeypatch):
+    monkeypatch.setattr(_deadline, "FUNCTION_MAX_DURATION", None)
+    monkeypatch.setattr(_deadline, "_budgets", None)
+    with open(_deadline.VERCEL_JSON, "r", encoding="utf-8") as fh:
+        functions = json.load(fh)["functions"]
+    for path, settings in functions.items():
+        if "*" not in path and settings.get("maxDuration"):
+            endpoint = path[len("api/"):-len(".py")]
+            assert function_budget(endpoint) == settings["maxDuration"]
+
+
+def test_start_deadline_subtracts_the_margin(vercel_json):
+    timer = RequestTimer("products", "GET", "production")
+    token = start_deadline("products", timer)
+    try:
+        deadline = current_deadline()
+        assert deadline.budget == 60 - DEADLINE_MARGIN
+        assert deadline.started == timer.started
+        assert 0 < remaining() <= 60 - DEADLINE_MARGIN
+    finally:
+        end_deadline(token)
+    assert current_deadline() is None
+
+
+def test_clip_timeout_without_deadline_is_unchanged():
+    timeout = httpx.Timeout(5.0)
+    assert clip_timeout(30.0, "upstream") == 30.0
+    assert clip_timeout(timeout, "upstream") is timeout
+
+
+def test_clip_timeout_never_exceeds_the_time_left(deadline):
+    deadline(2.0)
+    assert clip_timeout(30.0, "upstream") <= 2.0
+    assert clip_timeout(0.5, "upstream") == 0.5
+
+    clipped = clip_timeout(httpx.Timeout(30.0, connect=1.0, pool=None), "upstream")
+    assert clipped.connect == 1.0
+    assert clipped.read <= 2.0 and clipped.write <= 2.0
+    # Geen limiet (None) wordt de resterende tijd.
+    assert clipped.pool is not None and clipped.pool <= 2.0
+
+
+def test_clip_timeout_raises_when_time_is_up(deadline):
+    deadline(-0.01)
+    with pytest.raises(DeadlineExceeded) as info:
+        clip_timeout(30.0, "token")
+    assert info.value.phase == "token"
+    with pytest.raises(DeadlineExceeded):
+        check("upstream")
+
+
+def test_guard_turns_a_timeout_at_the_deadline_into_deadline_exceeded(deadline):
+    deadline(0.05)
+    with pytest.raises(DeadlineExceeded) as info:
+        with guard("upstream"):
+            raise httpx.ReadTimeout("read timeout")
+    assert info.value.phase == "upstream"
+    assert isinstance(info.value.__cause__, httpx.ReadTimeout)
+
+
+def test_guard_keeps_other_timeouts(deadline):
+    with pytest.raises(httpx.ReadTimeout):
+        with guard("upstream"):
+            raise httpx.ReadTimeout("zonder deadline")
+
+    deadline(10.0)
+    with pytest.raises(httpx.ReadTimeout):
+        with guard("upstream"):
+            raise httpx.ReadTimeout("ruim binnen de deadline")
+    with pytest.raises(ValueError):
+        with guard("upstream"):
+            raise ValueError("geen timeout")
+
+
+def test_payload_is_the_504_body(deadline):
+    timer = RequestTimer("products", "GET", "production")
+    value = deadline(0.2, timer=timer)
+    # Zoals @instrument: de timer als huidige timer zetten.
+    token = _timing._current.set(timer)
+    try:
+        with timed("token"):
+            time.sleep(0.01)
+    finally:
+        _timing._current.reset(token)
+
+    payload = DeadlineExceeded(value, "upstream").payload()
+    assert payload["error"] == "Gateway Timeout"
+    assert payload["phase"] == "upstream"
+    assert payload["budgetMs"] == 200
+    assert payload["elapsedMs"] >= 10
+    assert "upstream" in payload["message"]
+    assert payload["phases"]["token"] >= 10
+
+
+def test_payload_without_timer():
+    payload = DeadlineExceeded(Deadline(DEADLINE_MARGIN + 1), "llm").payload()
+    assert set(payload) == {"error", "message", "phase", "budgetMs", "elapsedMs"}
+
@@ -0,0 +1,151 @@
+import json
+
+import pytest
+
+from _deadline import DEADLINE_MARGIN, Deadline, DeadlineExceeded
+from _envdiff import MAX_FIELD_DIFFS, diff_records, field_diff, normalize_record
+
+
+def rule(regel_id, extern, omschrijving, expressie):
+    return {"RegelId": regel_id, "ExternNummer": extern, "Omschrijving": omschrijving, "Expressie": expressie}
+
+
+def test_same_content_with_other_ids_is_unchanged():
+    base = [rule(1, "A1", "Merk", "//Merk = 'BMW'"), rule(2, "A2", "Jaar", "//Bouwjaar > 1990")]
+    target = [rule(17, "A2", "Jaar", "//Bouwjaar  >  1990"), rule(18, "A1", "Merk", " //Merk = 'BMW' ")]
+    result = diff_records(base, target)
+    assert result["unchanged"] == 2
+    assert (result["added"], result["removed"], result["changed"]) == ([], [], [])
+    assert (result["baseCount"], result["targetCount"]) == (2, 2)
+
+
+def test_whitespace_inside_string_literals_counts():
+    result = diff_records([rule(1, "A1", "Merk", "//Merk = 'B MW'")], [rule(1, "A1", "Merk", "//Merk = 'BMW'")])
+    assert result["unchanged"] == 0
+    assert result["changed"][0]["fields"] == [{"path": "Expressie", "base": "//Merk = 'B MW'", "target": "//Merk = 'BMW'"}]
+
+
+def test_changed_added_and_removed():
+    base = [rule(1, "A1", "Merk", "//Merk = 'BMW'"), rule(2, "A2", "Jaar", "//Bouwjaar > 1990")]
+    target = [rule(5, "A1", "Merk", "//Merk = 'Audi'"), rule(6, "A3", "Regio", "//Regio = 'Noord'")]
+    result = diff_records(base, target)
+    assert result["unchanged"] == 0
+    assert [change["key"] for change in result["changed"]] == ["extern:a1"]
+    change = result["changed"][0]
+    assert change["base"]["regelId"] == 1 and change["target"]["regelId"] == 5
+    assert change["fields"] == [{"path": "Expressie", "base": "//Merk = 'BMW'", "target": "//Merk = 'Audi'"}]
+    assert [item["externNummer"] for item in result["added"]] == ["A3"]
+    assert [item["externNummer"] for item in result["removed"]] == ["A2"]
+
+
+def test_identity_falls_back_to_omschrijving():
+    base = [rule(1, "", "Leeftijd  bestuurder", "//Leeftijd < 18")]
+    target = [rule(2, "", "leeftijd bestuurder", "//Leeftijd < 21")]
+    result = diff_records(base, target)
+    assert [change["key"] for change in result["changed"]] == ["omschrijving:leeftijd bestuurder"]
+
+
+def test_duplicates_are_matched_as_multiset():
+    same = rule(1, "A1", "Merk", "//Merk = 'BMW'")
+    result = diff_records([same, same], [same])
+    assert result["unchanged"] == 1
+    assert len(result["removed"]) == 1
+
+
+def test_custom_identity_and_summary():
+    base = [{"ProductId": 1, "Omschrijving": "Auto", "Validatieregels": [{"Expressie": "a"}]}]
+    target = [{"ProductId": 1, "Omschrijving": "Auto", "Validatieregels": [{"Expressie": "b"}]}]
+    result = diff_records(
+        base,
+        target,
+        lambda item: f"product:{item['ProductId']}",
+        lambda item: {"productId": item["ProductId"]},
+    )
+    assert result["changed"][0]["key"] == "product:1"
+    assert result["changed"][0]["fields"] == [{"path": "Validatieregels[0].Expressie", "base": "a", "target": "b"}]
+
+
+def test_normalize_record_drops_volatile_fields():
+    assert normalize_record({"RegelId": 1, "Rekenregels": [{"RekenregelId": 3, "Operator": " Gelijk "}]}) == {
+        "Rekenregels": [{"Operator": "Gelijk"}]
+    }
+
+
+def test_field_diff_lists_and_limit():
+    assert field_diff([1, 2], [1]) == [{"path": "[1]", "base": 2, "target": None}]
+    assert field_diff({"a": 1}, {"b": 1}) == [
+        {"path": "a", "base": 1, "target": None},
+        {"path": "b", "base": None, "target": 1},
+    ]
+    many = field_diff(list(range(200)), list(range(1, 201)))
+    assert len(many) == MAX_FIELD_DIFFS
+
+
+@pytest.fixture
+def env_diff(load_handler, monkeypatch):
+    module = load_handler("env-diff")
+    fetched = []
+
+    def fetch_product_detail(config, token, product_id):
+        fetched.append((config["env"], product_id))
+        return {"Validatieregels": [{"Expressie": f"{config['env']}-{product_id}" if product_id == 1 else "x"}]}
+
+    monkeypatch.setattr(module, "get_product_env_config", lambda env_key: {"env": env_key})
+    monkeypatch.setattr(module, "get_bearer_token", lambda config: "token")
+    monkeypatch.setattr(module, "fetch_product_detail", fetch_product_detail)
+    return module, fetched
+
+
+def _products(*ids):
+    return [{"ProductId": product_id, "Omschrijving": f"Product {product_id}"} for product_id in ids]
+
+
+def test_product_details_are_merged(env_diff):
+    module, fetched = env_diff
+    loaded = {"production": _products(1, 2, 3), "acceptance": _products(1, 2)}
+    merged, errors, skipped = module.load_product_details(loaded, "production", "acceptance")
+
+    assert errors == [] and skipped == []
+    assert len(fetched) == 4
+    assert merged["production"][0]["Validatieregels"] == [{"Expressie": "production-1"}]
+    assert merged["production"][2] == {"ProductId": 3, "Omschrijving": "Product 3"}
+
+
+def test_product_details_are_capped(env_diff, monkeypatch):
+    module, fetched = env_diff
+    monkeypatch.setattr(module, "ENV_DIFF_MAX_PRODUCT_DETAILS", 2)
+    loaded = {"production": _products(1, 2, 3), "acceptance": _products(1, 2, 3)}
+    merged, errors, skipped = module.load_product_details(loaded, "production", "acceptance")
+
+    assert errors == []
+    assert skipped == [{"productId": 3, "omschrijving": "Product 3"}]
+    assert sorted(product_id for _, product_id in fetched) == [1, 1, 2, 2]
+    assert "Validatieregels" not in merged["production"][2]
+
+
+def test_product_details_are_skipped_when_time_is_short(env_diff, monkeypatch):
+    module, fetched = env_diff
+    monkeypatch.setattr(module, "remaining", lambda: module.ENV_DIFF_DETAIL_MIN_SECONDS / 2)
+    loaded = {"production": _products(1, 2), "acceptance": _products(1, 2)}
+    merged, errors, skipped = module.load_product_details(loaded, "production", "acceptance")
+
+    assert fetched == [] and errors == []
+    assert [item["productId"] for item in skipped] == [1, 2]
+    assert merged == loaded
+
+
+def test_deadline_gives_504(env_diff, call_handler, monkeypatch):
+    module, _ = env_diff
+    deadline = Deadline(DEADLINE_MARGIN + 1)
+
+    def compare_environments(*args):
+        raise DeadlineExceeded(deadline, "acceptance")
+
+    monkeypatch.setattr(module, "compare_environments", compare_environments)
+    monkeypatch.delenv("BASIC_AUTH_USER", raising=False)
+    monkeypatch.delenv("BASIC_AUTH_PASS", raising=False)
+    status, _, body = call_handler(module, "GET", "/api/env-diff")
+
+    assert status == 504
+    payload = json.loads(body)
+    assert (payload["error"], payload["phase"], payload["budgetMs"]) == ("Gateway Timeout", "acceptance", 1000)
@@ -0,0 +1,125 @@
+import gzip
+import io
+
+import pytest
+
+from _compress import COMPRESS_MIN_BYTES
+from _etag import etag_for, etag_matches, make_etag, send_cacheable
+
+SMALL = b'{"products": []}'
+LARGE = b'{"products": [' + b'{"ProductId": 1, "Omschrijving": "Auto"},' * COMPRESS_MIN_BYTES + b"{}]}"
+
+
+class Recorder:
+    """Net genoeg van BaseHTTPRequestHandler voor send_cacheable."""
+
+    def __init__(self, headers=None, command="GET"):
+        self.headers = headers or {}
+        self.command = command
+        self.status = None
+        self.sent = {}
+        self.wfile = io.BytesIO()
+
+    def send_response(self, code):
+        self.status = code
+
+    def send_header(self, name, value):
+        self.sent[name] = value
+
+    def end_headers(self):
+        pass
+
+
+def _send(body, etag, headers=None, command="GET", extra=None):
+    handler = Recorder(headers, command)
+    send_cacheable(handler, body, etag, extra)
+    return handler
+
+
+def test_etag_is_per_environment_and_content():
+    assert etag_for(SMALL, "production") != etag_for(SMALL, "acceptance")
+    assert etag_for(SMALL, "production") != etag_for(LARGE, "production")
+    assert etag_for(SMALL, None) == etag_for(SMALL, "production")
+    assert make_etag("ab" * 32, "acceptance") == '"a-' + "ab" * 20 + '"'
+
+
+@pytest.mark.parametrize(
+    "header, matches",
+    [
+        ('"p-1"', True),
+        ('W/"p-1"', True),
+        ('"x", "p-1"', True),
+        ("*", True),
+        ('"p-2"', False),
+        ('"p-1-gz"', False),
+        ("", False),
+    ],
+)
+def test_etag_matches(header, matches):
+    assert etag_matches({"If-None-Match": header}, '"p-1"') is matches
+
+
+def test_200_has_etag_and_cache_headers():
+    etag = etag_for(SMALL, "production")
+    handler = _send(SMALL, etag, extra={"Content-Type": "application/json", "X-Cache": "HIT"})
+
+    assert handler.status == 200
+    assert handler.wfile.getvalue() == SMALL
+    assert handler.sent["ETag"] == etag
+    assert handler.sent["Cache-Control"] == "private, no-cache"
+    assert handler.sent["Vary"] == "Authorization, Accept-Encoding"
+    assert handler.sent["Content-Length"] == str(len(SMALL))
+    assert (handler.sent["Content-Type"], handler.sent["X-Cache"]) == ("application/json", "HIT")
+    assert "Content-Encoding" not in handler.sent
+
+
+def test_304_on_matching_if_none_match():
+    etag = etag_for(SMALL, "production")
+    handler = _send(
+        SMALL,
+        etag,
+        headers={"If-None-Match": f"W/{etag}"},
+        extra={"Content-Type": "application/json", "X-Cache": "STALE"},
+    )
+
+    assert handler.status == 304
+    assert handler.wfile.getvalue() == b""
+    assert handler.sent == {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization, Accept-Encoding",
+        "X-Cache": "STALE",
+    }
+
+
+def test_gzip_variant_has_its_own_etag():
+    etag = etag_for(LARGE, "production")
+    handler = _send(LARGE, etag, headers={"Accept-Encoding": "gzip, deflate"})
+
+    gz_etag = etag[:-1] + '-gz"'
+    assert handler.status == 200
+    assert handler.sent["ETag"] == gz_etag
+    assert handler.sent["Content-Encoding"] == "gzip"
+    assert gzip.decompress(handler.wfile.getvalue()) == LARGE
+    assert handler.sent["Content-Length"] == str(len(handler.wfile.getvalue()))
+
+    # De identity-ETag valideert de gzip-variant niet, en andersom.
+    assert _send(LARGE, etag, headers={"Accept-Encoding": "gzip", "If-None-Match": etag}).status == 200
+    assert _send(LARGE, etag, headers={"Accept-Encoding": "gzip", "If-None-Match": gz_etag}).status == 304
+    assert _send(LARGE, etag, headers={"If-None-Match": gz_etag}).status == 200
+
+
+def test_small_bodies_keep_the_plain_etag():
+    etag = etag_for(SMALL, "production")
+    handler = _send(SMALL, etag, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert handler.status == 304
+
+
+def test_head_sends_headers_without_body():
+    etag = etag_for(LARGE, "production")
+    handler = _send(LARGE, etag, headers={"Accept-Encoding": "gzip"}, command="HEAD")
+
+    assert handler.status == 200
+    assert handler.wfile.getvalue() == b""
+    assert handler.sent["ETag"].endswith('-gz"')
+    assert int(handler.sent["Content-Length"]) < len(LARGE)
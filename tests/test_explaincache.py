@@ -0,0 +1,119 @@
+import sqlite3
+import time
+
+import pytest
+
+from _explaincache import ExplainCache, cache_key, normalize_expression
+
+
+def test_normalize_collapses_whitespace_outside_literals():
+    assert normalize_expression("  //Merk   =\n\t'BMW' ") == "//Merk = 'BMW'"
+    assert normalize_expression("//Omschrijving = 'twee  spaties'") == "//Omschrijving = 'twee  spaties'"
+    assert normalize_expression('//a = "x\n y"  or //b') == '//a = "x\n y" or //b'
+    assert normalize_expression("//a = \"it's\"  and  'say \"hi\"'") == "//a = \"it's\" and 'say \"hi\"'"
+
+
+def test_cache_key_ignores_layout_but_not_literals():
+    assert cache_key("//Merk='BMW'", "m", "1") != cache_key("//Merk = 'BMW'", "m", "1")
+    assert cache_key("//Merk = 'BMW'", "m", "1") == cache_key(" //Merk  =  'BMW'\n", "m", "1")
+    assert cache_key("//Merk = 'BMW'", "m", "1") != cache_key("//Merk = 'BMW '", "m", "1")
+
+
+def test_cache_key_includes_model_and_prompt_version():
+    base = cache_key("//Merk", "gpt-a", "1")
+    assert base != cache_key("//Merk", "gpt-b", "1")
+    assert base != cache_key("//Merk", "gpt-a", "2")
+    assert base == cache_key("//Merk", "gpt-a", 1)
+
+
+def test_memory_tier_without_db():
+    cache = ExplainCache(ttl=60, max_bytes=1024)
+    assert cache.get("//Merk", "m", "1") == (None, "MISS")
+    cache.set("//Merk", "m", "1", "Uitleg")
+    cache.set("//Leeg", "m", "1", "")
+
+    assert cache.get(" //Merk ", "m", "1") == ("Uitleg", "HIT")
+    assert cache.get("//Merk", "m", "2") == (None, "MISS")
+    assert cache.get("//Leeg", "m", "1") == (None, "MISS")
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["stores"]) == (1, 3, 1)
+    assert stats["hit_ratio"] == 0.25
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "explain" / "cache.sqlite3")
+
+
+def test_sqlite_tier_survives_a_cold_start(db_path):
+    ExplainCache(ttl=60, max_bytes=1024, db_path=db_path).set("//Merk = 'BMW'", "m", "1", "Uitleg")
+
+    cold = ExplainCache(ttl=60, max_bytes=1024, db_path=db_path)
+    assert cold.get("//Merk  = 'BMW'", "m", "1") == ("Uitleg", "HIT")
+    assert cold.get("//Merk = 'BMW'", "m", "2") == (None, "MISS")
+    # Na een DB-hit staat de uitleg ook in het geheugen.
+    assert cold.get("//Merk = 'BMW'", "m", "1") == ("Uitleg", "HIT")
+    stats = cold.stats()
+    assert (stats["db_hits"], stats["memory_hits"], stats["db_errors"]) == (1, 1, 0)
+
+
+def test_sqlite_tier_drops_expired_rows(db_path):
+    ExplainCache(ttl=60, max_bytes=1024, db_path=db_path).set("//Merk", "m", "1", "Uitleg")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE explanations SET created_at = ?", (time.time() - 120,))
+
+    cold = ExplainCache(ttl=60, max_bytes=1024, db_path=db_path)
+    assert cold.get("//Merk", "m", "1") == (None, "MISS")
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0] == 0
+
+
+def test_prune_keeps_most_recently_used(db_path):
+    cache = ExplainCache(ttl=60, max_bytes=1024, db_path=db_path, db_max_entries=2)
+    for n in range(3):
+        cache.set(f"//Regel{n}", "m", "1", f"Uitleg {n}")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE explanations SET created_at = ?, last_used = ?", (time.time() - 120, time.time()))
+        conn.execute(
+            "UPDATE explanations SET created_at = ? WHERE key = ?",
+            (time.time(), cache_key("//Regel1", "m", "1")),
+        )
+
+    # Prune draait bij de 1e, 51e, ... write: eerst verlopen, dan boven het maximum.
+    cache._writes = 50
+    cache.set("//Regel3", "m", "1", "Uitleg 3")
+
+    with sqlite3.connect(db_path) as conn:
+        keys = {row[0] for row in conn.execute("SELECT key FROM explanations")}
+    assert keys == {cache_key("//Regel1", "m", "1"), cache_key("//Regel3", "m", "1")}
+    assert cache.stats()["db_pruned"] == 2
+
+
+def test_prune_limits_entries_by_last_used(db_path):
+    cache = ExplainCache(ttl=60, max_bytes=1024, db_path=db_path, db_max_entries=2)
+    for n in range(3):
+        cache.set(f"//Regel{n}", "m", "1", f"Uitleg {n}")
+    now = time.time()
+    with sqlite3.connect(db_path) as conn:
+        for n, age in ((0, 30), (1, 10), (2, 20)):
+            conn.execute(
+                "UPDATE explanations SET last_used = ? WHERE key = ?",
+                (now - age, cache_key(f"//Regel{n}", "m", "1")),
+            )
+
+    cache._writes = 50
+    cache.set("//Regel3", "m", "1", "Uitleg 3")
+
+    with sqlite3.connect(db_path) as conn:
+        keys = {row[0] for row in conn.execute("SELECT key FROM explanations")}
+    assert keys == {cache_key("//Regel1", "m", "1"), cache_key("//Regel3", "m", "1")}
+
+
+def test_unusable_db_falls_back_to_memory(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("geen map")
+    cache = ExplainCache(ttl=60, max_bytes=1024, db_path=str(blocker / "cache.sqlite3"))
+
+    cache.set("//Merk", "m", "1", "Uitleg")
+    assert cache.get("//Merk", "m", "1") == ("Uitleg", "HIT")
+    assert cache.stats()["db_errors"] == 1
@@ -0,0 +1,56 @@
+import json
+
+import httpx
+import pytest
+
+from _explaincache import ExplainCache
+
+SSE_BODY = (
+    'event: response.output_text.delta\ndata: {"type": "response.output_text.delta", "delta": "- Merk"}\n\n'
+    'event: response.completed\ndata: {"type": "response.completed", "response": {"status": "completed"}}\n\n'
+)
+
+
+@pytest.fixture
+def explain_rule(load_handler, monkeypatch):
+    module = load_handler("explain-rule")
+    calls = []
+
+    def respond(request):
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=SSE_BODY.encode())
+
+    monkeypatch.setattr(module, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(module, "_llm_client", httpx.Client(transport=httpx.MockTransport(respond)))
+    monkeypatch.setattr(module, "explain_cache", ExplainCache(ttl=60, max_bytes=1024))
+    monkeypatch.delenv("BASIC_AUTH_USER", raising=False)
+    monkeypatch.delenv("BASIC_AUTH_PASS", raising=False)
+    return module, calls
+
+
+def _post(call_handler, module, body):
+    return call_handler(module, "POST", "/api/explain-rule", body=json.dumps(body).encode())
+
+
+def test_stream_sends_cache_status_and_caches_text(explain_rule, call_handler):
+    module, calls = explain_rule
+    body = {"expression": "//Merk", "engine": "llm", "stream": True}
+    status, headers, payload = _post(call_handler, module, body)
+
+    assert status == 200
+    assert headers["content-type"].startswith("text/event-stream")
+    assert headers["x-cache"] == "MISS"
+    assert b'"explanation": "- Merk"' in payload
+    assert calls[0]["stream"] is True
+
+    status, headers, payload = _post(call_handler, module, body)
+    assert headers["x-cache"] == "HIT" and len(calls) == 1
+
+
+def test_stream_without_cache_status_has_no_x_cache_header(explain_rule, call_handler, monkeypatch):
+    module, _ = explain_rule
+    monkeypatch.setattr(module.explain_cache, "get", lambda *args: (None, None))
+
+    status, headers, _ = _post(call_handler, module, {"expression": "//Merk", "engine": "llm", "stream": True})
+    assert status == 200
+    assert "x-cache" not in headers
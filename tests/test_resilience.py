@@ -0,0 +1,213 @@
+import time
+
+import httpx
+import pytest
+
+import _deadline
+import _resilience
+from _deadline import DEADLINE_MARGIN, Deadline, DeadlineExceeded
+from _resilience import CircuitBreaker, breaker, resilient_get, resilient_stream
+
+ENV = "resilience-test"
+URL = "https://dias.test/api/rules"
+
+
+@pytest.fixture
+def dias(monkeypatch):
+    """Stub transport: 'responses' is een lijst van responses of excepties, één per call."""
+    calls = []
+    responses = []
+
+    def handle(request):
+        calls.append(request)
+        outcome = responses.pop(0) if responses else httpx.Response(200, json={"ok": True})
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(_resilience, "_breakers", {})
+    monkeypatch.setattr(
+        _resilience, "_stats", {"retries": 0, "hedged": 0, "hedgeWins": 0, "breakerRejects": 0, "deadlineExceeded": 0}
+    )
+    monkeypatch.setattr(_resilience, "UPSTREAM_RETRIES", 2)
+    monkeypatch.setattr(_resilience, "UPSTREAM_RETRY_BASE", 0.001)
+    monkeypatch.setattr(_resilience, "UPSTREAM_RETRY_CAP", 0.05)
+    client = httpx.Client(transport=httpx.MockTransport(handle))
+    return client, calls, responses
+
+
+@pytest.fixture
+def deadline():
+    tokens = []
+
+    def start(seconds_left):
+        value = Deadline(DEADLINE_MARGIN + seconds_left)
+        tokens.append(_deadline._current.set(value))
+        return value
+
+    yield start
+    for token in reversed(tokens):
+        _deadline._current.reset(token)
+
+
+@pytest.mark.parametrize("status", [429, 502, 503, 504])
+def test_retries_on_retryable_status(dias, status):
+    client, calls, responses = dias
+    responses.append(httpx.Response(status))
+
+    response = resilient_get(client, ENV, URL)
+    assert response.status_code == 200
+    assert len(calls) == 2
+    assert _resilience.resilience_stats()["retries"] == 1
+
+
+@pytest.mark.parametrize("status", [400, 404, 500])
+def test_no_retry_on_other_status(dias, status):
+    client, calls, responses = dias
+    responses.append(httpx.Response(status))
+
+    assert resilient_get(client, ENV, URL).status_code == status
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize(
+    "error", [httpx.ConnectError("geweigerd"), httpx.ReadTimeout("timeout"), httpx.RemoteProtocolError("weg")]
+)
+def test_retries_on_transport_errors(dias, error):
+    client, calls, responses = dias
+    responses.append(error)
+
+    assert resilient_get(client, ENV, URL).status_code == 200
+    assert len(calls) == 2
+
+
+def test_gives_up_after_the_last_retry(dias, monkeypatch):
+    client, calls, responses = dias
+    monkeypatch.setattr(_resilience, "BREAKER_THRESHOLD", 10)
+    responses.extend([httpx.Response(503)] * 3)
+    assert resilient_get(client, ENV, URL).status_code == 503
+    assert len(calls) == 3
+
+    responses.extend([httpx.ConnectError("geweigerd")] * 3)
+    with pytest.raises(httpx.ConnectError):
+        resilient_get(client, ENV, URL)
+    assert len(calls) == 6
+
+
+def test_retry_after_is_honoured_up_to_the_cap(dias):
+    client, calls, responses = dias
+    responses.append(httpx.Response(429, headers={"Retry-After": "0.02"}))
+    started = time.monotonic()
+    assert resilient_get(client, ENV, URL).status_code == 200
+    assert time.monotonic() - started >= 0.02
+    assert len(calls) == 2
+
+    # Retry-After boven UPSTREAM_RETRY_CAP: niet wachten, de 429 teruggeven.
+    responses.append(httpx.Response(429, headers={"Retry-After": "120"}))
+    assert resilient_get(client, ENV, URL).status_code == 429
+    assert len(calls) == 3
+
+
+def test_no_retry_when_the_deadline_is_close(dias, deadline):
+    client, calls, responses = dias
+    deadline(0.5)
+    responses.append(httpx.Response(503))
+    assert resilient_get(client, ENV, URL).status_code == 503
+    assert len(calls) == 1
+
+
+def test_expired_deadline_raises_before_sending(dias, deadline):
+    client, calls, _ = dias
+    deadline(-1)
+    with pytest.raises(DeadlineExceeded):
+        resilient_get(client, ENV, URL)
+    assert calls == []
+    assert _resilience.resilience_stats()["deadlineExceeded"] == 1
+
+
+def test_breaker_opens_and_half_open_probe_closes_it(dias, monkeypatch):
+    client, calls, responses = dias
+    monkeypatch.setattr(_resilience, "UPSTREAM_RETRIES", 0)
+    monkeypatch.setattr(_resilience, "BREAKER_THRESHOLD", 2)
+    monkeypatch.setattr(_resilience, "BREAKER_COOLDOWN", 0.05)
+
+    responses.extend([httpx.Response(502), httpx.Response(502)])
+    resilient_get(client, ENV, URL)
+    resilient_get(client, ENV, URL)
+    assert breaker(ENV).snapshot() == {"state": "open", "failures": 2}
+
+    with pytest.raises(httpx.HTTPStatusError) as info:
+        resilient_get(client, ENV, URL)
+    assert info.value.response.status_code == 503
+    assert "Retry-After" in info.value.response.headers
+    assert len(calls) == 2
+    assert _resilience.resilience_stats()["breakerRejects"] == 1
+
+    time.sleep(0.06)
+    assert resilient_get(client, ENV, URL).status_code == 200
+    assert breaker(ENV).snapshot() == {"state": "closed", "failures": 0}
+
+
+def test_failed_half_open_probe_reopens(dias, monkeypatch):
+    client, calls, responses = dias
+    monkeypatch.setattr(_resilience, "UPSTREAM_RETRIES", 0)
+    monkeypatch.setattr(_resilience, "BREAKER_THRESHOLD", 1)
+    monkeypatch.setattr(_resilience, "BREAKER_COOLDOWN", 0.05)
+
+    responses.append(httpx.ConnectError("geweigerd"))
+    with pytest.raises(httpx.ConnectError):
+        resilient_get(client, ENV, URL)
+    time.sleep(0.06)
+
+    responses.append(httpx.Response(503))
+    assert resilient_get(client, ENV, URL).status_code == 503
+    assert breaker(ENV).snapshot()["state"] == "open"
+    with pytest.raises(httpx.HTTPStatusError):
+        resilient_get(client, ENV, URL)
+    assert len(calls) == 2
+
+
+def test_half_open_allows_a_single_probe(monkeypatch):
+    monkeypatch.setattr(_resilience, "BREAKER_THRESHOLD", 1)
+    monkeypatch.setattr(_resilience, "BREAKER_COOLDOWN", 0)
+    cb = CircuitBreaker(ENV)
+    cb.record(False)
+    assert cb.state == "open"
+
+    assert cb.allow() is True
+    assert cb.state == "half-open"
+    assert cb.allow() is False
+    # Probe zonder uitkomst (bijv. een bug in de caller): volgende mag proberen.
+    cb.release()
+    assert cb.allow() is True
+    cb.record(True)
+    assert cb.allow() is True and cb.state == "closed"
+
+
+class BrokenStream(httpx.SyncByteStream):
+    def __iter__(self):
+        yield b'{"Data": ['
+        raise httpx.ReadError("verbinding verbroken")
+
+
+def test_stream_retries_until_headers(dias):
+    client, calls, responses = dias
+    responses.extend([httpx.Response(503, text="bezet"), httpx.ConnectError("geweigerd")])
+
+    with resilient_stream(client, ENV, URL) as response:
+        assert response.status_code == 200
+        assert response.read() and response.json() == {"ok": True}
+    assert len(calls) == 3
+    assert response.is_closed
+
+
+def test_stream_does_not_retry_after_headers(dias):
+    client, calls, responses = dias
+    responses.append(httpx.Response(200, stream=BrokenStream()))
+
+    with pytest.raises(httpx.ReadError):
+        with resilient_stream(client, ENV, URL) as response:
+            for _ in response.iter_bytes():
+                pass
+    assert len(calls) == 1
+    assert _resilience.resilience_stats()["retries"] == 0
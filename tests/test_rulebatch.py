@@ -0,0 +1,91 @@
+import importlib.util
+import os
+
+import pytest
+
+from _rulevalidate import RuleValidationError
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+
+
+def _load_handler_module(name):
+    # Handler bestanden hebben een koppelteken in de naam; laden zoals Vercel.
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), os.path.join(API_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+rule_batch = _load_handler_module("rule-batch")
+
+
+def test_validate_create_update_delete():
+    create = rule_batch.validate_operation(
+        {
+            "kind": "acceptance",
+            "action": "create",
+            "payload": {"AfdBrancheCodeId": 1, "Omschrijving": "Merk", "Expressie": "//Merk = 'BMW'"},
+        }
+    )
+    assert create["action"] == "create" and "RegelId" not in create["payload"]
+
+    update = rule_batch.validate_operation(
+        {"kind": "dynamiek", "action": "update", "payload": {"RegelId": 5, "Omschrijving": "Korting"}}
+    )
+    assert update["payload"]["RegelId"] == 5
+
+    delete = rule_batch.validate_operation({"kind": "acceptance", "action": "delete", "payload": {"RegelId": " 9 "}})
+    assert delete == {"kind": "acceptance", "action": "delete", "regelId": "9"}
+
+
+@pytest.mark.parametrize(
+    "operation, message",
+    [
+        ([], "Operation must be an object"),
+        ({"kind": "x", "action": "create"}, "kind must be one of"),
+        ({"kind": "acceptance", "action": "upsert"}, "action must be one of"),
+        ({"kind": "acceptance", "action": "delete"}, "regelId is required"),
+        (
+            {"kind": "acceptance", "action": "create", "payload": {"RegelId": 1, "Omschrijving": "a", "Expressie": "a"}},
+            "RegelId is not allowed for create",
+        ),
+        ({"kind": "dynamiek", "action": "update", "payload": {"Omschrijving": "a"}}, "RegelId is required for update"),
+    ],
+)
+def test_validate_rejects(operation, message):
+    with pytest.raises(ValueError) as info:
+        rule_batch.validate_operation(operation)
+    assert message in str(info.value)
+
+
+def test_validate_blocks_lexical_errors_only():
+    operation = {"kind": "acceptance", "action": "update", "payload": {"RegelId": 1, "Omschrijving": "a"}}
+    operation["payload"]["Expressie"] = "some $x in //Merk satisfies $x = 'BMW'"
+    assert rule_batch.validate_operation(operation)["action"] == "update"
+    operation["payload"]["Expressie"] = "//Merk = 'BMW"
+    with pytest.raises(RuleValidationError):
+        rule_batch.validate_operation(operation)
+
+
+def _operations(count):
+    return [{"kind": "acceptance", "action": "delete", "regelId": str(i)} for i in range(count)]
+
+
+def test_run_operations_results_in_order(monkeypatch):
+    monkeypatch.setattr(rule_batch, "delete_rule", lambda config, token, kind, regel_id: {"deleted": regel_id})
+    results = rule_batch.run_operations({}, "token", _operations(20), concurrency=4, stop_on_error=False)
+    assert [result["index"] for result in results] == list(range(20))
+    assert all(result["status"] == "ok" for result in results)
+    assert results[3]["data"] == {"deleted": "3"}
+
+
+def test_run_operations_stop_on_error_skips_rest(monkeypatch):
+    def delete_rule(config, token, kind, regel_id):
+        if regel_id == "2":
+            raise RuntimeError("DIAS fout")
+        return {}
+
+    monkeypatch.setattr(rule_batch, "delete_rule", delete_rule)
+    results = rule_batch.run_operations({}, "token", _operations(10), concurrency=1, stop_on_error=True)
+    assert [result["status"] for result in results] == ["ok", "ok", "error"] + ["skipped"] * 7
+    assert results[2]["status_code"] == 502
@@ -0,0 +1,117 @@
+import random
+
+from _ruleindex import RuleIndex, parse_query, tokenize
+
+
+def acceptance(regel_id, omschrijving, expressie, extern=""):
+    return {"RegelId": regel_id, "ExternNummer": extern, "Omschrijving": omschrijving, "Expressie": expressie}
+
+
+def make_index():
+    index = RuleIndex()
+    index.upsert("acceptance", acceptance(1, "Merk niet toegestaan", "fn:lower-case(//Polis/Merk) = 'bmw'"))
+    index.upsert("acceptance", acceptance(2, "Bouwjaar te oud", "//Bouwjaar < 1990"))
+    index.upsert("acceptance", acceptance(10, "Merkloze aanhanger", "//Aanhanger/Merk = ''"))
+    index.upsert("acceptance", acceptance(3, "Premie bij schade", "//Schade > 2 and //Premie > 100"))
+    index.upsert(
+        "dynamiek",
+        {"RegelId": 7, "Omschrijving": "Korting merk", "Bron": {"EntiteitcodeId": "Merk"}, "Rekenregels": []},
+    )
+    return index
+
+
+def ids(result):
+    return [(item["kind"], item["regelId"]) for item in result["results"]]
+
+
+def test_tokenize_splits_compound_names():
+    assert tokenize("fn:lower-case(//Polis/Merk)") == ["fn:lower-case", "fn", "lower", "case", "polis", "merk"]
+    assert tokenize("Café 12.5") == ["cafe", "12.5", "12", "5"]
+
+
+def test_parse_query():
+    assert parse_query('merk* "niet toegestaan" //Polis/Merk') == [
+        {"terms": ["merk"], "prefix": True, "phrase": None},
+        {"terms": ["niet", "toegestaan"], "prefix": False, "phrase": "niet toegestaan"},
+        {"terms": ["polis", "merk"], "prefix": False, "phrase": "//polis/merk"},
+    ]
+
+
+def test_term_search_uses_natural_order():
+    assert ids(make_index().search("merk")) == [("acceptance", 1), ("acceptance", 10), ("dynamiek", 7)]
+
+
+def test_prefix_search_stops_at_prefix_boundary():
+    index = make_index()
+    assert ids(index.search("merk*", kind="acceptance")) == [("acceptance", 1), ("acceptance", 10)]
+    assert ids(index.search("merkl*")) == [("acceptance", 10)]
+    assert ids(index.search("mer*", field="omschrijving")) == [
+        ("acceptance", 1),
+        ("acceptance", 10),
+        ("dynamiek", 7),
+    ]
+    assert index.search("merkz*")["results"] == []
+
+
+def test_phrase_and_xpath_fragment():
+    index = make_index()
+    assert ids(index.search('"niet toegestaan"')) == [("acceptance", 1)]
+    assert ids(index.search("//Polis/Merk")) == [("acceptance", 1)]
+    result = index.search("//Polis/Merk")["results"][0]
+    assert result["matchedFields"] == ["expressie"]
+    assert "//Polis/Merk" in result["snippet"]
+
+
+def test_part_of_compound_name():
+    index = make_index()
+    assert ids(index.search("lower-case")) == [("acceptance", 1)]
+    assert ids(index.search("fn:lower-case")) == [("acceptance", 1)]
+    assert ids(index.search("lower-ca*")) == [("acceptance", 1)]
+    assert index.search("case-lower")["results"] == []
+
+
+def test_clauses_are_combined_with_and():
+    index = make_index()
+    assert ids(index.search("schade premie")) == [("acceptance", 3)]
+    assert ids(index.search("schade bouwjaar")) == []
+
+
+def test_limit_keeps_total():
+    result = make_index().search("merk", limit=1)
+    assert result["count"] == 1 and result["total"] == 3
+
+
+def test_upsert_replaces_terms_and_refreshes_prefix_list():
+    index = make_index()
+    assert ids(index.search("bouw*")) == [("acceptance", 2)]
+    index.upsert("acceptance", acceptance(2, "Catalogus te hoog", "//Cataloguswaarde > 80000"))
+    assert index.search("bouw*")["results"] == []
+    assert ids(index.search("catalogus*")) == [("acceptance", 2)]
+    assert "bouwjaar" not in index.postings["expressie"]
+
+
+def test_upsert_keeps_missing_fields_and_remove():
+    index = make_index()
+    index.upsert("acceptance", {"RegelId": 1, "Omschrijving": "Merk geweigerd"})
+    assert ids(index.search("lower-case")) == [("acceptance", 1)]
+    index.remove("acceptance", 1)
+    assert ids(index.search("merk*", kind="acceptance")) == [("acceptance", 10)]
+    assert ("acceptance", "1") not in index.docs
+
+
+def test_prefix_search_matches_brute_force():
+    rng = random.Random(7)
+    words = ["merk", "merken", "merkloos", "mer", "premie", "prem", "postcode", "post", "pos", "regio"]
+    index = RuleIndex()
+    docs = {}
+    for regel_id in range(1, 120):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        docs[regel_id] = set(text.split())
+        index.upsert("acceptance", acceptance(regel_id, text, ""))
+    for removed in range(1, 120, 7):
+        index.remove("acceptance", removed)
+        del docs[removed]
+    for prefix in ("m", "me", "mer", "merk", "merke", "p", "pos", "pre", "r", "x"):
+        expected = sorted(i for i, terms in docs.items() if any(term.startswith(prefix) for term in terms))
+        found = [int(item["regelId"]) for item in index.search(prefix + "*", limit=1000)["results"]]
+        assert found == expected, prefix
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def rule_simulate(load_handler, monkeypatch):
+    module = load_handler("rule-simulate")
+    monkeypatch.setattr(module, "RULE_SIMULATE_MAX_RULES", 2)
+    monkeypatch.delenv("BASIC_AUTH_USER", raising=False)
+    monkeypatch.delenv("BASIC_AUTH_PASS", raising=False)
+    return module
+
+
+def _post(call_handler, module, body):
+    status, _, payload = call_handler(module, "POST", "/api/rule-simulate", body=json.dumps(body).encode())
+    return status, json.loads(payload)
+
+
+def test_rule_limit_is_checked_before_parsing(rule_simulate, call_handler, monkeypatch):
+    parsed = []
+    monkeypatch.setattr(rule_simulate, "extract_expressie", lambda item: parsed.append(item))
+
+    # Ongeldige items: zou parse_rules ze bekijken, dan kwam er een andere fout.
+    status, body = _post(call_handler, rule_simulate, {"rules": [{}, {}, {}], "documents": [{"a": 1}]})
+    assert status == 400
+    assert body["error"] == "Maximaal 2 regels per request"
+    assert parsed == []
+
+
+def test_simulate_reports_results_and_regex_errors(rule_simulate, call_handler):
+    status, body = _post(
+        call_handler,
+        rule_simulate,
+        {
+            "rules": ["//Merk = 'BMW'", "matches(//Merk, '(B+)+$')"],
+            "documents": [{"Polis": {"Merk": "BMW"}}, {"Polis": {"Merk": "Audi"}}],
+        },
+    )
+    assert status == 200
+    first, second = body["results"]
+    assert (first["passed"], first["failed"], first["errors"]) == (1, 1, 0)
+    assert second["ok"] is True and second["errors"] == 2
+    assert "Geneste herhaling" in second["results"][0]["error"]
@@ -0,0 +1,146 @@
+import threading
+
+import pytest
+
+import _ruletable
+from _ruletable import (
+    MAX_PAGE_SIZE,
+    RuleTable,
+    flatten_rules,
+    get_rule_table,
+    invalidate_rule_table,
+    natural_key,
+    parse_list_query,
+)
+
+SEARCH = ("regelId", "externNummer", "omschrijving")
+SORT = ("externNummer", "omschrijving", "regelId")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_tables(monkeypatch):
+    monkeypatch.setattr(_ruletable, "_tables", {})
+    monkeypatch.setattr(_ruletable, "_build_locks", {})
+
+
+def _rules(*names):
+    return [{"RegelId": i + 1, "ExternNummer": name, "Omschrijving": f"Regel {name}"} for i, name in enumerate(names)]
+
+
+def test_natural_key_orders_numbers_numerically():
+    values = ["R10", "r2", "R1", "Ä3", "a20", "R2a", "b"]
+    assert sorted(values, key=natural_key) == ["Ä3", "a20", "b", "R1", "r2", "R2a", "R10"]
+    assert natural_key("Énergie") == natural_key("energie")
+
+
+def test_flatten_rules_keeps_document_order():
+    items = [{"Data": [{"RegelId": 1}, [{"RegelId": 2}, None]]}, {"RegelId": 3}, []]
+    assert [item["RegelId"] for item in flatten_rules(items)] == [1, 2, 3]
+
+
+def test_query_sorts_searches_and_pages():
+    table = RuleTable(_rules("R10", "R2", "R1", "X5"), SEARCH, SORT)
+
+    result = table.query(sort="externNummer", page_size=2)
+    assert [r["ExternNummer"] for r in result["rules"]] == ["R1", "R2"]
+    assert (result["total"], result["pages"], result["count"]) == (4, 2, 2)
+
+    result = table.query(sort="externNummer", direction="desc", page=2, page_size=2)
+    assert [r["ExternNummer"] for r in result["rules"]] == ["R2", "R1"]
+
+    result = table.query(q="regel r1", sort="unknown")
+    assert [r["ExternNummer"] for r in result["rules"]] == ["R1", "R10"]
+
+    # Pagina buiten bereik: laatste pagina.
+    result = table.query(page=99, page_size=3)
+    assert (result["page"], result["count"]) == (2, 1)
+
+
+def test_parse_list_query_without_params_is_none():
+    assert parse_list_query({}) is None
+    assert parse_list_query({"env": ["acceptance"]}) is None
+
+
+def test_parse_list_query_defaults_and_values():
+    assert parse_list_query({"q": ["merk"]}) == {
+        "q": "merk",
+        "sort": None,
+        "direction": "asc",
+        "page": 1,
+        "page_size": 10,
+    }
+    parsed = parse_list_query({"dir": ["desc"], "page": ["3"], "pageSize": [str(MAX_PAGE_SIZE)]})
+    assert (parsed["direction"], parsed["page"], parsed["page_size"]) == ("desc", 3, MAX_PAGE_SIZE)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"dir": ["up"]},
+        {"page": ["één"]},
+        {"pageSize": ["10.5"]},
+        {"page": ["0"]},
+        {"pageSize": ["0"]},
+        {"pageSize": [str(MAX_PAGE_SIZE + 1)]},
+    ],
+)
+def test_parse_list_query_rejects_bad_input(params):
+    with pytest.raises(ValueError):
+        parse_list_query(params)
+
+
+def test_table_is_cached_until_refresh_or_invalidate():
+    loads = []
+
+    def load():
+        loads.append(1)
+        return _rules(*[f"R{n}" for n in range(len(loads))])
+
+    first = get_rule_table("acceptance", "production", load, SEARCH, SORT)
+    assert get_rule_table("acceptance", "production", load, SEARCH, SORT) is first
+    assert len(loads) == 1
+
+    refreshed = get_rule_table("acceptance", "production", load, SEARCH, SORT, refresh=True)
+    assert refreshed is not first and len(refreshed.rows) == 2
+
+    other_env = get_rule_table("acceptance", "acceptance", load, SEARCH, SORT)
+    invalidate_rule_table("acceptance", "production")
+    rebuilt = get_rule_table("acceptance", "production", load, SEARCH, SORT)
+    assert rebuilt is not refreshed and len(rebuilt.rows) == 4
+    assert get_rule_table("acceptance", "acceptance", load, SEARCH, SORT) is other_env
+
+    invalidate_rule_table("acceptance")
+    assert _ruletable._tables == {}
+
+
+def test_table_expires_after_ttl(monkeypatch):
+    loads = []
+    load = lambda: loads.append(1) or _rules("R1")  # noqa: E731
+    monkeypatch.setattr(_ruletable, "RULE_TABLE_TTL", 0)
+    get_rule_table("dynamiek", "production", load, SEARCH, SORT)
+    get_rule_table("dynamiek", "production", load, SEARCH, SORT)
+    assert len(loads) == 2
+
+
+def test_concurrent_builds_share_one_load():
+    release = threading.Event()
+    loads = []
+
+    def load():
+        loads.append(1)
+        release.wait(5)
+        return _rules("R1")
+
+    tables = []
+    threads = [
+        threading.Thread(target=lambda: tables.append(get_rule_table("acceptance", "production", load, SEARCH, SORT)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(loads) == 1
+    assert len(tables) == 4 and all(table is tables[0] for table in tables)
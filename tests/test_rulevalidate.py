@@ -0,0 +1,132 @@
+import json
+
+import pytest
+
+from _rules import build_rule_payload
+from _rulevalidate import RuleValidationError, validate_expression
+
+# Geldig XPath 2.0 dat de lokale parser niet kent: mag niet blokkeren.
+UNSUPPORTED = [
+    "some $x in //Bestuurder satisfies $x/Leeftijd < 18",
+    "every $x in //Bestuurder satisfies $x/Leeftijd >= 18",
+    "for $x in //Bestuurder return $x/Leeftijd",
+    "//Bouwjaar instance of xs:integer",
+    "//Bouwjaar cast as xs:integer",
+    "//Bouwjaar castable as xs:integer",
+    "//Bouwjaar treat as item()*",
+    "(: commentaar (: genest :) :) //Merk = 'BMW'",
+    "//Merk = 'BMW' (: commentaar met ) en ' erin :)",
+    "1 to 5",
+    "//Merk/following-sibling::Type",
+    "//Type/preceding-sibling::Merk",
+    "//Merk/ancestor-or-self::Polis",
+    "//ns:*",
+    "//*:Merk",
+    "//Merk intersect //Type",
+    "//Merk except //Type",
+    "//Merk[1] is //Merk[1]",
+    "//Merk[1] << //Type[1]",
+]
+
+SUPPORTED = [
+    "if((fn:exists(//Merk) and (//Bouwjaar > 1990))) then false() else true()",
+    "lower-case(//Merk) = 'bmw' or //Bouwjaar >= 2000",
+    "'it''s' = \"a)\"",
+    "count(//Bestuurder[Leeftijd < 25]) gt 0",
+]
+
+INVALID = [
+    ("//Merk[1", "wordt niet gesloten"),
+    ("(//Merk = 'BMW'", "wordt niet gesloten"),
+    ("//Merk = 'BMW')", "zonder bijbehorend"),
+    ("fn:exists(//Merk]", "zonder bijbehorend"),
+    ("//Merk = 'BMW", "String wordt niet afgesloten"),
+    ("//Merk (: commentaar", "Commentaar wordt niet afgesloten"),
+    ("//Merk = 'BMW' and", "einde van de expressie"),
+    ("if (//Merk) then true()", "einde van de expressie"),
+]
+
+
+@pytest.mark.parametrize("expression", UNSUPPORTED)
+def test_unsupported_constructs_only_warn(expression):
+    result = validate_expression(expression)
+    assert result["valid"] is True
+    assert result["errors"] == []
+    assert len(result["warnings"]) == 1
+    assert result["warnings"][0]["severity"] == "warning"
+
+
+@pytest.mark.parametrize("expression", UNSUPPORTED)
+def test_unsupported_constructs_can_be_saved(expression):
+    action, payload = build_rule_payload(
+        "acceptance", {"RegelId": 1, "Omschrijving": "Test", "Expressie": expression}
+    )
+    assert action == "update"
+    assert payload["Expressie"] == expression
+
+
+@pytest.mark.parametrize("expression", SUPPORTED)
+def test_supported_expressions_are_clean(expression):
+    assert validate_expression(expression) == {"valid": True, "errors": [], "warnings": []}
+
+
+@pytest.mark.parametrize("expression, message", INVALID)
+def test_lexical_errors_block(expression, message):
+    result = validate_expression(expression)
+    assert result["valid"] is False
+    assert message in result["errors"][0]["message"]
+
+
+@pytest.mark.parametrize("expression, message", INVALID)
+def test_lexical_errors_block_save(expression, message):
+    with pytest.raises(RuleValidationError) as info:
+        build_rule_payload("acceptance", {"RegelId": 1, "Omschrijving": "Test", "Expressie": expression})
+    assert info.value.errors[0]["field"] == "Expressie"
+
+
+@pytest.mark.parametrize("expression", ["", "   "])
+def test_empty_expression_is_left_to_dias(expression):
+    result = validate_expression(expression)
+    assert result["valid"] is True and result["errors"] == []
+    assert result["warnings"][0]["message"] == "Lege expressie"
+
+    action, payload = build_rule_payload("acceptance", {"RegelId": 1, "Omschrijving": "Test", "Expressie": expression})
+    assert action == "update" and payload["Expressie"] == expression
+
+
+def test_error_position_line_and_column():
+    result = validate_expression("//Merk = 'BMW'\nand (//Type")
+    error = result["errors"][0]
+    assert (error["position"], error["line"], error["column"]) == (19, 2, 5)
+
+
+@pytest.fixture
+def acceptance_rules(load_handler, monkeypatch):
+    module = load_handler("acceptance-rules")
+    saved = []
+    monkeypatch.setattr(module, "get_env_config", lambda env_key: {"env": env_key})
+    monkeypatch.setattr(module, "get_bearer_token", lambda config: "token")
+    monkeypatch.setattr(
+        module, "save_rule", lambda config, token, kind, action, payload: saved.append(payload) or {"ok": True}
+    )
+    monkeypatch.setattr(module, "index_rule_saved", lambda *args: None)
+    monkeypatch.delenv("BASIC_AUTH_USER", raising=False)
+    monkeypatch.delenv("BASIC_AUTH_PASS", raising=False)
+    return module, saved
+
+
+def test_put_with_empty_expression_goes_to_dias(acceptance_rules, call_handler):
+    module, saved = acceptance_rules
+    body = json.dumps({"RegelId": 1, "Omschrijving": "Test", "Expressie": ""}).encode()
+    status, _, _ = call_handler(module, "PUT", "/api/acceptance-rules", body=body)
+    assert status == 200
+    assert saved[0]["Expressie"] == ""
+
+
+def test_put_with_syntax_error_is_rejected_locally(acceptance_rules, call_handler):
+    module, saved = acceptance_rules
+    body = json.dumps({"RegelId": 1, "Omschrijving": "Test", "Expressie": "//Merk = 'BMW"}).encode()
+    status, _, payload = call_handler(module, "PUT", "/api/acceptance-rules", body=body)
+    assert status == 400
+    assert json.loads(payload)["errors"][0]["field"] == "Expressie"
+    assert saved == []
@@ -0,0 +1,164 @@
+import copy
+import json
+
+import pytest
+
+import _snapshot
+from _snapshot import Snapshot, main, sync_snapshot
+
+DIAS = {
+    "acceptance": [
+        {"RegelId": 1, "ExternNummer": "A1", "Omschrijving": "Merk", "Expressie": "//Merk = 'BMW'"},
+        {"RegelId": 2, "ExternNummer": "A2", "Omschrijving": "Jaar", "Expressie": "//Bouwjaar > 1990"},
+    ],
+    # Zonder Rekenregels in de lijst: detail nodig.
+    "dynamiek": [{"RegelId": 7, "Omschrijving": "Korting"}],
+    "dynamiek_details": {7: {"Data": {"Rekenregels": [{"Operator": "Gelijk", "Waarde": "10"}]}}},
+    "products": [{"ProductId": 40, "Omschrijving": "Auto"}, {"ProductId": 41, "Omschrijving": "Fiets"}],
+    "product_details": {
+        40: {"ProductId": 40, "Validatieregels": [{"Expressie": "//Merk"}]},
+        41: {"ProductId": 41, "Validatieregels": []},
+    },
+}
+
+
+@pytest.fixture
+def dias(monkeypatch):
+    state = copy.deepcopy(DIAS)
+    calls = {"rule_details": [], "product_details": []}
+
+    def fetch_rule_details(config, token, kind, regel_ids):
+        calls["rule_details"].extend(regel_ids)
+        return [{"ok": True, "data": state["dynamiek_details"][regel_id]} for regel_id in regel_ids]
+
+    def fetch_product_detail(config, token, product_id):
+        calls["product_details"].append(product_id)
+        return state["product_details"][product_id]
+
+    monkeypatch.setattr(_snapshot, "get_env_config", lambda env_key: {"env": env_key})
+    monkeypatch.setattr(_snapshot, "get_product_env_config", lambda env_key: {"env": env_key})
+    monkeypatch.setattr(_snapshot, "get_bearer_token", lambda config: "token")
+    monkeypatch.setattr(_snapshot, "fetch_rules", lambda config, token, kind: {"rules": state[kind]})
+    monkeypatch.setattr(_snapshot, "fetch_products", lambda config, token: {"products": state["products"]})
+    monkeypatch.setattr(_snapshot, "fetch_rule_details", fetch_rule_details)
+    monkeypatch.setattr(_snapshot, "fetch_product_detail", fetch_product_detail)
+    return state, calls
+
+
+def _members(directory):
+    with Snapshot(directory) as snapshot:
+        return {key: bytes(snapshot.raw_member(key)) for key in snapshot.entries}
+
+
+def test_sync_then_show_and_export_round_trip(dias, tmp_path, capsys):
+    directory = str(tmp_path)
+    stats = sync_snapshot("production", directory)
+
+    assert stats["errors"] == [] and stats["count"] == 5
+    assert stats["kinds"]["dynamiek"] == {"listed": 1, "fetched": 1, "unchanged": 0, "changed": 1, "removed": 0}
+    assert stats["kinds"]["acceptance"]["fetched"] == 0
+
+    with Snapshot(directory) as snapshot:
+        records = list(snapshot.records())
+    assert [record["key"] for record in records] == [
+        "acceptance:1",
+        "acceptance:2",
+        "dynamiek:7",
+        "product:40",
+        "product:41",
+    ]
+    assert records[2]["data"]["Rekenregels"] == [{"Operator": "Gelijk", "Waarde": "10"}]
+    assert records[3]["data"] == DIAS["product_details"][40]
+
+    assert main(["export", "--dir", directory]) == 0
+    exported = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert exported == records
+
+    assert main(["export", "--dir", directory, "--kind", "product"]) == 0
+    assert [json.loads(line)["key"] for line in capsys.readouterr().out.splitlines()] == ["product:40", "product:41"]
+
+    assert main(["show", "--dir", directory, "acceptance:2"]) == 0
+    assert json.loads(capsys.readouterr().out) == records[1]
+
+    assert main(["show", "--dir", directory]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["count"] == 5
+    assert summary["kinds"] == {"acceptance": 2, "dynamiek": 1, "product": 2}
+
+    assert main(["show", "--dir", directory, "acceptance:99"]) == 1
+
+
+def test_second_sync_rewrites_only_the_changed_member(dias, tmp_path):
+    state, _ = dias
+    directory = str(tmp_path)
+    sync_snapshot("production", directory)
+    before = _members(directory)
+
+    state["product_details"][41] = {"ProductId": 41, "Validatieregels": [{"Expressie": "//Kleur"}]}
+    stats = sync_snapshot("production", directory)
+    after = _members(directory)
+
+    assert stats["kinds"]["product"] == {"listed": 2, "fetched": 2, "unchanged": 1, "changed": 1, "removed": 0}
+    assert stats["kinds"]["acceptance"]["unchanged"] == 2
+    assert stats["kinds"]["dynamiek"]["unchanged"] == 1
+    assert [key for key in before if before[key] != after[key]] == ["product:41"]
+    with Snapshot(directory) as snapshot:
+        assert snapshot.get("product:41")["data"]["Validatieregels"] == [{"Expressie": "//Kleur"}]
+
+
+def test_full_sync_rewrites_everything_with_the_same_bytes(dias, tmp_path):
+    directory = str(tmp_path)
+    sync_snapshot("production", directory)
+    before = _members(directory)
+
+    stats = sync_snapshot("production", directory, full=True)
+    assert sum(kind["changed"] for kind in stats["kinds"].values()) == 5
+    # mtime=0: dezelfde inhoud geeft dezelfde gzip members.
+    assert _members(directory) == before
+
+
+def test_removed_records_leave_the_snapshot(dias, tmp_path):
+    state, _ = dias
+    directory = str(tmp_path)
+    sync_snapshot("production", directory)
+
+    state["acceptance"] = state["acceptance"][:1]
+    stats = sync_snapshot("production", directory)
+
+    assert stats["kinds"]["acceptance"]["removed"] == 1
+    assert "acceptance:2" not in _members(directory)
+
+
+def test_unsynced_kinds_carry_forward(dias, tmp_path):
+    state, calls = dias
+    directory = str(tmp_path)
+    sync_snapshot("production", directory)
+    before = _members(directory)
+
+    state["dynamiek_details"][7] = {"Data": {"Rekenregels": []}}
+    state["product_details"][40] = {"ProductId": 40, "Validatieregels": []}
+    state["acceptance"][0]["Expressie"] = "//Merk = 'Audi'"
+    calls["product_details"].clear()
+
+    stats = sync_snapshot("production", directory, kinds=["acceptance"], include_products=False)
+    after = _members(directory)
+
+    assert set(stats["kinds"]) == {"acceptance"}
+    assert calls["product_details"] == []
+    assert sorted(after) == sorted(before)
+    assert [key for key in before if before[key] != after[key]] == ["acceptance:1"]
+
+
+def test_failed_list_keeps_existing_records(dias, tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    sync_snapshot("production", directory)
+    before = _members(directory)
+
+    def fetch_products(config, token):
+        raise RuntimeError("DIAS down")
+
+    monkeypatch.setattr(_snapshot, "fetch_products", fetch_products)
+    stats = sync_snapshot("production", directory)
+
+    assert stats["errors"] == [{"kind": "product", "error": "DIAS down"}]
+    assert _members(directory) == before
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from _stream import ListEnvelope, normalize_list_body
+
+KEYS = ("data", "rules")
+
+BODIES = [
+    b"[]",
+    b"[1, 2, 3]",
+    b' [ {"a": [1, {"b": "]"}]}, "x\\"]", null, [], {} ] ',
+    b'[["nested", ["deep"]], {"k": {"l": [1, 2]}}]',
+    b'{"data": [{"RegelId": 1, "Omschrijving": "a, b"}, {"RegelId": 2}]}',
+    b'{"data": [ ]}',
+    b'{"data": [1, 2], "total": 2}',
+    b'{"meta": {"data": [9, 9]}, "data": [1, 2]}',
+    b'{"da\\"ta": [0], "data": [2]}',
+    b'{"total": "data", "data": ["data", "[", "{"]}',
+    b'["a\\\\", "b\\"c", "\\u00e9", "\xc3\xa9", "\\\\\\""]',
+    b'{"rules": [1, 2]}',
+    b'{"data": {"x": 1}}',
+    b'{"data": null}',
+    b'{"other": 1}',
+    b"{}",
+    b'"scalar"',
+    b"42",
+    b"null",
+    b"",
+    b"   ",
+]
+
+
+def reference(raw, name="rules", keys=KEYS):
+    # Zelfde regels als de niet-gestreamde normalisatie.
+    data = json.loads(raw) if raw.strip() else None
+    items = None
+    if isinstance(data, list):
+        items = data
+    elif isinstance(data, dict):
+        for key in keys:
+            if key in data:
+                items = data[key]
+                break
+    if items is None:
+        items = [data] if data else []
+    return {name: items, "count": len(items)}
+
+
+def run(chunks, name="rules", keys=KEYS):
+    envelope = ListEnvelope(name, keys)
+    out = b"".join(envelope.feed(chunk) for chunk in chunks)
+    return json.loads(out + envelope.close())
+
+
+@pytest.mark.parametrize("raw", BODIES)
+def test_single_chunk(raw):
+    assert run([raw]) == reference(raw)
+    assert json.loads(normalize_list_body(raw, "rules", KEYS)) == reference(raw)
+
+
+@pytest.mark.parametrize("raw", BODIES)
+def test_every_two_way_split(raw):
+    expected = reference(raw)
+    for i in range(len(raw) + 1):
+        assert run([raw[:i], raw[i:]]) == expected, f"split op {i}"
+
+
+@pytest.mark.parametrize("raw", BODIES)
+def test_byte_by_byte(raw):
+    assert run([raw[i:i + 1] for i in range(len(raw))]) == reference(raw)
+
+
+@pytest.mark.parametrize("raw", BODIES)
+def test_every_three_way_split(raw):
+    expected = reference(raw)
+    for i in range(len(raw) + 1):
+        for j in range(i, len(raw) + 1):
+            assert run([raw[:i], raw[i:j], raw[j:]]) == expected, f"split op {i}, {j}"
+
+
+def test_large_array_is_streamed_before_close():
+    items = [{"RegelId": i, "Expressie": f"//Merk = 'x{i}'"} for i in range(200)]
+    raw = json.dumps({"data": items}).encode("utf-8")
+    envelope = ListEnvelope("rules", KEYS)
+    streamed = b"".join(envelope.feed(raw[i:i + 64]) for i in range(0, len(raw), 64))
+    # Bijna alles is al doorgezet vóór close(); close voegt alleen count toe.
+    assert len(streamed) > len(raw) - 64
+    tail = envelope.close()
+    assert tail == b', "count": 200}'
+    assert json.loads(streamed + tail) == {"rules": items, "count": 200}
+
+
+def test_keys_order_decides_fallback_key():
+    raw = b'{"rules": [1], "items": [2, 3]}'
+    assert run([raw], name="products", keys=("data", "items")) == {"products": [2, 3], "count": 2}
+
+
+@pytest.mark.parametrize("raw", [b"[1, 2", b'{"data": [1, {"a": 2}', b'["open string'])
+def test_truncated_array_raises(raw):
+    envelope = ListEnvelope("rules", KEYS)
+    envelope.feed(raw)
+    with pytest.raises(ValueError):
+        envelope.close()
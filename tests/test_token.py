@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+
+import httpx
+import pytest
+
+import _token
+import _upstream
+
+ENV = "token-test"
+CONFIG = {"env": ENV, "host": "https://kinetic.test/", "client_id": "id", "client_secret": "secret"}
+
+
+@pytest.fixture
+def token_server(monkeypatch):
+    calls = []
+    release = threading.Event()
+    release.set()
+
+    def respond(request):
+        release.wait(5)
+        calls.append(request)
+        assert request.url.path == "/token"
+        assert request.url.params["client_id"] == "id"
+        return httpx.Response(200, json={"access_token": f"token-{len(calls)}", "expires_in": 3600})
+
+    monkeypatch.setattr(_token, "_entries", {})
+    monkeypatch.setattr(_token, "_locks", {})
+    monkeypatch.setattr(_token, "_stats", {})
+    monkeypatch.setattr(_token, "TOKEN_STORE_DIR", None)
+    monkeypatch.setitem(_upstream._clients, ENV, httpx.Client(transport=httpx.MockTransport(respond)))
+    return calls, release
+
+
+def _wait_for(condition, seconds=5.0):
+    stop = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > stop:
+            raise AssertionError("conditie niet bereikt")
+        time.sleep(0.01)
+
+
+def test_token_is_shared_until_refresh_at(token_server):
+    calls, _ = token_server
+    assert _token.get_bearer_token(CONFIG) == "token-1"
+    assert _token.get_bearer_token(CONFIG) == "token-1"
+    assert len(calls) == 1
+
+    entry = _token._entries[ENV]
+    assert entry["refresh_at"] < entry["expires_at"]
+    stats = _token.token_stats()[ENV]
+    assert (stats["misses"], stats["hits"], stats["refreshes"]) == (1, 1, 1)
+
+
+def test_background_refresh_after_refresh_at(token_server):
+    calls, release = token_server
+    _token.get_bearer_token(CONFIG)
+    _token._entries[ENV]["refresh_at"] = time.time() - 1
+
+    # Het request dat refresh_at ziet wacht niet op /token.
+    release.clear()
+    assert _token.get_bearer_token(CONFIG) == "token-1"
+    # Een tweede request start geen tweede refresh zolang de eerste loopt.
+    assert _token.get_bearer_token(CONFIG) == "token-1"
+    release.set()
+
+    _wait_for(lambda: _token._entries[ENV]["token"] == "token-2")
+    _wait_for(lambda: not _token._locks[ENV].locked())
+    assert len(calls) == 2
+    assert _token.token_stats()[ENV]["background_refreshes"] == 1
+    assert _token.get_bearer_token(CONFIG) == "token-2"
+
+
+def test_concurrent_misses_refresh_once(token_server):
+    calls, release = token_server
+    release.clear()
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(_token.get_bearer_token(CONFIG))) for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: _token.token_stats().get(ENV, {}).get("misses") == 5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["token-1"] * 5
+    assert len(calls) == 1
+
+
+def test_file_store_is_shared_between_processes(token_server, monkeypatch, tmp_path):
+    calls, _ = token_server
+    store_dir = str(tmp_path / "tokens")
+    monkeypatch.setattr(_token, "TOKEN_STORE_DIR", store_dir)
+
+    assert _token.get_bearer_token(CONFIG) == "token-1"
+    path = _token._store_path(CONFIG)
+    assert os.path.exists(path)
+    if _token.fcntl is not None:
+        assert os.path.exists(path + ".lock")
+
+    # Een andere handler in dezelfde container: leeg geheugen, zelfde bestand.
+    monkeypatch.setattr(_token, "_entries", {})
+    assert _token.get_bearer_token(CONFIG) == "token-1"
+    assert len(calls) == 1
+    assert _token.token_stats()[ENV]["store_hits"] == 1
+
+
+def test_file_store_ignores_expired_token(token_server, monkeypatch, tmp_path):
+    calls, _ = token_server
+    monkeypatch.setattr(_token, "TOKEN_STORE_DIR", str(tmp_path))
+    _token._save_store(CONFIG, {"token": "old", "expires_at": time.time() - 1, "refresh_at": time.time() - 10})
+
+    assert _token.get_bearer_token(CONFIG) == "token-1"
+    assert len(calls) == 1
+
+
+def test_missing_credentials_raise(token_server):
+    with pytest.raises(RuntimeError):
+        _token.get_bearer_token(dict(CONFIG, client_secret=None))
+    assert _token.token_stats()[ENV]["errors"] == 1
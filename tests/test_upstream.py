@@ -0,0 +1,196 @@
+import threading
+import time
+
+import httpx
+import pytest
+
+import _deadline
+import _resilience
+import _upstream
+from _deadline import DEADLINE_MARGIN, Deadline, DeadlineExceeded
+from _upstream import _coalesce_key, coalesced_get, upstream_stats
+
+ENV = "coalesce-test"
+URL = "https://dias.test/api/rules"
+
+
+@pytest.fixture
+def dias(monkeypatch):
+    """Stub transport: elke call wordt geteld en wacht op 'release'."""
+    calls = []
+    release = threading.Event()
+    state = {"respond": lambda request, n: httpx.Response(200, json={"n": n})}
+
+    def handle(request):
+        calls.append(request)
+        n = len(calls)
+        release.wait(5)
+        return state["respond"](request, n)
+
+    monkeypatch.setattr(_upstream, "_inflight", {})
+    monkeypatch.setattr(_upstream, "_coalesce_stats", {"requests": 0, "coalesced": 0})
+    monkeypatch.setattr(_upstream, "UPSTREAM_COALESCE", True)
+    monkeypatch.setattr(_resilience, "_breakers", {})
+    monkeypatch.setattr(_resilience, "UPSTREAM_RETRIES", 0)
+    monkeypatch.setitem(_upstream._clients, ENV, httpx.Client(transport=httpx.MockTransport(handle)))
+    return calls, release, state
+
+
+def _wait_for(condition, seconds=5.0):
+    stop = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > stop:
+            raise AssertionError("conditie niet bereikt")
+        time.sleep(0.005)
+
+
+def _start(target, results, *args, **kwargs):
+    def run():
+        try:
+            results.append(target(*args, **kwargs))
+        except BaseException as exc:  # noqa: BLE001 - de test kijkt naar de exceptie
+            results.append(exc)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_concurrent_identical_gets_share_one_call(dias):
+    calls, release, _ = dias
+    results = []
+    threads = [_start(coalesced_get, results, ENV, URL, params={"kind": "acceptance"}) for _ in range(8)]
+    _wait_for(lambda: _upstream._coalesce_stats["coalesced"] == 7)
+    assert upstream_stats()["inflight"] == 1
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    assert results[0].json() == {"n": 1}
+    stats = upstream_stats()
+    assert (stats["requests"], stats["coalesced"], stats["inflight"]) == (8, 7, 0)
+
+
+def test_leader_exception_reaches_every_follower(dias):
+    calls, release, state = dias
+
+    def fail(request, n):
+        raise httpx.ConnectError("verbinding geweigerd", request=request)
+
+    state["respond"] = fail
+    results = []
+    threads = [_start(coalesced_get, results, ENV, URL) for _ in range(4)]
+    _wait_for(lambda: _upstream._coalesce_stats["coalesced"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 4
+    assert all(isinstance(result, httpx.ConnectError) for result in results)
+    assert all(result is results[0] for result in results)
+
+    # Daarna niets meer in flight: een nieuwe call gaat weer naar upstream.
+    state["respond"] = lambda request, n: httpx.Response(200, json={"n": n})
+    assert coalesced_get(ENV, URL).json() == {"n": 2}
+
+
+def test_different_params_do_not_coalesce(dias):
+    calls, release, _ = dias
+    results = []
+    threads = [
+        _start(coalesced_get, results, ENV, URL, params={"regelId": "1"}),
+        _start(coalesced_get, results, ENV, URL, params={"regelId": "2"}),
+        _start(coalesced_get, results, "other-env", URL, params={"regelId": "1"}),
+    ]
+    _wait_for(lambda: len(calls) == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 2
+    assert sorted(call.url.params["regelId"] for call in calls) == ["1", "2"]
+    assert _upstream._coalesce_stats["coalesced"] == 0
+
+
+def test_coalesce_key_ignores_authorization_only():
+    base = _coalesce_key(ENV, URL, {"a": 1, "b": 2}, {"Authorization": "Bearer x", "Accept": "application/json"})
+    assert base == _coalesce_key(ENV, URL, {"b": "2", "a": "1"}, {"authorization": "Bearer y", "accept": "application/json"})
+    assert base != _coalesce_key(ENV, URL, {"a": 1, "b": 2}, {"Accept": "text/plain"})
+    assert base != _coalesce_key("acceptance", URL, {"a": 1, "b": 2}, {"Accept": "application/json"})
+
+
+def test_followers_with_other_tokens_share_the_call(dias):
+    calls, release, _ = dias
+    results = []
+    threads = [
+        _start(coalesced_get, results, ENV, URL, headers={"Authorization": f"Bearer {n}"}) for n in range(3)
+    ]
+    _wait_for(lambda: _upstream._coalesce_stats["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+
+
+def test_follower_retries_itself_after_the_leaders_deadline(dias):
+    calls, release, state = dias
+    follower_joined = threading.Event()
+    leader_deadline = Deadline(DEADLINE_MARGIN + 0.3)
+
+    def respond(request, n):
+        if n == 1:
+            # Leider: pas opgeven als de volger wacht en zijn deadline voorbij is.
+            follower_joined.wait(5)
+            time.sleep(max(0.0, leader_deadline.remaining()) + 0.01)
+            raise httpx.ReadTimeout("read timeout", request=request)
+        return httpx.Response(200, json={"n": n})
+
+    state["respond"] = respond
+    release.set()
+
+    def leader():
+        _deadline._current.set(leader_deadline)
+        return coalesced_get(ENV, URL)
+
+    leader_results, follower_results = [], []
+    leader_thread = _start(leader, leader_results)
+    _wait_for(lambda: len(calls) == 1)
+    follower_thread = _start(coalesced_get, follower_results, ENV, URL)
+    _wait_for(lambda: _upstream._coalesce_stats["coalesced"] == 1)
+    follower_joined.set()
+    leader_thread.join(5)
+    follower_thread.join(5)
+
+    assert isinstance(leader_results[0], DeadlineExceeded)
+    assert leader_results[0].deadline is leader_deadline
+    # De volger heeft geen (of een latere) deadline: zelf opnieuw.
+    assert follower_results[0].json() == {"n": 2}
+    assert len(calls) == 2
+
+
+def test_follower_gives_up_at_its_own_timeout(dias):
+    calls, release, _ = dias
+    results = []
+    leader_thread = _start(coalesced_get, results, ENV, URL)
+    _wait_for(lambda: len(calls) == 1)
+
+    with pytest.raises(httpx.TimeoutException):
+        coalesced_get(ENV, URL, timeout=0.05)
+    release.set()
+    leader_thread.join(5)
+    assert results[0].status_code == 200
+
+
+def test_coalescing_can_be_disabled(dias, monkeypatch):
+    calls, release, _ = dias
+    monkeypatch.setattr(_upstream, "UPSTREAM_COALESCE", False)
+    results = []
+    threads = [_start(coalesced_get, results, ENV, URL) for _ in range(3)]
+    _wait_for(lambda: len(calls) == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert _upstream._coalesce_stats["requests"] == 0
@@ -0,0 +1,124 @@
+import pytest
+
+from _xpath import XPathSyntaxError, check_lexical, parse
+from _xpatheval import XPathEvalError, compile_expression, load_document
+
+DOCUMENT = {
+    "Polis": {
+        "Merk": "BMW",
+        "Bouwjaar": 2015,
+        "Bestuurder": [{"Leeftijd": 23}, {"Leeftijd": 41}],
+        "@versie": 2,
+    }
+}
+
+
+def run(expression):
+    return compile_expression(expression).test(load_document(DOCUMENT))
+
+
+def test_parse_if_expression():
+    node = parse("if (//Merk = 'BMW') then false() else true()")
+    assert node.kind == "if"
+    condition, then, otherwise = node.children
+    assert condition.kind == "cmp" and condition.value == "="
+    assert (then.kind, then.value) == ("call", "false")
+    assert (otherwise.kind, otherwise.value) == ("call", "true")
+
+
+def test_parse_positions_cover_source():
+    text = "fn:exists(//Merk) and //Bouwjaar > 1990"
+    node = parse(text)
+    assert node.kind == "and"
+    assert (node.pos, node.end) == (0, len(text))
+    assert text[node.children[0].pos:node.children[0].end] == "fn:exists(//Merk)"
+
+
+def test_parse_string_escapes():
+    node = parse("'it''s'")
+    assert (node.kind, node.value, node.end) == ("literal", "it's", 7)
+
+
+@pytest.mark.parametrize(
+    "text, pos",
+    [("//Merk = ", 9), ("if (a) then b", 13), ("//Merk ! 1", 7), ("following-sibling::a", 0)],
+)
+def test_parse_errors_have_positions(text, pos):
+    with pytest.raises(XPathSyntaxError) as info:
+        parse(text)
+    assert info.value.pos == pos
+
+
+@pytest.mark.parametrize(
+    "text", ["(a)[1]", "'(' = \"[\"", "a (: (: x :) ) :) = 1", "f(a, [b], {c})", "'a''('"]
+)
+def test_check_lexical_accepts(text):
+    check_lexical(text)
+
+
+@pytest.mark.parametrize(
+    "text, pos", [("(a", 0), ("a]", 1), ("(a]", 2), ("'a", 0), ("\"a''", 0), ("a (: b", 2), ("[(])", 2)]
+)
+def test_check_lexical_rejects(text, pos):
+    with pytest.raises(XPathSyntaxError) as info:
+        check_lexical(text)
+    assert info.value.pos == pos
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("//Merk = 'BMW'", True),
+        ("//Merk = 'Audi'", False),
+        ("//Bouwjaar > 2010 and //Bouwjaar < 2020", True),
+        ("//Bestuurder/Leeftijd < 25", True),
+        ("//Bestuurder/Leeftijd > 50", False),
+        ("count(//Bestuurder) = 2", True),
+        ("/Polis/@versie = 2", True),
+        ("fn:exists(//Kenteken)", False),
+        ("if (//Merk = 'BMW') then false() else true()", False),
+        ("lower-case(//Merk) = 'bmw'", True),
+        ("//Bestuurder[Leeftijd > 30]", True),
+    ],
+)
+def test_evaluate(expression, expected):
+    assert run(expression) is expected
+
+
+def test_unknown_function_is_eval_error():
+    with pytest.raises(XPathEvalError):
+        compile_expression("onbekend(//Merk)")
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("matches(//Merk, '^B.W$')", True),
+        ("matches(//Merk, '^bmw$', 'i')", True),
+        ("matches(//Merk, '^[A-Z]{2}-\\d+$')", False),
+        ("matches(//Merk, '(B|M)+W')", True),
+    ],
+)
+def test_matches(expression, expected):
+    assert run(expression) is expected
+
+
+@pytest.mark.parametrize("pattern", ["(a+)+$", "(\\d*x)*", "((a)+){2,}", "(?:B+)*"])
+def test_matches_rejects_nested_quantifiers(pattern):
+    with pytest.raises(XPathEvalError, match="Geneste herhaling"):
+        run(f"matches(//Merk, '{pattern}')")
+
+
+def test_matches_rejects_long_patterns(monkeypatch):
+    import _xpatheval
+
+    monkeypatch.setattr(_xpatheval, "XPATH_REGEX_MAX_LENGTH", 8)
+    _xpatheval._regex.cache_clear()
+    assert run("matches(//Merk, 'BMW|Audi')") is True
+    with pytest.raises(XPathEvalError, match="te lang"):
+        run("matches(//Merk, 'BMW|Audi|Opel')")
+
+
+def test_matches_escaped_and_class_parentheses_are_literal():
+    assert run("matches(//Merk, '[(B+)]+')") is True
+    assert run("matches(//Merk, '\\(B+\\)+')") is False